@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Add Content Hash Columns
+
+This script adds the change-detection columns to bee_conversations and
+limitless_lifelogs: content_hash, generated from md5(raw_data), and
+derived_hash/transform_version, which record the raw_data and transform that
+last produced the derived data. Reprocessing scripts (update_all_conversations.py,
+fix_from_raw_data.py, update_conversation_columns.py) and the lifelog backfills
+(update_lifelog_timestamps.py, extract_lifelog_subsummaries.py,
+extract_transcript_lines.py) then only visit rows whose raw_data or transform
+changed. On lifelogs, transform_version is a JSONB object with the version of
+each of the three backfills.
+
+Existing rows start with no derived_hash, so the first run of each script
+after the migration visits them once. Adding a stored generated column
+rewrites the table once. Running the script again is safe.
+"""
+
+import os
+import sqlalchemy
+from sqlalchemy import create_engine
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Get database URL from environment variable
+DATABASE_URL = os.environ.get('DATABASE_URL')
+if not DATABASE_URL:
+    logger.error("DATABASE_URL environment variable not set")
+    exit(1)
+
+# Initialize SQLAlchemy connection
+engine = create_engine(DATABASE_URL)
+
+# Table and type of its transform_version column
+TABLES = [
+    ("bee_conversations", "VARCHAR"),
+    ("limitless_lifelogs", "JSONB")  # One version per lifelog backfill
+]
+
+def add_content_hash_columns():
+    """Add the content hash, derived hash and transform version columns if missing."""
+    for table, version_type in TABLES:
+        with engine.begin() as conn:
+            logger.info(f"Adding generated column {table}.content_hash (skipped if it exists)")
+            conn.execute(sqlalchemy.text(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS content_hash VARCHAR "
+                f"GENERATED ALWAYS AS (md5(raw_data)) STORED"
+            ))
+
+            logger.info(f"Adding columns {table}.derived_hash and transform_version (skipped if they exist)")
+            conn.execute(sqlalchemy.text(
+                f"ALTER TABLE {table} "
+                f"ADD COLUMN IF NOT EXISTS derived_hash VARCHAR, "
+                f"ADD COLUMN IF NOT EXISTS transform_version {version_type}"
+            ))
+    logger.info("Content hash columns are in place")
+
+def main():
+    """Main function to run the migration."""
+    logger.info("Starting migration to add the conversation and lifelog content hash columns")
+    add_content_hash_columns()
+    logger.info("Migration completed successfully")
+
+if __name__ == "__main__":
+    main()
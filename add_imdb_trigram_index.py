@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Add IMDb Title Trigram Index
+
+This script installs the pg_trgm extension and adds a GIN trigram index on
+imdb_titles.normalized_title. Offline enrichment uses it to find candidates
+for Netflix titles without an exact match; without it, those titles are
+simply left unmatched.
+
+The index is built with CREATE INDEX CONCURRENTLY so the table stays writable
+while the index is created. Running the script again is safe.
+"""
+
+import os
+import sqlalchemy
+from sqlalchemy import create_engine
+import logging
+
+from imdb_offline import TRIGRAM_INDEX as INDEX_NAME
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Get database URL from environment variable
+DATABASE_URL = os.environ.get('DATABASE_URL')
+if not DATABASE_URL:
+    logger.error("DATABASE_URL environment variable not set")
+    exit(1)
+
+# Initialize SQLAlchemy connection
+engine = create_engine(DATABASE_URL)
+
+def add_imdb_trigram_index():
+    """Install pg_trgm and create the trigram index if it doesn't exist yet."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        logger.info("Installing the pg_trgm extension (skipped if installed)")
+        conn.execute(sqlalchemy.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+        # An interrupted concurrent build leaves an invalid index behind; drop it so it is rebuilt
+        invalid = conn.execute(sqlalchemy.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": INDEX_NAME}).fetchone()
+        if invalid:
+            logger.warning(f"Dropping invalid index {INDEX_NAME} left by an interrupted build")
+            conn.execute(sqlalchemy.text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+
+        logger.info(f"Creating index {INDEX_NAME} (skipped if it exists)")
+        conn.execute(sqlalchemy.text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            f"ON imdb_titles USING GIN (normalized_title gin_trgm_ops)"
+        ))
+    logger.info("IMDb trigram index is in place")
+
+def main():
+    """Main function to run the migration."""
+    logger.info("Starting migration to add the IMDb title trigram index")
+    add_imdb_trigram_index()
+    logger.info("Migration completed successfully")
+
+if __name__ == "__main__":
+    main()
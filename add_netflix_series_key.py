@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Add Netflix Series Key Column
+
+This script creates the netflix_series_key() SQL function and adds the
+generated netflix_history_items.series_key column plus its index. Series
+deduplication (netflix_dedup.py) ranks episodes by this column, so existing
+databases need it before importing or running --deduplicate-netflix.
+
+Adding a stored generated column rewrites the table once. The index is built
+with CREATE INDEX CONCURRENTLY so the table stays writable while the index is
+created. Running the script again is safe.
+"""
+
+import os
+import sqlalchemy
+from sqlalchemy import create_engine
+import logging
+
+from models import NETFLIX_SERIES_KEY_FUNCTION
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Get database URL from environment variable
+DATABASE_URL = os.environ.get('DATABASE_URL')
+if not DATABASE_URL:
+    logger.error("DATABASE_URL environment variable not set")
+    exit(1)
+
+# Initialize SQLAlchemy connection
+engine = create_engine(DATABASE_URL)
+
+INDEX_NAME = "ix_netflix_history_series_key"
+
+def add_netflix_series_key():
+    """Create the series key function, the generated column and its index if missing."""
+    with engine.begin() as conn:
+        logger.info("Creating the netflix_series_key() function")
+        conn.execute(sqlalchemy.text(NETFLIX_SERIES_KEY_FUNCTION))
+
+        logger.info("Adding generated column series_key (skipped if it exists)")
+        conn.execute(sqlalchemy.text(
+            "ALTER TABLE netflix_history_items ADD COLUMN IF NOT EXISTS series_key VARCHAR "
+            "GENERATED ALWAYS AS (netflix_series_key(title)) STORED"
+        ))
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # An interrupted concurrent build leaves an invalid index behind; drop it so it is rebuilt
+        invalid = conn.execute(sqlalchemy.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": INDEX_NAME}).fetchone()
+        if invalid:
+            logger.warning(f"Dropping invalid index {INDEX_NAME} left by an interrupted build")
+            conn.execute(sqlalchemy.text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+
+        logger.info(f"Creating index {INDEX_NAME} (skipped if it exists)")
+        conn.execute(sqlalchemy.text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            f"ON netflix_history_items (series_key, watch_date)"
+        ))
+    logger.info("Netflix series key column is in place")
+
+def main():
+    """Main function to run the migration."""
+    logger.info("Starting migration to add the Netflix series key column")
+    add_netflix_series_key()
+    logger.info("Migration completed successfully")
+
+if __name__ == "__main__":
+    main()
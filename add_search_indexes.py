@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Add Full-Text Search Indexes
+
+This script adds GIN expression indexes over to_tsvector() for the columns
+searched by /api/search:
+- bee_conversations.summary and atmosphere
+- bee_facts.text
+- limitless_lifelogs.title and description
+- limitless_transcript_lines.text
+- limitless_transcript_packs.text (added by add_transcript_pack_index.py)
+
+Indexes are built with CREATE INDEX CONCURRENTLY so the tables stay writable
+while the indexes are created. Running the script again is safe.
+"""
+
+import os
+import sqlalchemy
+from sqlalchemy import create_engine
+import logging
+
+from search import index_statements
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Get database URL from environment variable
+DATABASE_URL = os.environ.get('DATABASE_URL')
+if not DATABASE_URL:
+    logger.error("DATABASE_URL environment variable not set")
+    exit(1)
+
+# Initialize SQLAlchemy connection
+engine = create_engine(DATABASE_URL)
+
+def add_search_indexes():
+    """Create the full-text search indexes that don't exist yet."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index_name, statement in index_statements():
+            # An interrupted concurrent build leaves an invalid index behind; drop it so it is rebuilt
+            invalid = conn.execute(sqlalchemy.text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": index_name}).fetchone()
+            if invalid:
+                logger.warning(f"Dropping invalid index {index_name} left by an interrupted build")
+                conn.execute(sqlalchemy.text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+
+            logger.info(f"Creating index {index_name} (skipped if it exists)")
+            conn.execute(sqlalchemy.text(statement))
+    logger.info("Search indexes are in place")
+
+def main():
+    """Main function to run the migration."""
+    logger.info("Starting migration to add full-text search indexes")
+    add_search_indexes()
+    logger.info("Migration completed successfully")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Add Speaker Index to Transcript Lines
+
+This script adds limitless_transcript_lines.speaker_id, referencing the
+speakers table, and the (speaker_id, start_time, id) index that
+/api/speakers/<id>/lines reads. The speakers and speaker_aliases tables are
+created by models.py. Afterwards run `python speakers.py --backfill` to
+resolve the speaker of the lines already stored.
+
+The index is built with CREATE INDEX CONCURRENTLY so the table stays writable
+while the index is created. Running the script again is safe.
+"""
+
+import os
+import sqlalchemy
+from sqlalchemy import create_engine
+import logging
+
+# Importing the models creates the speakers and speaker_aliases tables
+import models
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Get database URL from environment variable
+DATABASE_URL = os.environ.get('DATABASE_URL')
+if not DATABASE_URL:
+    logger.error("DATABASE_URL environment variable not set")
+    exit(1)
+
+# Initialize SQLAlchemy connection
+engine = create_engine(DATABASE_URL)
+
+INDEX_NAME = "ix_transcript_lines_speaker_time"
+
+def add_speaker_index():
+    """Add the speaker_id column and its index if missing."""
+    with engine.begin() as conn:
+        logger.info("Adding column speaker_id (skipped if it exists)")
+        conn.execute(sqlalchemy.text(
+            "ALTER TABLE limitless_transcript_lines "
+            "ADD COLUMN IF NOT EXISTS speaker_id INTEGER REFERENCES speakers(id)"
+        ))
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # An interrupted concurrent build leaves an invalid index behind; drop it so it is rebuilt
+        invalid = conn.execute(sqlalchemy.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": INDEX_NAME}).fetchone()
+        if invalid:
+            logger.warning(f"Dropping invalid index {INDEX_NAME} left by an interrupted build")
+            conn.execute(sqlalchemy.text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+
+        logger.info(f"Creating index {INDEX_NAME} (skipped if it exists)")
+        conn.execute(sqlalchemy.text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            f"ON limitless_transcript_lines (speaker_id, start_time, id)"
+        ))
+    logger.info("Speaker index is in place; run `python speakers.py --backfill` to fill it")
+
+def main():
+    """Main function to run the migration."""
+    logger.info("Starting migration to add the transcript speaker index")
+    add_speaker_index()
+    logger.info("Migration completed successfully")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Index Packed Transcripts
+
+This script adds the columns limitless_transcript_packs needs to be found by
+full-text search and by speaker:
+- text: the text of every line of the pack
+- speaker_ids: the resolved speakers of its lines, with a GIN index
+- first_start_time and last_start_time: the range of its line start times,
+  indexed on first_start_time for time window lookups
+
+Afterwards run `python add_search_indexes.py` to build the search index over
+the pack text and `python transcript_store.py --reindex` to fill the columns
+of the packs already stored.
+
+The indexes are built with CREATE INDEX CONCURRENTLY so the table stays
+writable while they are created. Running the script again is safe.
+"""
+
+import os
+import sqlalchemy
+from sqlalchemy import create_engine
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Get database URL from environment variable
+DATABASE_URL = os.environ.get('DATABASE_URL')
+if not DATABASE_URL:
+    logger.error("DATABASE_URL environment variable not set")
+    exit(1)
+
+# Initialize SQLAlchemy connection
+engine = create_engine(DATABASE_URL)
+
+COLUMNS = [
+    ("text", "TEXT"),
+    ("speaker_ids", "INTEGER[]"),
+    ("first_start_time", "TIMESTAMP WITH TIME ZONE"),
+    ("last_start_time", "TIMESTAMP WITH TIME ZONE"),
+]
+
+INDEXES = [
+    ("ix_transcript_packs_speaker_ids", "USING GIN (speaker_ids)"),
+    ("ix_transcript_packs_start_time", "(first_start_time)"),
+]
+
+def add_pack_index():
+    """Add the pack columns and their indexes if missing."""
+    with engine.begin() as conn:
+        for column_name, column_type in COLUMNS:
+            logger.info(f"Adding column {column_name} (skipped if it exists)")
+            conn.execute(sqlalchemy.text(
+                f"ALTER TABLE limitless_transcript_packs ADD COLUMN IF NOT EXISTS {column_name} {column_type}"
+            ))
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index_name, definition in INDEXES:
+            # An interrupted concurrent build leaves an invalid index behind; drop it so it is rebuilt
+            invalid = conn.execute(sqlalchemy.text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": index_name}).fetchone()
+            if invalid:
+                logger.warning(f"Dropping invalid index {index_name} left by an interrupted build")
+                conn.execute(sqlalchemy.text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+
+            logger.info(f"Creating index {index_name} (skipped if it exists)")
+            conn.execute(sqlalchemy.text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON limitless_transcript_packs {definition}"
+            ))
+    logger.info("Pack columns are in place; run `python add_search_indexes.py` and "
+                "`python transcript_store.py --reindex` to fill them")
+
+def main():
+    """Main function to run the migration."""
+    logger.info("Starting migration to index packed transcripts")
+    add_pack_index()
+    logger.info("Migration completed successfully")
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,6 @@ import json
 import traceback
 import logging
 import asyncio
-import re
 from datetime import datetime
 import pytz
 import argparse
@@ -27,6 +26,8 @@ import netflix_importer
 from billboard_api import BillboardAPI
 import database_handler as db
 import config_loader
+import conversation_sections
+import markdown_normalizer
 
 # Configure logging
 logging.basicConfig(
@@ -93,176 +94,19 @@ def clean_markdown(text):
     Returns:
         String with Markdown formatting removed
     """
-    if not text:
-        return text
-    
-    # Handle different types
-    if isinstance(text, list):
-        return [clean_markdown(item) for item in text]
-    if not isinstance(text, str):
-        return text
-    
-    # Remove any duplicate "Summary:" or "Atmosphere:" headings that might exist within the text
-    text = re.sub(r'(?i)^Summary:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    text = re.sub(r'(?i)Atmosphere:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    text = re.sub(r'(?i)Key Take ?Aways:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    text = re.sub(r'(?i)Key Takeaways:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    
-    # Remove section heading variations more thoroughly
-    text = re.sub(r'(?i)^#+\s*Summary:?.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(?i)^#+\s*Atmosphere:?.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(?i)^#+\s*Key Take ?Aways:?.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(?i)^#+\s*Key Takeaways:?.*?\n', '', text, flags=re.MULTILINE)
-    
-    # Remove Markdown headers (e.g., ## Header)
-    text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
-    
-    # Remove bold formatting (e.g., **bold**)
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    
-    # Remove italic formatting (e.g., *italic*)
-    text = re.sub(r'(?<!\*)\*([^\*]+)\*(?!\*)', r'\1', text)
-    
-    # Remove bullet points
-    text = re.sub(r'^\s*[\*\-•]\s+', '', text, flags=re.MULTILINE)
-    
-    # Remove Markdown links [text](url) -> text
-    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
-    
-    # Remove code blocks
-    text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
-    
-    # Remove inline code
-    text = re.sub(r'`(.*?)`', r'\1', text)
-    
-    # Remove blockquotes
-    text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
-    
-    # Remove horizontal rules
-    text = re.sub(r'^\s*[-_*]{3,}\s*$', '', text, flags=re.MULTILINE)
-    
-    # Remove extra whitespace
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = text.strip()
-    
-    return text
+    return markdown_normalizer.normalize(text)
 
 def format_conversation(conv):
     """Format a conversation object from the Bee API for display/storage"""
-    # Extract summary, atmosphere, and key takeaways sections from the summary text
+    # Extract summary, atmosphere, and key takeaways sections from the summary text,
+    # in the same normalized form store_conversations saves
     full_text = conv.get("summary", "")
     
-    # Initialize summary, atmosphere, and key takeaways
-    summary_text = ""
-    atmosphere_text = ""
-    key_takeaways_text = ""
-    
     # Handle None summary value
     if full_text is None:
-        summary_text = "No summary available"
+        sections = {"summary": "No summary available", "atmosphere": "", "key_takeaways": None}
     else:
-        # Split the text into sections based on different possible headers
-        atmosphere_patterns = [
-            r'## Atmosphere\s*\n',
-            r'### Atmosphere\s*\n', 
-            r'## Atmosphere:',
-            r'### Atmosphere:',
-            r'\*\*Atmosphere\*\*:?',
-            r'Atmosphere:'
-        ]
-        
-        # Define patterns for Key Takeaways
-        key_takeaways_patterns = [
-            r'## Key Take[aA]ways\s*\n',
-            r'### Key Take[aA]ways\s*\n',
-            r'## Key Take[aA]ways:',
-            r'### Key Take[aA]ways:',
-            r'\*\*Key Take[aA]ways\*\*:?',
-            r'Key Take[aA]ways:',
-            r'## Key Takeaways\s*\n',
-            r'### Key Takeaways\s*\n',
-            r'## Key Takeaways:',
-            r'### Key Takeaways:',
-            r'\*\*Key Takeaways\*\*:?',
-            r'Key Takeaways:'
-        ]
-        
-        # First, extract Summary section
-        summary_patterns = [
-            r'## Summary\s*\n',
-            r'### Summary\s*\n',
-            r'## Summary:',
-            r'### Summary:',
-            r'\*\*Summary\*\*:?',
-            r'Summary:'
-        ]
-        
-        # Try to extract Summary section
-        summary_match = None
-        for pattern in summary_patterns:
-            match = re.search(pattern, full_text)
-            if match:
-                summary_match = match
-                break
-        
-        # Extract text after summary header
-        if summary_match:
-            start_idx = summary_match.end()
-            # Find where next section starts (if it exists)
-            next_section_start = len(full_text)
-            for pattern in atmosphere_patterns + key_takeaways_patterns:
-                match = re.search(pattern, full_text)
-                if match and match.start() > start_idx:
-                    next_section_start = min(next_section_start, match.start())
-            
-            # Extract summary text
-            summary_text = full_text[start_idx:next_section_start].strip()
-        else:
-            # No summary header found, use the whole text
-            summary_text = full_text.strip()
-        
-        # Try to extract Atmosphere section
-        atmosphere_match = None
-        for pattern in atmosphere_patterns:
-            match = re.search(pattern, full_text)
-            if match:
-                atmosphere_match = match
-                break
-        
-        # Extract text after atmosphere header
-        if atmosphere_match:
-            start_idx = atmosphere_match.end()
-            # Find where next section starts (if any)
-            next_section_start = len(full_text)
-            for pattern in key_takeaways_patterns + [r'## ', r'### ']:
-                match = re.search(pattern, full_text[start_idx:])
-                if match:
-                    next_section_start = min(next_section_start, start_idx + match.start())
-            
-            # Extract atmosphere text
-            atmosphere_text = full_text[start_idx:next_section_start].strip()
-            
-        # Try to extract Key Takeaways section
-        key_takeaways_match = None
-        for pattern in key_takeaways_patterns:
-            match = re.search(pattern, full_text)
-            if match:
-                key_takeaways_match = match
-                break
-                
-        # Extract text after key takeaways header
-        if key_takeaways_match:
-            start_idx = key_takeaways_match.end()
-            # Find where next section starts (if any)
-            next_section_start = len(full_text)
-            next_section_patterns = [r'## ', r'### ']
-            for pattern in next_section_patterns:
-                match = re.search(pattern, full_text[start_idx:])
-                if match:
-                    next_section_start = min(next_section_start, start_idx + match.start())
-            
-            # Extract key takeaways text
-            key_takeaways_text = full_text[start_idx:next_section_start].strip()
+        sections = conversation_sections.normalize_conversation(full_text)
     
     # Get address from primary_location if it exists
     address = "No address"
@@ -287,27 +131,11 @@ def format_conversation(conv):
     if conv.get("created_at"):
         created_at = conv["created_at"]
     
-    # Convert key takeaways text to list if it exists
-    key_takeaways_list = None
-    if key_takeaways_text:
-        # Split by newlines and handle bullet points
-        key_takeaways_items = key_takeaways_text.strip().split('\n')
-        key_takeaways_list = []
-        for item in key_takeaways_items:
-            # Remove bullet points or dashes if they exist
-            cleaned_item = re.sub(r'^[\*\-•]+\s*', '', item.strip())
-            if cleaned_item:  # Only add non-empty items
-                key_takeaways_list.append(clean_markdown(cleaned_item))
-    
-    # Clean Markdown from summary and atmosphere text
-    summary_text = clean_markdown(summary_text)
-    atmosphere_text = clean_markdown(atmosphere_text)
-    
     return {
         "Title": f"Conversation on {created_at[:10] if created_at else 'Unknown Date'}",
-        "Summary": summary_text,
-        "Atmosphere": atmosphere_text,
-        "Key Takeaways": key_takeaways_list,
+        "Summary": sections["summary"],
+        "Atmosphere": sections["atmosphere"],
+        "Key Takeaways": sections["key_takeaways"],
         "Address": address,
         "Start Time": start_time,
         "End Time": end_time,
@@ -1167,18 +995,73 @@ def parse_arguments():
     netflix_group.add_argument("--netflix-csv",
                       type=str,
                       help="Path to Netflix viewing history CSV file to import")
+    netflix_group.add_argument("--netflix-profile",
+                      type=str,
+                      default="default",
+                      help="Netflix profile the CSV export belongs to; re-imports only process rows "
+                           "watched since that profile's last import (default: default)")
+    netflix_group.add_argument("--netflix-full-import",
+                      action="store_true",
+                      default=False,
+                      help="Process every row of the Netflix CSV, even if imported before")
     netflix_group.add_argument("--enrich-netflix",
                       action="store_true",
                       default=False,
                       help="Enrich Netflix data with IMDB information (limit 50 titles)")
     netflix_group.add_argument("--enrich-limit",
                       type=int,
-                      default=50,
-                      help="Limit number of titles to enrich (default: 50)")
+                      default=None,
+                      help="Limit number of IMDB lookups to run; all episodes of a series share one lookup "
+                           "(default: 50, no limit with --enrich-offline)")
+    netflix_group.add_argument("--enrich-offline",
+                      action="store_true",
+                      default=False,
+                      help="With --enrich-netflix, match titles against the loaded IMDb dataset instead of the API")
+    netflix_group.add_argument("--imdb-dataset",
+                      type=str,
+                      help="Path to IMDb's title.basics.tsv(.gz) to load for offline enrichment")
+    netflix_group.add_argument("--imdb-ratings",
+                      type=str,
+                      help="Path to IMDb's title.ratings.tsv(.gz) to load with --imdb-dataset")
+    netflix_group.add_argument("--enrich-concurrency",
+                      type=int,
+                      default=5,
+                      help="Number of titles looked up concurrently during enrichment (default: 5)")
+    netflix_group.add_argument("--imdb-rate-limit",
+                      type=float,
+                      default=2.0,
+                      help="Maximum IMDB API requests per second across all workers, 0 for no limit (default: 2)")
+    netflix_group.add_argument("--no-imdb-cache",
+                      action="store_true",
+                      default=False,
+                      help="Bypass the persistent IMDB lookup cache during enrichment")
+    netflix_group.add_argument("--netflix-stream",
+                      action="store_true",
+                      default=False,
+                      help="Import the Netflix CSV in chunks with a resumable checkpoint (bounded memory)")
+    netflix_group.add_argument("--netflix-chunk-size",
+                      type=int,
+                      default=5000,
+                      help="Rows per committed chunk for --netflix-stream (default: 5000)")
     netflix_group.add_argument("--deduplicate-netflix",
                       action="store_true",
                       default=False,
                       help="Remove duplicate Netflix series entries from the database")
+    netflix_group.add_argument("--dedup-dry-run",
+                      action="store_true",
+                      default=False,
+                      help="With --deduplicate-netflix, only report which episodes would be removed")
+    
+    # Database maintenance options
+    maintenance_group = parser.add_argument_group('Database maintenance')
+    maintenance_group.add_argument("--rebuild-daily-activity",
+                      action="store_true",
+                      default=False,
+                      help="Recompute the per-day activity rollup used by the calendar and journal dates")
+    maintenance_group.add_argument("--rebuild-netflix-series-stats",
+                      action="store_true",
+                      default=False,
+                      help="Log the stored Netflix series episodes and recompute the per-series viewing statistics")
     
     return parser.parse_args()
 
@@ -1215,27 +1098,46 @@ def run_cli(debug_mode=False):
     loop = asyncio.get_event_loop()
     loop.run_until_complete(run_cli_async())
 
-async def process_netflix_operations(netflix_csv=None, enrich_netflix=False, enrich_limit=50, debug_mode=False):
+async def process_netflix_operations(netflix_csv=None, enrich_netflix=False, enrich_limit=50, debug_mode=False,
+                                     stream=False, chunk_size=5000, enrich_concurrency=5, imdb_rate_limit=2.0,
+                                     use_imdb_cache=True, enrich_offline=False, profile="default",
+                                     incremental=True):
     """
     Process Netflix-related operations: import CSV and/or enrich with IMDB data
     
     Args:
         netflix_csv: Path to Netflix viewing history CSV file
         enrich_netflix: Whether to enrich Netflix data with IMDB information
-        enrich_limit: Maximum number of titles to enrich
+        enrich_limit: Maximum number of IMDB lookups (title groups) to run
         debug_mode: Whether debug mode is enabled
+        stream: Whether to use the chunked, resumable streaming import
+        chunk_size: Rows per committed chunk in streaming mode
+        enrich_concurrency: Number of concurrent IMDB lookups
+        imdb_rate_limit: Maximum IMDB requests per second (0 for no limit)
+        use_imdb_cache: Whether to use the persistent IMDB lookup cache
+        enrich_offline: Whether to enrich from the loaded IMDb dataset instead of the API
+        profile: Netflix profile the CSV export belongs to
+        incremental: Whether to only process rows watched since the profile's last import
     """
     global app_debug_mode
     app_debug_mode = debug_mode
     # Import Netflix viewing history if CSV file is provided
     if netflix_csv and os.path.exists(netflix_csv):
         print(f"\nImporting Netflix viewing history from {netflix_csv}...")
-        import_result = netflix_importer.import_netflix_history(netflix_csv)
+        if stream:
+            import_result = netflix_importer.import_netflix_history_streaming(
+                netflix_csv, chunk_size=chunk_size, profile=profile, incremental=incremental)
+        else:
+            import_result = netflix_importer.import_netflix_history(
+                netflix_csv, profile=profile, incremental=incremental)
+        if import_result.get('unchanged_file'):
+            print(f"File unchanged since the last import for profile '{profile}' - nothing to import")
         print(f"Import result: {import_result['processed']} processed, "
               f"{import_result['added']} added, "
               f"{import_result['skipped']} skipped, "
-              f"{import_result['deduplicated']} deduplicated within import, "
-              f"{import_result.get('cross_deduplicated', 0)} deduplicated across imports")
+              f"{import_result['deduplicated']} episodes collapsed into their series, "
+              f"{import_result.get('cross_deduplicated', 0)} stored episodes replaced by earlier ones, "
+              f"{import_result.get('already_imported', 0)} imported before")
         
         # Save to JSON if debug mode is enabled
         if debug_mode:
@@ -1248,18 +1150,26 @@ async def process_netflix_operations(netflix_csv=None, enrich_netflix=False, enr
     
     # Enrich Netflix data with IMDB information if requested
     if enrich_netflix:
-        print(f"\nEnriching Netflix data with IMDB information (limit: {enrich_limit} titles)...")
+        print(f"\nEnriching Netflix data with IMDB information (limit: {enrich_limit or 'none'} lookups)...")
         try:
-            from imdb_api import IMDBAPI
-            
-            # Verify IMDB API is configured
-            imdb_api = IMDBAPI()
-            if not imdb_api.api_key:
-                print("ERROR: IMDB API key not found. Skipping Netflix enrichment.")
-                print("Set the IMDB_API_KEY environment variable and try again.")
-                return
-            
-            enrich_result = await netflix_importer.enrich_netflix_title_data(limit=enrich_limit)
+            if enrich_offline:
+                enrich_result = netflix_importer.enrich_netflix_title_data_offline(limit=enrich_limit)
+            else:
+                from imdb_api import IMDBAPI
+                
+                # Verify IMDB API is configured
+                imdb_api = IMDBAPI()
+                if not imdb_api.api_key:
+                    print("ERROR: IMDB API key not found. Skipping Netflix enrichment.")
+                    print("Set the IMDB_API_KEY environment variable and try again.")
+                    return
+                
+                enrich_result = await netflix_importer.enrich_netflix_title_data(
+                    limit=enrich_limit,
+                    concurrency=enrich_concurrency,
+                    rate_limit=imdb_rate_limit,
+                    use_cache=use_imdb_cache
+                )
             print(f"Enrichment result: {enrich_result['processed']} processed, "
                   f"{enrich_result['enriched']} enriched, "
                   f"{enrich_result['skipped']} skipped")
@@ -1323,8 +1233,19 @@ if __name__ == '__main__':
     
     # Global app_debug_mode is set in run_cli function
     
+    # Rebuild the daily activity rollup and exit
+    if args.rebuild_daily_activity:
+        print("Rebuilding daily activity rollup...")
+        counts = db.rebuild_daily_activity()
+        for source, days in counts.items():
+            print(f"- {source}: {days} days with data")
+    # Rebuild the Netflix series statistics and exit
+    elif args.rebuild_netflix_series_stats:
+        print("Rebuilding Netflix series statistics...")
+        from netflix_series_stats import rebuild_series_stats
+        print(f"- {rebuild_series_stats()} series with statistics")
     # Process Netflix operations if requested
-    if args.netflix_csv or args.enrich_netflix or args.deduplicate_netflix:
+    elif args.netflix_csv or args.enrich_netflix or args.deduplicate_netflix or args.imdb_dataset:
         print("Netflix operations requested - skipping regular data collection")
         
         # Initialize APIs just in case we need them
@@ -1335,26 +1256,50 @@ if __name__ == '__main__':
             print("\nRemoving duplicate Netflix series entries from the database...")
             try:
                 from remove_duplicate_netflix_series import remove_duplicate_netflix_series
-                result = remove_duplicate_netflix_series()
+                result = remove_duplicate_netflix_series(dry_run=args.dedup_dry_run)
                 if "error" in result:
                     print(f"Error: {result['error']}")
                 else:
-                    print(f"\nResults:")
+                    print(f"\nResults{' (dry run)' if args.dedup_dry_run else ''}:")
                     print(f"- Found {result['total_series']} unique series with {result['total_entries']} total entries")
                     print(f"- Kept {result['entries_kept']} entries (one per series)")
-                    print(f"- Removed {result['entries_removed']} duplicate entries")
+                    print(f"- {'Would remove' if args.dedup_dry_run else 'Removed'} {result['entries_removed']} duplicate entries")
+                    for series in result.get("series", []):
+                        print(f"  - {series['series']}: {series['removable']} episodes after {series['kept_title']}")
             except Exception as e:
                 print(f"Error deduplicating Netflix series: {str(e)}")
                 print(traceback.format_exc())
         
+        # Load the IMDb dataset for offline enrichment
+        if args.imdb_dataset:
+            print(f"\nLoading IMDb dataset from {args.imdb_dataset}...")
+            try:
+                from imdb_offline import load_imdb_dataset
+                result = load_imdb_dataset(args.imdb_dataset, ratings_path=args.imdb_ratings)
+                print(f"Loaded {result['titles']} IMDb titles ({result['rated']} with ratings)")
+            except Exception as e:
+                print(f"Error loading IMDb dataset: {str(e)}")
+                print(traceback.format_exc())
+        
         # Run other Netflix operations
         if args.netflix_csv or args.enrich_netflix:
+            enrich_limit = args.enrich_limit
+            if enrich_limit is None and not args.enrich_offline:
+                enrich_limit = 50
             loop = asyncio.get_event_loop()
             loop.run_until_complete(process_netflix_operations(
                 netflix_csv=args.netflix_csv,
                 enrich_netflix=args.enrich_netflix,
-                enrich_limit=args.enrich_limit,
-                debug_mode=debug_mode
+                enrich_limit=enrich_limit,
+                debug_mode=debug_mode,
+                stream=args.netflix_stream,
+                chunk_size=args.netflix_chunk_size,
+                enrich_concurrency=args.enrich_concurrency,
+                imdb_rate_limit=args.imdb_rate_limit,
+                use_imdb_cache=not args.no_imdb_cache,
+                enrich_offline=args.enrich_offline,
+                profile=args.netflix_profile,
+                incremental=not args.netflix_full_import
             ))
     else:
         # Run the regular data collection CLI
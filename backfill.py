@@ -0,0 +1,470 @@
+"""
+Backfill Runner
+
+This module runs the one-off data fixes (re-extracting conversation sections,
+cleaning Markdown, deriving lifelog timestamps, extracting transcript lines,
+...) as resumable backfills instead of loading a whole table with .all() and
+updating it row by row.
+
+A Backfill names a table, the columns its transform reads and a transform
+function. run_backfill() then:
+
+- reads the table in keyset-paginated chunks (key > last key ORDER BY key LIMIT n),
+  so every chunk costs the same however far the run has got
+- applies the transform to each row of a chunk, in this process or spread
+  over a worker pool for CPU-bound transforms
+- writes the changed rows of a chunk with one UPDATE ... FROM (VALUES ...)
+  statement per set of changed columns
+- records the last key of the chunk in backfill_checkpoints in the same
+  transaction, so an interrupted run resumes after the last committed chunk
+
+Transforms run in worker processes, so they must be module-level functions.
+They receive a dict of the key and the read columns and return a dict of new
+column values, or None to leave the row unchanged.
+
+Backfills that derive columns from raw_data can skip rows they have already
+processed. Such a table has a content_hash column generated from raw_data,
+plus derived_hash and transform_version columns. A Backfill with a version
+only visits rows whose derived_hash differs from content_hash (the payload
+changed) or whose transform_version differs from the backfill's version (the
+transform changed), and stamps both on every row it processes. Bumping the
+version after a parser change therefore reprocesses the rows again, and an
+unchanged rerun reads nothing.
+
+When several backfills derive different things from the same payload (the
+lifelog timestamps, subsummaries and transcript lines), transform_version is
+a JSONB object holding the version of each backfill by name. A backfill then
+only compares and stamps its own entry, and the entries recorded for an
+older payload are dropped when a row is stamped with a new derived_hash.
+
+Usage:
+    python backfill.py              # show the checkpoint of every backfill
+    python backfill.py --reset NAME # forget a checkpoint so the next run starts over
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import select, update, values, column, cast, literal, case, func, true, and_, or_, JSON, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert, JSONB
+from models import engine, Backfill_Checkpoint
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Rows read, transformed and committed at a time
+CHUNK_SIZE = 2000
+
+# Rows handed to a worker process at a time
+POOL_CHUNK_SIZE = 64
+
+# Transform errors logged individually per run (the rest are only counted)
+MAX_LOGGED_ERRORS = 20
+
+# Columns a table needs for change detection (see Backfill version)
+CHANGE_DETECTION_COLUMNS = ("content_hash", "derived_hash", "transform_version")
+
+def content_hash(raw_data):
+    """
+    Hash of a raw payload, equal to the database's generated content_hash (md5(raw_data)).
+
+    Args:
+        raw_data: Raw payload text as stored in the raw_data column
+
+    Returns:
+        Hex digest, or None for a missing payload
+    """
+    if raw_data is None:
+        return None
+    return hashlib.md5(raw_data.encode("utf-8")).hexdigest()
+
+class Backfill:
+    """
+    A resumable transform over every row of one table.
+
+    Args:
+        name: Checkpoint name, unique per backfill
+        table: Model class or Table to read and update
+        columns: Column names passed to the transform (the key is always included)
+        transform: Module-level function(row) returning a dict of new column
+            values, or None when the row needs no change
+        where: Optional filter limiting the rows visited
+        key: Name of the unique, orderable column used for keyset pagination
+        write: Optional function(connection, changes) replacing the default
+            UPDATE for backfills that write elsewhere; changes is a list of
+            (row, transform result) pairs and it returns the number of rows written
+        after: Optional function() called once a run has visited every row
+        chunk_size: Rows per chunk (default: CHUNK_SIZE)
+        version: Optional transform version; enables change detection, which
+            needs the CHANGE_DETECTION_COLUMNS. Rows are stamped with a
+            separate UPDATE when the backfill has its own writer or the
+            table's transform_version is a JSONB object of versions per backfill
+    """
+
+    def __init__(self, name, table, columns, transform, where=None, key="id", write=None,
+                 after=None, chunk_size=CHUNK_SIZE, version=None):
+        self.name = name
+        self.table = getattr(table, "__table__", table)
+        if version is not None:
+            missing = [column_name for column_name in CHANGE_DETECTION_COLUMNS if column_name not in self.table.c]
+            if missing:
+                raise ValueError(f"Backfill {name}: table {self.table.name} has no {', '.join(missing)} column")
+        self.version = version
+        self.columns = list(columns)
+        self.transform = transform
+        self.where = where
+        self.key = key
+        self.write = write
+        self.after = after
+        self.chunk_size = chunk_size
+
+    def __repr__(self):
+        return f"<Backfill(name={self.name}, table={self.table.name})>"
+
+    @property
+    def versions_by_name(self):
+        """True if the table records one transform version per backfill (a JSONB transform_version)."""
+        return isinstance(self.table.c.transform_version.type, JSON)
+
+    @property
+    def stamps_separately(self):
+        """True if processed rows are stamped with stamp_rows() rather than with the default writer's UPDATE."""
+        return self.write is not None or self.versions_by_name
+
+def _apply_transform(transform, row):
+    """Worker entry point: the transform result and error message for one row."""
+    try:
+        return transform(row), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def _value_type(column_type):
+    if isinstance(column_type, JSON):
+        return type(column_type)(none_as_null=True)
+    return column_type
+
+def update_rows(backfill, connection, changes):
+    """
+    Default writer: apply the transform results with UPDATE ... FROM (VALUES ...).
+
+    Rows are grouped by the set of columns their transform changed, and each
+    group is written with a single statement. Values are cast to the column
+    type because PostgreSQL types the VALUES list from its literals, and None
+    is written as SQL NULL (not a JSON null) in JSON columns.
+
+    Args:
+        backfill: The Backfill being run
+        connection: Connection with the chunk's open transaction
+        changes: List of (row, transform result) pairs
+
+    Returns:
+        Number of rows updated
+    """
+    table = backfill.table
+    key_column = table.c[backfill.key]
+
+    groups = {}
+    for row, result in changes:
+        names = tuple(sorted(result))
+        groups.setdefault(names, []).append((row[backfill.key],) + tuple(result[name] for name in names))
+
+    updated = 0
+    for names, data in groups.items():
+        rows = values(
+            column(backfill.key, key_column.type),
+            *[column(name, _value_type(table.c[name].type)) for name in names],
+            name="backfill_rows"
+        ).data(data)
+        connection.execute(
+            update(table)
+            .where(key_column == rows.c[backfill.key])
+            .values({name: cast(rows.c[name], table.c[name].type) for name in names})
+        )
+        updated += len(data)
+    return updated
+
+def stamp_rows(backfill, connection, rows):
+    """
+    Record that rows were processed from their current payload by this backfill's version.
+
+    Sets derived_hash to the content_hash the row was read with. With one
+    version per backfill, this backfill's entry is added to transform_version,
+    keeping the other backfills' entries only if they were recorded for the
+    same payload.
+
+    Args:
+        backfill: The Backfill being run (with a version)
+        connection: Connection with the chunk's open transaction
+        rows: Processed rows, with their key and content_hash
+    """
+    if not rows:
+        return
+    table = backfill.table
+    key_column = table.c[backfill.key]
+    stamped = values(
+        column(backfill.key, key_column.type),
+        column("content_hash", String),
+        name="stamped_rows"
+    ).data([(row[backfill.key], row["content_hash"]) for row in rows])
+
+    version = backfill.version
+    if backfill.versions_by_name:
+        kept = case(
+            (table.c.derived_hash.is_not_distinct_from(stamped.c.content_hash),
+             func.coalesce(table.c.transform_version, cast(literal("{}"), JSONB))),
+            else_=cast(literal("{}"), JSONB)
+        )
+        version = kept.op("||")(cast(literal(json.dumps({backfill.name: backfill.version})), JSONB))
+
+    connection.execute(
+        update(table)
+        .where(key_column == stamped.c[backfill.key])
+        .values(derived_hash=stamped.c.content_hash, transform_version=version)
+    )
+
+def _save_checkpoint(connection, name, last_key, processed, updated, errors, started_at, completed=False):
+    now = datetime.utcnow()
+    state = {
+        "last_key": None if last_key is None else str(last_key),
+        "rows_processed": processed,
+        "rows_updated": updated,
+        "errors": errors,
+        "started_at": started_at,
+        "updated_at": now,
+        "completed_at": now if completed else None
+    }
+    statement = pg_insert(Backfill_Checkpoint).values(name=name, **state)
+    connection.execute(statement.on_conflict_do_update(index_elements=["name"], set_=state))
+
+def get_checkpoint(name):
+    """
+    Return the checkpoint of a backfill as a dict, or None if it never ran.
+
+    Args:
+        name: Backfill name
+    """
+    with engine.connect() as connection:
+        row = connection.execute(
+            select(Backfill_Checkpoint.__table__).where(Backfill_Checkpoint.name == name)
+        ).mappings().first()
+    return dict(row) if row else None
+
+def reset_checkpoint(name):
+    """
+    Forget the checkpoint of a backfill so its next run starts from the first row.
+
+    Args:
+        name: Backfill name
+
+    Returns:
+        True if a checkpoint was removed
+    """
+    with engine.begin() as connection:
+        result = connection.execute(
+            Backfill_Checkpoint.__table__.delete().where(Backfill_Checkpoint.name == name)
+        )
+    return result.rowcount > 0
+
+def _stale(backfill):
+    """Filter for rows whose payload or transform changed since the backfill processed them."""
+    table = backfill.table
+    if backfill.versions_by_name:
+        recorded = table.c.transform_version[backfill.name].astext
+    else:
+        recorded = table.c.transform_version
+    return or_(
+        table.c.derived_hash.is_distinct_from(table.c.content_hash),
+        recorded.is_distinct_from(backfill.version)
+    )
+
+def run_backfill(backfill, processes=None, chunk_size=None, restart=False, force=False):
+    """
+    Run a backfill to completion, resuming an interrupted run.
+
+    A run that completed earlier starts over from the first row. Each chunk is
+    written and checkpointed in one transaction, so stopping the process at any
+    point loses at most the chunk in progress.
+
+    Args:
+        backfill: The Backfill to run
+        processes: Optional number of worker processes for the transform
+            (0 means one per CPU, default: in this process)
+        chunk_size: Optional rows per chunk (default: the backfill's chunk_size)
+        restart: Ignore an unfinished checkpoint and start from the first row
+        force: Also visit rows that change detection would skip
+
+    Returns:
+        Dict with processed, updated and errors counts of the run, whether it
+        resumed and the number of chunks this call committed
+    """
+    chunk_size = chunk_size or backfill.chunk_size
+    table = backfill.table
+    key_column = table.c[backfill.key]
+    read_columns = [key_column] + [table.c[name] for name in backfill.columns if name != backfill.key]
+    write = backfill.write or (lambda connection, changes: update_rows(backfill, connection, changes))
+
+    conditions = [backfill.where] if backfill.where is not None else []
+    if backfill.version is not None:
+        read_columns.append(table.c.content_hash)
+        if not force:
+            conditions.append(_stale(backfill))
+    where = and_(*conditions) if conditions else true()
+
+    checkpoint = get_checkpoint(backfill.name)
+    resumed = bool(checkpoint and not restart and checkpoint["completed_at"] is None
+                   and checkpoint["last_key"] is not None)
+    if resumed:
+        last_key = key_column.type.python_type(checkpoint["last_key"])
+        processed = checkpoint["rows_processed"]
+        updated = checkpoint["rows_updated"]
+        errors = checkpoint["errors"]
+        started_at = checkpoint["started_at"]
+        logger.info(f"Resuming backfill {backfill.name} after {backfill.key} {last_key} "
+                    f"({processed} rows processed so far)")
+    else:
+        last_key = None
+        processed = updated = errors = 0
+        started_at = datetime.utcnow()
+        logger.info(f"Starting backfill {backfill.name}")
+
+    executor = ProcessPoolExecutor(max_workers=processes or os.cpu_count()) if processes is not None else None
+    chunks = 0
+    try:
+        while True:
+            query = select(*read_columns).where(where).order_by(key_column).limit(chunk_size)
+            if last_key is not None:
+                query = query.where(key_column > last_key)
+            with engine.connect() as connection:
+                rows = [dict(row) for row in connection.execute(query).mappings()]
+            if not rows:
+                break
+
+            if executor is not None:
+                outcomes = list(executor.map(_apply_transform, repeat(backfill.transform), rows,
+                                             chunksize=POOL_CHUNK_SIZE))
+            else:
+                outcomes = [_apply_transform(backfill.transform, row) for row in rows]
+
+            changes = []
+            stamped = []
+            for row, (result, error) in zip(rows, outcomes):
+                if error:
+                    if errors < MAX_LOGGED_ERRORS:
+                        logger.error(f"Backfill {backfill.name}: error transforming {backfill.key} "
+                                     f"{row[backfill.key]}: {error}")
+                    errors += 1
+                    continue
+                # Stamp every processed row, changed or not, so the next run skips it
+                if backfill.version is not None and backfill.stamps_separately:
+                    stamped.append(row)
+                elif backfill.version is not None:
+                    result = dict(result or {}, derived_hash=row["content_hash"],
+                                  transform_version=backfill.version)
+                if result:
+                    changes.append((row, result))
+
+            last_key = rows[-1][backfill.key]
+            processed += len(rows)
+            with engine.begin() as connection:
+                if changes:
+                    updated += write(connection, changes)
+                stamp_rows(backfill, connection, stamped)
+                _save_checkpoint(connection, backfill.name, last_key, processed, updated, errors, started_at)
+            chunks += 1
+            logger.info(f"Backfill {backfill.name}: {processed} rows processed, {updated} updated "
+                        f"(up to {backfill.key} {last_key})")
+            if len(rows) < chunk_size:
+                break
+    except KeyboardInterrupt:
+        logger.warning(f"Backfill {backfill.name} interrupted after {backfill.key} {last_key}; "
+                       f"run it again to resume")
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    with engine.begin() as connection:
+        _save_checkpoint(connection, backfill.name, last_key, processed, updated, errors, started_at,
+                         completed=True)
+    logger.info(f"Backfill {backfill.name} complete: {processed} rows processed, {updated} updated, "
+                f"{errors} errors")
+    if backfill.after:
+        backfill.after()
+
+    return {
+        "processed": processed,
+        "updated": updated,
+        "errors": errors,
+        "resumed": resumed,
+        "chunks": chunks
+    }
+
+def add_backfill_arguments(parser, change_detection=False):
+    """
+    Add the --processes, --chunk-size and --restart options shared by the backfill scripts.
+
+    Args:
+        parser: argparse.ArgumentParser to extend
+        change_detection: Also add --force, for scripts whose backfill has a version
+    """
+    group = parser.add_argument_group("backfill options")
+    if change_detection:
+        group.add_argument("--force", action="store_true", default=False,
+                           help="Reprocess every row, including rows whose raw data and transform version are unchanged")
+    group.add_argument("--processes", type=int, default=None,
+                       help="Transform rows in this many worker processes (0 = one per CPU, default: in this process)")
+    group.add_argument("--chunk-size", type=int, default=None,
+                       help=f"Rows read and committed at a time (default: {CHUNK_SIZE})")
+    group.add_argument("--restart", action="store_true", default=False,
+                       help="Start from the first row instead of resuming an interrupted run")
+    return parser
+
+def backfill_options(args):
+    """Keyword arguments for run_backfill from options added by add_backfill_arguments."""
+    options = {"processes": args.processes, "chunk_size": args.chunk_size, "restart": args.restart}
+    if hasattr(args, "force"):
+        options["force"] = args.force
+    return options
+
+def list_checkpoints():
+    """Return every backfill checkpoint as a list of dicts, most recently updated first."""
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(Backfill_Checkpoint.__table__).order_by(Backfill_Checkpoint.updated_at.desc())
+        ).mappings().all()
+    return [dict(row) for row in rows]
+
+def main():
+    """Show or reset backfill checkpoints."""
+    parser = argparse.ArgumentParser(description="Show or reset the checkpoints of resumable backfills")
+    parser.add_argument("--reset", metavar="NAME", help="Forget the checkpoint of this backfill")
+    args = parser.parse_args()
+
+    if args.reset:
+        if reset_checkpoint(args.reset):
+            print(f"Checkpoint of {args.reset} removed")
+        else:
+            print(f"No checkpoint named {args.reset}")
+        return 0
+
+    checkpoints = list_checkpoints()
+    if not checkpoints:
+        print("No backfill has run yet")
+        return 0
+    print(f"{'backfill':<36} {'status':<11} {'processed':>10} {'updated':>10} {'errors':>7} {'last key':>12}")
+    for checkpoint in checkpoints:
+        status = "complete" if checkpoint["completed_at"] else "unfinished"
+        print(f"{checkpoint['name']:<36} {status:<11} {checkpoint['rows_processed']:>10} "
+              f"{checkpoint['rows_updated']:>10} {checkpoint['errors']:>7} {str(checkpoint['last_key']):>12}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Conversation Sections Benchmark
+
+This script measures the throughput of the single-pass section tokenizer in
+conversation_sections.py against the pattern-list extraction
+app.format_conversation used before, and checks that both find the same
+Summary, Atmosphere and Key Takeaways for every generated conversation.
+
+The legacy function below is a frozen copy of the extraction that used to live
+in app.format_conversation; it is only kept here as the reference for the
+equivalence check.
+
+Usage:
+    python benchmark_conversation_sections.py
+    python benchmark_conversation_sections.py --conversations 20000 --repeat 5
+"""
+
+import re
+import sys
+import time
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+import synthetic_data
+import conversation_sections
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Heading styles the Bee API has produced; {name} is the section title
+HEADING_STYLES = ["## {name}\n", "### {name}\n", "## {name}:", "**{name}**: ", "{name}: "]
+
+# Key Takeaways spellings the legacy patterns recognize; the Bee API also
+# writes "Key Take Aways", which they never matched
+LEGACY_TAKEAWAYS_NAMES = ["Key Takeaways", "Key TakeAways"]
+SPACED_TAKEAWAYS_NAME = "Key Take Aways"
+
+# --- Legacy pattern-list implementation (reference only) ---
+
+def legacy_extract_sections(full_text):
+    """Extract summary, atmosphere and key takeaways the way format_conversation did."""
+    summary_text = ""
+    atmosphere_text = ""
+    key_takeaways_text = ""
+
+    # Split the text into sections based on different possible headers
+    atmosphere_patterns = [
+        r'## Atmosphere\s*\n',
+        r'### Atmosphere\s*\n',
+        r'## Atmosphere:',
+        r'### Atmosphere:',
+        r'\*\*Atmosphere\*\*:?',
+        r'Atmosphere:'
+    ]
+
+    # Define patterns for Key Takeaways
+    key_takeaways_patterns = [
+        r'## Key Take[aA]ways\s*\n',
+        r'### Key Take[aA]ways\s*\n',
+        r'## Key Take[aA]ways:',
+        r'### Key Take[aA]ways:',
+        r'\*\*Key Take[aA]ways\*\*:?',
+        r'Key Take[aA]ways:',
+        r'## Key Takeaways\s*\n',
+        r'### Key Takeaways\s*\n',
+        r'## Key Takeaways:',
+        r'### Key Takeaways:',
+        r'\*\*Key Takeaways\*\*:?',
+        r'Key Takeaways:'
+    ]
+
+    # First, extract Summary section
+    summary_patterns = [
+        r'## Summary\s*\n',
+        r'### Summary\s*\n',
+        r'## Summary:',
+        r'### Summary:',
+        r'\*\*Summary\*\*:?',
+        r'Summary:'
+    ]
+
+    # Try to extract Summary section
+    summary_match = None
+    for pattern in summary_patterns:
+        match = re.search(pattern, full_text)
+        if match:
+            summary_match = match
+            break
+
+    # Extract text after summary header
+    if summary_match:
+        start_idx = summary_match.end()
+        # Find where next section starts (if it exists)
+        next_section_start = len(full_text)
+        for pattern in atmosphere_patterns + key_takeaways_patterns:
+            match = re.search(pattern, full_text)
+            if match and match.start() > start_idx:
+                next_section_start = min(next_section_start, match.start())
+
+        # Extract summary text
+        summary_text = full_text[start_idx:next_section_start].strip()
+    else:
+        # No summary header found, use the whole text
+        summary_text = full_text.strip()
+
+    # Try to extract Atmosphere section
+    atmosphere_match = None
+    for pattern in atmosphere_patterns:
+        match = re.search(pattern, full_text)
+        if match:
+            atmosphere_match = match
+            break
+
+    # Extract text after atmosphere header
+    if atmosphere_match:
+        start_idx = atmosphere_match.end()
+        # Find where next section starts (if any)
+        next_section_start = len(full_text)
+        for pattern in key_takeaways_patterns + [r'## ', r'### ']:
+            match = re.search(pattern, full_text[start_idx:])
+            if match:
+                next_section_start = min(next_section_start, start_idx + match.start())
+
+        # Extract atmosphere text
+        atmosphere_text = full_text[start_idx:next_section_start].strip()
+
+    # Try to extract Key Takeaways section
+    key_takeaways_match = None
+    for pattern in key_takeaways_patterns:
+        match = re.search(pattern, full_text)
+        if match:
+            key_takeaways_match = match
+            break
+
+    # Extract text after key takeaways header
+    if key_takeaways_match:
+        start_idx = key_takeaways_match.end()
+        # Find where next section starts (if any)
+        next_section_start = len(full_text)
+        next_section_patterns = [r'## ', r'### ']
+        for pattern in next_section_patterns:
+            match = re.search(pattern, full_text[start_idx:])
+            if match:
+                next_section_start = min(next_section_start, start_idx + match.start())
+
+        # Extract key takeaways text
+        key_takeaways_text = full_text[start_idx:next_section_start].strip()
+
+    # Convert key takeaways text to list if it exists
+    key_takeaways_list = None
+    if key_takeaways_text:
+        key_takeaways_list = []
+        for item in key_takeaways_text.strip().split('\n'):
+            cleaned_item = re.sub(r'^[\*\-•]+\s*', '', item.strip())
+            if cleaned_item:
+                key_takeaways_list.append(cleaned_item)
+
+    return summary_text, atmosphere_text, key_takeaways_list
+
+# --- Benchmark harness ---
+
+def tokenizer_extract_sections(full_text):
+    """Extract the same values with the single-pass tokenizer."""
+    sections = conversation_sections.split_sections(full_text)
+    key_takeaways_list = conversation_sections.parse_key_takeaways(sections["key_takeaways"]) or None
+    return sections["summary"], sections["atmosphere"], key_takeaways_list
+
+def build_summaries(count, seed, takeaways_names=LEGACY_TAKEAWAYS_NAMES):
+    """
+    Build conversation summaries from the synthetic data builders, with the
+    headings rewritten into a random mix of the styles in HEADING_STYLES and
+    the Key Takeaways heading spelled as one of takeaways_names.
+    """
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1)
+    summaries = []
+    for index in range(count):
+        summary = synthetic_data.build_conversation(rng, index, started + timedelta(hours=index))["summary"]
+        style = rng.choice(HEADING_STYLES)
+        takeaways_name = rng.choice(takeaways_names)
+        for name, heading in (("Summary", "Summary"), ("Atmosphere", "Atmosphere"),
+                              ("Key Takeaways", takeaways_name)):
+            summary = summary.replace(f"## {name}\n", style.format(name=heading), 1)
+        summaries.append(summary)
+    return summaries
+
+def verify(summaries):
+    """
+    Check that the tokenizer matches the legacy extraction.
+
+    Returns:
+        List of mismatch descriptions (empty when identical)
+    """
+    mismatches = []
+    for index, summary in enumerate(summaries):
+        expected = legacy_extract_sections(summary)
+        actual = tokenizer_extract_sections(summary)
+        if expected != actual:
+            mismatches.append(f"summary {index}: {expected} != {actual}")
+    return mismatches
+
+def count_missed_takeaways(summaries):
+    """Count summaries whose Key Takeaways the legacy extraction misses but the tokenizer finds."""
+    return sum(1 for summary in summaries
+               if legacy_extract_sections(summary)[2] is None and tokenizer_extract_sections(summary)[2])
+
+def time_runs(func, repeat):
+    """Return the best wall time over `repeat` runs of func."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark Bee conversation section extraction")
+    parser.add_argument("--conversations", type=int, default=5000,
+                        help="Number of generated conversation summaries (default: 5000)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per variant, best is reported (default: 5)")
+    return parser.parse_args()
+
+def main():
+    """Main function to run the benchmark."""
+    args = parse_arguments()
+    summaries = build_summaries(args.conversations, args.seed)
+    print(f"Generated {len(summaries)} conversation summaries")
+
+    mismatches = verify(summaries)
+    if mismatches:
+        print(f"tokenizer: {len(mismatches)} mismatches against the legacy extraction")
+        for mismatch in mismatches[:10]:
+            print(f"  {mismatch}")
+    else:
+        print("tokenizer: output identical to the legacy extraction")
+
+    spaced = build_summaries(args.conversations, args.seed + 1, [SPACED_TAKEAWAYS_NAME])
+    missed = count_missed_takeaways(spaced)
+    print(f"'{SPACED_TAKEAWAYS_NAME}' headings: legacy extraction misses the Key Takeaways "
+          f"of {missed} of {len(spaced)} summaries, the tokenizer finds them")
+
+    legacy_time = time_runs(lambda: [legacy_extract_sections(summary) for summary in summaries], args.repeat)
+    tokenizer_time = time_runs(lambda: [tokenizer_extract_sections(summary) for summary in summaries], args.repeat)
+    print(f"\n{'variant':<24} {'seconds':>9} {'summaries/s':>12} {'speedup':>8}")
+    print(f"{'legacy pattern lists':<24} {legacy_time:>9.4f} {len(summaries) / legacy_time:>12.0f} {1.0:>8.1f}")
+    print(f"{'single-pass tokenizer':<24} {tokenizer_time:>9.4f} {len(summaries) / tokenizer_time:>12.0f} "
+          f"{legacy_time / tokenizer_time:>8.1f}")
+
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Database Handler Benchmark
+
+This script measures the store_* and get_*_from_db functions in
+database_handler.py at several row counts, with cold and pre-populated tables
+and varying duplicate ratios. For every case it records the wall time and the
+number of database round trips (statements sent to the server), writes the
+results to a JSON baseline and can compare a run against an earlier baseline
+to flag regressions.
+
+Scenarios:
+- cold: tables are truncated first; the duplicate ratio is the share of the
+  batch that repeats earlier items of the same batch
+- populated: tables are pre-filled with as many unrelated rows as the batch
+  size; the duplicate ratio is the share of the batch already in the table
+
+Only run this against a disposable database: it truncates the benchmarked
+tables between cases.
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+
+import database_handler as db
+import synthetic_data as synth
+from generate_synthetic_data import SyntheticDatasetWriter
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_DUPLICATE_RATIOS = [0.0, 0.5]
+DEFAULT_THRESHOLD = 0.2
+
+class RoundTripCounter:
+    """Counts statements executed on an engine via the before_cursor_execute event."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        return False
+
+class Source:
+    """
+    One benchmarked data source.
+
+    Each source knows how to build `count` unique items, how to pass a batch to
+    its store function, how to pre-fill its tables in bulk and how to read back.
+    """
+
+    name = None
+    tables = []
+    rows_per_item = 1
+
+    def build_items(self, rng, count, offset):
+        raise NotImplementedError
+
+    def store(self, items):
+        raise NotImplementedError
+
+    def prefill(self, writer, items):
+        raise NotImplementedError
+
+    def read(self, size):
+        raise NotImplementedError
+
+class ConversationSource(Source):
+    name = "conversations"
+    tables = ["bee_conversations"]
+
+    def build_items(self, rng, count, offset):
+        base = datetime(2024, 1, 1)
+        return [synth.build_conversation(rng, f"bench-conv-{offset + i}", base + timedelta(minutes=offset + i))
+                for i in range(count)]
+
+    def store(self, items):
+        return db.store_conversations(items)
+
+    def prefill(self, writer, items):
+        for item in items:
+            writer.add_conversation(item, db.parse_date(item["created_at"]))
+
+    def read(self, size):
+        return db.get_conversations_from_db()
+
+class FactSource(Source):
+    name = "facts"
+    tables = ["bee_facts"]
+
+    def build_items(self, rng, count, offset):
+        base = datetime(2024, 1, 1)
+        return [synth.build_fact(rng, offset + i, base + timedelta(minutes=offset + i)) for i in range(count)]
+
+    def store(self, items):
+        return db.store_facts(items)
+
+    def prefill(self, writer, items):
+        for item in items:
+            writer.add_fact(item, db.parse_date(item["created_at"]))
+
+    def read(self, size):
+        return db.get_facts_from_db()
+
+class LifelogSource(Source):
+    name = "lifelogs"
+    tables = ["limitless_lifelogs", "limitless_lifelog_subsummaries", "limitless_transcript_lines",
+              "limitless_transcript_packs"]
+
+    def build_items(self, rng, count, offset):
+        base = datetime(2024, 1, 1)
+        return [synth.build_lifelog(rng, f"bench-log-{offset + i}", base + timedelta(minutes=offset + i),
+                                    subsummaries=2, lines_per_subsummary=5)
+                for i in range(count)]
+
+    def store(self, items):
+        return db.store_lifelogs(items)
+
+    def prefill(self, writer, items):
+        for item in items:
+            writer.add_lifelog(item, db.parse_date(item["contents"][0]["startTime"]))
+
+    def read(self, size):
+        return db.get_lifelogs_from_db()
+
+class WeatherSource(Source):
+    name = "weather"
+    tables = ["weather_data"]
+
+    def build_items(self, rng, count, offset):
+        base = datetime(2024, 1, 1)
+        return [synth.build_weather(rng, base + timedelta(minutes=offset + i)) for i in range(count)]
+
+    def store(self, items):
+        # store_weather_data takes one observation per call
+        result = {"processed": 0, "added": 0, "skipped": 0}
+        for item in items:
+            for key, value in db.store_weather_data(item).items():
+                result[key] += value
+        return result
+
+    def prefill(self, writer, items):
+        for item in items:
+            writer.add_weather(item)
+
+    def read(self, size):
+        return db.get_weather_data_from_db()
+
+class BillboardSource(Source):
+    """Billboard items are stored a chart (100 entries) at a time."""
+
+    name = "billboard"
+    tables = ["billboard_chart_items"]
+    rows_per_item = 100
+
+    def build_items(self, rng, count, offset):
+        # Each item is one chart; count is in rows, so build count / 100 charts
+        base = datetime(1900, 1, 1)
+        first_chart = offset // self.rows_per_item
+        charts = max(1, count // self.rows_per_item)
+        return [synth.build_billboard_chart(rng, (base + timedelta(days=first_chart + i)).strftime('%Y-%m-%d'),
+                                            self.rows_per_item)
+                for i in range(charts)]
+
+    def store(self, items):
+        result = {"processed": 0, "added": 0, "skipped": 0}
+        for chart in items:
+            for key, value in db.store_billboard_chart_items(chart, "hot-100").items():
+                result[key] += value
+        return result
+
+    def prefill(self, writer, items):
+        for chart in items:
+            writer.add_billboard(chart)
+
+    def read(self, size):
+        return db.get_billboard_chart_items_from_db(chart_name="hot-100", limit=size)
+
+class NetflixSource(Source):
+    name = "netflix"
+    tables = ["netflix_history_items"]
+
+    def build_items(self, rng, count, offset):
+        base = datetime(2024, 1, 1)
+        return [synth.build_netflix_history_item(rng, base - timedelta(minutes=offset + i)) for i in range(count)]
+
+    def store(self, items):
+        return db.store_netflix_history(items)
+
+    def prefill(self, writer, items):
+        for item in items:
+            writer.add_netflix(item)
+
+    def read(self, size):
+        return db.get_netflix_history_from_db()
+
+SOURCES = {source.name: source for source in [
+    ConversationSource(), FactSource(), LifelogSource(), WeatherSource(), BillboardSource(), NetflixSource()
+]}
+
+def truncate_tables(tables):
+    """Empty the given tables."""
+    with db.engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+
+def prefill(source, items, batch_size=5000):
+    """Bulk insert items for a source without going through the store function."""
+    session = db.Session()
+    try:
+        writer = SyntheticDatasetWriter(session, batch_size=batch_size)
+        source.prefill(writer, items)
+        writer.flush()
+    finally:
+        session.close()
+
+def build_batch(source, rng, size, scenario, duplicate_ratio):
+    """
+    Prepare the tables and return the batch to store.
+
+    Returns:
+        The list of items to pass to the store function
+    """
+    truncate_tables(source.tables)
+    unit = source.rows_per_item
+    duplicates = int(size * duplicate_ratio) // unit * unit
+    fresh = source.build_items(rng, size - duplicates, offset=0)
+
+    if scenario == "cold":
+        # Repeat the start of the batch to get within-batch duplicates
+        return fresh + fresh[:duplicates // unit]
+
+    # populated: unrelated rows plus the rows the batch will collide with
+    existing = source.build_items(rng, duplicates, offset=size) if duplicates else []
+    background = source.build_items(rng, size, offset=size * 2)
+    prefill(source, background + existing)
+    return fresh + existing
+
+def time_call(func, *args):
+    """Run func and return (result, seconds, round_trips)."""
+    with RoundTripCounter(db.engine) as counter:
+        started = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - started
+    return result, seconds, counter.count
+
+def run_benchmarks(sources, sizes, scenarios, duplicate_ratios, seed=42):
+    """
+    Run every combination of source, size, scenario and duplicate ratio.
+
+    Returns:
+        List of result dictionaries
+    """
+    results = []
+    for source in sources:
+        for size in sizes:
+            for scenario in scenarios:
+                for ratio in duplicate_ratios:
+                    if scenario == "cold" and ratio >= 1:
+                        continue
+                    rng = random.Random(seed)
+                    batch = build_batch(source, rng, size, scenario, ratio)
+
+                    stored, seconds, round_trips = time_call(source.store, batch)
+                    results.append({
+                        "function": f"store_{source.name}",
+                        "size": size,
+                        "scenario": scenario,
+                        "duplicate_ratio": ratio,
+                        "seconds": round(seconds, 4),
+                        "round_trips": round_trips,
+                        "added": stored.get("added"),
+                        "skipped": stored.get("skipped")
+                    })
+                    logger.info(f"store_{source.name} size={size} {scenario} dup={ratio}: "
+                                f"{seconds:.3f}s, {round_trips} round trips, {stored}")
+
+                    # Read back once per size/scenario, after the table holds the batch
+                    if ratio == duplicate_ratios[0]:
+                        rows, seconds, round_trips = time_call(source.read, size)
+                        results.append({
+                            "function": f"get_{source.name}_from_db",
+                            "size": size,
+                            "scenario": scenario,
+                            "duplicate_ratio": None,
+                            "seconds": round(seconds, 4),
+                            "round_trips": round_trips,
+                            "rows": len(rows)
+                        })
+                        logger.info(f"get_{source.name}_from_db size={size} {scenario}: "
+                                    f"{seconds:.3f}s, {round_trips} round trips, {len(rows)} rows")
+        truncate_tables(source.tables)
+    return results
+
+def result_key(result):
+    """Key identifying a benchmark case across runs."""
+    return f"{result['function']}|{result['size']}|{result['scenario']}|{result['duplicate_ratio']}"
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results against a baseline.
+
+    A case regresses when it takes more than (1 + threshold) times the baseline
+    time, or when it needs more round trips than the baseline.
+
+    Returns:
+        List of regression descriptions
+    """
+    previous = {result_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if not old:
+            continue
+        if old["seconds"] and result["seconds"] > old["seconds"] * (1 + threshold):
+            regressions.append(f"{result_key(result)}: {old['seconds']}s -> {result['seconds']}s")
+        if result["round_trips"] > old["round_trips"]:
+            regressions.append(f"{result_key(result)}: {old['round_trips']} -> {result['round_trips']} round trips")
+    return regressions
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark database_handler store and read functions")
+    parser.add_argument("--sources", nargs="+", choices=list(SOURCES), default=list(SOURCES),
+                        help="Sources to benchmark (default: all)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Batch sizes in rows (default: 1000 10000 100000)")
+    parser.add_argument("--scenarios", nargs="+", choices=["cold", "populated"], default=["cold", "populated"],
+                        help="Table states to benchmark (default: cold populated)")
+    parser.add_argument("--duplicate-ratios", type=float, nargs="+", default=DEFAULT_DUPLICATE_RATIOS,
+                        help="Share of each batch that is a duplicate (default: 0.0 0.5)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("--output", default="database_handler_benchmark.json",
+                        help="File to write results to (default: database_handler_benchmark.json)")
+    parser.add_argument("--compare", default=None,
+                        help="Baseline JSON file to compare against; exits 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before a case is flagged (default: 0.2 = 20%%)")
+    parser.add_argument("--verbose-store-logs", action="store_true", default=False,
+                        help="Keep database_handler's per-row INFO logging during timing")
+    parser.add_argument("--yes", action="store_true", default=False,
+                        help="Confirm that DATABASE_URL points to a disposable database")
+    return parser.parse_args()
+
+def main():
+    """Main function to run the benchmark."""
+    args = parse_arguments()
+    if not args.yes:
+        print("Refusing to run without --yes: the benchmark truncates tables.")
+        print("Only run this against a disposable database.")
+        return 1
+
+    # Read the baseline first: --output may be the same file and is overwritten below
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+
+    if not args.verbose_store_logs:
+        db.logger.setLevel(logging.WARNING)
+
+    db.Base.metadata.create_all(db.engine)
+    results = run_benchmarks([SOURCES[name] for name in args.sources], args.sizes,
+                             args.scenarios, args.duplicate_ratios, seed=args.seed)
+
+    report = {"timestamp": datetime.now().isoformat(), "seed": args.seed, "results": results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {len(results)} results to {args.output}")
+
+    if baseline is not None:
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for regression in regressions:
+                print(f"- {regression}")
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Lifelog Parser Benchmark
+
+This script measures the single-walk lifelog parser in lifelog_parser.py
+against the separate decodes and walks the lifelog maintenance scripts used
+before (timestamps, subsummary headings and transcript lines each decoded
+raw_data and walked the contents again), on large generated lifelogs, and
+checks that both produce the same timestamps, headings and lines.
+
+The legacy functions below are frozen copies of the implementations that used
+to live in update_lifelog_timestamps.py, extract_lifelog_subsummaries.py and
+extract_transcript_lines.py; they are only kept here as the reference for the
+equivalence check.
+
+Usage:
+    python benchmark_lifelog_parser.py
+    python benchmark_lifelog_parser.py --lifelogs 500 --subsummaries 60 --lines 80 --repeat 5
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+import synthetic_data
+import lifelog_parser
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Legacy per-script implementations (reference only) ---
+
+def legacy_parse_date(date_str):
+    """Parse date string to datetime object."""
+    if not date_str:
+        return None
+    try:
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    except (ValueError, TypeError):
+        return None
+
+def legacy_extract_timestamps(raw_data_text):
+    """The earliest startTime and latest endTime, as update_lifelog_timestamps found them."""
+    raw_data = json.loads(raw_data_text)
+
+    created_at = None
+    updated_at = None
+
+    if 'contents' in raw_data and isinstance(raw_data['contents'], list):
+        for item in raw_data['contents']:
+            start_time = item.get('startTime')
+            parsed_start = legacy_parse_date(start_time) if start_time else None
+            if parsed_start and (created_at is None or parsed_start < created_at):
+                created_at = parsed_start
+
+            end_time = item.get('endTime')
+            parsed_end = legacy_parse_date(end_time) if end_time else None
+            if parsed_end and (updated_at is None or parsed_end > updated_at):
+                updated_at = parsed_end
+
+    return created_at, updated_at
+
+def legacy_extract_headings(raw_data_text):
+    """The heading2 contents, as extract_lifelog_subsummaries found them."""
+    raw_data = json.loads(raw_data_text)
+    contents = raw_data.get('contents', [])
+    return [item.get('content', '') for item in contents if item.get('type') == 'heading2']
+
+def legacy_extract_speaker_from_text(text):
+    """Split a "Speaker: text" line, as extract_transcript_lines did."""
+    if not text:
+        return None, ""
+
+    speaker_match = re.match(r'^([A-Za-z\s\.]+):\s*(.*)', text)
+    if speaker_match:
+        speaker = speaker_match.group(1).strip()
+        content = speaker_match.group(2).strip()
+        return speaker, content
+
+    return None, text
+
+def legacy_extract_lines(raw_data_text):
+    """The transcript lines under each heading2, as extract_transcript_lines found them."""
+    raw_data = json.loads(raw_data_text)
+    contents = raw_data.get('contents', [])
+    heading2_positions = [i for i, item in enumerate(contents) if item.get('type') == 'heading2']
+
+    sections = []
+    for i, start_pos in enumerate(heading2_positions):
+        end_pos = heading2_positions[i+1] if i+1 < len(heading2_positions) else len(contents)
+
+        lines = []
+        for content_item in contents[start_pos + 1:end_pos]:
+            if content_item.get('type') != 'blockquote':
+                continue
+
+            text = content_item.get('content', '')
+            if not text.strip():
+                continue
+
+            speaker, cleaned_text = legacy_extract_speaker_from_text(text)
+            lines.append({
+                "speaker": speaker,
+                "text": cleaned_text,
+                "start_time": content_item.get('startTime'),
+                "end_time": content_item.get('endTime'),
+                "position": len(lines)
+            })
+        sections.append(lines)
+
+    return sections
+
+# --- Benchmark harness ---
+
+def legacy_parse(raw_data_text):
+    """Everything the maintenance scripts derived, one decode and walk each."""
+    created_at, updated_at = legacy_extract_timestamps(raw_data_text)
+    return created_at, updated_at, legacy_extract_headings(raw_data_text), legacy_extract_lines(raw_data_text)
+
+def parser_parse(raw_data_text):
+    """The same values from a single lifelog_parser.parse_lifelog() call."""
+    parsed = lifelog_parser.parse_lifelog(raw_data_text)
+    return (parsed.created_at, parsed.updated_at,
+            [subsummary.heading for subsummary in parsed.subsummaries],
+            [subsummary.lines for subsummary in parsed.subsummaries])
+
+def build_payloads(count, subsummaries, lines, seed):
+    """Build lifelog raw_data texts from the synthetic data builders."""
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1, 8)
+    return [
+        json.dumps(synthetic_data.build_lifelog(rng, f"bench-log-{index}", started + timedelta(hours=index),
+                                                subsummaries=subsummaries, lines_per_subsummary=lines))
+        for index in range(count)
+    ]
+
+def verify(payloads):
+    """
+    Check that the parser matches the legacy implementations.
+
+    Returns:
+        List of mismatch descriptions (empty when identical)
+    """
+    mismatches = []
+    for index, payload in enumerate(payloads):
+        if legacy_parse(payload) != parser_parse(payload):
+            mismatches.append(f"lifelog {index}")
+        # store_lifelogs stored the payload's own title, also for payloads without one
+        data = json.loads(payload)
+        untitled = dict(data, title=None)
+        if (lifelog_parser.parse_lifelog(payload).title != data.get('title')
+                or lifelog_parser.parse_lifelog(untitled).title is not None):
+            mismatches.append(f"lifelog {index} title")
+    return mismatches
+
+def time_runs(func, repeat):
+    """Return the best wall time over `repeat` runs of func."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark Limitless lifelog contents parsing")
+    parser.add_argument("--lifelogs", type=int, default=200, help="Number of generated lifelogs (default: 200)")
+    parser.add_argument("--subsummaries", type=int, default=40,
+                        help="Subsummaries per lifelog (default: 40)")
+    parser.add_argument("--lines", type=int, default=60,
+                        help="Transcript lines per subsummary (default: 60)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per variant, best is reported (default: 3)")
+    return parser.parse_args()
+
+def main():
+    """Main function to run the benchmark."""
+    args = parse_arguments()
+    payloads = build_payloads(args.lifelogs, args.subsummaries, args.lines, args.seed)
+    megabytes = sum(len(payload) for payload in payloads) / 1e6
+    print(f"Generated {len(payloads)} lifelogs ({megabytes:.1f} MB of raw_data)")
+
+    mismatches = verify(payloads)
+    if mismatches:
+        print(f"parser: {len(mismatches)} mismatches against the legacy implementations")
+        for mismatch in mismatches[:10]:
+            print(f"  {mismatch}")
+    else:
+        print("parser: output identical to the legacy implementations")
+
+    variants = [("legacy (3 decodes/walks)", lambda: [legacy_parse(payload) for payload in payloads])]
+    fast_json = lifelog_parser.orjson
+    lifelog_parser.orjson = None
+    try:
+        variants.append(("parser (json)", lambda: [parser_parse(payload) for payload in payloads]))
+        timings = [(name, time_runs(func, args.repeat)) for name, func in variants]
+    finally:
+        lifelog_parser.orjson = fast_json
+    if fast_json is not None:
+        timings.append(("parser (orjson)", time_runs(lambda: [parser_parse(payload) for payload in payloads],
+                                                     args.repeat)))
+    else:
+        print("orjson is not installed, skipping the fast JSON variant")
+
+    legacy_time = timings[0][1]
+    print(f"\n{'variant':<26} {'seconds':>9} {'lifelogs/s':>11} {'MB/s':>8} {'speedup':>8}")
+    for name, elapsed in timings:
+        print(f"{name:<26} {elapsed:>9.4f} {len(payloads) / elapsed:>11.0f} {megabytes / elapsed:>8.1f} "
+              f"{legacy_time / elapsed:>8.1f}")
+
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
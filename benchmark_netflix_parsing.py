@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Netflix Parsing Benchmark
+
+This script measures the throughput of the batch Netflix parsing engine in
+netflix_parsing.py against the per-row parsing the importer used before, and
+checks that both produce identical output for every row.
+
+The legacy functions below are frozen copies of the per-row implementations
+that used to live in netflix_importer.py; they are only kept here as the
+reference for the equivalence check.
+
+Usage:
+    python benchmark_netflix_parsing.py
+    python benchmark_netflix_parsing.py --csv attached_assets/NetflixViewingHistory.csv --multiply 20 --repeat 5
+"""
+
+import re
+import sys
+import csv
+import time
+import logging
+import argparse
+from datetime import datetime
+
+import netflix_parsing
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_CSV = "attached_assets/NetflixViewingHistory.csv"
+
+# --- Legacy per-row implementations (reference only) ---
+
+def legacy_clean_special_characters(title):
+    """
+    Remove special characters from a title.
+    
+    Args:
+        title: Original title string
+        
+    Returns:
+        Cleaned title string
+    """
+    if not title:
+        return title
+        
+    # Remove quotes if they exist
+    if title.startswith('"') and title.endswith('"'):
+        title = title[1:-1]
+        
+    # Replace colons and other special characters with spaces
+    cleaned = re.sub(r'[:\-_]', ' ', title)
+    
+    # Replace multiple spaces with a single space
+    cleaned = re.sub(r'\s+', ' ', cleaned)
+    
+    # Trim leading/trailing whitespace
+    cleaned = cleaned.strip()
+    
+    return cleaned
+
+def legacy_parse_date(date_str):
+    """Parse date string from Netflix CSV to datetime object."""
+    try:
+        return datetime.strptime(date_str, '%m/%d/%y')
+    except ValueError:
+        # Try alternative formats
+        try:
+            return datetime.strptime(date_str, '%m/%d/%Y')
+        except ValueError:
+            logger.warning(f"Could not parse date: {date_str}, using today's date")
+            return datetime.now()
+
+def legacy_parse_title(title):
+    """
+    Parse Netflix title to extract show name, season, and episode information.
+    
+    Returns a dictionary with keys:
+        - show_name: The name of the show (if applicable)
+        - season: Season information (if applicable)
+        - episode_name: Episode name (if applicable)
+        - episode_number: Episode number (if applicable)
+    """
+    # Initialize result with empty values
+    result = {
+        'show_name': None,
+        'season': None,
+        'episode_name': None,
+        'episode_number': None
+    }
+    
+    # Check if title has quotes - usually indicates a movie
+    if title.startswith('"') and title.endswith('"'):
+        # Remove quotes from title
+        clean_title = title[1:-1]
+        
+        # Common patterns for TV shows
+        # Pattern: "Show Name: Season X: Episode Name"
+        season_episode_pattern = r'^(.*?):\s*(Season\s*\d+):\s*(.*)$'
+        # Pattern: "Show Name: Limited Series: Episode Name"
+        limited_series_pattern = r'^(.*?):\s*(Limited Series):\s*(.*)$'
+        # Pattern: "Show Name: Episode X"
+        episode_pattern = r'^(.*?):\s*(Episode\s*\d+)$'
+        
+        # Try to match season and episode pattern
+        match = re.match(season_episode_pattern, clean_title)
+        if match:
+            result['show_name'] = match.group(1).strip()
+            result['season'] = match.group(2).strip()
+            result['episode_name'] = match.group(3).strip()
+            
+            # Try to extract episode number if it exists in the episode name
+            ep_num_match = re.search(r'Episode\s*(\d+)', result['episode_name'])
+            if ep_num_match:
+                result['episode_number'] = ep_num_match.group(1)
+            return result
+        
+        # Try to match limited series pattern
+        match = re.match(limited_series_pattern, clean_title)
+        if match:
+            result['show_name'] = match.group(1).strip()
+            result['season'] = match.group(2).strip()  # "Limited Series"
+            result['episode_name'] = match.group(3).strip()
+            return result
+        
+        # Try to match simple episode pattern
+        match = re.match(episode_pattern, clean_title)
+        if match:
+            result['show_name'] = match.group(1).strip()
+            result['episode_number'] = re.search(r'\d+', match.group(2)).group(0)
+            return result
+        
+        # If no patterns match, just use the entire title
+        return result
+    
+    # Not in quotes - might be a movie or simple format
+    return result
+
+def legacy_extract_series_name(title):
+    """
+    Extract the base series name from a title with episode information.
+    
+    Args:
+        title: Original Netflix title with episode information
+        
+    Returns:
+        Base series name without episode/season information
+    """
+    # Remove episode indicators
+    base_title = title
+    
+    # Try to extract series name before episode indicators
+    episode_keywords = [" Episode ", " Season ", " Chapter ", " Part "]
+    for keyword in episode_keywords:
+        if keyword.lower() in base_title.lower():
+            base_title = base_title.split(keyword, 1)[0]
+            break
+    
+    # Also handle format like "Series_Name: Season X: Episode Y"
+    if ":" in base_title:
+        base_title = base_title.split(":", 1)[0]
+    
+    # Handle "Limited Series" indicator
+    if "Limited Series" in base_title:
+        base_title = base_title.replace("Limited Series", "").strip()
+    
+    return base_title.strip()
+
+def legacy_is_series_episode(title):
+    """
+    Check if a title appears to be an episode of a TV series.
+    
+    Args:
+        title: The title to check
+        
+    Returns:
+        True if it appears to be a series episode, False otherwise
+    """
+    episode_indicators = ["Episode ", "Season ", "Chapter ", " Part ", "Limited Series"]
+    return any(indicator in title for indicator in episode_indicators)
+
+def legacy_clean_title_for_search(title):
+    """
+    Clean and normalize a Netflix title for better IMDB search results.
+    Removes episode indicators, special characters, and handles possessive forms.
+    Special handling for popular TV series to improve match rate.
+    
+    Args:
+        title: Original Netflix title
+    
+    Returns:
+        Cleaned title string optimized for IMDB search
+    """
+    # First, remove quotes if they exist
+    if title.startswith('"') and title.endswith('"'):
+        title = title[1:-1]
+    
+    # Check for popular TV series with exact matching
+    popular_shows = {
+        "Game of Thrones": ["Game of Thrones", "GoT"],
+        "Stranger Things": ["Stranger Things"],
+        "The Crown": ["The Crown"],
+        "Breaking Bad": ["Breaking Bad"],
+        "The Witcher": ["The Witcher"],
+        "Money Heist": ["Money Heist", "La Casa de Papel"],
+        "Bridgerton": ["Bridgerton"],
+        "The Queen's Gambit": ["The Queens Gambit", "Queens Gambit"]
+    }
+    
+    # Check if the title starts with any of the popular show names
+    for show_name, search_terms in popular_shows.items():
+        for term in search_terms:
+            if title.startswith(term):
+                return show_name
+    
+    # Standard cleaning for other titles
+    # Extract show name without episode info (split by colon)
+    base_title = title.split(':')[0] if ':' in title else title
+    
+    # Remove anything after "Episode" or "Season" keywords
+    episode_keywords = [" Episode ", " Season ", " Chapter ", " Part "]
+    for keyword in episode_keywords:
+        if keyword.lower() in base_title.lower():
+            base_title = base_title.split(keyword, 1)[0]
+    
+    # Also handle episode indicators with numbers like "- E01" or "S01E01"
+    base_title = re.sub(r'\s+-\s+[Ee]\d+.*$', '', base_title)  # Remove "- E01" pattern
+    base_title = re.sub(r'\s+[Ss]\d+[Ee]\d+.*$', '', base_title)  # Remove "S01E01" pattern
+    
+    # Handle special cases before removing all special characters
+    # Convert possessive form to regular form (Queen's → Queens)
+    base_title = base_title.replace("'s", "s")
+    
+    # Remove special characters, keeping only alphanumeric and spaces
+    cleaned = re.sub(r'[^\w\s]', '', base_title)
+    
+    # Remove extra spaces and trim
+    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    
+    # Remove "Limited Series" and similar suffixes
+    suffixes_to_remove = ["Limited Series", "The Complete Series", "The Series"]
+    for suffix in suffixes_to_remove:
+        if cleaned.endswith(suffix):
+            cleaned = cleaned[:-(len(suffix))].strip()
+    
+    return cleaned
+
+# --- Benchmark harness ---
+
+def legacy_parse_rows(titles, date_strings):
+    """Parse rows the way import_netflix_history did before the batch engine."""
+    rows = []
+    for title, date_str in zip(titles, date_strings):
+        watch_date = legacy_parse_date(date_str)
+        parsed_title = legacy_parse_title(title)
+        cleaned_title = legacy_clean_special_characters(title)
+        is_series = legacy_is_series_episode(cleaned_title)
+        rows.append({
+            'original_title': title,
+            'cleaned_title': cleaned_title,
+            'watch_date': watch_date,
+            'parsed_title': parsed_title,
+            'is_series': is_series,
+            'series_name': legacy_extract_series_name(cleaned_title) if is_series else None
+        })
+    return rows
+
+def load_csv(path, multiply=1):
+    """Read the title and date columns, repeated `multiply` times."""
+    titles = []
+    date_strings = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            title = row.get('Title', '')
+            date_str = row.get('Date', '')
+            if title and date_str:
+                titles.append(title)
+                date_strings.append(date_str)
+    return titles * multiply, date_strings * multiply
+
+def verify(titles, date_strings, use_pandas):
+    """
+    Check that the batch engine matches the legacy per-row output.
+
+    Returns:
+        List of mismatch descriptions (empty when identical)
+    """
+    expected = legacy_parse_rows(titles, date_strings)
+    actual = netflix_parsing.parse_netflix_rows(titles, date_strings, use_pandas=use_pandas)
+    mismatches = []
+    for index, (old, new) in enumerate(zip(expected, actual)):
+        if old != new:
+            mismatches.append(f"row {index}: {old} != {new}")
+    if len(expected) != len(actual):
+        mismatches.append(f"row count {len(expected)} != {len(actual)}")
+
+    for title in dict.fromkeys(titles):
+        if legacy_clean_title_for_search(title) != netflix_parsing.clean_title_for_search(title):
+            mismatches.append(f"clean_title_for_search({title!r}) differs")
+        if legacy_extract_series_name(title) != netflix_parsing.extract_series_name(title):
+            mismatches.append(f"extract_series_name({title!r}) differs")
+    return mismatches
+
+def time_runs(func, repeat, clear_caches=False):
+    """Return the best wall time over `repeat` runs of func."""
+    best = None
+    for _ in range(repeat):
+        if clear_caches:
+            netflix_parsing.clear_caches()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark Netflix CSV parsing")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help=f"Netflix viewing history CSV (default: {DEFAULT_CSV})")
+    parser.add_argument("--multiply", type=int, default=10,
+                        help="Repeat the CSV rows this many times (default: 10)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per variant, best is reported (default: 5)")
+    return parser.parse_args()
+
+def main():
+    """Main function to run the benchmark."""
+    args = parse_arguments()
+    titles, date_strings = load_csv(args.csv, args.multiply)
+    print(f"Loaded {len(titles)} rows ({len(set(titles))} distinct titles) from {args.csv}")
+
+    variants = [("batch (stdlib)", False)]
+    if netflix_parsing.pd is not None:
+        variants.append(("batch (pandas)", True))
+    else:
+        print("pandas not installed - skipping the pandas variant")
+
+    failed = False
+    for name, use_pandas in variants:
+        mismatches = verify(titles, date_strings, use_pandas)
+        if mismatches:
+            failed = True
+            print(f"{name}: {len(mismatches)} mismatches against the legacy parser")
+            for mismatch in mismatches[:10]:
+                print(f"  {mismatch}")
+        else:
+            print(f"{name}: output identical to the legacy parser")
+
+    legacy_time = time_runs(lambda: legacy_parse_rows(titles, date_strings), args.repeat)
+    print(f"\n{'variant':<24} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+    print(f"{'legacy per-row':<24} {legacy_time:>9.4f} {len(titles) / legacy_time:>12.0f} {1.0:>8.1f}")
+    for name, use_pandas in variants:
+        for label, clear in ((f"{name}, cold", True), (f"{name}, warm", False)):
+            elapsed = time_runs(lambda: netflix_parsing.parse_netflix_rows(titles, date_strings, use_pandas=use_pandas),
+                                args.repeat, clear_caches=clear)
+            print(f"{label:<24} {elapsed:>9.4f} {len(titles) / elapsed:>12.0f} {legacy_time / elapsed:>8.1f}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Web App Load Benchmark
+
+This script drives the Life Journal web interface (web_app.py) with concurrent
+HTTP requests and reports latency percentiles and throughput per endpoint.
+
+It exercises the endpoints the browser hits on every page load:
+- /api/date_counts (calendar on the index page)
+- /api/journal_data for 1, 7 and 30 day ranges
+- /day/<date> (server-rendered day view)
+
+Dates are picked at random inside --start-date/--end-date, so point it at a
+database filled by generate_synthetic_data.py to see how the endpoints behave
+with years of data.
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+import aiohttp
+
+def percentile(sorted_values, pct):
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def build_scenarios(start_date, end_date):
+    """
+    Build the weighted list of request scenarios.
+
+    Each scenario is (name, weight, function returning a URL path).
+    """
+    span_days = max(0, (end_date - start_date).days)
+
+    def random_day(offset_max=0):
+        day = start_date + timedelta(days=random.randint(0, max(0, span_days - offset_max)))
+        return day
+
+    def journal_range(days):
+        def path():
+            first = random_day(days - 1)
+            last = first + timedelta(days=days - 1)
+            return (f"/api/journal_data?start_date={first.strftime('%Y-%m-%d')}"
+                    f"&end_date={last.strftime('%Y-%m-%d')}")
+        return path
+
+    return [
+        ("date_counts", 2, lambda: "/api/date_counts"),
+        ("journal_data_1d", 4, journal_range(1)),
+        ("journal_data_7d", 2, journal_range(7)),
+        ("journal_data_30d", 1, journal_range(30)),
+        ("day_view", 4, lambda: f"/day/{random_day().strftime('%Y-%m-%d')}")
+    ]
+
+async def run_worker(session, base_url, scenarios, weights, deadline, remaining, results):
+    """Issue requests until the deadline passes or the request budget is spent."""
+    while time.perf_counter() < deadline:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return
+            remaining[0] -= 1
+
+        name, _, make_path = random.choices(scenarios, weights=weights)[0]
+        url = base_url + make_path()
+        started = time.perf_counter()
+        try:
+            async with session.get(url) as response:
+                await response.read()
+                ok = response.status == 200
+        except Exception:
+            ok = False
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        results.setdefault(name, []).append((elapsed_ms, ok))
+
+async def run_benchmark(base_url, concurrency, duration, requests, start_date, end_date,
+                        warmup=0, only=None):
+    """
+    Run the load benchmark.
+
+    Args:
+        base_url: Root URL of the running web app
+        concurrency: Number of concurrent clients
+        duration: Maximum run time in seconds
+        requests: Optional total request budget (stops early when reached)
+        start_date, end_date: Date window requests are drawn from
+        warmup: Number of untimed requests issued first
+        only: Optional list of scenario names to run
+
+    Returns:
+        Report dictionary with per-endpoint and overall statistics
+    """
+    scenarios = build_scenarios(start_date, end_date)
+    if only:
+        scenarios = [s for s in scenarios if s[0] in only]
+        if not scenarios:
+            raise ValueError(f"No scenarios match {only}")
+    weights = [s[1] for s in scenarios]
+
+    timeout = aiohttp.ClientTimeout(total=120)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        if warmup:
+            await asyncio.gather(*[
+                run_worker(session, base_url, scenarios, weights, float('inf'), [warmup // concurrency + 1], {})
+                for _ in range(concurrency)
+            ])
+
+        results = {}
+        remaining = [requests] if requests else None
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            run_worker(session, base_url, scenarios, weights, deadline, remaining, results)
+            for _ in range(concurrency)
+        ])
+        wall_time = time.perf_counter() - started
+
+    return build_report(results, wall_time, concurrency)
+
+def summarize(samples, wall_time):
+    """Compute latency percentiles and throughput for a list of (ms, ok) samples."""
+    latencies = sorted(ms for ms, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / wall_time, 2) if wall_time else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "max_ms": round(latencies[-1], 2) if latencies else None
+    }
+
+def build_report(results, wall_time, concurrency):
+    """Build the benchmark report from raw samples."""
+    all_samples = [sample for samples in results.values() for sample in samples]
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "concurrency": concurrency,
+        "wall_time_s": round(wall_time, 2),
+        "overall": summarize(all_samples, wall_time),
+        "endpoints": {name: summarize(samples, wall_time) for name, samples in sorted(results.items())}
+    }
+
+def print_report(report):
+    """Print the report as a table."""
+    header = f"{'endpoint':<18} {'reqs':>7} {'errs':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(f"\nConcurrency {report['concurrency']}, wall time {report['wall_time_s']}s")
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        print(f"{name:<18} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps'] or 0:>8} "
+              f"{stats['p50_ms'] or 0:>9} {stats['p95_ms'] or 0:>9} {stats['p99_ms'] or 0:>9} {stats['max_ms'] or 0:>9}")
+
+def parse_arguments():
+    """Parse command line arguments"""
+    today = datetime.now().date()
+    parser = argparse.ArgumentParser(description="Load benchmark for the Life Journal web app")
+    parser.add_argument("--base-url", default="http://localhost:5000",
+                        help="Root URL of the running web app (default: http://localhost:5000)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32],
+                        help="One or more concurrency levels to run (default: 1 8 32)")
+    parser.add_argument("--duration", type=float, default=30,
+                        help="Seconds to run each concurrency level (default: 30)")
+    parser.add_argument("--requests", type=int, default=None,
+                        help="Optional request budget per concurrency level")
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="Untimed warmup requests before each level (default: 20)")
+    parser.add_argument("--start-date", default=(today - timedelta(days=365)).strftime('%Y-%m-%d'),
+                        help="First date requests are drawn from (default: one year ago)")
+    parser.add_argument("--end-date", default=today.strftime('%Y-%m-%d'),
+                        help="Last date requests are drawn from (default: today)")
+    parser.add_argument("--only", nargs="+", default=None,
+                        help="Only run these scenarios (date_counts, journal_data_1d, journal_data_7d, "
+                             "journal_data_30d, day_view)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for date selection")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    return parser.parse_args()
+
+def main():
+    """Main function to run the benchmark."""
+    args = parse_arguments()
+    if args.seed is not None:
+        random.seed(args.seed)
+    start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d')
+
+    reports = []
+    for concurrency in args.concurrency:
+        report = asyncio.run(run_benchmark(
+            args.base_url.rstrip('/'), concurrency, args.duration, args.requests,
+            start_date, end_date, warmup=args.warmup, only=args.only
+        ))
+        print_report(report)
+        reports.append(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"base_url": args.base_url, "runs": reports}, f, indent=2)
+        print(f"\nSaved report to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,15 +3,17 @@
 Clean Markdown from Bee Conversation Data
 
 This script removes Markdown formatting from the summary, atmosphere, and key_takeaways
-fields in the bee_conversations table, ensuring they contain only plain text.
+fields in the bee_conversations table, ensuring they contain only plain text. It runs as a
+resumable backfill (see backfill.py); --processes spreads the cleaning over several cores.
 """
 
 import json
-import re
+import argparse
 import logging
-import os
-import psycopg2
-from psycopg2.extras import Json
+
+import markdown_normalizer
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
+from models import Bee_Conversation
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -27,163 +29,77 @@ def clean_markdown(text):
     Returns:
         String with Markdown formatting removed
     """
-    if not text:
-        return text
-        
-    # Handle different types
-    if isinstance(text, list):
-        return [clean_markdown(item) for item in text]
-    if not isinstance(text, str):
-        return text
-        
-    # Remove any duplicate "Summary:" or "Atmosphere:" headings that might exist within the text
-    text = re.sub(r'(?i)^Summary:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    text = re.sub(r'(?i)Atmosphere:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    text = re.sub(r'(?i)Key Take ?Aways:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    text = re.sub(r'(?i)Key Takeaways:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    
-    # Remove section heading variations more thoroughly
-    text = re.sub(r'(?i)^#+\s*Summary:?.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(?i)^#+\s*Atmosphere:?.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(?i)^#+\s*Key Take ?Aways:?.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(?i)^#+\s*Key Takeaways:?.*?\n', '', text, flags=re.MULTILINE)
-    
-    # Remove Markdown headers (e.g., ## Header)
-    text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
-    
-    # Enhanced Markdown cleanup - Run multiple times to catch nested formatting
-    # Remove bold formatting (e.g., **bold**)
-    for _ in range(3):  # Run multiple passes to catch nested formatting
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    
-    # Remove italic formatting (e.g., *italic*)
-    for _ in range(3):
-        text = re.sub(r'\*([^\*\n]+)\*', r'\1', text)
-    
-    # Remove remaining single asterisks that might be part of incomplete formatting
-    text = re.sub(r'(?<!\*)\*(?!\*)', '', text)
-    
-    # Remove bullet points with different symbols and spacing patterns
-    text = re.sub(r'^\s*[\*\-•]\s+', '', text, flags=re.MULTILINE)
-    
-    # Remove Markdown links [text](url) -> text
-    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
-    
-    # Remove code blocks with any language specifier
-    text = re.sub(r'```[\w]*\n.*?```', '', text, flags=re.DOTALL)
-    
-    # Remove inline code
-    text = re.sub(r'`(.*?)`', r'\1', text)
-    
-    # Remove blockquotes
-    text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
-    
-    # Remove horizontal rules
-    text = re.sub(r'^\s*[-_*]{3,}\s*$', '', text, flags=re.MULTILINE)
-    
-    # Remove HTML tags that might be present
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Fix common markdown artifacts
-    text = text.replace('**', '').replace('__', '')
-    
-    # Remove extra whitespace
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = text.strip()
-    
-    return text
+    return markdown_normalizer.normalize(text, "thorough")
 
-def clean_bee_conversation_data():
-    """Clean Markdown from summary, atmosphere, and key_takeaways in bee_conversations."""
-    # Get database connection
-    db_url = os.environ.get('DATABASE_URL')
-    if not db_url:
-        logger.error("DATABASE_URL not found in environment variables")
-        return {"cleaned": 0, "errors": 1}
+def decode_key_takeaways(key_takeaways):
+    """Key takeaways as stored: a JSON string is decoded, anything else is returned as is."""
+    if isinstance(key_takeaways, str):
+        # Try to parse as JSON if it's stored as a string
+        try:
+            return json.loads(key_takeaways)
+        except json.JSONDecodeError:
+            # Not valid JSON, treat as regular text
+            return key_takeaways
+    return key_takeaways
+
+def clean_conversation(row):
+    """
+    Backfill transform: a conversation's fields with Markdown removed.
     
-    try:
-        conn = psycopg2.connect(db_url)
-        cursor = conn.cursor()
-        
-        # Get all conversations that have data in summary, atmosphere, or key_takeaways
-        cursor.execute("""
-            SELECT id, summary, atmosphere, key_takeaways 
-            FROM bee_conversations 
-            WHERE summary IS NOT NULL OR atmosphere IS NOT NULL OR key_takeaways IS NOT NULL;
-        """)
-        
-        conversations = cursor.fetchall()
-        logger.info(f"Found {len(conversations)} conversations with data to clean")
-        
-        cleaned_count = 0
-        error_count = 0
-        
-        # Process each conversation
-        for conv_id, summary, atmosphere, key_takeaways in conversations:
-            try:
-                # Clean Markdown from each field
-                clean_summary = clean_markdown(summary)
-                clean_atmosphere = clean_markdown(atmosphere)
-                
-                # Handle key_takeaways specially since it could be a JSON array
-                clean_key_takeaways = None
-                if key_takeaways:
-                    if isinstance(key_takeaways, str):
-                        # Try to parse as JSON if it's stored as a string
-                        try:
-                            key_takeaways_list = json.loads(key_takeaways)
-                            clean_key_takeaways = clean_markdown(key_takeaways_list)
-                        except json.JSONDecodeError:
-                            # Not valid JSON, treat as regular text
-                            clean_key_takeaways = clean_markdown(key_takeaways)
-                    else:
-                        # Already a Python object (list)
-                        clean_key_takeaways = clean_markdown(key_takeaways)
-                
-                # Update the record
-                cursor.execute(
-                    """
-                    UPDATE bee_conversations 
-                    SET summary = %s, atmosphere = %s, key_takeaways = %s 
-                    WHERE id = %s
-                    """,
-                    (clean_summary, clean_atmosphere, Json(clean_key_takeaways) if clean_key_takeaways else None, conv_id)
-                )
-                
-                cleaned_count += 1
-                
-                # Log progress every 10 conversations
-                if cleaned_count % 10 == 0:
-                    logger.info(f"Cleaned {cleaned_count} conversations so far")
-                    conn.commit()
-                
-            except Exception as e:
-                logger.error(f"Error cleaning conversation {conv_id}: {str(e)}")
-                error_count += 1
-        
-        # Final commit
-        conn.commit()
-        logger.info(f"Cleaned {cleaned_count} conversations with {error_count} errors")
+    Args:
+        row: Dict with the conversation id, summary, atmosphere and key_takeaways
         
-        return {
-            "cleaned": cleaned_count,
-            "errors": error_count
-        }
+    Returns:
+        Dict with the cleaned summary, atmosphere and key_takeaways, or None if already clean
+    """
+    clean_key_takeaways = clean_markdown(decode_key_takeaways(row["key_takeaways"]))
+    cleaned = {
+        "summary": clean_markdown(row["summary"]),
+        "atmosphere": clean_markdown(row["atmosphere"]),
+        "key_takeaways": clean_key_takeaways if clean_key_takeaways else None
+    }
+    if all(cleaned[name] == row[name] for name in cleaned):
+        return None
+    return cleaned
+
+BACKFILL = Backfill(
+    "clean_markdown_from_bee_data", Bee_Conversation, ["summary", "atmosphere", "key_takeaways"],
+    clean_conversation,
+    where=(Bee_Conversation.summary.isnot(None) | Bee_Conversation.atmosphere.isnot(None) |
+           Bee_Conversation.key_takeaways.isnot(None))
+)
+
+def clean_bee_conversation_data(processes=None, chunk_size=None, restart=False):
+    """
+    Clean Markdown from summary, atmosphere, and key_takeaways in bee_conversations.
     
+    Args:
+        processes: Optional number of worker processes for cleaning (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first conversation instead of resuming an interrupted run
+    """
+    try:
+        result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
         return {
             "cleaned": 0,
             "errors": 1
         }
-    finally:
-        if 'conn' in locals():
-            conn.close()
+    
+    return {
+        "cleaned": result["updated"],
+        "errors": result["errors"]
+    }
 
 def main():
     """Main function to run the cleaning process."""
+    parser = argparse.ArgumentParser(description="Clean Markdown from Bee conversation data")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
+    
     logger.info("Starting Markdown cleaning process")
-    result = clean_bee_conversation_data()
+    result = clean_bee_conversation_data(**backfill_options(args))
     logger.info(f"Cleaning complete: {result['cleaned']} cleaned, {result['errors']} errors")
 
 if __name__ == "__main__":
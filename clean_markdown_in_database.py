@@ -4,25 +4,21 @@ One-time script to clean Markdown formatting from summary and atmosphere fields
 This script identifies and removes Markdown syntax (like *, **, #, -, etc.) from the summary and
 atmosphere fields in the bee_conversations table, while preserving the actual content.
 Key takeaways fields are left unchanged as specified by the user.
+
+With --transcripts the text of every Limitless transcript line is re-cleaned as
+well. Both run as resumable backfills (see backfill.py); --processes spreads the
+cleaning over several cores.
 """
 
-import re
-import sys
+import argparse
 from datetime import datetime
-from models import Bee_Conversation
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-import os
+from models import Bee_Conversation, Limitless_Transcript_Line
 
-# Get database connection
-DATABASE_URL = os.environ.get('DATABASE_URL')
-if not DATABASE_URL:
-    print("Error: DATABASE_URL environment variable not set.")
-    sys.exit(1)
+import markdown_normalizer
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
 
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()
+# Transcript lines are short, so their backfill reads larger chunks
+TRANSCRIPT_CHUNK_SIZE = 20000
 
 def clean_markdown(text):
     """
@@ -34,105 +30,120 @@ def clean_markdown(text):
     Returns:
         String with Markdown formatting removed
     """
-    if not text:
-        return text
-    
-    # Replace markdown headers (# Header) with just the text
-    text = re.sub(r'^#+\s*(.*?)$', r'\1', text, flags=re.MULTILINE)
-    
-    # Replace bold (**text**) with just the text
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    
-    # Remove single asterisks at the beginning of a line or paragraph
-    text = re.sub(r'(?:^|\n)\s*\*\s*', '\n', text)
-    
-    # Remove single asterisks at the end of a line or paragraph
-    text = re.sub(r'\s*\*(?:$|\n)', '\n', text)
-    
-    # Replace italic (*text*) with just the text
-    text = re.sub(r'(?<!\*)\*([^\*]+)\*(?!\*)', r'\1', text)
-    
-    # Replace markdown bullet points with plain text
-    text = re.sub(r'^\s*\*\s*(.*?)$', r'\1', text, flags=re.MULTILINE)
-    text = re.sub(r'^\s*-\s*(.*?)$', r'\1', text, flags=re.MULTILINE)
-    
-    # Remove any stray markdown characters
-    text = re.sub(r'^\s*#\s*$', '', text, flags=re.MULTILINE)
-    
-    # Remove solitary asterisks
-    text = re.sub(r'^\s*\*\s*$', '', text, flags=re.MULTILINE)
+    return markdown_normalizer.normalize(text, "light")
+
+def clean_conversation_markdown(row):
+    """
+    Backfill transform: the summary and atmosphere of a conversation that contain Markdown.
     
-    # Trim extra whitespace
-    text = re.sub(r'\n\n+', '\n\n', text)
-    text = text.strip()
+    Args:
+        row: Dict with the conversation id, summary and atmosphere
+        
+    Returns:
+        Dict with only the cleaned fields that changed, or None
+    """
+    cleaned = {}
+    for name in ("summary", "atmosphere"):
+        if row[name]:
+            value = clean_markdown(row[name])
+            if value != row[name]:
+                cleaned[name] = value
+    return cleaned or None
+
+def clean_transcript_line(row):
+    """
+    Backfill transform: a transcript line's text with Markdown characters removed.
     
-    return text
+    Args:
+        row: Dict with the line id and text
+        
+    Returns:
+        Dict with the cleaned text, or None if already clean
+    """
+    text = markdown_normalizer.normalize(row["text"], "transcript")
+    return {"text": text} if text != row["text"] else None
 
-def clean_markdown_in_database():
+CONVERSATION_BACKFILL = Backfill(
+    "clean_markdown_in_database", Bee_Conversation, ["summary", "atmosphere"], clean_conversation_markdown,
+    where=(
+        (Bee_Conversation.summary.like('%*%')) | 
+        (Bee_Conversation.summary.like('%#%')) | 
+        (Bee_Conversation.summary.like('%-%')) |
+        (Bee_Conversation.atmosphere.like('%*%')) | 
+        (Bee_Conversation.atmosphere.like('%#%')) | 
+        (Bee_Conversation.atmosphere.like('%-%'))
+    )
+)
+
+TRANSCRIPT_BACKFILL = Backfill(
+    "clean_markdown_in_transcript_lines", Limitless_Transcript_Line, ["text"], clean_transcript_line,
+    chunk_size=TRANSCRIPT_CHUNK_SIZE
+)
+
+def clean_markdown_in_database(processes=None, chunk_size=None, restart=False):
     """
     Clean Markdown formatting from summary and atmosphere fields in the bee_conversations table.
+    
+    Args:
+        processes: Optional number of worker processes for cleaning (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first conversation instead of resuming an interrupted run
+        
+    Returns:
+        Number of updated conversations
     """
     try:
-        # Get all conversations that might have Markdown
-        conversations = session.query(Bee_Conversation).filter(
-            (Bee_Conversation.summary.like('%*%')) | 
-            (Bee_Conversation.summary.like('%#%')) | 
-            (Bee_Conversation.summary.like('%-%')) |
-            (Bee_Conversation.atmosphere.like('%*%')) | 
-            (Bee_Conversation.atmosphere.like('%#%')) | 
-            (Bee_Conversation.atmosphere.like('%-%'))
-        ).all()
-        
-        print(f"Found {len(conversations)} conversations with potential Markdown formatting.")
-        
-        updated_count = 0
-        for conv in conversations:
-            original_summary = conv.summary
-            original_atmosphere = conv.atmosphere
-            
-            # Clean Markdown from summary
-            if conv.summary:
-                cleaned_summary = clean_markdown(conv.summary)
-                if cleaned_summary != original_summary:
-                    conv.summary = cleaned_summary
-                    print(f"Cleaned summary for conversation ID {conv.id}")
-                    updated_count += 1
-            
-            # Clean Markdown from atmosphere
-            if conv.atmosphere:
-                cleaned_atmosphere = clean_markdown(conv.atmosphere)
-                if cleaned_atmosphere != original_atmosphere:
-                    conv.atmosphere = cleaned_atmosphere
-                    print(f"Cleaned atmosphere for conversation ID {conv.id}")
-                    updated_count += 1
+        result = run_backfill(CONVERSATION_BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return 0
+    
+    if result["updated"] > 0:
+        print(f"Successfully updated {result['updated']} conversations.")
+    else:
+        print("No conversations needed updating.")
+    return result["updated"]
+
+def clean_transcript_lines(processes=None, chunk_size=None, restart=False):
+    """
+    Re-clean the text of every Limitless transcript line.
+    
+    Args:
+        processes: Optional number of worker processes for cleaning (0 means one per CPU)
+        chunk_size: Optional lines read and committed at a time (default: TRANSCRIPT_CHUNK_SIZE)
+        restart: Start from the first line instead of resuming an interrupted run
         
-        if updated_count > 0:
-            session.commit()
-            print(f"Successfully updated {updated_count} fields.")
-        else:
-            print("No fields needed updating.")
-            
-        return updated_count
-            
+    Returns:
+        Number of updated lines
+    """
+    try:
+        result = run_backfill(TRANSCRIPT_BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
     except Exception as e:
-        session.rollback()
         print(f"Error: {str(e)}")
         return 0
-    finally:
-        session.close()
+    
+    print(f"Updated {result['updated']} of {result['processed']} transcript lines.")
+    return result["updated"]
 
 def main():
     """Main function to run the Markdown cleaning process."""
     print("Starting Markdown cleaning process...")
+    parser = argparse.ArgumentParser(description="Clean Markdown formatting from conversations in the database")
+    parser.add_argument("--transcripts", action="store_true", default=False,
+                        help="Also re-clean the text of every Limitless transcript line")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
     start_time = datetime.now()
     
-    updated_count = clean_markdown_in_database()
+    updated_count = clean_markdown_in_database(**backfill_options(args))
+    if args.transcripts:
+        updated_count += clean_transcript_lines(**backfill_options(args))
     
     end_time = datetime.now()
     duration = (end_time - start_time).total_seconds()
     
     print(f"Markdown cleaning completed in {duration:.2f} seconds.")
-    print(f"Total fields updated: {updated_count}")
+    print(f"Total rows updated: {updated_count}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
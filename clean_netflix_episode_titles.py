@@ -2,17 +2,16 @@
 """
 One-time script to clean episode indicators from Netflix series titles.
 This script identifies series titles with episode information and updates them
-to remove the episode indicators, keeping just the base series name.
+to remove the episode indicators, keeping just the base series name. It runs as a
+resumable backfill (see backfill.py).
 """
 
 import re
 import logging
-import json
-import os
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
-from models import Netflix_History_Item, Netflix_Title_Info, Base
-from datetime import datetime
+import argparse
+from sqlalchemy import update, values, column, Text
+from models import Netflix_History_Item, Netflix_Title_Info
+from backfill import Backfill, run_backfill, update_rows, add_backfill_arguments, backfill_options
 
 # Configure logging
 logging.basicConfig(
@@ -51,67 +50,82 @@ def extract_series_name(title):
     
     return base_title.strip()
 
-def clean_episode_titles():
+def clean_episode_title(row):
     """
-    Update episode titles to remove episode indicators, keeping just the base series name.
+    Backfill transform: the base series name of an episode title.
+    
+    Args:
+        row: Dict with the history item id and title
+        
+    Returns:
+        Dict with the series name as title, or None if the title has no episode information
+    """
+    base_series_name = extract_series_name(row["title"])
+    if base_series_name == row["title"]:
+        return None
+    logger.info(f"Updating title: '{row['title']}' -> '{base_series_name}'")
+    return {"title": base_series_name}
+
+def update_titles(connection, changes):
+    """
+    Backfill writer: rename the history items and their title info records.
+    
+    Args:
+        connection: Connection with the chunk's open transaction
+        changes: List of (row, transform result) pairs
+        
+    Returns:
+        Number of history items updated
     """
-    # Get database URL from environment variables
-    DATABASE_URL = os.environ.get('DATABASE_URL')
-    if not DATABASE_URL:
-        raise ValueError("DATABASE_URL environment variable is not set")
+    updated = update_rows(BACKFILL, connection, changes)
     
-    # Create SQLAlchemy engine and session
-    engine = create_engine(DATABASE_URL)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    # Update Netflix_Title_Info where it exists
+    renames = {row["title"]: result["title"] for row, result in changes}
+    renamed = values(
+        column("old_title", Text), column("new_title", Text), name="renamed_titles"
+    ).data(list(renames.items()))
+    connection.execute(
+        update(Netflix_Title_Info)
+        .where(Netflix_Title_Info.title == renamed.c.old_title)
+        .values(title=renamed.c.new_title)
+    )
+    return updated
+
+BACKFILL = Backfill(
+    "clean_netflix_episode_titles", Netflix_History_Item, ["title"], clean_episode_title,
+    where=(
+        Netflix_History_Item.title.like("%Episode%") | 
+        Netflix_History_Item.title.like("%Season%") | 
+        Netflix_History_Item.title.like("%Chapter%") |
+        Netflix_History_Item.title.like("%Limited Series%")
+    ),
+    write=update_titles
+)
+
+def clean_episode_titles(processes=None, chunk_size=None, restart=False):
+    """
+    Update episode titles to remove episode indicators, keeping just the base series name.
     
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first row instead of resuming an interrupted run
+    """
     try:
-        # Get all titles that look like TV series episodes
-        series_titles = session.query(Netflix_History_Item).filter(
-            Netflix_History_Item.title.like("%Episode%") | 
-            Netflix_History_Item.title.like("%Season%") | 
-            Netflix_History_Item.title.like("%Chapter%") |
-            Netflix_History_Item.title.like("%Limited Series%")
-        ).all()
-        
-        updated_count = 0
-        
-        for item in series_titles:
-            original_title = item.title
-            base_series_name = extract_series_name(original_title)
-            
-            if base_series_name != original_title:
-                logger.info(f"Updating title: '{original_title}' -> '{base_series_name}'")
-                
-                # Update the Netflix_History_Item title
-                item.title = base_series_name
-                
-                # Update Netflix_Title_Info if it exists
-                title_info = session.query(Netflix_Title_Info).filter(
-                    Netflix_Title_Info.title == original_title
-                ).first()
-                
-                if title_info:
-                    title_info.title = base_series_name
-                    logger.info(f"Also updated title info for: '{original_title}'")
-                
-                updated_count += 1
-        
-        # Commit the changes
-        session.commit()
-        logger.info(f"Title cleaning complete: {updated_count} titles updated")
-        
+        result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
+        logger.info(f"Title cleaning complete: {result['updated']} titles updated")
     except Exception as e:
         logger.error(f"Error cleaning episode titles: {str(e)}")
-        session.rollback()
         raise
-    finally:
-        session.close()
 
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description="Remove episode indicators from Netflix series titles")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
+    
     logger.info("Starting Netflix episode title cleaning...")
-    clean_episode_titles()
+    clean_episode_titles(**backfill_options(args))
     logger.info("Netflix episode title cleaning completed.")
 
 if __name__ == "__main__":
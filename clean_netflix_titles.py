@@ -1,14 +1,14 @@
 """
 One-time script to clean special characters from Netflix titles in the database.
+
+Both tables are cleaned by resumable backfills (see backfill.py).
 """
 
 import re
 import logging
-from sqlalchemy import create_engine, MetaData, Table, select, update
-from sqlalchemy.orm import sessionmaker
-import os
+import argparse
 from models import Netflix_History_Item, Netflix_Title_Info
-from database_handler import engine, Session
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -38,73 +38,66 @@ def clean_title(title):
     
     return cleaned
 
-def update_netflix_history_titles():
+def clean_title_row(row):
+    """
+    Backfill transform: a row's title without special characters.
+    
+    Args:
+        row: Dict with the row id and title
+        
+    Returns:
+        Dict with the cleaned title, or None if it is already clean
+    """
+    cleaned_title = clean_title(row["title"])
+    if cleaned_title == row["title"]:
+        return None
+    logger.info(f"Updating title: '{row['title']}' -> '{cleaned_title}'")
+    return {"title": cleaned_title}
+
+HISTORY_BACKFILL = Backfill("clean_netflix_history_titles", Netflix_History_Item, ["title"], clean_title_row)
+TITLE_INFO_BACKFILL = Backfill("clean_netflix_title_info", Netflix_Title_Info, ["title"], clean_title_row)
+
+def update_netflix_history_titles(processes=None, chunk_size=None, restart=False):
     """
     Update all titles in the netflix_history_items table to remove special characters.
+    
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first row instead of resuming an interrupted run
     """
-    session = Session()
     try:
-        # Get all Netflix history items
-        items = session.query(Netflix_History_Item).all()
-        logger.info(f"Found {len(items)} Netflix history items to update")
-        
-        updated_count = 0
-        for item in items:
-            original_title = item.title
-            cleaned_title = clean_title(original_title)
-            
-            if original_title != cleaned_title:
-                logger.info(f"Updating title: '{original_title}' -> '{cleaned_title}'")
-                item.title = cleaned_title
-                updated_count += 1
-        
-        # Commit changes
-        session.commit()
-        logger.info(f"Updated {updated_count} Netflix history titles")
-        
+        result = run_backfill(HISTORY_BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
+        logger.info(f"Updated {result['updated']} Netflix history titles")
     except Exception as e:
-        session.rollback()
         logger.error(f"Error updating Netflix history titles: {e}")
-    finally:
-        session.close()
 
-def update_netflix_title_info():
+def update_netflix_title_info(processes=None, chunk_size=None, restart=False):
     """
     Update all titles in the netflix_title_info table to remove special characters.
+    
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first row instead of resuming an interrupted run
     """
-    session = Session()
     try:
-        # Get all Netflix title info records
-        titles = session.query(Netflix_Title_Info).all()
-        logger.info(f"Found {len(titles)} Netflix title info records to update")
-        
-        updated_count = 0
-        for title_info in titles:
-            original_title = title_info.title
-            cleaned_title = clean_title(original_title)
-            
-            if original_title != cleaned_title:
-                logger.info(f"Updating title info: '{original_title}' -> '{cleaned_title}'")
-                title_info.title = cleaned_title
-                updated_count += 1
-        
-        # Commit changes
-        session.commit()
-        logger.info(f"Updated {updated_count} Netflix title info records")
-        
+        result = run_backfill(TITLE_INFO_BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
+        logger.info(f"Updated {result['updated']} Netflix title info records")
     except Exception as e:
-        session.rollback()
         logger.error(f"Error updating Netflix title info records: {e}")
-    finally:
-        session.close()
 
 def main():
     """Main function to update both tables."""
+    parser = argparse.ArgumentParser(description="Remove special characters from Netflix titles")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
+    
     logger.info("Starting Netflix titles cleanup process")
     
     # Update both tables
-    update_netflix_history_titles()
-    update_netflix_title_info()
+    update_netflix_history_titles(**backfill_options(args))
+    update_netflix_title_info(**backfill_options(args))
     
     logger.info("Netflix titles cleanup complete")
 
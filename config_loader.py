@@ -22,6 +22,9 @@ DEFAULT_CONFIG = {
     "weather": {
         "units": "metric",
         "max_age_hours": 24
+    },
+    "transcripts": {
+        "storage": "rows"
     }
 }
 
@@ -90,4 +93,14 @@ def get_weather_config():
         Dictionary with weather configuration values
     """
     config = load_config()
-    return config.get("weather", DEFAULT_CONFIG["weather"])
\ No newline at end of file
+    return config.get("weather", DEFAULT_CONFIG["weather"])
+
+def get_transcript_config():
+    """
+    Get the transcript storage settings
+    
+    Returns:
+        Dictionary with transcript configuration values
+    """
+    config = load_config()
+    return config.get("transcripts", DEFAULT_CONFIG["transcripts"])
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Bee Conversation Sections
+
+This module splits a Bee conversation summary into its Summary, Atmosphere and
+Key Takeaways sections.
+
+Every heading variant the Bee API has produced ("## Summary", "### Atmosphere:",
+"**Key Takeaways**:", "Key Take Aways:", ...) is recognized by one compiled
+pattern, and the text is scanned once: each heading ends the section before it.
+Any other Markdown heading ends a section too. When a section appears more than
+once, the first occurrence is kept.
+
+normalize_conversation() is what ingest stores: the sections with Markdown
+removed and the key takeaways as a list of points.
+"""
+
+import re
+from collections import namedtuple
+
+import markdown_normalizer
+
+# Section names returned by split_sections, in display order
+SECTION_NAMES = ("summary", "atmosphere", "key_takeaways")
+
+# Stored as bee_conversations.transform_version with the columns
+# normalize_conversation() produced; bump it whenever the parsing or cleanup
+# changes, and update_all_conversations.py re-derives exactly the stored rows
+TRANSFORM_VERSION = "normalize_conversation:1"
+
+_NAME = r'summary|atmosphere|key[ \t]*take[ \t]*aways'
+
+# One alternative per heading style; the named group tells which one matched
+HEADING_RE = re.compile(
+    rf'^[ \t]*#{{1,6}}[ \t]*(?P<markdown>{_NAME})[ \t]*(?::|[ \t]*$)'  # ## Summary / ### Summary:
+    rf'|\*\*(?P<bold>{_NAME})(?:\*\*[ \t]*:?|:\*\*)'  # **Summary**: / **Summary:**
+    rf'|^[ \t]*(?P<label>{_NAME})[ \t]*:'  # Summary: at the start of a line
+    r'|^[ \t]*#{1,6}[ \t]+\S[^\n]*',  # any other Markdown heading
+    re.IGNORECASE | re.MULTILINE
+)
+
+BULLET_RE = re.compile(r'^[\*\-•]+\s*')
+
+# A span of the text: the heading (if any) starts at `start`, the body runs
+# from `body_start` to `end`. name is None for text before the first heading
+# and "other" for sections under an unrecognized heading.
+Section = namedtuple("Section", ["name", "start", "body_start", "end"])
+
+def _section_name(match):
+    """Section name for a heading match."""
+    heading = match.group('markdown') or match.group('bold') or match.group('label')
+    if heading is None:
+        return "other"
+    first = heading[0].lower()
+    return "summary" if first == "s" else "atmosphere" if first == "a" else "key_takeaways"
+
+def tokenize(text):
+    """
+    Split text into sections at every heading, in one pass.
+
+    Args:
+        text: Conversation summary text
+
+    Returns:
+        List of Section tuples covering the whole text, starting with the
+        (possibly empty) text before the first heading
+    """
+    sections = []
+    name, start, body_start = None, 0, 0
+    for match in HEADING_RE.finditer(text):
+        sections.append(Section(name, start, body_start, match.start()))
+        name, start, body_start = _section_name(match), match.start(), match.end()
+    sections.append(Section(name, start, body_start, len(text)))
+    return sections
+
+def split_sections(text):
+    """
+    Extract the Summary, Atmosphere and Key Takeaways sections.
+
+    Without a Summary heading, the text before the first heading is the
+    summary (the whole text when there are no headings).
+
+    Args:
+        text: Conversation summary text
+
+    Returns:
+        Dict mapping each of SECTION_NAMES to its stripped text ("" if missing)
+    """
+    sections = dict.fromkeys(SECTION_NAMES, "")
+    if not text:
+        return sections
+
+    seen = set()
+    preamble = ""
+    for section in tokenize(text):
+        if section.name is None:
+            preamble = text[section.body_start:section.end]
+        elif section.name in sections and section.name not in seen:
+            seen.add(section.name)
+            sections[section.name] = text[section.body_start:section.end].strip()
+    if "summary" not in seen:
+        sections["summary"] = preamble.strip()
+    return sections
+
+def remove_duplicate_sections(text):
+    """
+    Remove repeated Summary, Atmosphere and Key Takeaways sections, keeping
+    the first occurrence of each. Everything else is left untouched.
+
+    Args:
+        text: Text with possible duplicate sections
+
+    Returns:
+        Text without the repeated sections (the input itself if there were none)
+    """
+    if not text or not isinstance(text, str):
+        return text
+
+    seen = set()
+    kept = []
+    duplicates = False
+    for section in tokenize(text):
+        if section.name in SECTION_NAMES:
+            if section.name in seen:
+                duplicates = True
+                continue
+            seen.add(section.name)
+        kept.append(text[section.start:section.end])
+    return "".join(kept) if duplicates else text
+
+def parse_key_takeaways(text):
+    """
+    Split a Key Takeaways section into its points.
+
+    Args:
+        text: Key Takeaways section text
+
+    Returns:
+        List of non-empty points with bullet markers removed
+    """
+    if not text:
+        return []
+    points = []
+    for line in text.split('\n'):
+        point = BULLET_RE.sub('', line.strip())
+        if point:
+            points.append(point)
+    return points
+
+def normalize_conversation(text):
+    """
+    The canonical stored form of a Bee conversation summary.
+
+    Args:
+        text: Raw summary text from the Bee API (None is treated as empty)
+
+    Returns:
+        Dict with the Markdown-free summary and atmosphere strings, and
+        key_takeaways as a list of points (None when there are none)
+    """
+    sections = split_sections(text or "")
+    key_takeaways = [markdown_normalizer.normalize(point)
+                     for point in parse_key_takeaways(sections["key_takeaways"])]
+    return {
+        "summary": markdown_normalizer.normalize(sections["summary"]),
+        "atmosphere": markdown_normalizer.normalize(sections["atmosphere"]),
+        "key_takeaways": key_takeaways or None
+    }
+
+def merge_key_takeaways(existing, text):
+    """
+    Append the points of a Key Takeaways section to stored key takeaways.
+
+    Args:
+        existing: Stored key_takeaways (list of points, text or None)
+        text: Key Takeaways section text to append
+
+    Returns:
+        List of points
+    """
+    if isinstance(existing, list):
+        points = list(existing)
+    else:
+        points = parse_key_takeaways(existing)
+    return points + parse_key_takeaways(text)
@@ -3,15 +3,20 @@ Database Migration: Convert Key Takeaways to JSON Lists
 
 This script converts the key_takeaways column data from Text to JSON lists.
 Each line in the current text content will become an item in a JSON array.
+
+The lists are written to a new key_takeaways_json column by a resumable
+backfill (see backfill.py), which then replaces the text column in one
+transaction. An interrupted run picks up where it stopped. A JSON (not JSONB)
+column is converted in place, and running it on a database that is already
+converted does nothing.
 """
 
-import json
 import logging
-import os
-import sys
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from models import Bee_Conversation
+import argparse
+from sqlalchemy import text, table, column, Integer, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from models import engine
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
 
 # Set up logging
 logging.basicConfig(
@@ -20,83 +25,94 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def convert_key_takeaways_to_json():
+# bee_conversations as it looks during the migration (the model already declares JSONB)
+CONVERSATIONS = table(
+    "bee_conversations",
+    column("id", Integer),
+    column("key_takeaways", Text),
+    column("key_takeaways_json", JSONB)
+)
+
+def split_key_takeaways(row):
+    """
+    Backfill transform: split key takeaways text into a list of its non-empty lines.
+
+    Args:
+        row: Dict with the conversation id and key_takeaways text
+
+    Returns:
+        Dict with the key_takeaways_json list, or None if there are no lines
+    """
+    takeaways_list = [line.strip() for line in row["key_takeaways"].split('\n') if line.strip()]
+    return {"key_takeaways_json": takeaways_list} if takeaways_list else None
+
+BACKFILL = Backfill(
+    "convert_key_takeaways_to_json", CONVERSATIONS, ["key_takeaways"], split_key_takeaways,
+    where=CONVERSATIONS.c.key_takeaways.isnot(None)
+)
+
+def _key_takeaways_type(connection):
+    return connection.execute(text("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'bee_conversations' AND column_name = 'key_takeaways'
+    """)).scalar()
+
+def convert_key_takeaways_to_json(processes=None, chunk_size=None, restart=False):
     """
     Convert key_takeaways content from text with line breaks to JSON arrays.
-    
+
     This function:
-    1. Retrieves all bee_conversations with key_takeaways data
-    2. Splits the text content by line breaks into a list
-    3. Updates the database to use JSON format
-    4. Updates each record with JSON array data
+    1. Adds a key_takeaways_json JSONB column (if the column is still text)
+    2. Fills it with the split lines of each conversation's key_takeaways
+    3. Drops the text column and renames key_takeaways_json to key_takeaways
+
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first conversation instead of resuming an interrupted run
     """
+    with engine.connect() as connection:
+        column_type = _key_takeaways_type(connection)
+    if column_type == "jsonb":
+        logger.info("key_takeaways is already JSONB, nothing to convert")
+        return
+    if column_type == "json":
+        logger.info("Converting the key_takeaways JSON column to JSONB...")
+        with engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE bee_conversations ALTER COLUMN key_takeaways TYPE JSONB USING key_takeaways::jsonb"
+            ))
+        return
+
     try:
-        # Get database URL from environment variables
-        DATABASE_URL = os.environ.get('DATABASE_URL')
-        if not DATABASE_URL:
-            logger.error("DATABASE_URL environment variable is not set")
-            sys.exit(1)
-        
-        # Create SQLAlchemy engine and session
-        engine = create_engine(DATABASE_URL)
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        
-        # Get all conversations with key_takeaways before changing column type
-        logger.info("Retrieving conversations with key_takeaways data...")
-        conversations = session.query(Bee_Conversation).filter(Bee_Conversation.key_takeaways.isnot(None)).all()
-        
-        # Store the text data temporarily
-        logger.info(f"Found {len(conversations)} conversations with key_takeaways")
-        temp_data = {}
-        for conv in conversations:
-            if isinstance(conv.key_takeaways, str) and conv.key_takeaways.strip():
-                # Split by line breaks and filter out empty lines
-                takeaways_list = [line.strip() for line in conv.key_takeaways.split('\n') if line.strip()]
-                temp_data[conv.id] = takeaways_list
-        
-        # Now modify the column to JSON/JSONB type by first setting to NULL
-        logger.info(f"Temporarily setting key_takeaways to NULL for {len(temp_data)} records...")
-        session.execute(text("UPDATE bee_conversations SET key_takeaways = NULL WHERE key_takeaways IS NOT NULL"))
-        session.commit()
-        
-        # Change column type to JSONB
-        logger.info("Altering key_takeaways column to JSONB type...")
-        session.execute(text("ALTER TABLE bee_conversations ALTER COLUMN key_takeaways TYPE JSONB USING NULL"))
-        session.commit()
-        
-        # Now update each record with its JSON data
-        logger.info(f"Updating {len(temp_data)} records with JSON array data...")
-        count = 0
-        for conv_id, takeaways_list in temp_data.items():
-            if takeaways_list:
-                # Convert Python list to JSON string
-                json_data = json.dumps(takeaways_list)
-                # Update the record using a different approach with parameter binding
-                session.execute(
-                    text("UPDATE bee_conversations SET key_takeaways = cast(:json_data AS jsonb) WHERE id = :conv_id"),
-                    {"json_data": json_data, "conv_id": conv_id}
-                )
-                count += 1
-        
-        # Commit changes
-        session.commit()
-        logger.info(f"Successfully converted {count} conversations to use JSON arrays for key_takeaways")
-        
+        with engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE bee_conversations ADD COLUMN IF NOT EXISTS key_takeaways_json JSONB"
+            ))
+
+        result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
+
+        logger.info("Replacing the key_takeaways text column with the JSONB lists...")
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE bee_conversations DROP COLUMN key_takeaways"))
+            connection.execute(text(
+                "ALTER TABLE bee_conversations RENAME COLUMN key_takeaways_json TO key_takeaways"
+            ))
+        logger.info(f"Successfully converted {result['updated']} conversations to use JSON arrays for key_takeaways")
+
     except Exception as e:
         logger.error(f"Error converting key_takeaways to JSON: {e}")
-        if 'session' in locals():
-            session.rollback()
         raise
-    finally:
-        if 'session' in locals():
-            session.close()
 
 def main():
     """Main function to run the migration."""
+    parser = argparse.ArgumentParser(description="Convert bee_conversations.key_takeaways from text to JSONB lists")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
+
     logger.info("Starting key_takeaways conversion to JSON arrays...")
-    convert_key_takeaways_to_json()
+    convert_key_takeaways_to_json(**backfill_options(args))
     logger.info("Key takeaways conversion completed.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Convert Transcript Times to timestamptz
+
+This script converts limitless_transcript_lines.start_time and end_time from
+the API's ISO strings to timestamptz and creates the start_time index used by
+/api/transcripts. Values that are not ISO timestamps become NULL.
+
+Changing the column types rewrites the table (and rebuilds its indexes) under
+an exclusive lock, so run it while nothing is importing. The index is built
+with CREATE INDEX CONCURRENTLY. Running the script again is safe.
+"""
+
+import os
+import sqlalchemy
+from sqlalchemy import create_engine
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Get database URL from environment variable
+DATABASE_URL = os.environ.get('DATABASE_URL')
+if not DATABASE_URL:
+    logger.error("DATABASE_URL environment variable not set")
+    exit(1)
+
+# Initialize SQLAlchemy connection
+engine = create_engine(DATABASE_URL)
+
+INDEX_NAME = "ix_transcript_lines_start_time"
+
+# Anything else (empty strings, stray text) cannot be cast and is dropped
+ISO_TIMESTAMP = r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}"
+
+def convert_transcript_times():
+    """Convert start_time and end_time to timestamptz if needed, then create the index."""
+    with engine.begin() as conn:
+        types = dict(conn.execute(sqlalchemy.text(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = 'limitless_transcript_lines' AND column_name IN ('start_time', 'end_time')"
+        )).fetchall())
+        for column_name in ("start_time", "end_time"):
+            if types.get(column_name) == "timestamp with time zone":
+                logger.info(f"{column_name} is already timestamptz, skipping")
+                continue
+            logger.info(f"Converting {column_name} to timestamptz")
+            conn.execute(sqlalchemy.text(
+                f"ALTER TABLE limitless_transcript_lines ALTER COLUMN {column_name} TYPE TIMESTAMPTZ "
+                f"USING CASE WHEN {column_name} ~ :pattern THEN {column_name}::timestamptz END"
+            ), {"pattern": ISO_TIMESTAMP})
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # An interrupted concurrent build leaves an invalid index behind; drop it so it is rebuilt
+        invalid = conn.execute(sqlalchemy.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": INDEX_NAME}).fetchone()
+        if invalid:
+            logger.warning(f"Dropping invalid index {INDEX_NAME} left by an interrupted build")
+            conn.execute(sqlalchemy.text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+
+        logger.info(f"Creating index {INDEX_NAME} (skipped if it exists)")
+        conn.execute(sqlalchemy.text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            f"ON limitless_transcript_lines (start_time)"
+        ))
+    logger.info("Transcript times are timestamptz and indexed")
+
+def main():
+    """Main function to run the migration."""
+    logger.info("Starting migration of transcript times to timestamptz")
+    convert_transcript_times()
+    logger.info("Migration completed successfully")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
-from sqlalchemy import create_engine, func
+from sqlalchemy import create_engine, func, select, literal
 from sqlalchemy.orm import sessionmaker
-from models import Base, Bee_Conversation, Bee_Fact, Bee_Todo, Limitless_Lifelog, Weather_Data, Billboard_Chart_Item, Netflix_History_Item, Netflix_Title_Info
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models import Base, Bee_Conversation, Bee_Fact, Bee_Todo, Limitless_Lifelog, Weather_Data, Billboard_Chart_Item, Netflix_History_Item, Netflix_Title_Info, Daily_Activity
+import netflix_series_stats
+import conversation_sections
+import lifelog_parser
+import backfill
 import os
 import json
 import logging
@@ -32,6 +37,10 @@ def store_conversations(conversations):
     """
     Store conversations in the database with deduplication.
     
+    The summary text is split into its sections and cleaned of Markdown here,
+    once, so summary, atmosphere and the key_takeaways list are stored in the
+    form readers use directly.
+    
     Args:
         conversations: List of conversation dictionaries from Bee API
     
@@ -45,6 +54,7 @@ def store_conversations(conversations):
             "added": 0,
             "skipped": 0
         }
+        new_items = []
         
         for conv in conversations:
             # Check if this conversation already exists in the database
@@ -61,22 +71,30 @@ def store_conversations(conversations):
             latitude = location.get('latitude') if location else None
             longitude = location.get('longitude') if location else None
             
+            sections = conversation_sections.normalize_conversation(conv.get('summary'))
+            raw_data = json.dumps(conv)
+            
             # Create new conversation record
             new_conv = Bee_Conversation(
                 conversation_id=conv_id,
-                summary=conv.get('Summary'),  # Use the extracted summary without heading
-                atmosphere=conv.get('Atmosphere'),  # Store the atmosphere content separately
-                key_takeaways=conv.get('Key Takeaways'),  # Store key takeaways if they exist
-                created_at=parse_date(conv.get('Created At')),
+                summary=sections["summary"],  # Summary section without heading or Markdown
+                atmosphere=sections["atmosphere"],  # Atmosphere section, stored separately
+                key_takeaways=sections["key_takeaways"],  # List of key takeaway points, or None
+                created_at=parse_date(conv.get('created_at') or conv.get('Created At')),
                 address=address,
                 latitude=latitude,
                 longitude=longitude,
-                raw_data=json.dumps(conv)
+                raw_data=raw_data,
+                derived_hash=backfill.content_hash(raw_data),  # Reprocessing skips this row until raw_data changes
+                transform_version=conversation_sections.TRANSFORM_VERSION
             )
             
             session.add(new_conv)
+            new_items.append(new_conv)
             result["added"] += 1
         
+        session.flush()
+        record_daily_activity(session, "conversations", [item.id for item in new_items])
         session.commit()
         return result
         
@@ -103,6 +121,7 @@ def store_facts(facts):
             "added": 0,
             "skipped": 0
         }
+        new_items = []
         
         for fact in facts:
             fact_text = fact.get('text')
@@ -126,8 +145,11 @@ def store_facts(facts):
             )
             
             session.add(new_fact)
+            new_items.append(new_fact)
             result["added"] += 1
         
+        session.flush()
+        record_daily_activity(session, "facts", [item.id for item in new_items])
         session.commit()
         return result
         
@@ -235,6 +257,7 @@ def store_lifelogs(lifelogs):
             
         # Update processed count for valid list
         result["processed"] = len(lifelogs)
+        new_items = []
         
         for log in lifelogs:
             # Skip if it's a string that's just "lifelogs"
@@ -276,69 +299,42 @@ def store_lifelogs(lifelogs):
                 continue
             
             try:
+                # Timestamps (earliest startTime, latest endTime) in one walk over the contents
+                parsed = lifelog_parser.parse_lifelog(log_data)
+                
                 # Extract tags if they exist
-                tags = log_data.get('tags')
+                tags = parsed.tags
                 if tags and isinstance(tags, list):
                     tags_json = json.dumps(tags)
                 else:
                     tags_json = None
                 
-                # Extract timestamps from contents
-                created_at = None
-                updated_at = None
-                
-                # Look for startTime and endTime in contents
-                if 'contents' in log_data and isinstance(log_data['contents'], list):
-                    # Find the earliest startTime and latest endTime
-                    for item in log_data['contents']:
-                        start_time = item.get('startTime')
-                        parsed_start = parse_date(start_time) if start_time else None
-                        
-                        if parsed_start:
-                            if created_at is None:
-                                created_at = parsed_start
-                            elif parsed_start < created_at:
-                                created_at = parsed_start
-                            
-                        end_time = item.get('endTime')
-                        parsed_end = parse_date(end_time) if end_time else None
-                        
-                        if parsed_end:
-                            if updated_at is None:
-                                updated_at = parsed_end
-                            elif parsed_end > updated_at:
-                                updated_at = parsed_end
-                
-                # Fallback to created_at/updated_at if they exist at top level
-                if created_at is None:
-                    created_at = parse_date(log_data.get('created_at'))
-                
-                if updated_at is None:
-                    updated_at = parse_date(log_data.get('updated_at'))
-                
                 # If we still don't have timestamps, log a warning
-                if created_at is None:
+                if parsed.created_at is None:
                     logger.warning(f"No valid startTime or created_at found for lifelog {log_id}")
                 
                 # Create new lifelog record
                 new_log = Limitless_Lifelog(
                     log_id=log_id,
-                    title=log_data.get('title'),
-                    description=log_data.get('description'),
-                    created_at=created_at,
-                    updated_at=updated_at,
-                    log_type=log_data.get('type'),
+                    title=parsed.title,
+                    description=parsed.description,
+                    created_at=parsed.created_at,
+                    updated_at=parsed.updated_at,
+                    log_type=parsed.log_type,
                     tags=tags_json,
                     raw_data=json.dumps(log_data)
                 )
                 
                 session.add(new_log)
+                new_items.append(new_log)
                 result["added"] += 1
                 logger.info(f"Added lifelog with ID {log_id}")
             except Exception as e:
                 logger.error(f"Error adding lifelog {log_id}: {str(e)}")
                 result["skipped"] += 1
         
+        session.flush()
+        record_daily_activity(session, "lifelogs", [item.id for item in new_items])
         session.commit()
         return result
         
@@ -579,6 +575,116 @@ def check_weather_data_exists_for_date(date_str):
     finally:
         session.close()
         
+# Timestamp column counted in daily_activity for each source
+ACTIVITY_SOURCES = {
+    "conversations": (Bee_Conversation, Bee_Conversation.created_at),
+    "facts": (Bee_Fact, Bee_Fact.created_at),
+    "lifelogs": (Limitless_Lifelog, Limitless_Lifelog.created_at),
+    "netflix": (Netflix_History_Item, Netflix_History_Item.watch_date)
+}
+
+def _daily_activity_upsert(source, ids=None):
+    """
+    Build an INSERT ... SELECT that adds per-day counts for a source to daily_activity.
+
+    Args:
+        source: Key of ACTIVITY_SOURCES
+        ids: Optional list of row ids to count (default: the whole table)
+        
+    Returns:
+        Insert statement that merges into existing rows on conflict
+    """
+    model, column = ACTIVITY_SOURCES[source]
+    day = func.date(column)
+    query = select(
+        day, literal(source), func.count(), func.min(column), func.max(column)
+    ).where(column.isnot(None))
+    if ids is not None:
+        query = query.where(model.id.in_(ids))
+    query = query.group_by(day)
+    
+    stmt = pg_insert(Daily_Activity).from_select(
+        ['day', 'source', 'item_count', 'first_at', 'last_at'], query
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[Daily_Activity.day, Daily_Activity.source],
+        set_={
+            "item_count": Daily_Activity.item_count + stmt.excluded.item_count,
+            "first_at": func.least(Daily_Activity.first_at, stmt.excluded.first_at),
+            "last_at": func.greatest(Daily_Activity.last_at, stmt.excluded.last_at)
+        }
+    )
+
+def record_daily_activity(session, source, ids):
+    """
+    Add newly stored rows to the daily_activity rollup.
+    
+    Runs inside the caller's transaction, so the rollup is committed together
+    with the rows it counts. The rows must already be flushed.
+    
+    Args:
+        session: Session the rows were added in
+        source: Key of ACTIVITY_SOURCES
+        ids: Ids of the newly added rows
+    """
+    if ids:
+        session.execute(_daily_activity_upsert(source, ids))
+
+def rebuild_daily_activity(sources=None):
+    """
+    Recompute the daily_activity rollup from the source tables.
+    
+    Use after deleting rows or bulk loading data outside the store functions.
+    
+    Args:
+        sources: Optional list of ACTIVITY_SOURCES keys (default: all)
+        
+    Returns:
+        Dict mapping each source to the number of days with data
+    """
+    sources = sources or list(ACTIVITY_SOURCES)
+    session = Session()
+    try:
+        session.query(Daily_Activity).filter(
+            Daily_Activity.source.in_(sources)
+        ).delete(synchronize_session=False)
+        for source in sources:
+            session.execute(_daily_activity_upsert(source))
+        session.commit()
+        
+        counts = dict(session.query(Daily_Activity.source, func.count()).filter(
+            Daily_Activity.source.in_(sources)
+        ).group_by(Daily_Activity.source).all())
+        return {source: counts.get(source, 0) for source in sources}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error rebuilding daily activity: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+def get_daily_activity(session, start_date=None, end_date=None, sources=None):
+    """
+    Read daily_activity rows for a date range.
+    
+    Args:
+        session: Database session to use
+        start_date: Optional first day (date or datetime, inclusive)
+        end_date: Optional last day (date or datetime, inclusive)
+        sources: Optional list of ACTIVITY_SOURCES keys to include
+        
+    Returns:
+        List of Daily_Activity objects ordered by day
+    """
+    query = session.query(Daily_Activity)
+    if start_date:
+        query = query.filter(Daily_Activity.day >= (start_date.date() if isinstance(start_date, datetime) else start_date))
+    if end_date:
+        query = query.filter(Daily_Activity.day <= (end_date.date() if isinstance(end_date, datetime) else end_date))
+    if sources:
+        query = query.filter(Daily_Activity.source.in_(sources))
+    return query.order_by(Daily_Activity.day).all()
+
 def get_dates_with_data():
     """
     Get a list of unique dates that have Bee, Netflix, or Limitless data.
@@ -588,37 +694,12 @@ def get_dates_with_data():
     """
     session = Session()
     try:
-        unique_dates = set()
-        
-        # Get Bee conversation dates
-        bee_dates = session.query(
-            func.date_trunc('day', Bee_Conversation.created_at).label('date_day')
-        ).distinct().all()
-        
-        for date_tuple in bee_dates:
-            if date_tuple[0]:
-                unique_dates.add(date_tuple[0].strftime('%Y-%m-%d'))
-        
-        # Get Netflix history dates
-        netflix_dates = session.query(
-            func.date_trunc('day', Netflix_History_Item.watch_date).label('date_day')
-        ).distinct().all()
-        
-        for date_tuple in netflix_dates:
-            if date_tuple[0]:
-                unique_dates.add(date_tuple[0].strftime('%Y-%m-%d'))
-        
-        # Get Limitless lifelog dates
-        lifelog_dates = session.query(
-            func.date_trunc('day', Limitless_Lifelog.created_at).label('date_day')
-        ).distinct().all()
-        
-        for date_tuple in lifelog_dates:
-            if date_tuple[0]:
-                unique_dates.add(date_tuple[0].strftime('%Y-%m-%d'))
+        days = session.query(Daily_Activity.day).filter(
+            Daily_Activity.source.in_(["conversations", "netflix", "lifelogs"]),
+            Daily_Activity.item_count > 0
+        ).distinct().order_by(Daily_Activity.day).all()
         
-        # Convert to sorted list
-        return sorted(list(unique_dates))
+        return [day.strftime('%Y-%m-%d') for (day,) in days]
     except Exception as e:
         logger.error(f"Error getting dates with data: {str(e)}")
         return []
@@ -829,6 +910,7 @@ def store_netflix_history(history_items):
     """
     session = Session()
     result = {"processed": 0, "added": 0, "skipped": 0}
+    new_items = []
     
     try:
         for item in history_items:
@@ -862,10 +944,16 @@ def store_netflix_history(history_items):
             )
             
             session.add(netflix_item)
+            new_items.append(netflix_item)
             logger.info(f"Added Netflix history item: {item.get('title')}")
             result["added"] += 1
             
-        # Commit all changes
+        # Commit all changes along with the daily activity rollup
+        session.flush()
+        new_ids = [item.id for item in new_items]
+        record_daily_activity(session, "netflix", new_ids)
+        netflix_series_stats.refresh_series_stats(
+            session, netflix_series_stats.record_series_episodes(session, new_ids))
         session.commit()
         
     except Exception as e:
@@ -3,18 +3,20 @@
 Extract Lifelog Sub-Summaries Script
 
 This script extracts subsummaries (heading2 content) from existing lifelog entries
-and populates the limitless_lifelog_subsummaries table.
+and populates the limitless_lifelog_subsummaries table. It runs as a resumable backfill
+(see backfill.py) that skips lifelogs it already parsed from the same raw_data
+(--force visits them again).
 """
 
-import json
 import logging
-import os
 import sys
+import argparse
 from datetime import datetime
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from models import Limitless_Lifelog, Limitless_Lifelog_SubSummary, Base
+import lifelog_parser
+from models import Limitless_Lifelog, Limitless_Lifelog_SubSummary
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
 
 # Configure logging
 logging.basicConfig(
@@ -24,84 +26,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def extract_subsummaries():
+# Bump when extract_headings changes, so processed lifelogs are parsed again
+TRANSFORM_VERSION = "extract_lifelog_subsummaries:1"
+
+def extract_headings(row):
     """
-    Extract subsummaries (heading2 content) from all existing lifelog entries
-    and store them in the limitless_lifelog_subsummaries table.
+    Backfill transform: the heading2 contents of a lifelog, in order.
+    
+    Args:
+        row: Dict with the lifelog id, log_id and raw_data
+        
+    Returns:
+        Dict with the list of heading contents, or None if there are none
     """
-    # Get database URL from environment variables
-    DATABASE_URL = os.environ.get('DATABASE_URL')
-    if not DATABASE_URL:
-        raise ValueError("DATABASE_URL environment variable is not set")
+    parsed = lifelog_parser.parse_lifelog(row["raw_data"])
+    headings = [subsummary.heading for subsummary in parsed.subsummaries]
+    return {"headings": headings} if headings else None
 
-    # Create SQLAlchemy engine and session
-    engine = create_engine(DATABASE_URL)
-    
-    # Ensure the table exists
-    Base.metadata.create_all(engine)
+def insert_subsummaries(connection, changes):
+    """
+    Backfill writer: store the headings of each lifelog as its subsummaries.
     
-    with Session(engine) as session:
-        # Get all lifelogs that have not yet had subsummaries extracted
-        lifelogs = session.execute(
-            select(Limitless_Lifelog)
-            .outerjoin(Limitless_Lifelog_SubSummary)
-            .where(Limitless_Lifelog_SubSummary.id == None)
-        ).scalars().all()
-        
-        logger.info(f"Found {len(lifelogs)} lifelogs without subsummaries")
+    Args:
+        connection: Connection with the chunk's open transaction
+        changes: List of (row, transform result) pairs
         
-        processed_count = 0
-        subsummaries_added = 0
-        
-        for lifelog in lifelogs:
-            processed_count += 1
-            
-            # Parse raw_data JSON
-            try:
-                raw_data = json.loads(lifelog.raw_data)
-                contents = raw_data.get('contents', [])
-                
-                # Find all heading2 items
-                heading2_items = []
-                for i, item in enumerate(contents):
-                    if item.get('type') == 'heading2':
-                        heading2_items.append({
-                            'content': item.get('content', ''),
-                            'position': i
-                        })
-                
-                # Add subsummaries to database
-                for idx, h2 in enumerate(heading2_items):
-                    subsummary = Limitless_Lifelog_SubSummary(
-                        lifelog_id=lifelog.log_id,
-                        content=h2['content'],
-                        position=idx,
-                        created_at=datetime.utcnow()
-                    )
-                    session.add(subsummary)
-                    subsummaries_added += 1
-                
-                # Commit after each lifelog to avoid losing data if an error occurs
-                session.commit()
-                
-                if processed_count % 10 == 0 or processed_count == len(lifelogs):
-                    logger.info(f"Processed {processed_count}/{len(lifelogs)} lifelogs, added {subsummaries_added} subsummaries")
-                
-            except Exception as e:
-                logger.error(f"Error processing lifelog {lifelog.id} ({lifelog.log_id}): {str(e)}")
-                session.rollback()
-                continue
+    Returns:
+        Number of subsummaries added
+    """
+    now = datetime.utcnow()
+    records = [
+        {"lifelog_id": row["log_id"], "content": content, "position": idx, "created_at": now}
+        for row, result in changes
+        for idx, content in enumerate(result["headings"])
+    ]
+    connection.execute(
+        pg_insert(Limitless_Lifelog_SubSummary).on_conflict_do_nothing(constraint='uq_lifelog_subsummary_position'),
+        records
+    )
+    return len(records)
+
+# Lifelog raw_data is large, so fewer lifelogs are read at a time
+BACKFILL = Backfill(
+    "extract_lifelog_subsummaries", Limitless_Lifelog, ["log_id", "raw_data"], extract_headings,
+    where=~Limitless_Lifelog.subsummaries.any(),
+    write=insert_subsummaries, chunk_size=200, version=TRANSFORM_VERSION
+)
+
+def extract_subsummaries(processes=None, chunk_size=None, restart=False, force=False):
+    """
+    Extract subsummaries (heading2 content) from all existing lifelog entries
+    and store them in the limitless_lifelog_subsummaries table.
+    
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional lifelogs read and committed at a time
+        restart: Start from the first lifelog instead of resuming an interrupted run
+        force: Also parse lifelogs already processed from the same raw_data
+    """
+    result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart, force=force)
     
-    logger.info(f"Processing complete. Processed {processed_count} lifelogs, added {subsummaries_added} subsummaries")
+    logger.info(f"Processing complete. Processed {result['processed']} lifelogs, added {result['updated']} subsummaries")
     return {
-        "processed": processed_count,
-        "added": subsummaries_added
+        "processed": result["processed"],
+        "added": result["updated"]
     }
 
 def main():
     """Main function to run the extraction process."""
+    parser = argparse.ArgumentParser(description="Extract subsummaries from stored Limitless lifelogs")
+    add_backfill_arguments(parser, change_detection=True)
+    args = parser.parse_args()
+    
     try:
-        results = extract_subsummaries()
+        results = extract_subsummaries(**backfill_options(args))
         logger.info(f"Extraction complete. Processed {results['processed']} lifelogs, added {results['added']} subsummaries")
         return 0
     except Exception as e:
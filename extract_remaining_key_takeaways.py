@@ -3,122 +3,103 @@ Script to extract remaining Key Take Aways from atmosphere field
 
 This script scans the atmosphere column of all bee_conversations for any content
 that starts with "Key Take Aways" or similar variations, and moves that content
-to the key_takeaways column.
+to the key_takeaways column. It runs as a resumable backfill (see backfill.py).
 """
 
 import re
-import sys
+import argparse
 from datetime import datetime
 from models import Bee_Conversation
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-import os
 
-# Get database connection
-DATABASE_URL = os.environ.get('DATABASE_URL')
-if not DATABASE_URL:
-    print("Error: DATABASE_URL environment variable not set.")
-    sys.exit(1)
+import conversation_sections
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
 
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()
+# Patterns matching the key takeaways section, tried in order
+KEY_TAKEAWAYS_PATTERNS = [
+    re.compile(r'Key Take Aways:?\s*([\s\S]*?)(?:\Z)'),
+    re.compile(r'Key Takeaways:?\s*([\s\S]*?)(?:\Z)'),
+    re.compile(r'Key takeaways:?\s*([\s\S]*?)(?:\Z)'),
+    re.compile(r'Key take aways:?\s*([\s\S]*?)(?:\Z)')
+]
 
-def extract_key_takeaways_from_atmosphere():
+def move_key_takeaways(row):
+    """
+    Backfill transform: move a key takeaways section from atmosphere to key_takeaways.
+
+    Args:
+        row: Dict with the conversation id, atmosphere and key_takeaways
+
+    Returns:
+        Dict with the new atmosphere and key_takeaways, or None if the atmosphere
+        has no key takeaways section
+    """
+    if not row["atmosphere"]:
+        return None
+
+    for pattern in KEY_TAKEAWAYS_PATTERNS:
+        match = pattern.search(row["atmosphere"])
+        if match:
+            takeaways_content = match.group(1).strip()
+            if not takeaways_content:
+                return None
+            return {
+                # Remove the key takeaways section from atmosphere
+                "atmosphere": pattern.sub('', row["atmosphere"]).strip(),
+                "key_takeaways": conversation_sections.merge_key_takeaways(row["key_takeaways"], takeaways_content)
+            }
+    return None
+
+BACKFILL = Backfill(
+    "extract_remaining_key_takeaways", Bee_Conversation, ["atmosphere", "key_takeaways"], move_key_takeaways,
+    where=(
+        Bee_Conversation.atmosphere.like('%Key Take Aways%') |
+        Bee_Conversation.atmosphere.like('%Key Takeaways%') |
+        Bee_Conversation.atmosphere.like('%Key takeaways%') |
+        Bee_Conversation.atmosphere.like('%Key take aways%')
+    )
+)
+
+def extract_key_takeaways_from_atmosphere(processes=None, chunk_size=None, restart=False):
     """
     Extract key takeaways from atmosphere field if they exist.
-    
-    This function scans the atmosphere column for content after a 
+
+    This function scans the atmosphere column for content after a
     "Key Take Aways:" or "Key Takeaways:" heading and moves that content
-    to the key_takeaways column.
+    to the key_takeaways column, appending to any key takeaways already stored.
+
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first conversation instead of resuming an interrupted run
     """
     try:
-        # Get all conversations that might have key takeaways in atmosphere
-        patterns = [
-            '%Key Take Aways%', 
-            '%Key Takeaways%', 
-            '%Key takeaways%', 
-            '%Key take aways%'
-        ]
-        
-        condition = Bee_Conversation.atmosphere.like(patterns[0])
-        for pattern in patterns[1:]:
-            condition = condition | Bee_Conversation.atmosphere.like(pattern)
-            
-        conversations = session.query(Bee_Conversation).filter(condition).all()
-        
-        print(f"Found {len(conversations)} conversations with potential key takeaways in atmosphere field.")
-        
-        updated_count = 0
-        for conv in conversations:
-            # Skip if no atmosphere content
-            if not conv.atmosphere:
-                continue
-                
-            # Define regex pattern to match key takeaways section
-            patterns = [
-                r'Key Take Aways:?\s*([\s\S]*?)(?:\Z)',
-                r'Key Takeaways:?\s*([\s\S]*?)(?:\Z)',
-                r'Key takeaways:?\s*([\s\S]*?)(?:\Z)',
-                r'Key take aways:?\s*([\s\S]*?)(?:\Z)'
-            ]
-            
-            takeaways_content = None
-            clean_atmosphere = conv.atmosphere
-            
-            # Try each pattern until we find a match
-            for pattern in patterns:
-                match = re.search(pattern, conv.atmosphere)
-                if match:
-                    takeaways_content = match.group(1).strip()
-                    # Remove the key takeaways section from atmosphere
-                    clean_atmosphere = re.sub(pattern, '', conv.atmosphere).strip()
-                    break
-            
-            if takeaways_content:
-                print(f"Found key takeaways in conversation ID {conv.id}")
-                
-                # Update key_takeaways column
-                if conv.key_takeaways:
-                    # If key_takeaways already has content, append the new content
-                    print(f"Appending to existing key_takeaways for conversation ID {conv.id}")
-                    conv.key_takeaways = f"{conv.key_takeaways}\n\n{takeaways_content}"
-                else:
-                    # Otherwise, just set the new content
-                    conv.key_takeaways = takeaways_content
-                
-                # Update atmosphere to remove key takeaways section
-                conv.atmosphere = clean_atmosphere
-                
-                updated_count += 1
-        
-        if updated_count > 0:
-            session.commit()
-            print(f"Successfully updated {updated_count} conversations.")
-        else:
-            print("No conversations needed updating.")
-            
-        return updated_count
-            
+        result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
     except Exception as e:
-        session.rollback()
         print(f"Error: {str(e)}")
         return 0
-    finally:
-        session.close()
+
+    if result["updated"] > 0:
+        print(f"Successfully updated {result['updated']} conversations.")
+    else:
+        print("No conversations needed updating.")
+    return result["updated"]
 
 def main():
     """Main function to run the key takeaways extraction process."""
+    parser = argparse.ArgumentParser(description="Move key takeaways left in the atmosphere column")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
+
     print("Starting key takeaways extraction process...")
     start_time = datetime.now()
-    
-    updated_count = extract_key_takeaways_from_atmosphere()
-    
+
+    updated_count = extract_key_takeaways_from_atmosphere(**backfill_options(args))
+
     end_time = datetime.now()
     duration = (end_time - start_time).total_seconds()
-    
+
     print(f"Key takeaways extraction completed in {duration:.2f} seconds.")
     print(f"Total conversations updated: {updated_count}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,21 +3,23 @@
 Extract Transcript Lines Script
 
 This script extracts transcript lines (blockquote content) from existing lifelog entries
-and populates the limitless_transcript_lines table, associating each line with the appropriate
-subsummary based on their positions in the original content array.
+and stores them through transcript_store (as rows or packs, see transcript_store.py), associating
+each line with the appropriate subsummary based on their positions in the original content array.
+It runs as a resumable backfill (see backfill.py) that skips lifelogs it already parsed from the
+same raw_data (--force visits them again).
 """
 
-import json
 import logging
-import os
-import re
 import sys
-from datetime import datetime
+import argparse
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select
 
-from models import Limitless_Lifelog, Limitless_Lifelog_SubSummary, Limitless_Transcript_Line
+import markdown_normalizer
+import lifelog_parser
+import transcript_store
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
+from models import Limitless_Lifelog, Limitless_Lifelog_SubSummary
 
 # Configure logging
 logging.basicConfig(
@@ -27,14 +29,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Get database URL from environment variables
-DATABASE_URL = os.environ.get('DATABASE_URL')
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set")
-
-# Create SQLAlchemy engine and session
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
+# Bump when extract_lifelog_lines changes, so processed lifelogs are parsed again
+TRANSFORM_VERSION = "extract_transcript_lines:1"
 
 def clean_text(text):
     """
@@ -48,154 +44,104 @@ def clean_text(text):
     """
     if not text:
         return ""
+    return markdown_normalizer.normalize(text, "transcript")
+
+# Kept importable from here; the lifelog parser splits speakers off transcript lines
+extract_speaker_from_text = lifelog_parser.extract_speaker_from_text
+
+def extract_lifelog_lines(row):
+    """
+    Backfill transform: the transcript lines under each heading2 of a lifelog's contents.
     
-    # Remove Markdown formatting
-    cleaned = text.replace('*', '')
-    cleaned = cleaned.replace('_', '')
-    cleaned = cleaned.replace('#', '')
+    Args:
+        row: Dict with the lifelog id, log_id and raw_data
+        
+    Returns:
+        Dict whose "sections" holds one list of line dicts per heading2, in
+        order, or None if the lifelog has no usable raw_data
+    """
+    if not row["raw_data"]:
+        logger.warning(f"Lifelog {row['log_id']} has no raw_data, skipping")
+        return None
     
-    # Remove leading/trailing whitespace
-    cleaned = cleaned.strip()
+    parsed = lifelog_parser.parse_lifelog(row["raw_data"])
+    if not parsed.has_contents:
+        logger.warning(f"Lifelog {row['log_id']} has invalid raw_data format, skipping")
+        return None
     
-    return cleaned
+    # The blockquote lines between each heading2 and the next
+    return {"sections": [subsummary.lines for subsummary in parsed.subsummaries]}
 
-def extract_speaker_from_text(text):
+def insert_transcript_lines(connection, changes):
     """
-    Extract speaker name from transcript line text if available.
+    Backfill writer: attach each lifelog's extracted lines to its subsummaries.
     
-    Many transcript lines start with a speaker name followed by a colon.
-    This function attempts to extract that name.
+    The i-th subsummary (by position) of a lifelog gets the lines of its i-th
+    heading2. Lines already stored are left alone, so a re-run only fills gaps.
     
     Args:
-        text: Transcript line text that may include a speaker prefix
+        connection: Connection with the chunk's open transaction
+        changes: List of (row, transform result) pairs
         
     Returns:
-        Tuple of (speaker_name, cleaned_text) or (None, original_text) if no speaker found
+        Number of lifelogs whose lines were written
     """
-    if not text:
-        return None, ""
+    sections_by_log = {row["log_id"]: result["sections"] for row, result in changes}
+    subsummaries = connection.execute(
+        select(Limitless_Lifelog_SubSummary.id, Limitless_Lifelog_SubSummary.lifelog_id)
+        .where(Limitless_Lifelog_SubSummary.lifelog_id.in_(list(sections_by_log)))
+        .order_by(Limitless_Lifelog_SubSummary.lifelog_id, Limitless_Lifelog_SubSummary.position)
+    ).all()
     
-    # Common pattern: "Speaker: Text of what they said"
-    speaker_match = re.match(r'^([A-Za-z\s\.]+):\s*(.*)', text)
-    if speaker_match:
-        speaker = speaker_match.group(1).strip()
-        content = speaker_match.group(2).strip()
-        return speaker, content
+    lines_by_subsummary = {}
+    index_by_log = {}
+    for subsummary_id, log_id in subsummaries:
+        i = index_by_log.get(log_id, 0)
+        index_by_log[log_id] = i + 1
+        sections = sections_by_log[log_id]
+        if i >= len(sections):
+            logger.warning(f"Subsummary index {i} out of range for heading2_positions of lifelog {log_id}")
+            continue
+        lines_by_subsummary[subsummary_id] = sections[i]
     
-    return None, text
+    written = transcript_store.write_transcript_lines(connection, lines_by_subsummary)
+    logger.info(f"Extracted {written} transcript lines from {len(changes)} lifelogs")
+    return len(changes)
 
-def extract_transcript_lines():
-    """
-    Extract transcript lines (blockquote content) from all existing lifelog entries
-    and store them in the limitless_transcript_lines table with appropriate relationships.
+# Lifelog raw_data is large, so fewer lifelogs are read at a time
+BACKFILL = Backfill(
+    "extract_transcript_lines", Limitless_Lifelog, ["log_id", "raw_data"], extract_lifelog_lines,
+    where=Limitless_Lifelog.subsummaries.any(
+        ~Limitless_Lifelog_SubSummary.transcript_lines.any() & ~Limitless_Lifelog_SubSummary.transcript_pack.has()
+    ),
+    write=insert_transcript_lines, chunk_size=200, version=TRANSFORM_VERSION
+)
+
+def extract_transcript_lines(processes=None, chunk_size=None, restart=False, force=False):
     """
-    session = Session()
+    Extract transcript lines (blockquote content) from all lifelogs with subsummaries
+    that have no transcript lines yet, and store them with transcript_store in the
+    configured storage.
     
-    try:
-        # Find all lifelogs with subsummaries but no transcript lines
-        lifelogs_with_subsummaries = session.query(Limitless_Lifelog)\
-            .join(Limitless_Lifelog_SubSummary)\
-            .filter(~Limitless_Lifelog_SubSummary.transcript_lines.any())\
-            .distinct().all()
-        
-        if not lifelogs_with_subsummaries:
-            logger.info("No lifelogs with subsummaries found that need transcript line extraction")
-            return
-        
-        logger.info(f"Found {len(lifelogs_with_subsummaries)} lifelogs with subsummaries but no transcript lines")
-        
-        processed_count = 0
-        added_lines_count = 0
-        
-        for lifelog in lifelogs_with_subsummaries:
-            # Parse raw data to get the original contents array
-            if not lifelog.raw_data:
-                logger.warning(f"Lifelog {lifelog.log_id} has no raw_data, skipping")
-                continue
-            
-            try:
-                raw_data = json.loads(lifelog.raw_data)
-                if not raw_data or 'contents' not in raw_data:
-                    logger.warning(f"Lifelog {lifelog.log_id} has invalid raw_data format, skipping")
-                    continue
-                
-                contents = raw_data.get('contents', [])
-                
-                # Get all subsummaries for this lifelog
-                subsummaries = session.query(Limitless_Lifelog_SubSummary)\
-                    .filter(Limitless_Lifelog_SubSummary.lifelog_id == lifelog.log_id)\
-                    .order_by(Limitless_Lifelog_SubSummary.position)\
-                    .all()
-                
-                # Extract the blockquote contents and associate with subsummaries
-                heading2_positions = [i for i, item in enumerate(contents) 
-                                      if item.get('type') == 'heading2']
-                
-                # Process each subsummary
-                for i, subsummary in enumerate(subsummaries):
-                    # Find the corresponding position in the contents array
-                    if i >= len(heading2_positions):
-                        logger.warning(f"Subsummary index {i} out of range for heading2_positions")
-                        continue
-                    
-                    start_pos = heading2_positions[i] + 1
-                    end_pos = heading2_positions[i+1] if i+1 < len(heading2_positions) else len(contents)
-                    
-                    # Collect all blockquote items between this heading2 and the next
-                    transcript_position = 0
-                    for pos in range(start_pos, end_pos):
-                        if pos >= len(contents):
-                            break
-                            
-                        content_item = contents[pos]
-                        if content_item.get('type') != 'blockquote':
-                            continue
-                        
-                        text = content_item.get('content', '')
-                        if not text.strip():
-                            continue
-                        
-                        # Extract speaker and clean text
-                        speaker, cleaned_text = extract_speaker_from_text(text)
-                        
-                        # Create transcript line entry
-                        transcript_line = Limitless_Transcript_Line(
-                            subsummary_id=subsummary.id,
-                            speaker=speaker,
-                            text=cleaned_text,
-                            start_time=content_item.get('startTime'),
-                            end_time=content_item.get('endTime'),
-                            position=transcript_position
-                        )
-                        
-                        session.add(transcript_line)
-                        transcript_position += 1
-                        added_lines_count += 1
-                
-                processed_count += 1
-                if processed_count % 5 == 0:
-                    logger.info(f"Processed {processed_count}/{len(lifelogs_with_subsummaries)} lifelogs, added {added_lines_count} transcript lines")
-                    session.commit()
-            
-            except Exception as e:
-                logger.error(f"Error processing lifelog {lifelog.log_id}: {str(e)}")
-                continue
-        
-        # Final commit
-        session.commit()
-        logger.info(f"Completed processing {processed_count} lifelogs, added {added_lines_count} transcript lines")
-    
-    except Exception as e:
-        logger.error(f"Error extracting transcript lines: {str(e)}")
-        session.rollback()
-    
-    finally:
-        session.close()
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional lifelogs read and committed at a time
+        restart: Start from the first lifelog instead of resuming an interrupted run
+        force: Also parse lifelogs already processed from the same raw_data
+    """
+    result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart, force=force)
+    logger.info(f"Completed processing {result['processed']} lifelogs, "
+                f"stored transcript lines for {result['updated']}")
+    return result
 
 def main():
     """Main function to run the extraction process."""
+    parser = argparse.ArgumentParser(description="Extract transcript lines from stored Limitless lifelogs")
+    add_backfill_arguments(parser, change_detection=True)
+    args = parser.parse_args()
+    
     try:
-        extract_transcript_lines()
+        extract_transcript_lines(**backfill_options(args))
         logger.info("Transcript line extraction completed successfully")
     except Exception as e:
         logger.error(f"Error in main function: {str(e)}")
@@ -5,18 +5,25 @@ Fix Summary and Atmosphere from Raw Data
 This script extracts clean summary and atmosphere content from the raw_data JSON field
 and updates the corresponding fields in the database. This bypasses any previous
 processing issues that might have resulted in duplicate sections or Markdown artifacts.
+It runs as a resumable backfill (see backfill.py) that skips conversations this version of
+the fix already produced from unchanged raw_data (--force visits all).
 """
-import os
-import re
 import json
 import logging
-import psycopg2
-from psycopg2.extras import Json
+import argparse
+
+import conversation_sections
+import markdown_normalizer
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
+from models import Bee_Conversation
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Recorded as transform_version of the conversations this script derives; bump it when parse_raw_json changes
+TRANSFORM_VERSION = "fix_from_raw_data:1"
+
 def clean_markdown(text):
     """
     Remove Markdown formatting from text.
@@ -27,104 +34,7 @@ def clean_markdown(text):
     Returns:
         String with Markdown formatting removed
     """
-    if not text:
-        return text
-        
-    # Handle different types
-    if isinstance(text, list):
-        return [clean_markdown(item) for item in text]
-    if not isinstance(text, str):
-        return text
-        
-    # Remove section headings that should be in separate fields
-    text = re.sub(r'(?i)^Summary:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    text = re.sub(r'(?i)Atmosphere:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    text = re.sub(r'(?i)Key Take ?Aways:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    text = re.sub(r'(?i)Key Takeaways:.*?(\n\n|$)', '', text, flags=re.MULTILINE | re.DOTALL)
-    
-    # Remove section heading variations more thoroughly
-    text = re.sub(r'(?i)^#+\s*Summary:?.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(?i)^#+\s*Atmosphere:?.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(?i)^#+\s*Key Take ?Aways:?.*?\n', '', text, flags=re.MULTILINE)
-    text = re.sub(r'(?i)^#+\s*Key Takeaways:?.*?\n', '', text, flags=re.MULTILINE)
-    
-    # Remove Markdown headers (e.g., ## Header)
-    text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
-    
-    # Enhanced Markdown cleanup - Run multiple times to catch nested formatting
-    # Remove bold formatting (e.g., **bold**)
-    for _ in range(3):  # Run multiple passes to catch nested formatting
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    
-    # Remove italic formatting (e.g., *italic*)
-    for _ in range(3):
-        text = re.sub(r'\*([^\*\n]+)\*', r'\1', text)
-    
-    # Remove remaining single asterisks that might be part of incomplete formatting
-    text = re.sub(r'(?<!\*)\*(?!\*)', '', text)
-    
-    # Remove bullet points with different symbols and spacing patterns
-    text = re.sub(r'^\s*[\*\-•]\s+', '', text, flags=re.MULTILINE)
-    
-    # Remove Markdown links [text](url) -> text
-    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
-    
-    # Remove code blocks with any language specifier
-    text = re.sub(r'```[\w]*\n.*?```', '', text, flags=re.DOTALL)
-    
-    # Remove inline code
-    text = re.sub(r'`(.*?)`', r'\1', text)
-    
-    # Remove blockquotes
-    text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
-    
-    # Remove horizontal rules
-    text = re.sub(r'^\s*[-_*]{3,}\s*$', '', text, flags=re.MULTILINE)
-    
-    # Remove HTML tags that might be present
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Fix common markdown artifacts
-    text = text.replace('**', '').replace('__', '')
-    
-    # Remove extra whitespace
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = text.strip()
-    
-    return text
-
-def extract_section(text, section_patterns):
-    """
-    Extract a section from text based on the provided section patterns.
-    
-    Args:
-        text: The full text to search in
-        section_patterns: List of regex patterns to identify the section
-        
-    Returns:
-        Extracted section content with formatting removed, or empty string if not found
-    """
-    if not text:
-        return ""
-    
-    # Try each pattern until we find a match
-    for pattern in section_patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-        if match:
-            # Find where this section ends (next section starts or end of text)
-            start_pos = match.end()
-            # Look for the next section heading
-            next_section = re.search(r'(?i)(?:^|\n)(?:#+\s*)?(?:summary|atmosphere|key\s*takeaways|key\s*take\s*aways)\s*[:\n]', text[start_pos:], re.MULTILINE)
-            
-            if next_section:
-                section_content = text[start_pos:start_pos + next_section.start()].strip()
-            else:
-                section_content = text[start_pos:].strip()
-            
-            # Clean any Markdown formatting from the content
-            return clean_markdown(section_content)
-    
-    return ""
+    return markdown_normalizer.normalize(text, "thorough")
 
 def parse_raw_json(raw_data):
     """
@@ -161,47 +71,13 @@ def parse_raw_json(raw_data):
         if not full_content:
             return {"summary": "", "atmosphere": "", "key_takeaways": []}
         
-        # Define patterns to extract sections
-        summary_patterns = [
-            r'(?i)##\s*Summary\s*[\n:]',
-            r'(?i)#\s*Summary\s*[\n:]',
-            r'(?i)Summary\s*:',
-            r'(?i)\*\*Summary\*\*\s*:?'
-        ]
-        
-        atmosphere_patterns = [
-            r'(?i)##\s*Atmosphere\s*[\n:]',
-            r'(?i)#\s*Atmosphere\s*[\n:]',
-            r'(?i)Atmosphere\s*:',
-            r'(?i)\*\*Atmosphere\*\*\s*:?'
-        ]
-        
-        key_takeaways_patterns = [
-            r'(?i)##\s*Key\s*Takeaways\s*[\n:]',
-            r'(?i)#\s*Key\s*Takeaways\s*[\n:]',
-            r'(?i)Key\s*Takeaways\s*:',
-            r'(?i)\*\*Key\s*Takeaways\*\*\s*:?',
-            r'(?i)##\s*Key\s*Take\s*Aways\s*[\n:]',
-            r'(?i)#\s*Key\s*Take\s*Aways\s*[\n:]',
-            r'(?i)Key\s*Take\s*Aways\s*:',
-            r'(?i)\*\*Key\s*Take\s*Aways\*\*\s*:?'
-        ]
-        
-        # Extract each section
-        summary = extract_section(full_content, summary_patterns)
-        atmosphere = extract_section(full_content, atmosphere_patterns)
-        key_takeaways_text = extract_section(full_content, key_takeaways_patterns)
+        # Extract each section in one pass and clean any Markdown formatting
+        sections = conversation_sections.split_sections(full_content)
+        summary = clean_markdown(sections["summary"])
+        atmosphere = clean_markdown(sections["atmosphere"])
         
         # Convert key takeaways text to an array of points
-        key_takeaways = []
-        if key_takeaways_text:
-            # Split by bullet points or newlines and clean
-            lines = re.split(r'\n+', key_takeaways_text)
-            for line in lines:
-                # Remove bullet points and leading/trailing spaces
-                clean_line = re.sub(r'^\s*[\*\-•]\s*', '', line).strip()
-                if clean_line:
-                    key_takeaways.append(clean_line)
+        key_takeaways = conversation_sections.parse_key_takeaways(clean_markdown(sections["key_takeaways"]))
         
         return {
             "summary": summary,
@@ -213,85 +89,58 @@ def parse_raw_json(raw_data):
         logger.error(f"Error parsing raw JSON: {str(e)}")
         return {"summary": "", "atmosphere": "", "key_takeaways": []}
 
-def fix_from_raw_data():
+def fix_conversation(row):
     """
-    Fix summary and atmosphere by extracting clean data from the raw_data field.
-    """
-    # Get database connection
-    db_url = os.environ.get('DATABASE_URL')
-    if not db_url:
-        logger.error("DATABASE_URL not found in environment variables")
-        return {"fixed": 0, "errors": 1}
+    Backfill transform: clean sections extracted from a conversation's raw_data.
     
-    try:
-        conn = psycopg2.connect(db_url)
-        cursor = conn.cursor()
-        
-        # Get all conversations with raw_data
-        cursor.execute("""
-            SELECT id, raw_data 
-            FROM bee_conversations 
-            WHERE raw_data IS NOT NULL;
-        """)
-        
-        conversations = cursor.fetchall()
-        logger.info(f"Found {len(conversations)} conversations with raw_data to process")
-        
-        fixed_count = 0
-        error_count = 0
-        
-        # Process each conversation
-        for conv_id, raw_data in conversations:
-            try:
-                # Extract clean sections from raw_data
-                sections = parse_raw_json(raw_data)
-                
-                # Update the record with extracted sections
-                cursor.execute(
-                    """
-                    UPDATE bee_conversations 
-                    SET summary = %s, atmosphere = %s, key_takeaways = %s
-                    WHERE id = %s
-                    """,
-                    (sections["summary"], sections["atmosphere"], 
-                     Json(sections["key_takeaways"]) if sections["key_takeaways"] else None, 
-                     conv_id)
-                )
-                
-                fixed_count += 1
-                
-                # Log progress every 10 fixed conversations
-                if fixed_count % 10 == 0:
-                    logger.info(f"Fixed {fixed_count} conversations from raw_data so far")
-                    conn.commit()
-            
-            except Exception as e:
-                logger.error(f"Error fixing conversation {conv_id}: {str(e)}")
-                error_count += 1
-        
-        # Final commit
-        conn.commit()
-        logger.info(f"Fixed {fixed_count} conversations from raw_data with {error_count} errors")
+    Args:
+        row: Dict with the conversation id and raw_data
         
-        return {
-            "fixed": fixed_count,
-            "errors": error_count
-        }
+    Returns:
+        Dict with the new summary, atmosphere and key_takeaways values
+    """
+    sections = parse_raw_json(row["raw_data"])
+    return {
+        "summary": sections["summary"],
+        "atmosphere": sections["atmosphere"],
+        "key_takeaways": sections["key_takeaways"] or None
+    }
+
+BACKFILL = Backfill("fix_from_raw_data", Bee_Conversation, ["raw_data"], fix_conversation,
+                    where=Bee_Conversation.raw_data.isnot(None), version=TRANSFORM_VERSION)
+
+def fix_from_raw_data(processes=None, chunk_size=None, restart=False, force=False):
+    """
+    Fix summary and atmosphere by extracting clean data from the raw_data field.
     
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first conversation instead of resuming an interrupted run
+        force: Also fix conversations that are already up to date
+    """
+    try:
+        result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart, force=force)
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
         return {
             "fixed": 0,
             "errors": 1
         }
-    finally:
-        if 'conn' in locals():
-            conn.close()
+    
+    return {
+        "fixed": result["updated"],
+        "errors": result["errors"]
+    }
 
 def main():
     """Main function to run the fix process."""
+    parser = argparse.ArgumentParser(description="Re-extract clean Bee conversation sections from raw_data")
+    add_backfill_arguments(parser, change_detection=True)
+    args = parser.parse_args()
+    
     logger.info("Starting fix from raw_data process")
-    result = fix_from_raw_data()
+    result = fix_from_raw_data(**backfill_options(args))
     logger.info(f"Fix complete: {result['fixed']} fixed, {result['errors']} errors")
 
 if __name__ == "__main__":
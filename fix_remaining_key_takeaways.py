@@ -1,89 +1,90 @@
 """
 Script to fix remaining Key Takeaways in atmosphere field
 
-This script scans the atmosphere column for any content that contains 
-"Key Take aways" or "Key Takeaways", extracts that content to the 
-key_takeaways column, and removes it from the atmosphere column.
+This script scans the atmosphere column for any content that contains
+"Key Take aways" or "Key Takeaways", extracts that content to the
+key_takeaways column, and removes it from the atmosphere column. It runs as a
+resumable backfill (see backfill.py).
 """
 
 import re
-import os
 import logging
-from datetime import datetime
+import argparse
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from models import Base, Bee_Conversation
+import conversation_sections
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
+from models import Bee_Conversation
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def extract_remaining_key_takeaways_from_atmosphere():
+KEY_TAKEAWAYS_RE = re.compile(r'Key Take ?[Aa]ways:?([\s\S]*?)$')
+
+def split_atmosphere(row):
+    """
+    Backfill transform: separate the key takeaways from a conversation's atmosphere.
+
+    Args:
+        row: Dict with the conversation id, conversation_id, atmosphere and key_takeaways
+
+    Returns:
+        Dict with the new atmosphere and key_takeaways, or None if the atmosphere
+        has no key takeaways
+    """
+    atmosphere_text = row["atmosphere"] if row["atmosphere"] else ""
+    key_takeaways_match = KEY_TAKEAWAYS_RE.search(atmosphere_text)
+    if not key_takeaways_match:
+        return None
+
+    # Extract the key takeaways content and everything before it
+    key_takeaways_content = key_takeaways_match.group(1).strip()
+    atmosphere_content = atmosphere_text[:key_takeaways_match.start()].strip()
+
+    logger.info(f"Conversation {row['conversation_id']}: Extracting key takeaways")
+    logger.info(f"  - Original atmosphere length: {len(atmosphere_text)}")
+    logger.info(f"  - New atmosphere length: {len(atmosphere_content)}")
+    logger.info(f"  - Key takeaways length: {len(key_takeaways_content)}")
+
+    # If there are already key takeaways, append to them
+    return {
+        "atmosphere": atmosphere_content,
+        "key_takeaways": conversation_sections.merge_key_takeaways(row["key_takeaways"], key_takeaways_content)
+    }
+
+BACKFILL = Backfill(
+    "fix_remaining_key_takeaways", Bee_Conversation, ["conversation_id", "atmosphere", "key_takeaways"],
+    split_atmosphere,
+    where=(Bee_Conversation.atmosphere.like('%Key Take aways%')) |
+          (Bee_Conversation.atmosphere.like('%Key Takeaways%'))
+)
+
+def extract_remaining_key_takeaways_from_atmosphere(processes=None, chunk_size=None, restart=False):
     """
     Extract any remaining key takeaways from atmosphere field if they exist.
-    
+
     This function scans the atmosphere column for "Key Take aways" or "Key Takeaways"
     and moves that content to the key_takeaways column, removing it from atmosphere.
+
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first conversation instead of resuming an interrupted run
     """
-    # Connect to the database
-    db_url = os.environ.get('DATABASE_URL', 'sqlite:///life_journal.db')
-    engine = create_engine(db_url)
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    
-    # Find all conversations with "Key Take aways" or "Key Takeaways" in atmosphere
-    conversations = session.query(Bee_Conversation).filter(
-        (Bee_Conversation.atmosphere.like('%Key Take aways%')) | 
-        (Bee_Conversation.atmosphere.like('%Key Takeaways%'))
-    ).all()
-    
-    logger.info(f"Found {len(conversations)} conversations with Key Takeaways in atmosphere")
-    
-    updated_count = 0
-    
-    for conversation in conversations:
-        # Parse the atmosphere text to separate atmosphere from key takeaways
-        atmosphere_text = conversation.atmosphere if conversation.atmosphere else ""
-        
-        # Check for the specific patterns we're looking for
-        key_takeaways_match = re.search(r'Key Take ?[Aa]ways:?([\s\S]*?)$', atmosphere_text)
-        
-        if key_takeaways_match:
-            # Extract the key takeaways content
-            key_takeaways_content = key_takeaways_match.group(1).strip()
-            
-            # Extract the atmosphere content (everything before Key Takeaways)
-            atmosphere_content = atmosphere_text[:key_takeaways_match.start()].strip()
-            
-            logger.info(f"Conversation {conversation.conversation_id}: Extracting key takeaways")
-            logger.info(f"  - Original atmosphere length: {len(atmosphere_text)}")
-            logger.info(f"  - New atmosphere length: {len(atmosphere_content)}")
-            logger.info(f"  - Key takeaways length: {len(key_takeaways_content)}")
-            
-            # Update the fields
-            conversation.atmosphere = atmosphere_content
-            
-            # If there's already content in key_takeaways, append to it
-            if conversation.key_takeaways and conversation.key_takeaways.strip():
-                conversation.key_takeaways += f"\n\n{key_takeaways_content}"
-            else:
-                conversation.key_takeaways = key_takeaways_content
-                
-            updated_count += 1
-    
-    # Commit the changes
-    session.commit()
-    logger.info(f"Updated {updated_count} conversations")
-    session.close()
-    
-    return updated_count
-    
+    result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
+    logger.info(f"Updated {result['updated']} conversations")
+
+    return result["updated"]
+
 def main():
     """Main function to run the key takeaways extraction process."""
+    parser = argparse.ArgumentParser(description="Move key takeaways left in the atmosphere column")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
+
     logger.info("Starting extraction of remaining key takeaways from atmosphere column")
-    updated_count = extract_remaining_key_takeaways_from_atmosphere()
+    updated_count = extract_remaining_key_takeaways_from_atmosphere(**backfill_options(args))
     logger.info(f"Extraction complete. Updated {updated_count} conversations")
-    
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
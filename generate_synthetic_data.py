@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Synthetic Scale Dataset Generator
+
+This script fills the database with years of realistic-looking data (Bee
+conversations and facts, Limitless lifelogs with subsummaries and transcript
+lines, Netflix viewing history, weather and Billboard charts) so the web
+interface and storage code can be checked at volume.
+
+Volumes are controlled by per-day rates and a global --scale factor. Rows are
+written with bulk INSERT statements rather than through the store functions so
+that multi-year datasets can be generated in minutes.
+
+Only run this against a disposable database: it writes directly into the tables
+referenced by DATABASE_URL and --reset drops and recreates every table.
+"""
+
+import sys
+import json
+import random
+import logging
+import argparse
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database_handler import rebuild_daily_activity
+from models import (engine, Base, Bee_Conversation, Bee_Fact, Limitless_Lifelog,
+                    Limitless_Lifelog_SubSummary,
+                    Weather_Data, Billboard_Chart_Item, Netflix_History_Item)
+import synthetic_data as synth
+import conversation_sections
+import transcript_store
+from backfill import content_hash
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+Session = sessionmaker(bind=engine)
+
+# Average number of items per day at --scale 1.0
+DEFAULT_RATES = {
+    "conversations": 8,
+    "facts": 3,
+    "lifelogs": 6,
+    "subsummaries": 4,    # per lifelog
+    "lines": 12,          # per subsummary
+    "netflix": 3,
+    "weather": 2
+}
+
+def insert_rows(session, model, rows):
+    """
+    Bulk insert rows into a table, ignoring rows that hit a unique constraint.
+
+    Returns:
+        Number of rows inserted
+    """
+    if not rows:
+        return 0
+    return len(session.scalars(pg_insert(model).on_conflict_do_nothing().returning(model.id), rows).all())
+
+class SyntheticDatasetWriter:
+    """
+    Buffers generated rows and writes them to the database in batches.
+
+    counts holds the rows actually inserted; rows already present (e.g. from
+    an earlier run with the same seed) are skipped and not counted.
+    """
+
+    def __init__(self, session, batch_size=5000):
+        self.session = session
+        self.batch_size = batch_size
+        self.counts = {
+            "conversations": 0, "facts": 0, "lifelogs": 0, "subsummaries": 0,
+            "transcript_lines": 0, "netflix": 0, "weather": 0, "billboard": 0
+        }
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self.conversations = []
+        self.facts = []
+        self.lifelogs = []
+        self.subsummaries = []   # (subsummary row, list of transcript line rows)
+        self.netflix = []
+        self.weather = []
+        self.billboard = []
+
+    def pending(self):
+        """Number of buffered rows waiting to be written."""
+        return (len(self.conversations) + len(self.facts) + len(self.lifelogs) +
+                sum(1 + len(lines) for _, lines in self.subsummaries) +
+                len(self.netflix) + len(self.weather) + len(self.billboard))
+
+    def add_conversation(self, payload, created_at):
+        # Stored exactly as store_conversations normalizes it at ingest
+        sections = conversation_sections.normalize_conversation(payload["summary"])
+        raw_data = json.dumps(payload)
+        location = payload["primary_location"]
+        self.conversations.append({
+            "conversation_id": str(payload["id"]),
+            "summary": sections["summary"],
+            "atmosphere": sections["atmosphere"],
+            "key_takeaways": sections["key_takeaways"],
+            "derived_hash": content_hash(raw_data),
+            "transform_version": conversation_sections.TRANSFORM_VERSION,
+            "created_at": created_at,
+            "address": location["address"],
+            "latitude": location["latitude"],
+            "longitude": location["longitude"],
+            "raw_data": raw_data
+        })
+
+    def add_fact(self, payload, created_at):
+        self.facts.append({
+            "fact_id": str(payload["id"]),
+            "text": payload["text"],
+            "created_at": created_at,
+            "raw_data": json.dumps(payload)
+        })
+
+    def add_lifelog(self, payload, created_at):
+        contents = payload["contents"]
+        self.lifelogs.append({
+            "log_id": payload["id"],
+            "title": payload["title"],
+            "description": None,
+            "created_at": created_at,
+            "updated_at": datetime.fromisoformat(contents[-1]["endTime"].replace('Z', '+00:00')),
+            "log_type": "conversation",
+            "tags": None,
+            "raw_data": json.dumps(payload)
+        })
+
+        position = -1
+        lines = None
+        for item in contents:
+            if item["type"] == "heading2":
+                position += 1
+                lines = []
+                self.subsummaries.append(({
+                    "lifelog_id": payload["id"],
+                    "content": item["content"],
+                    "position": position
+                }, lines))
+            elif item["type"] == "blockquote" and lines is not None:
+                speaker, text = item["content"].split(": ", 1)
+                lines.append({
+                    "speaker": speaker,
+                    "text": text,
+                    "start_time": item["startTime"],
+                    "end_time": item["endTime"],
+                    "position": len(lines)
+                })
+
+    def add_netflix(self, item):
+        self.netflix.append(item)
+
+    def add_weather(self, payload):
+        weather = payload["weather"][0]
+        self.weather.append({
+            "weather_id": weather["id"],
+            "location_name": payload["name"],
+            "latitude": payload["coord"]["lat"],
+            "longitude": payload["coord"]["lon"],
+            "temperature": payload["main"]["temp"],
+            "feels_like": payload["main"]["feels_like"],
+            "humidity": payload["main"]["humidity"],
+            "pressure": payload["main"]["pressure"],
+            "wind_speed": payload["wind"]["speed"],
+            "wind_direction": payload["wind"]["deg"],
+            "clouds": payload["clouds"]["all"],
+            "weather_main": weather["main"],
+            "weather_description": weather["description"],
+            "visibility": payload["visibility"],
+            "timestamp": datetime.fromtimestamp(payload["dt"]),
+            "raw_data": json.dumps(payload),
+            "units": payload["units"]
+        })
+
+    def add_billboard(self, chart):
+        chart_date = chart["chart"]["date"]
+        for entry in chart["chart"]["entries"]:
+            self.billboard.append({
+                "chart_name": "hot-100",
+                "item_rank": entry["rank"],
+                "title": entry["title"],
+                "artist": entry["artist"],
+                "image_url": entry["image"],
+                "last_week_rank": entry["last_week"],
+                "peak_position": entry["peak_position"],
+                "weeks_on_chart": entry["weeks_on_chart"],
+                "chart_date": chart_date,
+                "raw_data": json.dumps(entry)
+            })
+
+    def flush_if_full(self):
+        if self.pending() >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered rows and commit."""
+        self.counts["conversations"] += insert_rows(self.session, Bee_Conversation, self.conversations)
+        self.counts["facts"] += insert_rows(self.session, Bee_Fact, self.facts)
+        self.counts["lifelogs"] += insert_rows(self.session, Limitless_Lifelog, self.lifelogs)
+        self.counts["netflix"] += insert_rows(self.session, Netflix_History_Item, self.netflix)
+        self.counts["weather"] += insert_rows(self.session, Weather_Data, self.weather)
+        self.counts["billboard"] += insert_rows(self.session, Billboard_Chart_Item, self.billboard)
+
+        # Subsummaries need their generated ids before transcript lines can reference them.
+        # Skipped subsummaries return no id, so the ids are matched back by (lifelog_id, position).
+        if self.subsummaries:
+            inserted = self.session.execute(
+                pg_insert(Limitless_Lifelog_SubSummary)
+                .on_conflict_do_nothing(constraint='uq_lifelog_subsummary_position')
+                .returning(Limitless_Lifelog_SubSummary.id, Limitless_Lifelog_SubSummary.lifelog_id,
+                           Limitless_Lifelog_SubSummary.position),
+                [row for row, _ in self.subsummaries]
+            ).all()
+            subsummary_ids = {(lifelog_id, position): subsummary_id
+                              for subsummary_id, lifelog_id, position in inserted}
+            self.counts["subsummaries"] += len(inserted)
+            lines_by_subsummary = {
+                subsummary_ids[(row["lifelog_id"], row["position"])]: lines
+                for row, lines in self.subsummaries
+                if (row["lifelog_id"], row["position"]) in subsummary_ids
+            }
+            self.counts["transcript_lines"] += transcript_store.write_transcript_lines(
+                self.session.connection(), lines_by_subsummary)
+
+        self.session.commit()
+        self._reset_buffers()
+
+def generate_dataset(days=365, scale=1.0, rates=None, seed=42, batch_size=5000, end_date=None):
+    """
+    Generate a synthetic dataset covering `days` days ending at end_date.
+
+    Args:
+        days: Number of days of history to generate
+        scale: Multiplier applied to every per-day rate
+        rates: Optional overrides for DEFAULT_RATES
+        seed: Random seed for reproducible output
+        batch_size: Number of rows to buffer before each bulk write
+        end_date: Last generated day (default: today)
+
+    Returns:
+        Dictionary with the number of rows inserted per table (rows already present are not counted)
+    """
+    rates = dict(DEFAULT_RATES, **(rates or {}))
+    rng = random.Random(seed)
+    session = Session()
+    writer = SyntheticDatasetWriter(session, batch_size=batch_size)
+    # Prefix external ids with the seed so repeated runs with new seeds don't collide
+    id_prefix = f"synthetic-{seed}"
+    sequence = 0
+
+    try:
+        for day_number, day in enumerate(synth.iter_days(days, end_date)):
+            for _ in range(synth.poisson(rng, rates["conversations"] * scale)):
+                sequence += 1
+                created_at = synth.random_time_on_day(rng, day)
+                writer.add_conversation(
+                    synth.build_conversation(rng, f"{id_prefix}-conv-{sequence}", created_at), created_at)
+
+            for _ in range(synth.poisson(rng, rates["facts"] * scale)):
+                sequence += 1
+                created_at = synth.random_time_on_day(rng, day)
+                writer.add_fact(synth.build_fact(rng, f"{id_prefix}-fact-{sequence}", created_at), created_at)
+
+            for _ in range(synth.poisson(rng, rates["lifelogs"] * scale)):
+                sequence += 1
+                created_at = synth.random_time_on_day(rng, day)
+                writer.add_lifelog(synth.build_lifelog(
+                    rng, f"{id_prefix}-log-{sequence}", created_at,
+                    subsummaries=max(1, synth.poisson(rng, rates["subsummaries"])),
+                    lines_per_subsummary=max(1, synth.poisson(rng, rates["lines"]))
+                ), created_at)
+
+            watch_date = datetime(day.year, day.month, day.day)
+            for _ in range(synth.poisson(rng, rates["netflix"] * scale)):
+                writer.add_netflix(synth.build_netflix_history_item(rng, watch_date))
+
+            for _ in range(synth.poisson(rng, rates["weather"] * scale)):
+                writer.add_weather(synth.build_weather(rng, synth.random_time_on_day(rng, day)))
+
+            # Billboard charts are weekly
+            if day.weekday() == 5:
+                writer.add_billboard(synth.build_billboard_chart(rng, day.strftime('%Y-%m-%d')))
+
+            writer.flush_if_full()
+            if (day_number + 1) % 30 == 0:
+                logger.info(f"Generated {day_number + 1}/{days} days: {writer.counts}")
+
+        writer.flush()
+        # Rows were written around the store functions, so recompute the rollup
+        rebuild_daily_activity()
+        return writer.counts
+
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def reset_database():
+    """Drop and recreate every table defined in models.py."""
+    logger.warning("Dropping and recreating all tables")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Fill a disposable database with synthetic data")
+    parser.add_argument("--days", type=int, default=365,
+                        help="Number of days of history to generate (default: 365)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplier applied to all per-day rates (default: 1.0)")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="Random seed (default: 42)")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="Rows buffered per bulk insert (default: 5000)")
+    for name, rate in DEFAULT_RATES.items():
+        parser.add_argument(f"--{name}-rate", type=float, default=rate, dest=f"{name}_rate",
+                            help=f"Average {name} per {'day' if name not in ('subsummaries', 'lines') else 'parent'} "
+                                 f"(default: {rate})")
+    parser.add_argument("--reset", action="store_true", default=False,
+                        help="Drop and recreate all tables before generating")
+    parser.add_argument("--yes", action="store_true", default=False,
+                        help="Confirm that DATABASE_URL points to a disposable database")
+    return parser.parse_args()
+
+def main():
+    """Main function to run the generator."""
+    args = parse_arguments()
+    if not args.yes:
+        print("Refusing to write synthetic data without --yes.")
+        print("Only run this against a disposable database.")
+        return 1
+
+    if args.reset:
+        reset_database()
+
+    rates = {name: getattr(args, f"{name}_rate") for name in DEFAULT_RATES}
+    started = datetime.now()
+    counts = generate_dataset(days=args.days, scale=args.scale, rates=rates,
+                              seed=args.seed, batch_size=args.batch_size)
+    duration = (datetime.now() - started).total_seconds()
+
+    print(f"\nGenerated {args.days} days of synthetic data in {duration:.1f} seconds, rows inserted:")
+    for name, count in counts.items():
+        print(f"- {name}: {count}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
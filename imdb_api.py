@@ -7,6 +7,7 @@ movie and TV show data based on search criteria and autocomplete title search.
 
 import os
 import json
+import time
 import logging
 import aiohttp
 import asyncio
@@ -15,28 +16,103 @@ import asyncio
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class AsyncRateLimiter:
+    """
+    Token bucket rate limiter shared by concurrent coroutines.
+    
+    Allows `rate` acquisitions per second on average with bursts of up to
+    `burst` acquisitions.
+    """
+    
+    def __init__(self, rate, burst=1):
+        """
+        Initialize the rate limiter
+        
+        Args:
+            rate: Average number of requests per second
+            burst: Maximum number of requests allowed back to back (default: 1)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a request may be sent."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
 class IMDBAPI:
     """
     Client for interacting with the IMDB API via RapidAPI
+    
+    Use as an async context manager to share one HTTP connection pool between
+    requests; otherwise each request opens its own session.
     """
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, rate_limiter=None, cache=None):
         """
         Initialize the IMDB API client
         
         Args:
             api_key: API key for IMDB API on RapidAPI. 
                     If None, will look for IMDB_API_KEY env var
+            rate_limiter: Optional AsyncRateLimiter applied to every HTTP request,
+                    including retries
+            cache: Optional imdb_cache.IMDBLookupCache checked before every API call
         """
         self.api_key = api_key or os.environ.get("IMDB_API_KEY")
         self.api_host = "imdb236.p.rapidapi.com"
         self.base_url = "https://imdb236.p.rapidapi.com/imdb"
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._session = None
         
         if not self.api_key:
             logger.warning("No IMDB API key provided. Set IMDB_API_KEY environment variable.")
         else:
             logger.info("IMDB API client initialized with key.")
     
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession()
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self._session.close()
+        self._session = None
+        return False
+    
+    async def _get(self, url, headers, params):
+        """
+        Send a rate-limited GET request.
+        
+        Returns:
+            Tuple of (HTTP status, parsed JSON or response text)
+        """
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
+        
+        async def fetch(session):
+            async with session.get(url, headers=headers, params=params) as response:
+                if response.status == 200:
+                    return response.status, await response.json()
+                return response.status, await response.text()
+        
+        if self._session:
+            return await fetch(self._session)
+        async with aiohttp.ClientSession() as session:
+            return await fetch(session)
+    
     async def search_movies(self, genre=None, title=None, rows=25, sort_order="ASC", sort_field="id", max_retries=3, retry_delay=2):
         """
         Search for movies in the IMDB database with retry mechanism
@@ -79,20 +155,30 @@ class IMDBAPI:
         
         url = f"{self.base_url}/search"
         
+        if self.cache:
+            cached = self.cache.get("search", params)
+            if cached is not None:
+                logger.info(f"Using cached IMDB data for params {params}")
+                return cached
+        
         for attempt in range(max_retries):
             try:
                 logger.info(f"Fetching IMDB data (attempt {attempt+1}/{max_retries+1}): {url} with params {params}")
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=headers, params=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            logger.info(f"Successfully retrieved IMDB data")
-                            return data
-                        else:
-                            error_text = await response.text()
-                            logger.error(f"Error fetching IMDB data: HTTP {response.status}, {error_text}")
-                            return {"error": f"API error: {response.status}", "details": error_text}
+                status, data = await self._get(url, headers, params)
+                if status == 200:
+                    logger.info(f"Successfully retrieved IMDB data")
+                    if self.cache:
+                        self.cache.set("search", params, data)
+                    return data
+                elif status == 429 and attempt < max_retries - 1:
+                    # Quota exceeded: back off and retry
+                    logger.warning(f"IMDB API rate limit hit, retrying in {retry_delay * 2 ** attempt} seconds...")
+                    await asyncio.sleep(retry_delay * 2 ** attempt)
+                    continue
+                else:
+                    logger.error(f"Error fetching IMDB data: HTTP {status}, {data}")
+                    return {"error": f"API error: {status}", "details": data}
             
             except Exception as e:
                 logger.error(f"Exception while fetching IMDB data: {str(e)}")
@@ -133,25 +219,38 @@ class IMDBAPI:
         
         url = f"{self.base_url}/search"
         
+        if self.cache:
+            cached = self.cache.get("autocomplete", params)
+            if cached is not None:
+                logger.info(f"Using cached IMDB autocomplete data for '{query}'")
+                if "results" in cached and max_results:
+                    cached["results"] = cached["results"][:max_results]
+                return cached
+        
         for attempt in range(max_retries):
             try:
                 logger.info(f"Fetching IMDB autocomplete data (attempt {attempt+1}/{max_retries+1}): {url} with params {params}")
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=headers, params=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            logger.info(f"Successfully retrieved IMDB autocomplete data")
-                            
-                            # Limit the number of results if specified
-                            if "results" in data and max_results:
-                                data["results"] = data["results"][:max_results]
-                                
-                            return data
-                        else:
-                            error_text = await response.text()
-                            logger.error(f"Error fetching IMDB autocomplete data: HTTP {response.status}, {error_text}")
-                            return {"error": f"API error: {response.status}", "details": error_text}
+                status, data = await self._get(url, headers, params)
+                if status == 200:
+                    logger.info(f"Successfully retrieved IMDB autocomplete data")
+                    if self.cache:
+                        # Cache the full response; the result limit is applied per call
+                        self.cache.set("autocomplete", params, data)
+                    
+                    # Limit the number of results if specified
+                    if "results" in data and max_results:
+                        data["results"] = data["results"][:max_results]
+                        
+                    return data
+                elif status == 429 and attempt < max_retries - 1:
+                    # Quota exceeded: back off and retry
+                    logger.warning(f"IMDB API rate limit hit, retrying in {retry_delay * 2 ** attempt} seconds...")
+                    await asyncio.sleep(retry_delay * 2 ** attempt)
+                    continue
+                else:
+                    logger.error(f"Error fetching IMDB autocomplete data: HTTP {status}, {data}")
+                    return {"error": f"API error: {status}", "details": data}
             
             except Exception as e:
                 logger.error(f"Exception while fetching IMDB autocomplete data: {str(e)}")
@@ -0,0 +1,196 @@
+"""
+IMDB Lookup Cache
+
+This module provides a persistent cache for IMDB API responses, stored in the
+imdb_lookup_cache table. Both hits and misses (responses without results) are
+cached, each with its own TTL, so titles that can't be matched only cost an
+API call once per miss TTL instead of once per enrichment run. Error responses
+are never cached.
+
+Keys are built from the API endpoint and the normalized request parameters, so
+searches that only differ in case, accents or spacing share one entry.
+"""
+
+import json
+import logging
+import unicodedata
+from datetime import datetime, timedelta
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default time to live for cached responses
+HIT_TTL_DAYS = 90
+MISS_TTL_DAYS = 14
+
+def normalize_search_term(term):
+    """
+    Normalize a search term for use in a cache key.
+
+    Args:
+        term: Search string
+
+    Returns:
+        Lowercase, accent-folded string with collapsed whitespace
+    """
+    term = unicodedata.normalize('NFKD', str(term))
+    term = ''.join(char for char in term if not unicodedata.combining(char))
+    return ' '.join(term.lower().split())
+
+def make_cache_key(params):
+    """
+    Build a cache key from request parameters.
+
+    Args:
+        params: Dictionary of request parameters
+
+    Returns:
+        Stable string key
+    """
+    normalized = {
+        name: normalize_search_term(value) if isinstance(value, str) else value
+        for name, value in params.items() if value is not None
+    }
+    return json.dumps(normalized, sort_keys=True)
+
+def is_hit(response):
+    """Whether an API response contains at least one result."""
+    if isinstance(response, list):
+        return bool(response)
+    return bool(response.get("results"))
+
+class IMDBLookupCache:
+    """
+    Persistent cache of IMDB API responses with separate TTLs for hits and misses.
+
+    Entries read or written during the life of the object are also kept in
+    memory, so repeated variation searches in one run don't query the database
+    again.
+    """
+
+    def __init__(self, hit_ttl_days=HIT_TTL_DAYS, miss_ttl_days=MISS_TTL_DAYS):
+        """
+        Initialize the cache
+
+        Args:
+            hit_ttl_days: Days before a response with results is fetched again
+            miss_ttl_days: Days before a response without results is fetched again
+        """
+        # Imported here so the API client can be used without a database
+        from sqlalchemy.orm import sessionmaker
+        from models import engine
+
+        self.hit_ttl = timedelta(days=hit_ttl_days)
+        self.miss_ttl = timedelta(days=miss_ttl_days)
+        self.Session = sessionmaker(bind=engine)
+        self._memory = {}
+        self.stats = {"hits": 0, "misses": 0, "negative_hits": 0, "stored": 0}
+
+    def get(self, endpoint, params):
+        """
+        Look up a cached response.
+
+        Args:
+            endpoint: API method name
+            params: Request parameters
+
+        Returns:
+            The cached response (a fresh copy), or None if absent or expired
+        """
+        from models import IMDB_Lookup_Cache
+
+        key = (endpoint, make_cache_key(params))
+        entry = self._memory.get(key)
+        if entry is None:
+            session = self.Session()
+            try:
+                row = session.query(IMDB_Lookup_Cache.response, IMDB_Lookup_Cache.is_hit,
+                                    IMDB_Lookup_Cache.expires_at).filter(
+                    IMDB_Lookup_Cache.endpoint == endpoint,
+                    IMDB_Lookup_Cache.search_key == key[1]
+                ).first()
+            except Exception as e:
+                logger.warning(f"IMDB cache lookup failed, calling the API: {str(e)}")
+                row = None
+            finally:
+                session.close()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            entry = (row.response, row.is_hit, row.expires_at)
+
+        response, hit, expires_at = entry
+        if expires_at <= datetime.utcnow():
+            self._memory.pop(key, None)
+            self.stats["misses"] += 1
+            return None
+
+        self._memory[key] = entry
+        self.stats["hits" if hit else "negative_hits"] += 1
+        return json.loads(response)
+
+    def set(self, endpoint, params, response):
+        """
+        Store an API response. Error responses are not cached.
+
+        Args:
+            endpoint: API method name
+            params: Request parameters
+            response: Parsed API response
+        """
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        from models import IMDB_Lookup_Cache
+
+        if isinstance(response, dict) and "error" in response:
+            return
+
+        hit = is_hit(response)
+        now = datetime.utcnow()
+        expires_at = now + (self.hit_ttl if hit else self.miss_ttl)
+        key = make_cache_key(params)
+        payload = json.dumps(response)
+
+        session = self.Session()
+        try:
+            stmt = pg_insert(IMDB_Lookup_Cache).values(
+                endpoint=endpoint, search_key=key, is_hit=hit, response=payload,
+                fetched_at=now, expires_at=expires_at
+            )
+            session.execute(stmt.on_conflict_do_update(
+                constraint='uq_imdb_lookup_cache_key',
+                set_={
+                    "is_hit": stmt.excluded.is_hit,
+                    "response": stmt.excluded.response,
+                    "fetched_at": stmt.excluded.fetched_at,
+                    "expires_at": stmt.excluded.expires_at
+                }
+            ))
+            session.commit()
+            self._memory[(endpoint, key)] = (payload, hit, expires_at)
+            self.stats["stored"] += 1
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Could not store IMDB response in cache: {str(e)}")
+        finally:
+            session.close()
+
+    def purge_expired(self):
+        """
+        Delete expired entries.
+
+        Returns:
+            Number of deleted entries
+        """
+        from models import IMDB_Lookup_Cache
+
+        session = self.Session()
+        try:
+            deleted = session.query(IMDB_Lookup_Cache).filter(
+                IMDB_Lookup_Cache.expires_at <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            session.commit()
+            self._memory.clear()
+            return deleted
+        finally:
+            session.close()
@@ -0,0 +1,316 @@
+"""
+Offline IMDb Dataset Matcher
+
+This module loads IMDb's public dataset files (title.basics.tsv and optionally
+title.ratings.tsv, plain or gzipped, from https://datasets.imdbws.com/) into
+the imdb_titles table and matches Netflix titles against it, so enrichment
+can run without any network calls.
+
+Loading streams the files and bulk loads them with COPY in chunks, so memory
+stays constant. Episodes and adult titles are skipped, which leaves roughly
+2 million of the 10+ million rows. Every title is stored with a compact match
+key (see normalize_title) that is indexed for both the primary and the
+original title, so a batch of Netflix titles is matched with one index lookup
+per batch. Titles without an exact key match fall back to a trigram search
+(pg_trgm, see add_imdb_trigram_index.py), and every match is chosen and
+scored by title_matcher.
+"""
+
+import io
+import gzip
+import logging
+import re
+from itertools import islice
+from sqlalchemy import text
+from imdb_cache import normalize_search_term
+from netflix_parsing import is_series_episode
+import title_matcher
+from models import engine, IMDB_Title
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Title types loaded from title.basics.tsv (episodes are matched through their series)
+OFFLINE_TITLE_TYPES = {"movie", "tvMovie", "tvSeries", "tvMiniSeries", "tvSpecial", "short"}
+
+# Rows sent per COPY statement
+COPY_CHUNK_ROWS = 100000
+
+# Match keys sent per matching query
+MATCH_BATCH_SIZE = 1000
+
+# Trigram candidates fetched per match key without an exact match
+FUZZY_CANDIDATES = 20
+
+# GIN trigram index created by add_imdb_trigram_index.py
+TRIGRAM_INDEX = "ix_imdb_titles_normalized_title_trgm"
+
+# Null marker used by the dataset files and by COPY's text format
+TSV_NULL = '\\N'
+
+NON_ALNUM_RE = re.compile(r'[\W_]+')
+
+COPY_TITLES_SQL = (
+    "COPY imdb_titles (tconst, title_type, primary_title, original_title, normalized_title, "
+    "normalized_original_title, start_year, end_year, genres) FROM STDIN"
+)
+COPY_RATINGS_SQL = "COPY imdb_ratings_staging (tconst, average_rating, num_votes) FROM STDIN"
+
+def normalize_title(title):
+    """
+    Build the match key of a title.
+
+    Case, accents, punctuation and spacing are ignored, so "The Queen's Gambit",
+    "The Queens Gambit" and "the queens-gambit" share one key.
+
+    Args:
+        title: Title string
+
+    Returns:
+        Compact lowercase key, or None for an empty title
+    """
+    if not title:
+        return None
+    key = normalize_search_term(title).replace('&', 'and')
+    return NON_ALNUM_RE.sub('', key) or None
+
+def _open_tsv(path):
+    """Open a dataset file, gzipped or not, for reading text."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+def _iter_tsv(path):
+    """Yield (column index, fields) for each well-formed row of a dataset file."""
+    with _open_tsv(path) as f:
+        header = f.readline().rstrip('\r\n').split('\t')
+        columns = {name: i for i, name in enumerate(header)}
+        for line in f:
+            fields = line.rstrip('\r\n').split('\t')
+            if len(fields) == len(header):
+                yield columns, fields
+
+def _value(field):
+    """Map the dataset's null marker to None."""
+    return None if field == TSV_NULL else field
+
+def iter_title_basics(path, title_types=OFFLINE_TITLE_TYPES):
+    """
+    Read title.basics.tsv.
+
+    Args:
+        path: Path to title.basics.tsv or title.basics.tsv.gz
+        title_types: Title types to keep
+
+    Yields:
+        Tuples in COPY_TITLES_SQL column order
+    """
+    for columns, fields in _iter_tsv(path):
+        title_type = fields[columns['titleType']]
+        if title_type not in title_types or fields[columns['isAdult']] == '1':
+            continue
+        primary_title = _value(fields[columns['primaryTitle']])
+        original_title = _value(fields[columns['originalTitle']])
+        yield (
+            fields[columns['tconst']],
+            title_type,
+            primary_title,
+            original_title,
+            normalize_title(primary_title),
+            normalize_title(original_title),
+            _value(fields[columns['startYear']]),
+            _value(fields[columns['endYear']]),
+            _value(fields[columns['genres']])
+        )
+
+def iter_title_ratings(path):
+    """
+    Read title.ratings.tsv.
+
+    Yields:
+        Tuples of (tconst, average rating, number of votes)
+    """
+    for columns, fields in _iter_tsv(path):
+        yield (fields[columns['tconst']], _value(fields[columns['averageRating']]),
+               _value(fields[columns['numVotes']]))
+
+def _copy_buffer(rows):
+    """Encode rows in COPY's text format."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(
+            TSV_NULL if value is None else
+            value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+            for value in row
+        ))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+def _copy_rows(cursor, sql, rows, chunk_rows):
+    """COPY rows in chunks and return the number of rows sent."""
+    count = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return count
+        cursor.copy_expert(sql, _copy_buffer(chunk))
+        count += len(chunk)
+        logger.info(f"Copied {count} rows")
+
+def load_imdb_dataset(basics_path, ratings_path=None, chunk_rows=COPY_CHUNK_ROWS):
+    """
+    Replace the contents of imdb_titles with an IMDb dataset snapshot.
+
+    The load runs in one transaction, so a failed load leaves the previous
+    snapshot in place.
+
+    Args:
+        basics_path: Path to title.basics.tsv(.gz)
+        ratings_path: Optional path to title.ratings.tsv(.gz)
+        chunk_rows: Rows sent per COPY statement
+
+    Returns:
+        Dictionary with the number of titles loaded and titles rated
+    """
+    result = {"titles": 0, "rated": 0}
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("TRUNCATE imdb_titles")
+
+        logger.info(f"Loading IMDb titles from {basics_path}")
+        result["titles"] = _copy_rows(cursor, COPY_TITLES_SQL, iter_title_basics(basics_path), chunk_rows)
+
+        if ratings_path:
+            logger.info(f"Loading IMDb ratings from {ratings_path}")
+            cursor.execute(
+                "CREATE TEMP TABLE imdb_ratings_staging "
+                "(tconst text PRIMARY KEY, average_rating real, num_votes integer) ON COMMIT DROP"
+            )
+            _copy_rows(cursor, COPY_RATINGS_SQL, iter_title_ratings(ratings_path), chunk_rows)
+            cursor.execute(
+                "UPDATE imdb_titles t SET average_rating = r.average_rating, num_votes = r.num_votes "
+                "FROM imdb_ratings_staging r WHERE r.tconst = t.tconst"
+            )
+            result["rated"] = cursor.rowcount
+
+        cursor.execute("ANALYZE imdb_titles")
+        connection.commit()
+        logger.info(f"Loaded {result['titles']} IMDb titles ({result['rated']} with ratings)")
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    return result
+
+def has_imdb_dataset(session):
+    """Whether the imdb_titles table has been loaded."""
+    return session.query(IMDB_Title.tconst).limit(1).first() is not None
+
+def _group_keys(search_term, titles):
+    """Match keys to try for a title group, most specific first."""
+    keys = []
+    # A movie title with a colon is cut to its prefix by clean_title_for_search,
+    # so try the full title first
+    for title in titles[:1]:
+        if not is_series_episode(title):
+            keys.append(normalize_title(title.strip('"')))
+    keys.append(normalize_title(search_term))
+    return [key for key in dict.fromkeys(keys) if key]
+
+def has_trigram_index(session):
+    """Whether the trigram index used by the fuzzy fallback exists."""
+    return session.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = :name"),
+                           {"name": TRIGRAM_INDEX}).first() is not None
+
+def _as_result(row):
+    """Shape a matched row like an IMDB API search result."""
+    return {
+        "id": row.tconst,
+        "type": row.title_type,
+        "primaryTitle": row.primary_title,
+        "originalTitle": row.original_title,
+        "startYear": row.start_year,
+        "endYear": row.end_year,
+        "genres": row.genres.split(',') if row.genres else [],
+        "averageRating": row.average_rating,
+        "numVotes": row.num_votes,
+        "source": "imdb_offline"
+    }
+
+TITLE_COLUMNS = ("tconst, title_type, primary_title, original_title, normalized_title, "
+                 "normalized_original_title, start_year, end_year, genres, average_rating, num_votes")
+
+def _fuzzy_candidates(session, keys):
+    """Trigram candidates for each match key, from the pg_trgm index on normalized_title."""
+    candidates = {}
+    for start in range(0, len(keys), MATCH_BATCH_SIZE):
+        rows = session.execute(text(
+            f"SELECT k.key AS match_key, t.* FROM unnest(CAST(:keys AS text[])) AS k(key) "
+            f"CROSS JOIN LATERAL (SELECT {TITLE_COLUMNS} FROM imdb_titles "
+            f"WHERE normalized_title % k.key ORDER BY normalized_title <-> k.key LIMIT :limit) t"
+        ), {"keys": keys[start:start + MATCH_BATCH_SIZE], "limit": FUZZY_CANDIDATES})
+        for row in rows:
+            candidates.setdefault(row.match_key, []).append(_as_result(row))
+    return candidates
+
+def match_title_groups(session, groups, fuzzy=True):
+    """
+    Match groups of Netflix titles against the offline dataset.
+
+    Each group is a (search term, titles, first watched year) tuple as built
+    by netflix_importer.pending_title_groups(). Candidates sharing a match key
+    with the group are scored with title_matcher (preferring series for
+    groups of episodes, and releases no later than the first watch); groups without a confident exact-key match fall back
+    to trigram candidates when the trigram index exists.
+
+    Args:
+        session: Database session
+        groups: List of (search term, list of titles, first watched year or None) tuples
+        fuzzy: Use the trigram fallback
+
+    Returns:
+        List with, for each group, a result shaped like an IMDB API search
+        result (with its "matchConfidence"), or None if nothing matched
+    """
+    group_keys = [_group_keys(search_term, titles) for search_term, titles, _ in groups]
+    all_keys = list(dict.fromkeys(key for keys in group_keys for key in keys))
+
+    candidates = {}
+    for start in range(0, len(all_keys), MATCH_BATCH_SIZE):
+        batch = all_keys[start:start + MATCH_BATCH_SIZE]
+        rows = session.execute(text(
+            f"SELECT {TITLE_COLUMNS} FROM imdb_titles "
+            f"WHERE normalized_title = ANY(:keys) OR normalized_original_title = ANY(:keys)"
+        ), {"keys": batch})
+        for row in rows:
+            for key in {row.normalized_title, row.normalized_original_title}:
+                if key:
+                    candidates.setdefault(key, []).append(_as_result(row))
+
+    def pick(search_term, titles, first_watched_year, keys, candidates):
+        want_series = any(is_series_episode(title) for title in titles)
+        year = title_matcher.title_year(titles)
+        for key in keys:
+            candidate, confidence = title_matcher.best_match(search_term, candidates.get(key, []), want_series,
+                                                             year=year, latest_year=first_watched_year)
+            if candidate:
+                return dict(candidate, matchConfidence=confidence)
+        return None
+
+    matches = [pick(search_term, titles, first_watched_year, keys, candidates)
+               for (search_term, titles, first_watched_year), keys in zip(groups, group_keys)]
+
+    unmatched = [i for i, match in enumerate(matches) if match is None]
+    if fuzzy and unmatched and has_trigram_index(session):
+        fuzzy_keys = list(dict.fromkeys(key for i in unmatched for key in group_keys[i]))
+        fuzzy_candidates = _fuzzy_candidates(session, fuzzy_keys)
+        for i in unmatched:
+            search_term, titles, first_watched_year = groups[i]
+            matches[i] = pick(search_term, titles, first_watched_year, group_keys[i], fuzzy_candidates)
+    return matches
@@ -5,12 +5,13 @@ One-time script to clean duplicate sections from bee conversation data
 This script uses a more direct approach to identify and remove duplicated 
 Summary and Atmosphere sections in the bee_conversations table.
 """
-import os
 import re
-import json
 import logging
-import psycopg2
-from psycopg2.extras import Json
+import argparse
+
+import conversation_sections
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
+from models import Bee_Conversation
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -18,7 +19,7 @@ logger = logging.getLogger(__name__)
 
 def clean_duplicate_sections(text):
     """
-    Clean duplicate sections by extracting content between section markers.
+    Clean duplicate sections with the shared section tokenizer.
     This implementation just keeps the first occurrence of each section type.
     
     Args:
@@ -30,151 +31,68 @@ def clean_duplicate_sections(text):
     if not text or not isinstance(text, str):
         return text
     
-    # Define regex patterns for section detection
-    section_markers = {
-        'summary': r'(?i)(?:^|\n)(?:#+\s*)?(?:summary|summary\s*:)',
-        'atmosphere': r'(?i)(?:^|\n)(?:#+\s*)?(?:atmosphere|atmosphere\s*:)',
-        'key_takeaways': r'(?i)(?:^|\n)(?:#+\s*)?(?:key\s*takeaways|key\s*takeaways\s*:|key\s*take\s*aways|key\s*take\s*aways\s*:)'
-    }
-    
-    # Find all section markers in the text
-    sections = {}
-    for section_name, pattern in section_markers.items():
-        matches = list(re.finditer(pattern, text))
-        if matches:
-            for match in matches:
-                start_pos = match.start()
-                if match.group().startswith('\n'):
-                    start_pos += 1  # Adjust for newline prefix
-                sections[start_pos] = section_name
-    
-    if not sections:
-        return text  # No sections found
-    
-    # Sort sections by position
-    sorted_positions = sorted(sections.keys())
-    
-    # Identify duplicates (same section type appearing multiple times)
-    seen_sections = {}
-    duplicate_markers = []
-    
-    for pos in sorted_positions:
-        section_type = sections[pos]
-        if section_type in seen_sections:
-            duplicate_markers.append(pos)
-        else:
-            seen_sections[section_type] = pos
-    
-    if not duplicate_markers:
+    result = conversation_sections.remove_duplicate_sections(text)
+    if result is text:
         return text  # No duplicates found
     
-    # Remove duplicate sections
-    # We'll build a new text excluding the duplicate sections
-    result = text
-    
-    # Process duplicates in reverse order to avoid position changes
-    duplicate_markers.sort(reverse=True)
-    
-    for dup_pos in duplicate_markers:
-        section_type = sections[dup_pos]
-        
-        # Find the end of this duplicate section
-        section_end = len(text)
-        for pos in sorted_positions:
-            if pos > dup_pos:
-                section_end = pos
-                break
-        
-        # Remove this duplicate section
-        duplicate_content = text[dup_pos:section_end]
-        result = result.replace(duplicate_content, '', 1)
-    
     # Check for empty lines and normalize spacing
     result = re.sub(r'\n{3,}', '\n\n', result)
     result = result.strip()
     
     return result
 
-def process_conversations():
+def clean_conversation(row):
     """
-    Process all bee_conversations to remove duplicate sections.
-    """
-    # Get database connection
-    db_url = os.environ.get('DATABASE_URL')
-    if not db_url:
-        logger.error("DATABASE_URL not found in environment variables")
-        return {"cleaned": 0, "errors": 1}
+    Backfill transform: a conversation's summary and atmosphere without duplicate sections.
     
-    try:
-        conn = psycopg2.connect(db_url)
-        cursor = conn.cursor()
-        
-        # Get all conversations that have data in summary or atmosphere
-        cursor.execute("""
-            SELECT id, summary, atmosphere 
-            FROM bee_conversations 
-            WHERE summary IS NOT NULL OR atmosphere IS NOT NULL;
-        """)
-        
-        conversations = cursor.fetchall()
-        logger.info(f"Found {len(conversations)} conversations to check for duplicate sections")
-        
-        updated_count = 0
-        error_count = 0
-        
-        # Process each conversation
-        for conv_id, summary, atmosphere in conversations:
-            try:
-                # Clean duplicate sections from each field
-                clean_summary = clean_duplicate_sections(summary)
-                clean_atmosphere = clean_duplicate_sections(atmosphere)
-                
-                # Check if anything changed
-                if clean_summary != summary or clean_atmosphere != atmosphere:
-                    # Update the record
-                    cursor.execute(
-                        """
-                        UPDATE bee_conversations 
-                        SET summary = %s, atmosphere = %s
-                        WHERE id = %s
-                        """,
-                        (clean_summary, clean_atmosphere, conv_id)
-                    )
-                    
-                    updated_count += 1
-                    
-                    # Log progress every 10 cleaned conversations
-                    if updated_count % 10 == 0:
-                        logger.info(f"Cleaned {updated_count} conversations with duplicate sections so far")
-                        conn.commit()
-                
-            except Exception as e:
-                logger.error(f"Error cleaning conversation {conv_id}: {str(e)}")
-                error_count += 1
-        
-        # Final commit
-        conn.commit()
-        logger.info(f"Removed duplicate sections from {updated_count} conversations with {error_count} errors")
+    Args:
+        row: Dict with the conversation id, summary and atmosphere
         
-        return {
-            "cleaned": updated_count,
-            "errors": error_count
-        }
+    Returns:
+        Dict with the cleaned summary and atmosphere, or None if nothing changed
+    """
+    clean_summary = clean_duplicate_sections(row["summary"])
+    clean_atmosphere = clean_duplicate_sections(row["atmosphere"])
+    if clean_summary == row["summary"] and clean_atmosphere == row["atmosphere"]:
+        return None
+    return {"summary": clean_summary, "atmosphere": clean_atmosphere}
+
+BACKFILL = Backfill(
+    "improved_duplicate_section_cleaner", Bee_Conversation, ["summary", "atmosphere"], clean_conversation,
+    where=Bee_Conversation.summary.isnot(None) | Bee_Conversation.atmosphere.isnot(None)
+)
+
+def process_conversations(processes=None, chunk_size=None, restart=False):
+    """
+    Process all bee_conversations to remove duplicate sections.
     
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first conversation instead of resuming an interrupted run
+    """
+    try:
+        result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
         return {
             "cleaned": 0,
             "errors": 1
         }
-    finally:
-        if 'conn' in locals():
-            conn.close()
+    
+    return {
+        "cleaned": result["updated"],
+        "errors": result["errors"]
+    }
 
 def main():
     """Main function to run the duplicate section cleaning process."""
+    parser = argparse.ArgumentParser(description="Remove duplicate sections from Bee conversations")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
+    
     logger.info("Starting improved duplicate section cleaning process")
-    result = process_conversations()
+    result = process_conversations(**backfill_options(args))
     logger.info(f"Cleaning complete: {result['cleaned']} cleaned, {result['errors']} errors")
 
 if __name__ == "__main__":
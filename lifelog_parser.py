@@ -0,0 +1,200 @@
+"""
+Limitless Lifelog Contents Parser
+
+This module parses a Limitless lifelog payload once and returns everything the
+ingest path and the lifelog maintenance scripts derive from it: the payload's
+own fields (title, description, ...), the earliest startTime and latest
+endTime, the heading2 subsummaries with the span of contents items each
+covers, and the blockquote transcript lines under each.
+It has no database dependency.
+
+The payload is decoded at most once, with orjson when it is installed and the
+standard json module otherwise. The contents array is walked once. Timestamps
+in the API's fixed format (2024-05-01T14:03:12.250Z) sort chronologically as
+text, so they are compared as strings and only the earliest and latest are
+turned into datetimes; other formats are parsed one by one.
+"""
+
+import re
+import json
+from datetime import datetime
+from collections import namedtuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Common pattern: "Speaker: Text of what they said"
+SPEAKER_RE = re.compile(r'^([A-Za-z\s\.]+):\s*(.*)')
+
+# A heading2 and the transcript lines under it; start and end index the
+# contents items the subsummary covers (end is exclusive)
+Subsummary = namedtuple("Subsummary", ["heading", "start", "end", "lines"])
+
+ParsedLifelog = namedtuple("ParsedLifelog", [
+    "log_id", "title", "description", "log_type", "tags",
+    "created_at", "updated_at", "has_contents", "subsummaries"
+])
+
+def loads(raw_data):
+    """
+    Decode a JSON payload, with orjson when it is installed.
+
+    Args:
+        raw_data: JSON text (str or bytes)
+
+    Returns:
+        The decoded value
+    """
+    if orjson is not None:
+        return orjson.loads(raw_data)
+    return json.loads(raw_data)
+
+def parse_time(value):
+    """
+    Datetime of an ISO timestamp.
+
+    Args:
+        value: ISO string such as a startTime, or None
+
+    Returns:
+        Datetime (aware when the string has an offset), or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def _is_api_time(value):
+    # The API's fixed-width UTC format, e.g. 2024-05-01T14:03:12.250Z
+    return type(value) is str and len(value) == 24 and value[-1] == 'Z' and value[10] == 'T'
+
+class _Extremes:
+    """Earliest or latest timestamp seen, comparing API-format strings as text."""
+
+    def __init__(self, latest):
+        self.latest = latest
+        self.text = None
+        self.other = None
+
+    def _better(self, value, current):
+        return current is None or (value > current if self.latest else value < current)
+
+    def add(self, value):
+        if not value:
+            return
+        if _is_api_time(value):
+            if self._better(value, self.text):
+                self.text = value
+            return
+        parsed = parse_time(value)
+        if parsed is not None and self._better(parsed, self.other):
+            self.other = parsed
+
+    def result(self):
+        candidates = [value for value in (parse_time(self.text), self.other) if value is not None]
+        if not candidates:
+            return None
+        return max(candidates) if self.latest else min(candidates)
+
+def extract_speaker_from_text(text):
+    """
+    Extract speaker name from transcript line text if available.
+
+    Many transcript lines start with a speaker name followed by a colon.
+    This function attempts to extract that name.
+
+    Args:
+        text: Transcript line text that may include a speaker prefix
+
+    Returns:
+        Tuple of (speaker_name, cleaned_text) or (None, original_text) if no speaker found
+    """
+    if not text:
+        return None, ""
+
+    speaker_match = SPEAKER_RE.match(text)
+    if speaker_match:
+        return speaker_match.group(1).strip(), speaker_match.group(2).strip()
+
+    return None, text
+
+def parse_lifelog(payload):
+    """
+    Parse a lifelog payload in a single walk over its contents.
+
+    Args:
+        payload: Lifelog as returned by the Limitless API, either decoded (a
+            dict) or as the JSON text stored in raw_data
+
+    Returns:
+        ParsedLifelog. created_at and updated_at are the earliest startTime
+        and latest endTime in the contents, falling back to the payload's own
+        created_at/updated_at. subsummaries holds a Subsummary per heading2,
+        whose lines are dicts with speaker, text, start_time, end_time (the
+        API's strings) and position. title is the payload's own title; the
+        heading1 fallback shown for untitled lifelogs is display only
+        (app.format_lifelog) and is not stored.
+
+    Raises:
+        ValueError: If the payload is not a JSON object
+    """
+    data = loads(payload) if isinstance(payload, (str, bytes)) else payload
+    if not isinstance(data, dict):
+        raise ValueError(f"Lifelog payload is a {type(data).__name__}, not an object")
+
+    contents = data.get('contents')
+    has_contents = isinstance(contents, list)
+    if not has_contents:
+        contents = []
+
+    earliest = _Extremes(latest=False)
+    latest = _Extremes(latest=True)
+    subsummaries = []
+    lines = None
+    for index, item in enumerate(contents):
+        if not isinstance(item, dict):
+            continue
+        start_time = item.get('startTime')
+        end_time = item.get('endTime')
+        earliest.add(start_time)
+        latest.add(end_time)
+
+        item_type = item.get('type')
+        if item_type == 'blockquote':
+            if lines is None:
+                continue
+            text = item.get('content', '')
+            if not text.strip():
+                continue
+            speaker, line_text = extract_speaker_from_text(text)
+            lines.append({
+                "speaker": speaker,
+                "text": line_text,
+                "start_time": start_time,
+                "end_time": end_time,
+                "position": len(lines)
+            })
+        elif item_type == 'heading2':
+            if subsummaries:
+                subsummaries[-1] = subsummaries[-1]._replace(end=index)
+            lines = []
+            subsummaries.append(Subsummary(item.get('content', ''), index, len(contents), lines))
+
+    created_at = earliest.result() or parse_time(data.get('created_at'))
+    updated_at = latest.result() or parse_time(data.get('updated_at'))
+
+    return ParsedLifelog(
+        log_id=str(data.get('id', '')),
+        title=data.get('title'),
+        description=data.get('description'),
+        log_type=data.get('type'),
+        tags=data.get('tags'),
+        created_at=created_at,
+        updated_at=updated_at,
+        has_contents=has_contents,
+        subsummaries=subsummaries
+    )
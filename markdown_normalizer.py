@@ -0,0 +1,199 @@
+"""
+Markdown Normalizer
+
+This module removes Markdown formatting from Bee conversation text and
+Limitless transcript lines. It replaces the clean_markdown/clean_text copies
+that used to live in app.py and the cleanup scripts; each of those is kept as
+a profile so existing callers get the same output:
+
+- "standard": what app.clean_markdown applies when conversations are stored
+- "thorough": the stricter cleanup of fix_from_raw_data and clean_markdown_from_bee_data
+- "light": clean_markdown_in_database, which keeps heading text and section labels
+- "transcript": the character stripping extract_transcript_lines applies to transcript lines
+
+Every rule is compiled once and only runs when the text contains a substring
+its pattern needs to match, so plain text skips most passes. Single strings
+go through an LRU cache; normalize_batch cleans each distinct string once and
+can spread large backfills over a process pool.
+"""
+
+import os
+import re
+from functools import lru_cache
+from itertools import repeat
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_PROFILE = "standard"
+
+# Distinct strings remembered by normalize()
+CACHE_SIZE = 8192
+
+# Below this many distinct strings a process pool costs more than it saves
+PARALLEL_THRESHOLD = 2000
+
+# Strings handed to a worker process at a time
+POOL_CHUNK_SIZE = 256
+
+# A regex substitution applied `passes` times (stopping early once nothing
+# changes), skipped when the text contains none of `triggers`
+Rule = namedtuple("Rule", ["pattern", "replacement", "triggers", "passes"])
+
+def _rule(pattern, replacement, triggers, flags=0, passes=1):
+    return Rule(re.compile(pattern, flags), replacement, triggers, passes)
+
+# Section labels and headings that belong in separate fields
+_SECTION_LABELS = [
+    _rule(r'(?i)^Summary:.*?(\n\n|$)', '', (':',), re.MULTILINE | re.DOTALL),
+    _rule(r'(?i)Atmosphere:.*?(\n\n|$)', '', (':',), re.MULTILINE | re.DOTALL),
+    _rule(r'(?i)Key Take ?Aways:.*?(\n\n|$)', '', (':',), re.MULTILINE | re.DOTALL),
+    _rule(r'(?i)Key Takeaways:.*?(\n\n|$)', '', (':',), re.MULTILINE | re.DOTALL),
+    _rule(r'(?i)^#+\s*(?:Summary|Atmosphere|Key Take ?Aways|Key Takeaways):?.*?\n', '', ('#',), re.MULTILINE),
+]
+
+_HEADER = _rule(r'^#+\s+', '', ('#',), re.MULTILINE)
+_BULLET = _rule(r'^\s*[\*\-•]\s+', '', ('*', '-', '•'), re.MULTILINE)
+_LINK = _rule(r'\[(.*?)\]\(.*?\)', r'\1', ('](',))
+_INLINE_CODE = _rule(r'`(.*?)`', r'\1', ('`',))
+_BLOCKQUOTE = _rule(r'^>\s+', '', ('>',), re.MULTILINE)
+_HORIZONTAL_RULE = _rule(r'^\s*[-_*]{3,}\s*$', '', ('-', '_', '*'), re.MULTILINE)
+_BLANK_LINES = _rule(r'\n{3,}', '\n\n', ('\n\n\n',))
+
+PROFILES = {
+    "standard": _SECTION_LABELS + [
+        _HEADER,
+        _rule(r'\*\*(.*?)\*\*', r'\1', ('**',)),
+        _rule(r'(?<!\*)\*([^\*]+)\*(?!\*)', r'\1', ('*',)),
+        _BULLET,
+        _LINK,
+        _rule(r'```.*?```', '', ('```',), re.DOTALL),
+        _INLINE_CODE,
+        _BLOCKQUOTE,
+        _HORIZONTAL_RULE,
+        _BLANK_LINES,
+    ],
+    "thorough": _SECTION_LABELS + [
+        _HEADER,
+        # Several passes catch nested formatting
+        _rule(r'\*\*(.*?)\*\*', r'\1', ('**',), passes=3),
+        _rule(r'\*([^\*\n]+)\*', r'\1', ('*',), passes=3),
+        # Single asterisks left over from incomplete formatting
+        _rule(r'(?<!\*)\*(?!\*)', '', ('*',)),
+        _BULLET,
+        _LINK,
+        _rule(r'```[\w]*\n.*?```', '', ('```',), re.DOTALL),
+        _INLINE_CODE,
+        _BLOCKQUOTE,
+        _HORIZONTAL_RULE,
+        _rule(r'<[^>]+>', '', ('<',)),
+        _rule(r'\*\*', '', ('**',)),
+        _rule(r'__', '', ('__',)),
+        _BLANK_LINES,
+    ],
+    "light": [
+        _rule(r'^#+\s*(.*?)$', r'\1', ('#',), re.MULTILINE),
+        _rule(r'\*\*(.*?)\*\*', r'\1', ('**',)),
+        # Asterisks at the start or end of a line or paragraph
+        _rule(r'(?:^|\n)\s*\*\s*', '\n', ('*',)),
+        _rule(r'\s*\*(?:$|\n)', '\n', ('*',)),
+        _rule(r'(?<!\*)\*([^\*]+)\*(?!\*)', r'\1', ('*',)),
+        _rule(r'^\s*\*\s*(.*?)$', r'\1', ('*',), re.MULTILINE),
+        _rule(r'^\s*-\s*(.*?)$', r'\1', ('-',), re.MULTILINE),
+        _rule(r'^\s*#\s*$', '', ('#',), re.MULTILINE),
+        _rule(r'^\s*\*\s*$', '', ('*',), re.MULTILINE),
+        _rule(r'\n\n+', '\n\n', ('\n\n',)),
+    ],
+    "transcript": [
+        _rule(r'[*_#]+', '', ('*', '_', '#')),
+    ],
+}
+
+def _apply_rules(text, rules):
+    """Run a profile's rules over one string."""
+    for rule in rules:
+        for _ in range(rule.passes):
+            if not any(trigger in text for trigger in rule.triggers):
+                break
+            text, count = rule.pattern.subn(rule.replacement, text)
+            if not count:
+                break
+    return text.strip()
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize_string(text, profile):
+    return _apply_rules(text, PROFILES[profile])
+
+def _normalize_uncached(text, profile):
+    """Worker-process entry point (the cache would only live in the worker)."""
+    return _apply_rules(text, PROFILES[profile])
+
+def normalize(text, profile=DEFAULT_PROFILE):
+    """
+    Remove Markdown formatting from text.
+
+    Args:
+        text: String, list of strings, or any other value (returned unchanged)
+        profile: Key of PROFILES
+
+    Returns:
+        Cleaned string (or list of cleaned strings)
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown Markdown profile '{profile}', expected one of: {', '.join(PROFILES)}")
+    if not text:
+        return text
+    if isinstance(text, list):
+        return [normalize(item, profile) for item in text]
+    if not isinstance(text, str):
+        return text
+    return _normalize_string(text, profile)
+
+def normalize_batch(texts, profile=DEFAULT_PROFILE, processes=None, executor=None):
+    """
+    Remove Markdown formatting from many values at once.
+
+    Each distinct string is cleaned once. With processes (or an executor) and
+    at least PARALLEL_THRESHOLD distinct strings, the work is spread over a
+    process pool.
+
+    Args:
+        texts: Iterable of strings, lists of strings, or other values
+        profile: Key of PROFILES
+        processes: Optional number of worker processes (0 means one per CPU)
+        executor: Optional ProcessPoolExecutor to reuse across batches
+
+    Returns:
+        List with the cleaned value for each input, in input order
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown Markdown profile '{profile}', expected one of: {', '.join(PROFILES)}")
+    texts = list(texts)
+
+    distinct = {}
+    for value in texts:
+        for item in (value if isinstance(value, list) else [value]):
+            if isinstance(item, str) and item:
+                distinct[item] = None
+    strings = list(distinct)
+
+    parallel = (executor is not None or processes is not None) and len(strings) >= PARALLEL_THRESHOLD
+    if parallel and executor is not None:
+        cleaned = list(executor.map(_normalize_uncached, strings, repeat(profile), chunksize=POOL_CHUNK_SIZE))
+    elif parallel:
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+            cleaned = list(pool.map(_normalize_uncached, strings, repeat(profile), chunksize=POOL_CHUNK_SIZE))
+    else:
+        cleaned = [_normalize_string(item, profile) for item in strings]
+    lookup = dict(zip(strings, cleaned))
+
+    def clean(item):
+        return lookup[item] if isinstance(item, str) and item else item
+    return [[clean(item) for item in value] if isinstance(value, list) else clean(value) for value in texts]
+
+def clear_cache():
+    """Forget the strings remembered by normalize()."""
+    _normalize_string.cache_clear()
+
+def cache_info():
+    """Hit and miss counts of the normalize() cache."""
+    return _normalize_string.cache_info()
@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Float, UniqueConstraint, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, Date, DateTime, ForeignKey, Float, UniqueConstraint, Computed, Index, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from sqlalchemy.orm import relationship
 import os
 from datetime import datetime
@@ -22,13 +23,20 @@ class Bee_Conversation(Base):
     conversation_id = Column(String, unique=True)  # External ID from Bee API
     summary = Column(Text, nullable=True)  # Only the summary content, without heading
     atmosphere = Column(Text, nullable=True)  # Only the atmosphere content, without heading
-    key_takeaways = Column(JSON, nullable=True)  # List of key takeaways points
+    key_takeaways = Column(JSONB, nullable=True)  # List of key takeaway points, normalized at ingest
     created_at = Column(DateTime)
     address = Column(Text, nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
     raw_data = Column(Text)  # Store the raw JSON for reference
     
+    # Change detection for reprocessing: the hash of raw_data (computed by the
+    # database), the hash the derived columns above were produced from, and the
+    # transform that produced them
+    content_hash = Column(String, Computed("md5(raw_data)", persisted=True))
+    derived_hash = Column(String, nullable=True)
+    transform_version = Column(String, nullable=True)
+    
     def __repr__(self):
         return f"<Bee_Conversation(id={self.id}, created_at={self.created_at})>"
 
@@ -73,6 +81,14 @@ class Limitless_Lifelog(Base):
     tags = Column(Text, nullable=True)  # Store tags as JSON string
     raw_data = Column(Text)  # Store the raw JSON for reference
     
+    # Change detection for the lifelog backfills (timestamps, subsummaries,
+    # transcript lines): the hash of raw_data (computed by the database), the
+    # hash the backfills last processed, and each backfill's transform version
+    # by backfill name
+    content_hash = Column(String, Computed("md5(raw_data)", persisted=True))
+    derived_hash = Column(String, nullable=True)
+    transform_version = Column(JSONB, nullable=True)
+    
     # Relationship to sub-summaries
     subsummaries = relationship("Limitless_Lifelog_SubSummary", back_populates="lifelog", cascade="all, delete-orphan")
     
@@ -91,34 +107,104 @@ class Limitless_Lifelog_SubSummary(Base):
     # Relationship to parent lifelog
     lifelog = relationship("Limitless_Lifelog", foreign_keys=[lifelog_id], back_populates="subsummaries")
     
-    # Relationship to transcript lines
+    # Relationship to transcript lines, stored as rows or as one pack (see transcript_store.py)
     transcript_lines = relationship("Limitless_Transcript_Line", back_populates="subsummary", cascade="all, delete-orphan")
+    transcript_pack = relationship("Limitless_Transcript_Pack", back_populates="subsummary", uselist=False, cascade="all, delete-orphan")
     
     __table_args__ = (UniqueConstraint('lifelog_id', 'position', name='uq_lifelog_subsummary_position'),)
     
     def __repr__(self):
         return f"<Limitless_Lifelog_SubSummary(id={self.id}, lifelog_id='{self.lifelog_id}', content='{self.content[:30]}...')>"
 
+class Speaker(Base):
+    """
+    A person heard in Limitless transcripts.
+
+    Transcript lines reference their speaker by id; the spellings a speaker
+    appears under are kept in speaker_aliases (see speakers.py).
+    """
+    __tablename__ = 'speakers'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)  # Display name, the first spelling seen unless renamed
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    aliases = relationship("Speaker_Alias", back_populates="speaker", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<Speaker(id={self.id}, name='{self.name}')>"
+
+class Speaker_Alias(Base):
+    __tablename__ = 'speaker_aliases'
+
+    id = Column(Integer, primary_key=True)
+    alias = Column(String, unique=True, nullable=False)  # Normalized spelling (see speakers.alias_key())
+    speaker_id = Column(Integer, ForeignKey('speakers.id'), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    speaker = relationship("Speaker", back_populates="aliases")
+
+    def __repr__(self):
+        return f"<Speaker_Alias(alias='{self.alias}', speaker_id={self.speaker_id})>"
+
 class Limitless_Transcript_Line(Base):
     __tablename__ = 'limitless_transcript_lines'
     
     id = Column(Integer, primary_key=True)
     subsummary_id = Column(Integer, ForeignKey('limitless_lifelog_subsummaries.id'))  # Reference to parent subsummary
-    speaker = Column(String, nullable=True)  # Speaker name if available
+    speaker = Column(String, nullable=True)  # Speaker name if available, as written in the transcript
+    speaker_id = Column(Integer, ForeignKey('speakers.id'), nullable=True)  # Resolved speaker (see speakers.py)
     text = Column(Text, nullable=False)  # The actual transcript text
-    start_time = Column(String, nullable=True)  # Start time of this line in the original recording
-    end_time = Column(String, nullable=True)  # End time of this line in the original recording
+    start_time = Column(DateTime(timezone=True), nullable=True)  # Start time of this line in the original recording
+    end_time = Column(DateTime(timezone=True), nullable=True)  # End time of this line in the original recording
     position = Column(Integer, nullable=True)  # Position in the sequence of transcript lines
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship to parent subsummary
     subsummary = relationship("Limitless_Lifelog_SubSummary", foreign_keys=[subsummary_id], back_populates="transcript_lines")
     
-    __table_args__ = (UniqueConstraint('subsummary_id', 'position', name='uq_transcript_line_position'),)
+    __table_args__ = (
+        UniqueConstraint('subsummary_id', 'position', name='uq_transcript_line_position'),
+        # A speaker's lines in time order, read by speakers.get_speaker_lines()
+        Index('ix_transcript_lines_speaker_time', 'speaker_id', 'start_time', 'id'),
+        # Lines overlapping a time window, read by transcript_store.get_transcript_lines_between()
+        Index('ix_transcript_lines_start_time', 'start_time'),
+    )
     
     def __repr__(self):
         return f"<Limitless_Transcript_Line(id={self.id}, subsummary_id={self.subsummary_id}, speaker='{self.speaker if self.speaker else 'Unknown'}', text='{self.text[:30]}...')>"
 
+class Limitless_Transcript_Pack(Base):
+    """
+    All transcript lines of one subsummary in a single row.
+
+    The packed alternative to limitless_transcript_lines, written when
+    transcripts.storage is "packed" in config.yml. Read and write through
+    transcript_store.py, which handles both representations.
+    """
+    __tablename__ = 'limitless_transcript_packs'
+
+    subsummary_id = Column(Integer, ForeignKey('limitless_lifelog_subsummaries.id'), primary_key=True)
+    lines = Column(JSONB, nullable=False)  # [[speaker, text, start_time, end_time, speaker_id], ...] in position order
+    line_count = Column(Integer, nullable=False)
+    text = Column(Text, nullable=True)  # Text of every line, one per line, for full-text search
+    speaker_ids = Column(ARRAY(Integer), nullable=True)  # Resolved speakers of the lines (see speakers.py)
+    first_start_time = Column(DateTime(timezone=True), nullable=True)  # Earliest start time of a line
+    last_start_time = Column(DateTime(timezone=True), nullable=True)  # Latest start time of a line
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    subsummary = relationship("Limitless_Lifelog_SubSummary", back_populates="transcript_pack")
+
+    __table_args__ = (
+        # Packs holding a speaker's lines, read by transcript_store.read_speaker_lines()
+        Index('ix_transcript_packs_speaker_ids', 'speaker_ids', postgresql_using='gin'),
+        # Packs overlapping a time window, read by transcript_store.get_transcript_lines_between()
+        Index('ix_transcript_packs_start_time', 'first_start_time'),
+    )
+
+    def __repr__(self):
+        return f"<Limitless_Transcript_Pack(subsummary_id={self.subsummary_id}, line_count={self.line_count})>"
+
 class Weather_Data(Base):
     __tablename__ = 'weather_data'
     
@@ -170,6 +256,40 @@ class Billboard_Chart_Item(Base):
     def __repr__(self):
         return f"<Billboard_Chart_Item(chart={self.chart_name}, date={self.chart_date}, rank={self.item_rank}, title={self.title[:30]}..., artist={self.artist[:30]}...)>"
 
+# SQL version of netflix_parsing.is_series_episode() and extract_series_name():
+# the series a title belongs to, or NULL for titles that aren't series episodes.
+# Used by the generated netflix_history_items.series_key column.
+NETFLIX_SERIES_KEY_FUNCTION = r"""
+CREATE OR REPLACE FUNCTION netflix_series_key(title text) RETURNS text
+LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+DECLARE
+    base text := title;
+    keyword text;
+BEGIN
+    IF title IS NULL OR NOT (strpos(title, 'Episode ') > 0 OR strpos(title, 'Season ') > 0
+            OR strpos(title, 'Chapter ') > 0 OR strpos(title, ' Part ') > 0
+            OR strpos(title, 'Limited Series') > 0) THEN
+        RETURN NULL;
+    END IF;
+    -- Cut before the first episode keyword found (case-insensitive check, exact split)
+    FOREACH keyword IN ARRAY ARRAY[' Episode ', ' Season ', ' Chapter ', ' Part '] LOOP
+        IF strpos(lower(base), lower(keyword)) > 0 THEN
+            IF strpos(base, keyword) > 0 THEN
+                base := left(base, strpos(base, keyword) - 1);
+            END IF;
+            EXIT;
+        END IF;
+    END LOOP;
+    -- "Series: Season X: Episode Y"
+    IF strpos(base, ':') > 0 THEN
+        base := left(base, strpos(base, ':') - 1);
+    END IF;
+    base := replace(base, 'Limited Series', '');
+    RETURN regexp_replace(base, '^\s+|\s+$', '', 'g');
+END
+$$
+"""
+
 class Netflix_History_Item(Base):
     __tablename__ = 'netflix_history_items'
     
@@ -193,12 +313,84 @@ class Netflix_History_Item(Base):
     # Metadata
     imported_at = Column(DateTime, default=datetime.utcnow)  # When this record was imported
     
+    # Series the title belongs to (NULL for movies), computed by the database
+    series_key = Column(String, Computed("netflix_series_key(title)", persisted=True))
+    
     # Create a unique constraint on title and watch date to prevent duplicates
-    __table_args__ = (UniqueConstraint('title', 'watch_date', name='uq_netflix_history_title_date'),)
+    __table_args__ = (
+        UniqueConstraint('title', 'watch_date', name='uq_netflix_history_title_date'),
+        Index('ix_netflix_history_series_key', 'series_key', 'watch_date'),
+    )
     
     def __repr__(self):
         return f"<Netflix_History_Item(id={self.id}, title={self.title[:30]}..., watch_date={self.watch_date.strftime('%Y-%m-%d') if self.watch_date else 'None'})>"
 
+# The generated column needs the function to exist before the table is created
+event.listen(Netflix_History_Item.__table__, 'before_create', DDL(NETFLIX_SERIES_KEY_FUNCTION))
+
+class Netflix_Import_State(Base):
+    """
+    Last import of each Netflix profile's viewing history export.
+
+    Exports are cumulative, so the next import of a profile skips an unchanged
+    file and only processes the rows watched since max_watch_date.
+    """
+    __tablename__ = 'netflix_import_state'
+
+    profile = Column(String, primary_key=True)  # Netflix profile the export belongs to
+    source_file = Column(String, nullable=True)  # File name of the last imported export
+    file_sha256 = Column(String, nullable=False)  # Hash of the last imported export
+    row_count = Column(Integer, nullable=False)  # Data rows in the last imported export
+    max_watch_date = Column(DateTime, nullable=True)  # Latest watch date imported so far
+    imported_at = Column(DateTime, default=datetime.utcnow)  # When the last import completed
+
+    def __repr__(self):
+        return f"<Netflix_Import_State(profile={self.profile}, rows={self.row_count}, max_watch_date={self.max_watch_date})>"
+
+class Netflix_Series_Episode(Base):
+    """
+    Every series episode seen by an import, including those collapsed out of
+    netflix_history_items by series deduplication.
+
+    Source of the per-series aggregates in netflix_series_stats.
+    """
+    __tablename__ = 'netflix_series_episodes'
+
+    id = Column(Integer, primary_key=True)
+    series_key = Column(String, nullable=False)  # Series the episode belongs to (see netflix_series_key())
+    title = Column(String, nullable=False)  # Full Netflix title of the episode
+    watch_date = Column(DateTime, nullable=False)  # When the episode was watched
+
+    __table_args__ = (
+        UniqueConstraint('title', 'watch_date', name='uq_netflix_series_episode_title_date'),
+        Index('ix_netflix_series_episodes_series_key', 'series_key', 'watch_date'),
+    )
+
+    def __repr__(self):
+        return f"<Netflix_Series_Episode(series={self.series_key[:30]}, watch_date={self.watch_date})>"
+
+class Netflix_Series_Stats(Base):
+    """
+    Viewing aggregates per series, one row per series_key.
+
+    Recomputed for the series touched by each import by netflix_series_stats
+    and rebuilt from netflix_series_episodes with rebuild_series_stats().
+    """
+    __tablename__ = 'netflix_series_stats'
+
+    series_key = Column(String, primary_key=True)  # Series name
+    first_watch = Column(DateTime, nullable=False)  # Earliest watched episode
+    last_watch = Column(DateTime, nullable=False, index=True)  # Latest watched episode
+    episode_count = Column(Integer, nullable=False)  # Episodes watched
+    distinct_days = Column(Integer, nullable=False)  # Days with at least one episode
+    max_daily_episodes = Column(Integer, nullable=False)  # Most episodes watched on one day
+    longest_streak = Column(Integer, nullable=False)  # Most consecutive days with an episode
+    longest_streak_start = Column(Date, nullable=True)  # First day of the longest streak
+    updated_at = Column(DateTime, default=datetime.utcnow)  # When the row was last recomputed
+
+    def __repr__(self):
+        return f"<Netflix_Series_Stats(series={self.series_key[:30]}, episodes={self.episode_count}, streak={self.longest_streak})>"
+
 class Netflix_Title_Info(Base):
     """
     Additional information about Netflix titles from the Netflix API or other sources.
@@ -224,5 +416,158 @@ class Netflix_Title_Info(Base):
     def __repr__(self):
         return f"<Netflix_Title_Info(id={self.id}, title={self.title[:30]}..., type={self.content_type})>"
 
+class IMDB_Lookup_Cache(Base):
+    """
+    Cached IMDB API responses, including lookups that found nothing.
+
+    Managed by imdb_cache.IMDBLookupCache; rows expire after a TTL that is
+    shorter for misses than for hits.
+    """
+    __tablename__ = 'imdb_lookup_cache'
+    
+    id = Column(Integer, primary_key=True)
+    endpoint = Column(String, nullable=False)  # API method, e.g. "autocomplete" or "search"
+    search_key = Column(String, nullable=False)  # Normalized request parameters
+    is_hit = Column(Boolean, nullable=False)  # Whether the response contained any results
+    response = Column(Text, nullable=False)  # Raw API response as JSON
+    fetched_at = Column(DateTime, default=datetime.utcnow)  # When the API was called
+    expires_at = Column(DateTime, nullable=False)  # When the entry must be refreshed
+    
+    __table_args__ = (UniqueConstraint('endpoint', 'search_key', name='uq_imdb_lookup_cache_key'),)
+    
+    def __repr__(self):
+        return f"<IMDB_Lookup_Cache(endpoint={self.endpoint}, search_key={self.search_key[:30]}, hit={self.is_hit})>"
+
+class IMDB_Title(Base):
+    """
+    Titles from IMDb's public dataset files (title.basics.tsv, title.ratings.tsv).
+
+    Loaded by imdb_offline.load_imdb_dataset() and used to enrich Netflix titles
+    without calling the IMDB API. Episodes are not loaded.
+    """
+    __tablename__ = 'imdb_titles'
+
+    tconst = Column(String, primary_key=True)  # IMDB ID, e.g. "tt0903747"
+    title_type = Column(String, nullable=False)  # "movie", "tvSeries", "tvMiniSeries", ...
+    primary_title = Column(Text, nullable=True)
+    original_title = Column(Text, nullable=True)
+    normalized_title = Column(Text, nullable=True, index=True)  # Match key of primary_title
+    normalized_original_title = Column(Text, nullable=True, index=True)  # Match key of original_title
+    start_year = Column(Integer, nullable=True)
+    end_year = Column(Integer, nullable=True)
+    genres = Column(Text, nullable=True)  # Comma separated, as in the dataset
+    average_rating = Column(Float, nullable=True)  # From title.ratings.tsv
+    num_votes = Column(Integer, nullable=True)  # From title.ratings.tsv
+
+    def __repr__(self):
+        return f"<IMDB_Title(tconst={self.tconst}, title={(self.primary_title or '')[:30]}, type={self.title_type})>"
+
+class Daily_Activity(Base):
+    """
+    Per-day rollup of stored items, one row per day and source.
+
+    Kept up to date by the store functions in database_handler and rebuilt from
+    the source tables with database_handler.rebuild_daily_activity().
+    """
+    __tablename__ = 'daily_activity'
+    
+    day = Column(Date, primary_key=True)  # Calendar day of the item timestamps
+    source = Column(String, primary_key=True)  # "conversations", "facts", "lifelogs" or "netflix"
+    item_count = Column(Integer, nullable=False, default=0)  # Number of items on this day
+    first_at = Column(DateTime, nullable=True)  # Earliest item timestamp on this day
+    last_at = Column(DateTime, nullable=True)  # Latest item timestamp on this day
+    
+    def __repr__(self):
+        return f"<Daily_Activity(day={self.day}, source={self.source}, item_count={self.item_count})>"
+
+class Backfill_Checkpoint(Base):
+    """
+    Progress of each resumable backfill run by backfill.run_backfill().
+
+    Updated in the same transaction as every chunk the backfill writes, so an
+    interrupted run continues after last_key instead of starting over.
+    """
+    __tablename__ = 'backfill_checkpoints'
+
+    name = Column(String, primary_key=True)  # Backfill name, e.g. "fix_from_raw_data"
+    last_key = Column(String, nullable=True)  # Key of the last row of the last committed chunk
+    rows_processed = Column(Integer, nullable=False, default=0)  # Rows read by the current run
+    rows_updated = Column(Integer, nullable=False, default=0)  # Rows written by the current run
+    errors = Column(Integer, nullable=False, default=0)  # Rows whose transform raised an exception
+    started_at = Column(DateTime, default=datetime.utcnow)  # When the current run started
+    updated_at = Column(DateTime, default=datetime.utcnow)  # When the last chunk was committed
+    completed_at = Column(DateTime, nullable=True)  # Set once the run has visited every row
+
+    def __repr__(self):
+        return f"<Backfill_Checkpoint(name={self.name}, last_key={self.last_key}, completed_at={self.completed_at})>"
+
+class Related_Item(Base):
+    """
+    One precomputed nearest neighbour of a conversation or lifelog.
+
+    Written by related_index.py from the cosine similarity of TF-IDF vectors,
+    so /api/related/<type>/<id> is a primary key range read.
+    """
+    __tablename__ = 'related_items'
+
+    source_type = Column(String, primary_key=True)  # "conversation" or "lifelog"
+    source_id = Column(Integer, primary_key=True)  # bee_conversations.id or limitless_lifelogs.id
+    rank = Column(Integer, primary_key=True)  # 1 for the most similar item
+    related_type = Column(String, nullable=False)
+    related_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)  # Cosine similarity, between 0 and 1
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Lists that include a document, recomputed by related_index.update_index() when it is re-indexed
+        Index('ix_related_items_related', 'related_type', 'related_id'),
+    )
+
+    def __repr__(self):
+        return f"<Related_Item({self.source_type} {self.source_id} #{self.rank}: {self.related_type} {self.related_id}, score={self.score:.3f})>"
+
+class Related_Vector(Base):
+    """
+    TF-IDF vector of an indexed conversation or lifelog, in the vocabulary of related_index_state.
+
+    Incremental updates of related_index.py only vectorize new documents and
+    read the vectors sharing a term with them, found through the GIN index on
+    terms, instead of re-reading and re-vectorizing the whole corpus.
+    """
+    __tablename__ = 'related_vectors'
+
+    doc_type = Column(String, primary_key=True)  # "conversation" or "lifelog"
+    doc_id = Column(Integer, primary_key=True)  # bee_conversations.id or limitless_lifelogs.id
+    terms = Column(ARRAY(Integer), nullable=False)  # Vocabulary positions of the document's terms
+    weights = Column(ARRAY(Float), nullable=False)  # L2-normalized TF-IDF weight of each term
+
+    __table_args__ = (
+        Index('ix_related_vectors_terms', 'terms', postgresql_using='gin'),
+    )
+
+    def __repr__(self):
+        return f"<Related_Vector({self.doc_type} {self.doc_id}, terms={len(self.terms)})>"
+
+class Related_Index_State(Base):
+    """
+    Vocabulary and progress of the related-items index, a single row.
+
+    Incremental updates vectorize new documents with the stored vocabulary
+    and IDF weights, and only look at rows past the stored high-water marks.
+    """
+    __tablename__ = 'related_index_state'
+
+    id = Column(Integer, primary_key=True)  # Always 1
+    vocabulary = Column(JSONB, nullable=False)  # Terms; a term's vector column is its position
+    idf = Column(JSONB, nullable=False)  # Inverse document frequency of each vocabulary term
+    document_count = Column(Integer, nullable=False)  # Documents the vocabulary was built from
+    last_conversation_id = Column(Integer, nullable=True)  # Highest bee_conversations.id indexed
+    last_subsummary_id = Column(Integer, nullable=True)  # Highest limitless_lifelog_subsummaries.id indexed
+    built_at = Column(DateTime, default=datetime.utcnow)  # When the vocabulary was last rebuilt
+    updated_at = Column(DateTime, default=datetime.utcnow)  # When new documents were last indexed
+
+    def __repr__(self):
+        return f"<Related_Index_State(terms={len(self.vocabulary)}, documents={self.document_count}, updated_at={self.updated_at})>"
+
 # Create all tables in the database
 Base.metadata.create_all(engine)
\ No newline at end of file
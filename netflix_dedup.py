@@ -0,0 +1,157 @@
+"""
+Netflix Series Deduplication
+
+This module collapses every series in netflix_history_items to its earliest
+watched episode, inside the database.
+
+Each row's series comes from the generated series_key column (computed by the
+netflix_series_key() SQL function, see models.NETFLIX_SERIES_KEY_FUNCTION).
+Rows are ranked with ROW_NUMBER() OVER (PARTITION BY series_key ORDER BY
+watch_date, id) and everything after the first row of a series is removed
+with one DELETE statement. A dry run reports what would be removed with the
+same ranking.
+
+The importer collapses only the series touched by an import; the maintenance
+scripts collapse the whole table.
+"""
+
+import logging
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from models import engine
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Series listed in a dry-run report
+REPORT_SERIES_LIMIT = 20
+
+RANKED_SQL = (
+    "ranked AS (SELECT id, series_key, title, watch_date, "
+    "ROW_NUMBER() OVER (PARTITION BY series_key ORDER BY watch_date, id) AS position "
+    "FROM netflix_history_items WHERE series_key IS NOT NULL{series_filter})"
+)
+
+def _ranked(row_ids=None):
+    """The ranking CTE and its parameters, optionally limited to the series of some rows."""
+    if row_ids is None:
+        return RANKED_SQL.format(series_filter=""), {}
+    series_filter = (" AND series_key IN (SELECT series_key FROM netflix_history_items "
+                     "WHERE id = ANY(:row_ids) AND series_key IS NOT NULL)")
+    return RANKED_SQL.format(series_filter=series_filter), {"row_ids": list(row_ids)}
+
+def dedup_report(session, row_ids=None, limit=REPORT_SERIES_LIMIT):
+    """
+    Report what collapse_series would remove, without changing anything.
+
+    Args:
+        session: Database session
+        row_ids: Optional row ids; only the series of these rows are considered
+        limit: Number of series with the most removable episodes to list
+
+    Returns:
+        Dictionary with total_series, total_entries, entries_kept,
+        entries_removed and the listed series
+    """
+    ranked, params = _ranked(row_ids)
+    totals = session.execute(text(
+        f"WITH {ranked} SELECT count(DISTINCT series_key) AS series, "
+        f"count(*) FILTER (WHERE position > 1) AS removable FROM ranked"
+    ), params).one()
+    series = session.execute(text(
+        f"WITH {ranked} SELECT series_key, count(*) - 1 AS removable, "
+        f"min(title) FILTER (WHERE position = 1) AS kept_title, min(watch_date) AS kept_watch_date "
+        f"FROM ranked GROUP BY series_key HAVING count(*) > 1 "
+        f"ORDER BY removable DESC, series_key LIMIT :limit"
+    ), dict(params, limit=limit)).all()
+
+    return {
+        "total_series": totals.series,
+        "total_entries": session.execute(text("SELECT count(*) FROM netflix_history_items")).scalar(),
+        "entries_kept": totals.series,
+        "entries_removed": totals.removable,
+        "series": [{
+            "series": row.series_key,
+            "kept_title": row.kept_title,
+            "kept_watch_date": row.kept_watch_date.isoformat() if row.kept_watch_date else None,
+            "removable": row.removable
+        } for row in series]
+    }
+
+def collapse_series(session, row_ids=None):
+    """
+    Delete every episode but the earliest watched one of each series.
+
+    Runs in the caller's transaction; the caller commits.
+
+    Args:
+        session: Database session
+        row_ids: Optional row ids; only the series of these rows are collapsed
+
+    Returns:
+        List of (id, title) of the deleted rows
+    """
+    ranked, params = _ranked(row_ids)
+    return session.execute(text(
+        f"WITH {ranked} DELETE FROM netflix_history_items h USING ranked r "
+        f"WHERE h.id = r.id AND r.position > 1 RETURNING h.id, h.title"
+    ), params).all()
+
+def remove_orphaned_title_info(session, titles):
+    """
+    Delete title info of titles that no longer appear in the viewing history.
+
+    Returns:
+        Number of deleted title info rows
+    """
+    if not titles:
+        return 0
+    return session.execute(text(
+        "DELETE FROM netflix_title_info t WHERE t.title = ANY(:titles) "
+        "AND NOT EXISTS (SELECT 1 FROM netflix_history_items h WHERE h.title = t.title)"
+    ), {"titles": list(set(titles))}).rowcount
+
+def deduplicate_netflix_series(dry_run=False):
+    """
+    Collapse every series in the viewing history to its earliest watched episode.
+
+    Args:
+        dry_run: Only report what would be removed
+
+    Returns:
+        Dictionary with total_series, total_entries, entries_kept and
+        entries_removed (plus the largest series in a dry run)
+    """
+    from database_handler import rebuild_daily_activity
+
+    session = sessionmaker(bind=engine)()
+    try:
+        if dry_run:
+            return dedup_report(session)
+
+        total_entries = session.execute(text("SELECT count(*) FROM netflix_history_items")).scalar()
+        total_series = session.execute(text(
+            "SELECT count(DISTINCT series_key) FROM netflix_history_items WHERE series_key IS NOT NULL"
+        )).scalar()
+        removed = collapse_series(session)
+        title_info_removed = remove_orphaned_title_info(session, [title for _, title in removed])
+        session.commit()
+        logger.info(f"Removed {len(removed)} duplicate series episodes "
+                    f"and {title_info_removed} orphaned title info rows")
+
+        if removed:
+            # Deleted episodes change the per-day Netflix counts
+            rebuild_daily_activity(["netflix"])
+
+        return {
+            "total_series": total_series,
+            "total_entries": total_entries,
+            "entries_kept": total_series,
+            "entries_removed": len(removed)
+        }
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -8,12 +8,20 @@ and parsing it into the database.
 import os
 import csv
 import json
-import re
+import hashlib
 from datetime import datetime
 import logging
-from sqlalchemy import create_engine, exc
+from sqlalchemy import create_engine, exc, update, values, column, func, Integer, String
 from sqlalchemy.orm import sessionmaker, scoped_session
-from models import Netflix_History_Item, Netflix_Title_Info, Base
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models import Netflix_History_Item, Netflix_Title_Info, Netflix_Import_State, Base
+from database_handler import record_daily_activity, rebuild_daily_activity
+import netflix_dedup
+import netflix_series_stats
+import title_matcher
+# Title parsing lives in netflix_parsing; re-exported here for existing callers
+from netflix_parsing import (clean_special_characters, parse_date, parse_title, extract_series_name,
+                             is_series_episode, clean_title_for_search, parse_netflix_rows, try_parse_date)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -28,302 +36,468 @@ if not DATABASE_URL:
 engine = create_engine(DATABASE_URL)
 Session = scoped_session(sessionmaker(bind=engine))
 
-def clean_special_characters(title):
+# Profile name used when an import doesn't specify one
+DEFAULT_PROFILE = "default"
+
+def _csv_fingerprint(csv_file_path):
     """
-    Remove special characters from a title.
+    Hash a CSV file and count its data records in one pass.
     
-    Args:
-        title: Original title string
-        
     Returns:
-        Cleaned title string
+        Tuple of (SHA-256 hex digest, number of data records)
+    """
+    digest = hashlib.sha256()
+    records = 0
+    in_quotes = False
+    with open(csv_file_path, 'rb') as file:
+        for line in file:
+            digest.update(line)
+            # Quoted fields may span lines; a record ends on a line that closes all quotes
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes and line.strip():
+                records += 1
+    return digest.hexdigest(), max(0, records - 1)
+
+class NewRowFilter:
+    """
+    Selects the rows of a cumulative export that were watched since the last import.
+    
+    Netflix exports list the newest rows first, so once rows cross from newer
+    to older than the watermark in a newest-first file the rest of the file
+    is old as well and `exhausted` is set. Rows on the watermark day are kept because
+    dates have no time of day; they are deduplicated by the import. If the
+    file turns out not to be in newest-first order, every row is checked.
     """
-    if not title:
-        return title
+    
+    def __init__(self, watermark=None):
+        """
+        Initialize the filter
         
-    # Remove quotes if they exist
-    if title.startswith('"') and title.endswith('"'):
-        title = title[1:-1]
+        Args:
+            watermark: Latest watch date of the previous import (None keeps every row)
+        """
+        self.watermark = watermark
+        self.previous = None
+        self.newest_first = True
+        self.exhausted = False
+        self.max_watch_date = None
+    
+    def is_new(self, date_str):
+        """Whether a row with this date string should be imported."""
+        watch_date = try_parse_date(date_str)
+        if watch_date is None:
+            # Unparseable dates are left to the import's own handling
+            return True
+        if self.previous is not None and watch_date > self.previous:
+            self.newest_first = False
+        self.previous = watch_date
         
-    # Replace colons and other special characters with spaces
-    cleaned = re.sub(r'[:\-_]', ' ', title)
+        if self.watermark is not None and watch_date < self.watermark:
+            # A first row that is already old says nothing about the order yet
+            if self.newest_first and self.max_watch_date is not None:
+                self.exhausted = True
+            return False
+        if self.max_watch_date is None or watch_date > self.max_watch_date:
+            self.max_watch_date = watch_date
+        return True
+
+def _import_watermark(state, row_count, incremental):
+    """Watch date from which rows are imported, or None to import every row."""
+    if not incremental or state is None:
+        return None
+    if row_count < state.row_count:
+        # Not a continuation of the previous export (shorter than it was)
+        logger.warning(f"Export has fewer rows than the last import for profile '{state.profile}' "
+                       f"({row_count} < {state.row_count}), importing all rows")
+        return None
+    return state.max_watch_date
+
+def _save_import_state(session, profile, csv_file_path, file_sha256, row_count, max_watch_date):
+    """Record a completed import of a profile's export."""
+    stmt = pg_insert(Netflix_Import_State).values(
+        profile=profile,
+        source_file=os.path.basename(csv_file_path),
+        file_sha256=file_sha256,
+        row_count=row_count,
+        max_watch_date=max_watch_date,
+        imported_at=datetime.utcnow()
+    )
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=['profile'],
+        set_={
+            "source_file": stmt.excluded.source_file,
+            "file_sha256": stmt.excluded.file_sha256,
+            "row_count": stmt.excluded.row_count,
+            # greatest() ignores NULL, so an import without new rows keeps the watermark
+            "max_watch_date": func.greatest(Netflix_Import_State.max_watch_date, stmt.excluded.max_watch_date),
+            "imported_at": stmt.excluded.imported_at
+        }
+    ))
+    session.commit()
+
+def import_netflix_history(csv_file_path, deduplicate_series=True, profile=DEFAULT_PROFILE, incremental=True):
+    """
+    Import Netflix viewing history from a CSV file into the database.
     
-    # Replace multiple spaces with a single space
-    cleaned = re.sub(r'\s+', ' ', cleaned)
+    Imports are incremental per profile: a file identical to the profile's
+    last import is skipped, and otherwise only rows watched since the last
+    imported watch date are processed (see NewRowFilter).
     
-    # Trim leading/trailing whitespace
-    cleaned = cleaned.strip()
+    Args:
+        csv_file_path: Path to the Netflix viewing history CSV file
+        deduplicate_series: If True, only keep one episode per series
+        profile: Netflix profile the export belongs to
+        incremental: If False, process every row regardless of earlier imports
+        
+    Returns:
+        Dictionary with counts of processed, added, and skipped items
+    """
+    session = Session()
+    result = {"processed": 0, "added": 0, "skipped": 0, "deduplicated": 0, "cross_deduplicated": 0,
+              "title_info_removed": 0, "already_imported": 0, "unchanged_file": False}
     
-    return cleaned
-
-def parse_date(date_str):
-    """Parse date string from Netflix CSV to datetime object."""
     try:
-        return datetime.strptime(date_str, '%m/%d/%y')
-    except ValueError:
-        # Try alternative formats
-        try:
-            return datetime.strptime(date_str, '%m/%d/%Y')
-        except ValueError:
-            logger.warning(f"Could not parse date: {date_str}, using today's date")
-            return datetime.now()
-
-def parse_title(title):
-    """
-    Parse Netflix title to extract show name, season, and episode information.
-    
-    Returns a dictionary with keys:
-        - show_name: The name of the show (if applicable)
-        - season: Season information (if applicable)
-        - episode_name: Episode name (if applicable)
-        - episode_number: Episode number (if applicable)
-    """
-    # Initialize result with empty values
-    result = {
-        'show_name': None,
-        'season': None,
-        'episode_name': None,
-        'episode_number': None
-    }
-    
-    # Check if title has quotes - usually indicates a movie
-    if title.startswith('"') and title.endswith('"'):
-        # Remove quotes from title
-        clean_title = title[1:-1]
-        
-        # Common patterns for TV shows
-        # Pattern: "Show Name: Season X: Episode Name"
-        season_episode_pattern = r'^(.*?):\s*(Season\s*\d+):\s*(.*)$'
-        # Pattern: "Show Name: Limited Series: Episode Name"
-        limited_series_pattern = r'^(.*?):\s*(Limited Series):\s*(.*)$'
-        # Pattern: "Show Name: Episode X"
-        episode_pattern = r'^(.*?):\s*(Episode\s*\d+)$'
-        
-        # Try to match season and episode pattern
-        match = re.match(season_episode_pattern, clean_title)
-        if match:
-            result['show_name'] = match.group(1).strip()
-            result['season'] = match.group(2).strip()
-            result['episode_name'] = match.group(3).strip()
-            
-            # Try to extract episode number if it exists in the episode name
-            ep_num_match = re.search(r'Episode\s*(\d+)', result['episode_name'])
-            if ep_num_match:
-                result['episode_number'] = ep_num_match.group(1)
+        # Check if file exists
+        if not os.path.exists(csv_file_path):
+            logger.error(f"File not found: {csv_file_path}")
             return result
         
-        # Try to match limited series pattern
-        match = re.match(limited_series_pattern, clean_title)
-        if match:
-            result['show_name'] = match.group(1).strip()
-            result['season'] = match.group(2).strip()  # "Limited Series"
-            result['episode_name'] = match.group(3).strip()
+        file_sha256, row_count = _csv_fingerprint(csv_file_path)
+        state = session.get(Netflix_Import_State, profile)
+        if incremental and state is not None and state.file_sha256 == file_sha256:
+            logger.info(f"{csv_file_path} is unchanged since the last import for profile '{profile}', skipping")
+            result["unchanged_file"] = True
             return result
+        row_filter = NewRowFilter(_import_watermark(state, row_count, incremental))
         
-        # Try to match simple episode pattern
-        match = re.match(episode_pattern, clean_title)
-        if match:
-            result['show_name'] = match.group(1).strip()
-            result['episode_number'] = re.search(r'\d+', match.group(2)).group(0)
-            return result
+        # Read CSV file; the title and date columns are parsed in one batch below
+        titles = []
+        date_strings = []
+        with open(csv_file_path, 'r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            
+            for row in reader:
+                title = row.get('Title', '')
+                date_str = row.get('Date', '')
+                
+                if not title or not date_str:
+                    result["processed"] += 1
+                    logger.warning(f"Missing title or date in row: {row}")
+                    result["skipped"] += 1
+                    continue
+                
+                if not row_filter.is_new(date_str):
+                    if row_filter.exhausted:
+                        break
+                    continue
+                result["processed"] += 1
+                titles.append(title)
+                date_strings.append(date_str)
+        result["already_imported"] = row_count - result["processed"]
+        if row_filter.watermark is not None:
+            logger.info(f"Processing {result['processed']} of {row_count} rows watched since "
+                        f"{row_filter.watermark.strftime('%Y-%m-%d')} for profile '{profile}'")
         
-        # If no patterns match, just use the entire title
-        return result
+        # Parse dates and titles, then insert and collapse series in the database
+        rebuild_needed = _store_history_entries(session, parse_netflix_rows(titles, date_strings),
+                                                deduplicate_series, result, _last_history_id(session))
+        session.commit()
+        if rebuild_needed:
+            rebuild_daily_activity(["netflix"])
+        _save_import_state(session, profile, csv_file_path, file_sha256, row_count, row_filter.max_watch_date)
+        logger.info(f"Import completed: {result['processed']} processed, {result['added']} added, " +
+                   f"{result['skipped']} skipped, {result['deduplicated']} deduplicated")
+            
+    except Exception as e:
+        logger.error(f"Error importing Netflix history: {str(e)}")
+        session.rollback()
+    finally:
+        session.close()
     
-    # Not in quotes - might be a movie or simple format
     return result
 
-def extract_series_name(title):
+# Default chunk size (rows) and checkpoint file suffix for streaming imports
+STREAM_CHUNK_SIZE = 5000
+CHECKPOINT_SUFFIX = ".import-checkpoint.json"
+
+def iter_csv_records(file, start_offset=None):
     """
-    Extract the base series name from a title with episode information.
+    Read CSV records from a binary file, tracking byte offsets.
+    
+    Quoted fields may contain newlines, so physical lines are joined until the
+    quotes of a record are balanced.
     
     Args:
-        title: Original Netflix title with episode information
+        file: File opened in binary mode
+        start_offset: Optional byte offset to resume from (must be a record boundary)
         
-    Returns:
-        Base series name without episode/season information
+    Yields:
+        (header, fields, end_offset) for each data record, where end_offset is the
+        byte offset just after the record
     """
-    # Remove episode indicators
-    base_title = title
-    
-    # Try to extract series name before episode indicators
-    episode_keywords = [" Episode ", " Season ", " Chapter ", " Part "]
-    for keyword in episode_keywords:
-        if keyword.lower() in base_title.lower():
-            base_title = base_title.split(keyword, 1)[0]
+    header = None
+    pending = b''
+    while True:
+        line = file.readline()
+        if not line:
             break
+        pending += line
+        if pending.count(b'"') % 2:
+            # Record continues on the next line
+            continue
+        record, pending = pending, b''
+        fields = next(csv.reader([record.decode('utf-8').rstrip('\r\n')]), [])
+        
+        if header is None:
+            header = [field.lstrip('\ufeff') for field in fields]
+            if start_offset:
+                file.seek(start_offset)
+            continue
+        if fields:
+            yield header, fields, file.tell()
+
+def _file_fingerprint(csv_file_path):
+    """Identify a CSV file by its size and a hash of its first 64 KiB."""
+    with open(csv_file_path, 'rb') as file:
+        head = hashlib.sha256(file.read(65536)).hexdigest()
+    return {"size": os.path.getsize(csv_file_path), "head_sha256": head}
+
+def _load_checkpoint(checkpoint_path, fingerprint, deduplicate_series):
+    """Load a streaming import checkpoint if it belongs to this file and mode."""
+    if not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with open(checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable checkpoint {checkpoint_path}: {str(e)}")
+        return None
+    if checkpoint.get("fingerprint") != fingerprint or checkpoint.get("deduplicate_series") != deduplicate_series:
+        logger.warning(f"Checkpoint {checkpoint_path} belongs to a different file or mode, starting over")
+        return None
+    return checkpoint
+
+def _save_checkpoint(checkpoint_path, fingerprint, deduplicate_series, offset, result, max_watch_date=None,
+                     last_stored_id=None, rebuild_needed=False):
+    """Atomically write a streaming import checkpoint."""
+    checkpoint = {
+        "fingerprint": fingerprint,
+        "deduplicate_series": deduplicate_series,
+        "offset": offset,
+        "result": result,
+        "max_watch_date": max_watch_date.isoformat() if max_watch_date else None,
+        "last_stored_id": last_stored_id,
+        "rebuild_needed": rebuild_needed,
+        "saved_at": datetime.now().isoformat()
+    }
+    temp_path = checkpoint_path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, checkpoint_path)
+
+def _insert_history_entries(session, entries):
+    """
+    Bulk insert parsed history entries, ignoring ones already stored.
+    
+    Returns:
+        Ids of the inserted rows
+    """
+    if not entries:
+        return []
+    rows = [{
+        "title": entry["cleaned_title"],
+        "watch_date": entry["watch_date"],
+        "show_name": entry["parsed_title"]["show_name"],
+        "season": entry["parsed_title"]["season"],
+        "episode_name": entry["parsed_title"]["episode_name"],
+        "episode_number": entry["parsed_title"]["episode_number"]
+    } for entry in entries]
+    return session.scalars(
+        pg_insert(Netflix_History_Item).values(rows)
+        .on_conflict_do_nothing(constraint='uq_netflix_history_title_date')
+        .returning(Netflix_History_Item.id)
+    ).all()
+
+def _last_history_id(session):
+    """Highest netflix_history_items id, 0 for an empty table; rows inserted later have higher ids."""
+    return session.query(func.max(Netflix_History_Item.id)).scalar() or 0
+
+def _store_history_entries(session, entries, deduplicate_series, result, last_stored_id):
+    """
+    Insert parsed entries, collapse the series they belong to and update the
+    daily activity and series statistics rollups, in the caller's transaction.
     
-    # Also handle format like "Series_Name: Season X: Episode Y"
-    if ":" in base_title:
-        base_title = base_title.split(":", 1)[0]
+    Series are collapsed in the database (see netflix_dedup), so the earliest
+    watched episode of a series is kept whether it was stored before or comes
+    from this import. Title info of titles that no longer appear in the
+    history is removed with the rows.
     
-    # Handle "Limited Series" indicator
-    if "Limited Series" in base_title:
-        base_title = base_title.replace("Limited Series", "").strip()
+    Args:
+        session: Database session
+        entries: Parsed history entries
+        deduplicate_series: Collapse the series the entries belong to
+        result: Import counts, updated in place
+        last_stored_id: Highest history id before the import started; rows
+            above it were added by this import, possibly by an earlier chunk
     
-    return base_title.strip()
+    Returns:
+        True if rows committed before (stored earlier or by an earlier chunk)
+        were removed, so the caller has to rebuild the daily activity rollup
+        after committing
+    """
+    ids = _insert_history_entries(session, entries)
+    result["skipped"] += len(entries) - len(ids)
+    # Log the episodes before collapsing removes them from the history
+    touched_series = netflix_series_stats.record_series_episodes(session, ids)
+    
+    removed_committed = False
+    if deduplicate_series and ids:
+        new_ids = set(ids)
+        removed = netflix_dedup.collapse_series(session, ids)
+        removed_ids = {row.id for row in removed}
+        # Rows of an earlier chunk of this import were counted as added then
+        removed_earlier_chunks = {row_id for row_id in removed_ids - new_ids if row_id > last_stored_id}
+        # New episodes not kept, and stored episodes replaced by an earlier one from this import
+        result["deduplicated"] += len(removed_ids & new_ids) + len(removed_earlier_chunks)
+        result["cross_deduplicated"] += len(removed_ids - new_ids - removed_earlier_chunks)
+        result["added"] -= len(removed_earlier_chunks)
+        removed_committed = bool(removed_ids - new_ids)
+        ids = [row_id for row_id in ids if row_id not in removed_ids]
+        result["title_info_removed"] += netflix_dedup.remove_orphaned_title_info(
+            session, [row.title for row in removed])
+    
+    record_daily_activity(session, "netflix", ids)
+    netflix_series_stats.refresh_series_stats(session, touched_series)
+    result["added"] += len(ids)
+    return removed_committed
 
-def is_series_episode(title):
+def _process_stream_chunk(session, titles, date_strings, deduplicate_series, result, last_stored_id):
     """
-    Check if a title appears to be an episode of a TV series.
+    Parse, store and commit one chunk of rows.
     
-    Args:
-        title: The title to check
-        
     Returns:
-        True if it appears to be a series episode, False otherwise
+        True if the daily activity rollup needs a rebuild (see _store_history_entries)
     """
-    episode_indicators = ["Episode ", "Season ", "Chapter ", " Part ", "Limited Series"]
-    return any(indicator in title for indicator in episode_indicators)
+    rebuild_needed = _store_history_entries(session, parse_netflix_rows(titles, date_strings),
+                                            deduplicate_series, result, last_stored_id)
+    session.commit()
+    return rebuild_needed
 
-def import_netflix_history(csv_file_path, deduplicate_series=True):
+def import_netflix_history_streaming(csv_file_path, deduplicate_series=True, chunk_size=STREAM_CHUNK_SIZE,
+                                     checkpoint_path=None, profile=DEFAULT_PROFILE, incremental=True):
     """
-    Import Netflix viewing history from a CSV file into the database.
+    Import Netflix viewing history in bounded memory with resumable progress.
+    
+    The CSV is read in chunks of chunk_size rows. Each chunk is parsed,
+    inserted and committed before the next one is read, and the series it
+    touches are collapsed to their earliest episode in the database, so the
+    importer holds no per-series state.
+    
+    After every chunk a checkpoint with the byte offset and the counts is
+    written next to the CSV. Running the import again on the
+    same file resumes from the checkpoint; it is removed once the import
+    completes.
+    
+    Like import_netflix_history, imports are incremental per profile and
+    reading stops at the first row imported before.
     
     Args:
         csv_file_path: Path to the Netflix viewing history CSV file
         deduplicate_series: If True, only keep one episode per series
+        chunk_size: Number of rows parsed and committed together
+        checkpoint_path: Optional checkpoint file (default: CSV path + CHECKPOINT_SUFFIX)
+        profile: Netflix profile the export belongs to
+        incremental: If False, process every row regardless of earlier imports
         
     Returns:
         Dictionary with counts of processed, added, and skipped items
     """
-    session = Session()
-    result = {"processed": 0, "added": 0, "skipped": 0, "deduplicated": 0, "cross_deduplicated": 0}
+    result = {"processed": 0, "added": 0, "skipped": 0, "deduplicated": 0, "cross_deduplicated": 0,
+              "title_info_removed": 0, "already_imported": 0, "unchanged_file": False}
+    
+    if not os.path.exists(csv_file_path):
+        logger.error(f"File not found: {csv_file_path}")
+        return result
     
+    checkpoint_path = checkpoint_path or csv_file_path + CHECKPOINT_SUFFIX
+    fingerprint = _file_fingerprint(csv_file_path)
+    offset = None
+    resumed_max_watch_date = None
+    last_stored_id = None
+    rebuild_needed = False
+    
+    checkpoint = _load_checkpoint(checkpoint_path, fingerprint, deduplicate_series)
+    if checkpoint:
+        offset = checkpoint["offset"]
+        result.update(checkpoint["result"])
+        last_stored_id = checkpoint.get("last_stored_id")
+        rebuild_needed = checkpoint.get("rebuild_needed", False)
+        if checkpoint.get("max_watch_date"):
+            resumed_max_watch_date = datetime.fromisoformat(checkpoint["max_watch_date"])
+        logger.info(f"Resuming import of {csv_file_path} at byte {offset} "
+                    f"({result['processed']} rows already processed)")
+    
+    session = Session()
     try:
-        # Check if file exists
-        if not os.path.exists(csv_file_path):
-            logger.error(f"File not found: {csv_file_path}")
+        file_sha256, row_count = _csv_fingerprint(csv_file_path)
+        state = session.get(Netflix_Import_State, profile)
+        if incremental and state is not None and state.file_sha256 == file_sha256:
+            logger.info(f"{csv_file_path} is unchanged since the last import for profile '{profile}', skipping")
+            result["unchanged_file"] = True
             return result
+        row_filter = NewRowFilter(_import_watermark(state, row_count, incremental))
+        row_filter.max_watch_date = resumed_max_watch_date
+        if last_stored_id is None:
+            last_stored_id = _last_history_id(session)
         
-        # Dictionary to track series episodes for deduplication
-        # Key: series_name, Value: list of (title, watch_date) tuples
-        series_episodes = {}
-        
-        # Track series that are already in the database
-        existing_series = set()
-        if deduplicate_series:
-            # Query the database for all existing series
-            all_history = session.query(Netflix_History_Item).all()
-            for item in all_history:
-                if item.show_name and is_series_episode(item.title):
-                    existing_series.add(item.show_name)
-            logger.info(f"Found {len(existing_series)} existing series in the database")
-            
-        # Read CSV file and gather data
-        all_entries = []
-        with open(csv_file_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            
-            for row in reader:
-                result["processed"] += 1
+        titles = []
+        date_strings = []
+        with open(csv_file_path, 'rb') as file:
+            for header, fields, end_offset in iter_csv_records(file, offset):
+                row = dict(zip(header, fields))
+                title = row.get('Title', '')
+                date_str = row.get('Date', '')
                 
-                # Parse date and title
-                try:
-                    title = row.get('Title', '')
-                    date_str = row.get('Date', '')
-                    
-                    if not title or not date_str:
-                        logger.warning(f"Missing title or date in row: {row}")
-                        result["skipped"] += 1
-                        continue
-                    
-                    watch_date = parse_date(date_str)
-                    parsed_title = parse_title(title)
-                    
-                    # Clean title by removing special characters
-                    cleaned_title = clean_special_characters(title)
-                    
-                    # Check if this entry already exists in the database
-                    existing = session.query(Netflix_History_Item).filter(
-                        Netflix_History_Item.title == cleaned_title,
-                        Netflix_History_Item.watch_date == watch_date
-                    ).first()
-                    
-                    if existing:
-                        logger.debug(f"Skipping duplicate entry: {cleaned_title} on {date_str}")
-                        result["skipped"] += 1
-                        continue
-                    
-                    # Check for cross-import deduplication:
-                    # If this is a series episode, and we already have an episode from this series
-                    # in the database, skip it
-                    if deduplicate_series and is_series_episode(cleaned_title):
-                        series_name = extract_series_name(cleaned_title)
-                        if series_name in existing_series:
-                            logger.info(f"Skipping {cleaned_title} - Series '{series_name}' already in database")
-                            result["cross_deduplicated"] += 1
-                            continue
-                    
-                    # Store entry for processing
-                    all_entries.append({
-                        'original_title': title,
-                        'cleaned_title': cleaned_title,
-                        'watch_date': watch_date,
-                        'parsed_title': parsed_title
-                    })
-                    
-                    # If this is a series episode and deduplication is enabled, group by series name
-                    if deduplicate_series and is_series_episode(cleaned_title):
-                        series_name = extract_series_name(cleaned_title)
-                        if series_name not in series_episodes:
-                            series_episodes[series_name] = []
-                        
-                        series_episodes[series_name].append({
-                            'original_title': title,
-                            'cleaned_title': cleaned_title,
-                            'watch_date': watch_date,
-                            'parsed_title': parsed_title
-                        })
-                    
-                except Exception as e:
-                    logger.error(f"Error processing row: {row} - Error: {str(e)}")
+                if not title or not date_str:
+                    result["processed"] += 1
+                    logger.warning(f"Missing title or date in row: {row}")
                     result["skipped"] += 1
-        
-        # Process entries with deduplication
-        entries_to_add = []
-        if deduplicate_series:
-            # Process non-series entries first
-            for entry in all_entries:
-                if not is_series_episode(entry['cleaned_title']):
-                    entries_to_add.append(entry)
-            
-            # For each series, only keep the first episode (by watch date)
-            for series_name, episodes in series_episodes.items():
-                if episodes:
-                    # Sort by watch date (oldest first)
-                    episodes.sort(key=lambda x: x['watch_date'])
-                    # Keep only the first episode of each series
-                    entries_to_add.append(episodes[0])
-                    # Count skipped episodes
-                    result["deduplicated"] += len(episodes) - 1
-                    logger.info(f"Keeping 1 episode out of {len(episodes)} for series '{series_name}'")
-        else:
-            # No deduplication, add all entries
-            entries_to_add = all_entries
-        
-        # Add the final entries to the database
-        for entry in entries_to_add:
-            # Create new history item
-            history_item = Netflix_History_Item(
-                title=entry['cleaned_title'],
-                watch_date=entry['watch_date'],
-                show_name=entry['parsed_title']['show_name'],
-                season=entry['parsed_title']['season'],
-                episode_name=entry['parsed_title']['episode_name'],
-                episode_number=entry['parsed_title']['episode_number']
-            )
+                elif row_filter.is_new(date_str):
+                    result["processed"] += 1
+                    titles.append(title)
+                    date_strings.append(date_str)
+                elif row_filter.exhausted:
+                    # Newest-first export: the rest was imported before
+                    break
+                
+                if len(titles) >= chunk_size:
+                    rebuild_needed |= _process_stream_chunk(session, titles, date_strings, deduplicate_series,
+                                                            result, last_stored_id)
+                    _save_checkpoint(checkpoint_path, fingerprint, deduplicate_series, end_offset, result,
+                                     row_filter.max_watch_date, last_stored_id, rebuild_needed)
+                    logger.info(f"Committed chunk ending at byte {end_offset}: {result}")
+                    titles = []
+                    date_strings = []
             
-            session.add(history_item)
-            result["added"] += 1
+            if titles:
+                rebuild_needed |= _process_stream_chunk(session, titles, date_strings, deduplicate_series,
+                                                        result, last_stored_id)
+            _save_checkpoint(checkpoint_path, fingerprint, deduplicate_series, file.tell(), result,
+                             row_filter.max_watch_date, last_stored_id, rebuild_needed)
+        result["already_imported"] = row_count - result["processed"]
         
-        # Commit changes
-        session.commit()
+        # Once per import: chunks only update the rollup for the rows they add
+        if rebuild_needed:
+            rebuild_daily_activity(["netflix"])
+        
+        _save_import_state(session, profile, csv_file_path, file_sha256, row_count, row_filter.max_watch_date)
+        os.remove(checkpoint_path)
         logger.info(f"Import completed: {result['processed']} processed, {result['added']} added, " +
                    f"{result['skipped']} skipped, {result['deduplicated']} deduplicated")
-            
+    
     except Exception as e:
-        logger.error(f"Error importing Netflix history: {str(e)}")
+        logger.error(f"Error importing Netflix history (progress saved in {checkpoint_path}): {str(e)}")
         session.rollback()
     finally:
         session.close()
@@ -407,208 +581,261 @@ def save_netflix_history_to_json(output_dir='data/netflix', debug_mode=False):
     finally:
         session.close()
 
-def clean_title_for_search(title):
+# Enrichment defaults: concurrent lookups, provider requests per second, titles per database write
+ENRICH_CONCURRENCY = 5
+IMDB_RATE_LIMIT = 2.0
+ENRICH_WRITE_BATCH_SIZE = 50
+
+# Autocomplete results ranked per lookup
+AUTOCOMPLETE_CANDIDATES = 10
+
+def search_variations(search_term):
     """
-    Clean and normalize a Netflix title for better IMDB search results.
-    Removes episode indicators, special characters, and handles possessive forms.
-    Special handling for popular TV series to improve match rate.
+    Alternative search terms to try when the cleaned title finds nothing.
     
     Args:
-        title: Original Netflix title
-    
+        search_term: Cleaned search term
+        
     Returns:
-        Cleaned title string optimized for IMDB search
-    """
-    # First, remove quotes if they exist
-    if title.startswith('"') and title.endswith('"'):
-        title = title[1:-1]
-    
-    # Check for popular TV series with exact matching
-    popular_shows = {
-        "Game of Thrones": ["Game of Thrones", "GoT"],
-        "Stranger Things": ["Stranger Things"],
-        "The Crown": ["The Crown"],
-        "Breaking Bad": ["Breaking Bad"],
-        "The Witcher": ["The Witcher"],
-        "Money Heist": ["Money Heist", "La Casa de Papel"],
-        "Bridgerton": ["Bridgerton"],
-        "The Queen's Gambit": ["The Queens Gambit", "Queens Gambit"]
-    }
+        List of variations in the order they should be tried
+    """
+    variations = []
     
-    # Check if the title starts with any of the popular show names
-    for show_name, search_terms in popular_shows.items():
-        for term in search_terms:
-            if title.startswith(term):
-                return show_name
+    # Try without "The" prefix if it exists
+    if search_term.startswith("The "):
+        variations.append(search_term[4:])
     
-    # Standard cleaning for other titles
-    # Extract show name without episode info (split by colon)
-    base_title = title.split(':')[0] if ':' in title else title
+    # Try with "The" prefix if it doesn't exist and isn't too long
+    if not search_term.startswith("The ") and len(search_term.split()) <= 3:
+        variations.append("The " + search_term)
+        
+    # Try with apostrophe for possessive nouns (Queens → Queen's)
+    if "s " in search_term:
+        variations.append(search_term.replace("s ", "'s "))
+    
+    return variations
+
+async def lookup_imdb_title(api, search_term, want_series=None, year=None, latest_year=None):
+    """
+    Find the best IMDB match for a search term, trying variations if needed.
+    
+    The autocomplete results are ranked with title_matcher rather than taken
+    in API order, and variations are only tried when no result is a
+    confident match.
     
-    # Remove anything after "Episode" or "Season" keywords
-    episode_keywords = [" Episode ", " Season ", " Chapter ", " Part "]
-    for keyword in episode_keywords:
-        if keyword.lower() in base_title.lower():
-            base_title = base_title.split(keyword, 1)[0]
+    Args:
+        api: IMDBAPI client
+        search_term: Cleaned search term
+        want_series: True if episodes were watched, False for a movie, None if unknown
+        year: Release year written in the Netflix title, if any
+        latest_year: Year the title was first watched; later releases can't match
+        
+    Returns:
+        The matching IMDB result dictionary with its "matchConfidence", or None
+        if nothing was found
+    """
+    for term in [search_term] + search_variations(search_term):
+        if term != search_term:
+            logger.info(f"Trying variation: {term}")
+        response = await api.autocomplete_search(term, max_results=AUTOCOMPLETE_CANDIDATES)
+        candidate, confidence = title_matcher.best_match(search_term, response.get("results") or [], want_series,
+                                                         year=year, latest_year=latest_year)
+        if candidate:
+            return dict(candidate, matchConfidence=confidence)
+    
+    return None
+
+def title_info_from_result(title, search_result):
+    """
+    Build the Netflix_Title_Info column values for an IMDB search result.
     
-    # Also handle episode indicators with numbers like "- E01" or "S01E01"
-    base_title = re.sub(r'\s+-\s+[Ee]\d+.*$', '', base_title)  # Remove "- E01" pattern
-    base_title = re.sub(r'\s+[Ss]\d+[Ee]\d+.*$', '', base_title)  # Remove "S01E01" pattern
+    Returns:
+        Dictionary of column values
+    """
+    content_type = "SERIES" if search_result.get("type") in ["tvSeries", "tvMiniSeries"] else "MOVIE"
+    release_year = None
+    if "startYear" in search_result:
+        try:
+            release_year = int(search_result.get("startYear", 0))
+        except (ValueError, TypeError):
+            pass
+    
+    return {
+        "title": title,
+        "content_type": content_type,
+        "imdb_id": search_result.get("id"),
+        "release_year": release_year,
+        "imdb_score": search_result.get("averageRating"),
+        "raw_data": json.dumps(search_result)
+    }
+
+def write_title_enrichments(session, enrichments):
+    """
+    Store a batch of enrichments in one transaction.
     
-    # Handle special cases before removing all special characters
-    # Convert possessive form to regular form (Queen's → Queens)
-    base_title = base_title.replace("'s", "s")
+    Inserts the Netflix_Title_Info rows and updates the content type and
+    release year of every history item with those titles.
     
-    # Remove special characters, keeping only alphanumeric and spaces
-    cleaned = re.sub(r'[^\w\s]', '', base_title)
+    Args:
+        session: Database session
+        enrichments: List of dictionaries from title_info_from_result
+    """
+    if not enrichments:
+        return
+    
+    session.execute(
+        pg_insert(Netflix_Title_Info).values(enrichments).on_conflict_do_nothing(index_elements=['title'])
+    )
+    
+    # One set-based UPDATE ... FROM (VALUES ...) for every title in the batch
+    history = Netflix_History_Item.__table__
+    enriched = values(
+        column('title', String), column('content_type', String), column('release_year', Integer),
+        name='enriched'
+    ).data([(info["title"], info["content_type"], info["release_year"] or None) for info in enrichments])
+    session.execute(
+        update(history)
+        .where(history.c.title == enriched.c.title)
+        .values(
+            content_type=enriched.c.content_type,
+            # Keep the existing year when IMDB has none, like the per-title update did
+            release_year=func.coalesce(enriched.c.release_year, history.c.release_year)
+        )
+    )
+    session.commit()
+
+def pending_title_groups(session, limit=None):
+    """
+    Find the titles without title info, grouped by IMDB search term.
     
-    # Remove extra spaces and trim
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    All episodes of a series share one search term, so each group needs a
+    single lookup.
     
-    # Remove "Limited Series" and similar suffixes
-    suffixes_to_remove = ["Limited Series", "The Complete Series", "The Series"]
-    for suffix in suffixes_to_remove:
-        if cleaned.endswith(suffix):
-            cleaned = cleaned[:-(len(suffix))].strip()
+    Args:
+        session: Database session
+        limit: Optional maximum number of groups to return
     
-    return cleaned
+    Returns:
+        Tuple of (number of pending titles, list of (search term, titles,
+        first watched year) groups); the year is None when no title has a
+        watch date
+    """
+    # Titles in the history without title info and when each was first watched, found in one query
+    query = session.query(Netflix_History_Item.title, func.min(Netflix_History_Item.watch_date)).outerjoin(
+        Netflix_Title_Info, Netflix_Title_Info.title == Netflix_History_Item.title
+    ).filter(Netflix_Title_Info.id.is_(None)).group_by(Netflix_History_Item.title)
+    titles_to_process = query.all()
+    
+    groups = {}
+    for title, first_watched in titles_to_process:
+        titles, years = groups.setdefault(clean_title_for_search(title), ([], []))
+        titles.append(title)
+        if first_watched:
+            years.append(first_watched.year)
+    groups = [(search_term, titles, min(years) if years else None)
+              for search_term, (titles, years) in groups.items()]
+    
+    # Apply limit if specified
+    if limit and limit > 0:
+        groups = groups[:limit]
+    return len(titles_to_process), groups
 
-async def enrich_netflix_title_data(limit=None):
+async def enrich_netflix_title_data(limit=None, concurrency=ENRICH_CONCURRENCY, rate_limit=IMDB_RATE_LIMIT,
+                                    write_batch_size=ENRICH_WRITE_BATCH_SIZE, use_cache=True):
     """
     Enrich Netflix title data using the IMDB API.
     
     Looks up each Netflix title in the IMDB database using the autocomplete search
     and updates the Netflix_Title_Info table with IMDB data.
     
+    Titles are grouped by their search term (all episodes of a series share
+    one), and each group is resolved with a single lookup whose result is
+    applied to every title in the group.
+    
+    Lookups run in a pool of `concurrency` workers that share one provider rate
+    limit, so throughput is bounded by the API quota rather than by request
+    latency. Results are written to the database in batches.
+    
     Args:
-        limit: Optional maximum number of titles to process (default: None, process all)
+        limit: Optional maximum number of lookups (title groups) to run (default: None, all)
+        concurrency: Number of titles looked up at the same time
+        rate_limit: Maximum IMDB requests per second across all workers (None or 0 for no limit)
+        write_batch_size: Number of enriched titles written per transaction
+        use_cache: Check the persistent IMDB lookup cache before calling the API
     
     Returns:
-        Dictionary with counts of processed, enriched, and skipped items
+        Dictionary with counts of processed, enriched, and skipped titles and
+        the number of lookups
     """
-    from imdb_api import IMDBAPI
+    from imdb_api import IMDBAPI, AsyncRateLimiter
+    from imdb_cache import IMDBLookupCache
     import asyncio
     
-    # Initialize API client
-    api = IMDBAPI()
     session = Session()
-    result = {"processed": 0, "enriched": 0, "skipped": 0}
+    result = {"processed": 0, "enriched": 0, "skipped": 0, "lookups": 0}
     
     try:
-        # Query Netflix history items without enriched data
-        query = session.query(Netflix_History_Item.title).distinct()
-        
-        # Check which titles already have info
-        existing_info = session.query(Netflix_Title_Info.title).all()
-        existing_titles = [info[0] for info in existing_info]
-        
-        # Filter out titles that already have info
-        all_titles = [item[0] for item in query.all()]
-        titles_to_process = [title for title in all_titles if title not in existing_titles]
+        # Group titles by search term so each series is looked up once
+        title_count, groups = pending_title_groups(session, limit)
         
-        # Apply limit if specified
-        if limit and limit > 0:
-            titles_to_process = titles_to_process[:limit]
+        logger.info(f"Found {title_count} Netflix titles to enrich in {len(groups)} search groups "
+                    f"({concurrency} workers, rate limit {rate_limit or 'none'} requests/s)")
         
-        logger.info(f"Found {len(titles_to_process)} Netflix titles to enrich")
+        queue = asyncio.Queue()
+        for group in groups:
+            queue.put_nowait(group)
+        pending = []
         
-        # Process each title
-        for title in titles_to_process:
-            result["processed"] += 1
-            
+        def flush():
+            # Runs without awaiting, so workers can't interleave with the write
+            batch = pending[:]
+            pending.clear()
             try:
-                # Clean the title for better search results
-                search_term = clean_title_for_search(title)
-                logger.info(f"Searching IMDB for: {search_term} (from {title})")
-                
-                # Try autocomplete search first
-                search_success = False
-                search_result = None
-                
-                # Initial search with cleaned term
-                autocomplete_result = await api.autocomplete_search(search_term, max_results=5)
-                
-                if "results" in autocomplete_result and autocomplete_result["results"]:
-                    search_result = autocomplete_result["results"][0]  # Take the first/best match
-                    search_success = True
-                else:
-                    # Try variations if original search failed
-                    variations = []
-                    
-                    # Try without "The" prefix if it exists
-                    if search_term.startswith("The "):
-                        variations.append(search_term[4:])
-                    
-                    # Try with "The" prefix if it doesn't exist and isn't too long
-                    if not search_term.startswith("The ") and len(search_term.split()) <= 3:
-                        variations.append("The " + search_term)
-                        
-                    # Try with apostrophe for possessive nouns (Queens → Queen's)
-                    if "s " in search_term:
-                        variation = search_term.replace("s ", "'s ")
-                        variations.append(variation)
-                        
-                    # Try each variation
-                    for variation in variations:
-                        logger.info(f"Trying variation: {variation}")
-                        var_result = await api.autocomplete_search(variation, max_results=5)
-                        
-                        if "results" in var_result and var_result["results"]:
-                            search_result = var_result["results"][0]  # Take the first/best match
-                            search_success = True
-                            break
-                
-                if search_success and search_result:
-                    # Create new title info record
-                    imdb_id = search_result.get("id")
-                    primary_title = search_result.get("primaryTitle", "")
-                    content_type = "SERIES" if search_result.get("type") in ["tvSeries", "tvMiniSeries"] else "MOVIE"
-                    
-                    title_info = Netflix_Title_Info(
-                        title=title,
-                        content_type=content_type,
-                        imdb_id=imdb_id,
-                        raw_data=json.dumps(search_result)
-                    )
-                    
-                    # Add release year if available
-                    if "startYear" in search_result:
-                        try:
-                            title_info.release_year = int(search_result.get("startYear", 0))
-                        except (ValueError, TypeError):
-                            pass
-                    
-                    session.add(title_info)
-                    result["enriched"] += 1
-                    
-                    # Update all Netflix history items with this title
-                    history_items = session.query(Netflix_History_Item).filter(
-                        Netflix_History_Item.title == title
-                    ).all()
-                    
-                    for item in history_items:
-                        item.content_type = content_type
-                        if title_info.release_year:
-                            item.release_year = title_info.release_year
-                    
-                    # Commit after each successful enrichment to avoid losing progress
-                    session.commit()
-                    logger.info(f"Enriched: {title} → {primary_title} ({imdb_id})")
-                
-                else:
-                    logger.warning(f"No IMDB match found for: {title}")
-                    result["skipped"] += 1
-                
-                # Add a small delay to avoid rate limiting
-                await asyncio.sleep(0.5)
-                
+                write_title_enrichments(session, batch)
+                result["enriched"] += len(batch)
             except Exception as e:
-                logger.error(f"Error enriching title {title}: {str(e)}")
-                result["skipped"] += 1
+                logger.error(f"Error writing {len(batch)} enriched titles: {str(e)}")
                 session.rollback()
+                result["skipped"] += len(batch)
+        
+        async def worker(api):
+            while True:
+                try:
+                    search_term, titles, first_watched_year = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result["processed"] += len(titles)
+                result["lookups"] += 1
+                try:
+                    logger.info(f"Searching IMDB for: {search_term} ({len(titles)} titles, e.g. {titles[0]})")
+                    want_series = any(is_series_episode(title) for title in titles)
+                    search_result = await lookup_imdb_title(api, search_term, want_series,
+                                                            year=title_matcher.title_year(titles),
+                                                            latest_year=first_watched_year)
+                    
+                    if search_result:
+                        pending.extend(title_info_from_result(title, search_result) for title in titles)
+                        logger.info(f"Enriched {len(titles)} titles: {search_term} → "
+                                    f"{search_result.get('primaryTitle', '')} ({search_result.get('id')})")
+                        if len(pending) >= write_batch_size:
+                            flush()
+                    else:
+                        logger.warning(f"No IMDB match found for: {search_term} ({len(titles)} titles)")
+                        result["skipped"] += len(titles)
+                except Exception as e:
+                    logger.error(f"Error enriching {search_term}: {str(e)}")
+                    result["skipped"] += len(titles)
+        
+        rate_limiter = AsyncRateLimiter(rate_limit) if rate_limit else None
+        cache = IMDBLookupCache() if use_cache else None
+        async with IMDBAPI(rate_limiter=rate_limiter, cache=cache) as api:
+            await asyncio.gather(*[worker(api) for _ in range(max(1, concurrency))])
+        flush()
+        if cache:
+            logger.info(f"IMDB lookup cache: {cache.stats}")
         
         logger.info(f"Title enrichment completed: {result['processed']} processed, "
-                  f"{result['enriched']} enriched, {result['skipped']} skipped")
+                  f"{result['enriched']} enriched, {result['skipped']} skipped, {result['lookups']} lookups")
         
     except Exception as e:
         logger.error(f"Error during title enrichment process: {str(e)}")
@@ -618,6 +845,68 @@ async def enrich_netflix_title_data(limit=None):
     
     return result
 
+OFFLINE_BATCH_SIZE = 1000
+
+def enrich_netflix_title_data_offline(limit=None, batch_size=OFFLINE_BATCH_SIZE):
+    """
+    Enrich Netflix title data from the offline IMDb dataset.
+    
+    Works like enrich_netflix_title_data but matches the title groups against
+    the imdb_titles table (see imdb_offline.load_imdb_dataset) instead of the
+    IMDB API, so no network access is needed. Groups are matched and written
+    in batches.
+    
+    Args:
+        limit: Optional maximum number of title groups to match (default: None, all)
+        batch_size: Number of title groups matched and written per transaction
+    
+    Returns:
+        Dictionary with counts of processed, enriched, and skipped titles and
+        the number of lookups
+    """
+    import imdb_offline
+    
+    session = Session()
+    result = {"processed": 0, "enriched": 0, "skipped": 0, "lookups": 0}
+    
+    try:
+        if not imdb_offline.has_imdb_dataset(session):
+            logger.error("The IMDb dataset is not loaded; load title.basics.tsv first")
+            return result
+        
+        title_count, groups = pending_title_groups(session, limit)
+        logger.info(f"Found {title_count} Netflix titles to enrich offline in {len(groups)} search groups")
+        
+        for start in range(0, len(groups), batch_size):
+            batch = groups[start:start + batch_size]
+            enrichments = []
+            for (search_term, titles, _), match in zip(batch, imdb_offline.match_title_groups(session, batch)):
+                result["processed"] += len(titles)
+                result["lookups"] += 1
+                if match:
+                    enrichments.extend(title_info_from_result(title, match) for title in titles)
+                else:
+                    logger.debug(f"No IMDb dataset match found for: {search_term} ({len(titles)} titles)")
+                    result["skipped"] += len(titles)
+            try:
+                write_title_enrichments(session, enrichments)
+                result["enriched"] += len(enrichments)
+            except Exception as e:
+                logger.error(f"Error writing {len(enrichments)} enriched titles: {str(e)}")
+                session.rollback()
+                result["skipped"] += len(enrichments)
+        
+        logger.info(f"Offline title enrichment completed: {result['processed']} processed, "
+                    f"{result['enriched']} enriched, {result['skipped']} skipped")
+        
+    except Exception as e:
+        logger.error(f"Error during offline title enrichment: {str(e)}")
+        session.rollback()
+    finally:
+        session.close()
+    
+    return result
+
 def main(csv_file_path, debug_mode=False):
     """
     Import Netflix viewing history from CSV and save to JSON.
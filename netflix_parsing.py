@@ -0,0 +1,337 @@
+"""
+Netflix Title Parsing
+
+This module holds the title and date parsing used by the Netflix importer and
+the Netflix maintenance scripts. It has no database dependency.
+
+The per-row functions (clean_special_characters, parse_title,
+extract_series_name, is_series_episode, parse_date, clean_title_for_search)
+keep the exact behaviour they had in netflix_importer, but use precompiled
+patterns and memoize their results.
+
+parse_netflix_rows() parses a whole CSV column of titles and dates at once. It
+works on the distinct titles and dates only (episodes of a series and all
+titles watched on one day repeat), and uses pandas for the string cleaning
+when it is installed, falling back to the standard library otherwise.
+"""
+
+import re
+import logging
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Size of the memoization caches (distinct titles in a large viewing history)
+CACHE_SIZE = 65536
+
+# Colons, dashes and underscores become spaces and whitespace runs collapse to
+# one space; a single pass over the combined character class does both
+SPECIAL_CHARACTERS_RE = re.compile(r'[\s:\-_]+')
+
+# Title patterns for quoted titles
+SEASON_EPISODE_RE = re.compile(r'^(.*?):\s*(Season\s*\d+):\s*(.*)$')      # "Show: Season X: Episode"
+LIMITED_SERIES_RE = re.compile(r'^(.*?):\s*(Limited Series):\s*(.*)$')    # "Show: Limited Series: Episode"
+EPISODE_RE = re.compile(r'^(.*?):\s*(Episode\s*\d+)$')                    # "Show: Episode X"
+EPISODE_NUMBER_RE = re.compile(r'Episode\s*(\d+)')
+NUMBER_RE = re.compile(r'\d+')
+
+# Series detection
+SERIES_NAME_KEYWORDS = [(keyword, keyword.lower()) for keyword in [" Episode ", " Season ", " Chapter ", " Part "]]
+EPISODE_INDICATORS = ["Episode ", "Season ", "Chapter ", " Part ", "Limited Series"]
+
+# Search title cleaning
+SEARCH_EPISODE_KEYWORDS = [(keyword, keyword.lower()) for keyword in [" Episode ", " Season ", " Chapter ", " Part "]]
+DASH_EPISODE_RE = re.compile(r'\s+-\s+[Ee]\d+.*$')     # "- E01"
+SEASON_EPISODE_CODE_RE = re.compile(r'\s+[Ss]\d+[Ee]\d+.*$')  # "S01E01"
+NON_WORD_RE = re.compile(r'[^\w\s]')
+WHITESPACE_RE = re.compile(r'\s+')
+SEARCH_SUFFIXES = ["Limited Series", "The Complete Series", "The Series"]
+
+# Popular TV series matched by prefix for better IMDB search results
+POPULAR_SHOWS = {
+    "Game of Thrones": ["Game of Thrones", "GoT"],
+    "Stranger Things": ["Stranger Things"],
+    "The Crown": ["The Crown"],
+    "Breaking Bad": ["Breaking Bad"],
+    "The Witcher": ["The Witcher"],
+    "Money Heist": ["Money Heist", "La Casa de Papel"],
+    "Bridgerton": ["Bridgerton"],
+    "The Queen's Gambit": ["The Queens Gambit", "Queens Gambit"]
+}
+
+def clean_special_characters(title):
+    """
+    Remove special characters from a title.
+
+    Args:
+        title: Original title string
+
+    Returns:
+        Cleaned title string
+    """
+    if not title:
+        return title
+    return _clean_special_characters(title)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _clean_special_characters(title):
+    # Remove quotes if they exist
+    if title.startswith('"') and title.endswith('"'):
+        title = title[1:-1]
+    return SPECIAL_CHARACTERS_RE.sub(' ', title).strip()
+
+def parse_date(date_str):
+    """Parse date string from Netflix CSV to datetime object."""
+    parsed = _parse_date(date_str)
+    if parsed is None:
+        logger.warning(f"Could not parse date: {date_str}, using today's date")
+        return datetime.now()
+    return parsed
+
+def try_parse_date(date_str):
+    """Parse date string from Netflix CSV, returning None if it can't be parsed."""
+    return _parse_date(date_str)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_date(date_str):
+    # Failures return None so the "today" fallback is never cached
+    for date_format in ('%m/%d/%y', '%m/%d/%Y'):
+        try:
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            continue
+    return None
+
+def parse_title(title):
+    """
+    Parse Netflix title to extract show name, season, and episode information.
+
+    Returns a dictionary with keys:
+        - show_name: The name of the show (if applicable)
+        - season: Season information (if applicable)
+        - episode_name: Episode name (if applicable)
+        - episode_number: Episode number (if applicable)
+    """
+    # Cached results are shared, so hand out a copy
+    return dict(_parse_title(title))
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_title(title):
+    result = {
+        'show_name': None,
+        'season': None,
+        'episode_name': None,
+        'episode_number': None
+    }
+
+    # Only quoted titles are parsed; unquoted ones might be a movie or simple format
+    if not (title.startswith('"') and title.endswith('"')):
+        return result
+
+    clean_title = title[1:-1]
+
+    match = SEASON_EPISODE_RE.match(clean_title)
+    if match:
+        result['show_name'] = match.group(1).strip()
+        result['season'] = match.group(2).strip()
+        result['episode_name'] = match.group(3).strip()
+
+        # Extract episode number if it exists in the episode name
+        ep_num_match = EPISODE_NUMBER_RE.search(result['episode_name'])
+        if ep_num_match:
+            result['episode_number'] = ep_num_match.group(1)
+        return result
+
+    match = LIMITED_SERIES_RE.match(clean_title)
+    if match:
+        result['show_name'] = match.group(1).strip()
+        result['season'] = match.group(2).strip()  # "Limited Series"
+        result['episode_name'] = match.group(3).strip()
+        return result
+
+    match = EPISODE_RE.match(clean_title)
+    if match:
+        result['show_name'] = match.group(1).strip()
+        result['episode_number'] = NUMBER_RE.search(match.group(2)).group(0)
+        return result
+
+    # If no patterns match, just use the entire title
+    return result
+
+@lru_cache(maxsize=CACHE_SIZE)
+def extract_series_name(title):
+    """
+    Extract the base series name from a title with episode information.
+
+    Args:
+        title: Original Netflix title with episode information
+
+    Returns:
+        Base series name without episode/season information
+    """
+    base_title = title
+
+    # Extract series name before the first episode indicator found
+    lowered = base_title.lower()
+    for keyword, keyword_lower in SERIES_NAME_KEYWORDS:
+        if keyword_lower in lowered:
+            base_title = base_title.split(keyword, 1)[0]
+            break
+
+    # Also handle format like "Series_Name: Season X: Episode Y"
+    if ":" in base_title:
+        base_title = base_title.split(":", 1)[0]
+
+    # Handle "Limited Series" indicator
+    if "Limited Series" in base_title:
+        base_title = base_title.replace("Limited Series", "").strip()
+
+    return base_title.strip()
+
+def is_series_episode(title):
+    """
+    Check if a title appears to be an episode of a TV series.
+
+    Args:
+        title: The title to check
+
+    Returns:
+        True if it appears to be a series episode, False otherwise
+    """
+    return any(indicator in title for indicator in EPISODE_INDICATORS)
+
+def clean_title_for_search(title):
+    """
+    Clean and normalize a Netflix title for better IMDB search results.
+    Removes episode indicators, special characters, and handles possessive forms.
+    Special handling for popular TV series to improve match rate.
+
+    The result only depends on the show prefix (the text before the first
+    colon), so it is memoized per prefix and shared by all episodes of a series.
+
+    Args:
+        title: Original Netflix title
+
+    Returns:
+        Cleaned title string optimized for IMDB search
+    """
+    # First, remove quotes if they exist
+    if title.startswith('"') and title.endswith('"'):
+        title = title[1:-1]
+    return _clean_search_prefix(title.split(':', 1)[0])
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _clean_search_prefix(base_title):
+    # The popular show names contain no colon, so matching them against the
+    # prefix is the same as matching them against the whole title
+    for show_name, search_terms in POPULAR_SHOWS.items():
+        for term in search_terms:
+            if base_title.startswith(term):
+                return show_name
+
+    # Remove anything after "Episode" or "Season" keywords
+    for keyword, keyword_lower in SEARCH_EPISODE_KEYWORDS:
+        if keyword_lower in base_title.lower():
+            base_title = base_title.split(keyword, 1)[0]
+
+    # Also handle episode indicators with numbers like "- E01" or "S01E01"
+    base_title = DASH_EPISODE_RE.sub('', base_title)
+    base_title = SEASON_EPISODE_CODE_RE.sub('', base_title)
+
+    # Convert possessive form to regular form (Queen's → Queens)
+    base_title = base_title.replace("'s", "s")
+
+    # Remove special characters, keeping only alphanumeric and spaces
+    cleaned = NON_WORD_RE.sub('', base_title)
+    cleaned = WHITESPACE_RE.sub(' ', cleaned).strip()
+
+    # Remove "Limited Series" and similar suffixes
+    for suffix in SEARCH_SUFFIXES:
+        if cleaned.endswith(suffix):
+            cleaned = cleaned[:-(len(suffix))].strip()
+
+    return cleaned
+
+def _clean_titles_stdlib(titles):
+    """Clean distinct titles and flag series episodes with the standard library."""
+    cleaned = [clean_special_characters(title) for title in titles]
+    return cleaned, [is_series_episode(title) for title in cleaned]
+
+def _clean_titles_pandas(titles):
+    """Clean distinct titles and flag series episodes with vectorized pandas string operations."""
+    series = pd.Series(titles, dtype=object)
+    quoted = series.str.startswith('"') & series.str.endswith('"')
+    series = series.where(~quoted, series.str[1:-1])
+    series = series.str.replace(SPECIAL_CHARACTERS_RE, ' ', regex=True).str.strip()
+
+    is_series = pd.Series(False, index=series.index)
+    for indicator in EPISODE_INDICATORS:
+        is_series |= series.str.contains(indicator, regex=False)
+    return series.tolist(), is_series.tolist()
+
+def parse_netflix_rows(titles, date_strings, use_pandas=None):
+    """
+    Parse a column of Netflix titles and watch dates in one batch.
+
+    For every row this returns the same values the importer used to compute
+    with the per-row functions: the cleaned title, the parsed title parts, the
+    watch date, whether the cleaned title is a series episode and its series
+    name. Titles and dates must be non-empty strings.
+
+    Args:
+        titles: List of titles as read from the CSV
+        date_strings: List of date strings as read from the CSV
+        use_pandas: Use pandas for string cleaning (default: when installed)
+
+    Returns:
+        List of dictionaries with keys original_title, cleaned_title, watch_date,
+        parsed_title, is_series and series_name
+    """
+    if use_pandas is None:
+        use_pandas = pd is not None
+    if use_pandas and pd is None:
+        raise ImportError("pandas is not installed")
+
+    # Work on distinct values only: titles and dates repeat across rows
+    distinct_titles = list(dict.fromkeys(titles))
+    if use_pandas:
+        cleaned, is_series = _clean_titles_pandas(distinct_titles)
+    else:
+        cleaned, is_series = _clean_titles_stdlib(distinct_titles)
+
+    by_title = {}
+    for title, cleaned_title, series_flag in zip(distinct_titles, cleaned, is_series):
+        by_title[title] = (
+            cleaned_title,
+            _parse_title(title),
+            series_flag,
+            extract_series_name(cleaned_title) if series_flag else None
+        )
+    dates = {date_str: parse_date(date_str) for date_str in dict.fromkeys(date_strings)}
+
+    rows = []
+    for title, date_str in zip(titles, date_strings):
+        cleaned_title, parsed_title, series_flag, series_name = by_title[title]
+        rows.append({
+            'original_title': title,
+            'cleaned_title': cleaned_title,
+            'watch_date': dates[date_str],
+            'parsed_title': dict(parsed_title),
+            'is_series': series_flag,
+            'series_name': series_name
+        })
+    return rows
+
+def clear_caches():
+    """Clear the memoization caches (used by the benchmark for cold runs)."""
+    for cached in (_clean_special_characters, _parse_date, _parse_title,
+                   extract_series_name, _clean_search_prefix):
+        cached.cache_clear()
@@ -0,0 +1,168 @@
+"""
+Netflix Series Statistics
+
+This module maintains netflix_series_stats, the per-series viewing aggregates
+(first and last watch, episode count, distinct days, most episodes in a day and
+the longest streak of consecutive days).
+
+Series deduplication keeps only the earliest episode of a series in
+netflix_history_items, so imports also log every episode they see in
+netflix_series_episodes. After each import the stats of the touched series are
+recomputed from that log in one statement; the longest streak is found with
+the gaps-and-islands technique (consecutive days minus their row number are
+constant within a streak).
+"""
+
+import logging
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from models import engine, Netflix_Series_Stats
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Orderings accepted by get_series_stats
+SORT_COLUMNS = {
+    "last_watch": Netflix_Series_Stats.last_watch.desc(),
+    "first_watch": Netflix_Series_Stats.first_watch.desc(),
+    "episodes": Netflix_Series_Stats.episode_count.desc(),
+    "days": Netflix_Series_Stats.distinct_days.desc(),
+    "streak": Netflix_Series_Stats.longest_streak.desc(),
+    "binge": Netflix_Series_Stats.max_daily_episodes.desc(),
+    "series": Netflix_Series_Stats.series_key.asc()
+}
+
+REFRESH_SQL = """
+WITH days AS (
+    SELECT series_key, watch_date::date AS day, count(*) AS episodes,
+           min(watch_date) AS first_watch, max(watch_date) AS last_watch
+    FROM netflix_series_episodes{series_filter}
+    GROUP BY series_key, watch_date::date
+), islands AS (
+    SELECT series_key, day,
+           day - (ROW_NUMBER() OVER (PARTITION BY series_key ORDER BY day))::int AS island
+    FROM days
+), streaks AS (
+    SELECT DISTINCT ON (series_key) series_key, count(*) AS length, min(day) AS start_day
+    FROM islands
+    GROUP BY series_key, island
+    ORDER BY series_key, count(*) DESC, min(day)
+)
+INSERT INTO netflix_series_stats (series_key, first_watch, last_watch, episode_count, distinct_days,
+                                  max_daily_episodes, longest_streak, longest_streak_start, updated_at)
+SELECT d.series_key, min(d.first_watch), max(d.last_watch), sum(d.episodes), count(*),
+       max(d.episodes), s.length, s.start_day, now() AT TIME ZONE 'utc'
+FROM days d JOIN streaks s ON s.series_key = d.series_key
+GROUP BY d.series_key, s.length, s.start_day
+ON CONFLICT (series_key) DO UPDATE SET
+    first_watch = EXCLUDED.first_watch,
+    last_watch = EXCLUDED.last_watch,
+    episode_count = EXCLUDED.episode_count,
+    distinct_days = EXCLUDED.distinct_days,
+    max_daily_episodes = EXCLUDED.max_daily_episodes,
+    longest_streak = EXCLUDED.longest_streak,
+    longest_streak_start = EXCLUDED.longest_streak_start,
+    updated_at = EXCLUDED.updated_at
+"""
+
+def record_series_episodes(session, ids=None):
+    """
+    Log the series episodes among stored history rows in netflix_series_episodes.
+
+    Must run before series deduplication deletes any of the rows. Runs in the
+    caller's transaction.
+
+    Args:
+        session: Database session
+        ids: Ids of netflix_history_items rows (default: the whole table)
+
+    Returns:
+        Series keys that gained episodes
+    """
+    if ids is not None and not ids:
+        return []
+    row_filter = " AND id = ANY(:ids)" if ids is not None else ""
+    rows = session.execute(text(
+        f"INSERT INTO netflix_series_episodes (series_key, title, watch_date) "
+        f"SELECT series_key, title, watch_date FROM netflix_history_items "
+        f"WHERE series_key IS NOT NULL{row_filter} "
+        f"ON CONFLICT (title, watch_date) DO NOTHING RETURNING series_key"
+    ), {"ids": list(ids)} if ids is not None else {}).scalars().all()
+    return sorted(set(rows))
+
+def refresh_series_stats(session, series_keys=None):
+    """
+    Recompute netflix_series_stats rows from the episode log.
+
+    Runs in the caller's transaction.
+
+    Args:
+        session: Database session
+        series_keys: Series to recompute (default: all)
+    """
+    if series_keys is not None and not series_keys:
+        return
+    series_filter = " WHERE series_key = ANY(:series_keys)" if series_keys is not None else ""
+    session.execute(text(REFRESH_SQL.format(series_filter=series_filter)),
+                    {"series_keys": list(series_keys)} if series_keys is not None else {})
+
+def rebuild_series_stats():
+    """
+    Log every series episode currently in the viewing history and recompute
+    all series statistics.
+
+    Episodes already removed by series deduplication before the episode log
+    existed can only be restored by re-importing the export with a full import.
+
+    Returns:
+        Number of series with statistics
+    """
+    session = sessionmaker(bind=engine)()
+    try:
+        added = record_series_episodes(session)
+        session.execute(text("DELETE FROM netflix_series_stats"))
+        refresh_series_stats(session)
+        session.commit()
+        count = session.query(Netflix_Series_Stats).count()
+        logger.info(f"Rebuilt statistics for {count} series ({len(added)} series gained logged episodes)")
+        return count
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error rebuilding Netflix series stats: {str(e)}")
+        raise
+    finally:
+        session.close()
+
+def get_series_stats(session, sort="last_watch", limit=50, offset=0):
+    """
+    Read a page of series statistics.
+
+    Args:
+        session: Database session
+        sort: Key of SORT_COLUMNS
+        limit: Maximum number of series
+        offset: Number of series to skip
+
+    Returns:
+        (total number of series, list of Netflix_Series_Stats)
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort '{sort}', expected one of: {', '.join(SORT_COLUMNS)}")
+    query = session.query(Netflix_Series_Stats)
+    rows = query.order_by(SORT_COLUMNS[sort], Netflix_Series_Stats.series_key).limit(limit).offset(offset).all()
+    return query.count(), rows
+
+def format_series_stats(stats):
+    """Convert a Netflix_Series_Stats row to a JSON-serializable dictionary."""
+    return {
+        "series": stats.series_key,
+        "first_watch": stats.first_watch.isoformat(),
+        "last_watch": stats.last_watch.isoformat(),
+        "episode_count": stats.episode_count,
+        "distinct_days": stats.distinct_days,
+        "episodes_per_day": round(stats.episode_count / stats.distinct_days, 2) if stats.distinct_days else 0,
+        "max_daily_episodes": stats.max_daily_episodes,
+        "longest_streak": stats.longest_streak,
+        "longest_streak_start": stats.longest_streak_start.isoformat() if stats.longest_streak_start else None
+    }
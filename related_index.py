@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+"""
+Related Conversations and Lifelogs Index
+
+This script precomputes, for every Bee conversation and Limitless lifelog, the
+most similar other conversations and lifelogs, and stores them in the
+related_items table. /api/related/<type>/<id> then only reads a stored list;
+no similarity is computed on request.
+
+Documents are conversation summaries with their key takeaways, and lifelog
+titles with their subsummaries. Each becomes a TF-IDF vector (sublinear term
+frequency, smoothed IDF, L2-normalized) in a SciPy sparse matrix, and the
+neighbours are the highest cosine similarities, found a block of rows at a
+time with a sparse matrix product.
+
+A rebuild builds the vocabulary and IDF weights from all documents, stores
+every document vector in related_vectors and recomputes every list. Later runs
+are incremental: only the documents past the stored high-water marks (new
+conversations, and lifelogs with new subsummaries) are read and vectorized,
+with the stored vocabulary. They are compared with the stored vectors that
+share a term with them (the only ones that can score above zero), get their
+own lists and are merged into the lists of existing documents they now rank
+in. The lists that already included a re-indexed document (a lifelog with new
+subsummaries) hold its old score, so they are recomputed from the stored
+vectors sharing a term with them. Once the corpus has grown by REBUILD_GROWTH since the vocabulary was
+built, the next run rebuilds instead.
+
+NumPy and SciPy are needed to build the index (not to read it); they are the
+"related" extra in pyproject.toml.
+
+Usage:
+    python related_index.py            # index what was added since the last run
+    python related_index.py --rebuild  # rebuild the vocabulary and every list
+"""
+
+import re
+import sys
+import math
+import logging
+import argparse
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models import (engine, Bee_Conversation, Limitless_Lifelog, Limitless_Lifelog_SubSummary,
+                    Related_Item, Related_Vector, Related_Index_State)
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DOCUMENT_TYPES = ("conversation", "lifelog")
+
+# Neighbours stored per document
+TOP_K = 10
+
+# Less similar items are not worth showing
+MIN_SCORE = 0.05
+
+# Terms in fewer documents than MIN_DF, or in more than MAX_DF of them, carry no signal
+MIN_DF = 2
+MAX_DF = 0.5
+
+# Rows compared per sparse product; each block densifies to BLOCK_SIZE x documents floats
+BLOCK_SIZE = 256
+
+# Rebuild the vocabulary once the corpus has grown by this fraction
+REBUILD_GROWTH = 0.25
+
+# Rows per related_items insert
+WRITE_BATCH = 5000
+
+# Characters of a conversation summary shown for a related conversation
+SNIPPET_LENGTH = 160
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9']+")
+
+STOP_WORDS = frozenset("""
+about above after again against all also and any are because been before being below between both but
+can could did does doing down during each few for from further had has have having her here hers herself
+him himself his how into its itself just more most myself nor not now off once only other our ours
+ourselves out over own same she should some such than that the their theirs them themselves then there
+these they this those through too under until very was were what when where which while who whom why
+will with would you your yours yourself yourselves
+""".split())
+
+def _require_numpy():
+    if np is None or sparse is None:
+        raise ImportError("Building the related index needs numpy and scipy (pip install numpy scipy, "
+                          "or install the \"related\" extra)")
+
+def tokenize(text):
+    """
+    Terms of a document.
+
+    Args:
+        text: Document text
+
+    Returns:
+        List of lowercased words of three or more characters, without stop words
+    """
+    return [token for token in TOKEN_RE.findall(text.lower()) if len(token) > 2 and token not in STOP_WORDS]
+
+def load_documents(connection, conversation_ids=None, lifelog_ids=None):
+    """
+    Tokenized documents to index.
+
+    Args:
+        connection: Database connection
+        conversation_ids: Optional conversation ids to load (default: all)
+        lifelog_ids: Optional lifelog ids to load (default: all with subsummaries)
+
+    Returns:
+        List of ((document type, id), tokens) pairs, skipping documents without terms
+    """
+    documents = []
+
+    if conversation_ids is None or conversation_ids:
+        query = select(Bee_Conversation.id, Bee_Conversation.summary, Bee_Conversation.key_takeaways)
+        if conversation_ids is not None:
+            query = query.where(Bee_Conversation.id.in_(conversation_ids))
+        for conversation_id, summary, key_takeaways in connection.execute(query.order_by(Bee_Conversation.id)):
+            points = key_takeaways if isinstance(key_takeaways, list) else []
+            tokens = tokenize(" ".join([summary or ""] + [str(point) for point in points]))
+            if tokens:
+                documents.append((("conversation", conversation_id), tokens))
+
+    if lifelog_ids is None or lifelog_ids:
+        query = (
+            select(Limitless_Lifelog.id, Limitless_Lifelog.title,
+                   func.string_agg(Limitless_Lifelog_SubSummary.content, ' '))
+            .join(Limitless_Lifelog_SubSummary, Limitless_Lifelog_SubSummary.lifelog_id == Limitless_Lifelog.log_id)
+            .group_by(Limitless_Lifelog.id, Limitless_Lifelog.title)
+        )
+        if lifelog_ids is not None:
+            query = query.where(Limitless_Lifelog.id.in_(lifelog_ids))
+        for lifelog_id, title, subsummaries in connection.execute(query.order_by(Limitless_Lifelog.id)):
+            tokens = tokenize(f"{title or ''} {subsummaries or ''}")
+            if tokens:
+                documents.append((("lifelog", lifelog_id), tokens))
+
+    return documents
+
+def build_vocabulary(token_lists):
+    """
+    Vocabulary and smoothed IDF weights of a corpus.
+
+    Args:
+        token_lists: Tokens of every document
+
+    Returns:
+        Tuple of (sorted list of terms, NumPy array of their IDF weights)
+    """
+    document_frequency = Counter()
+    for tokens in token_lists:
+        document_frequency.update(set(tokens))
+
+    count = len(token_lists)
+    max_df = max(MAX_DF * count, MIN_DF)
+    vocabulary = sorted(term for term, df in document_frequency.items() if MIN_DF <= df <= max_df)
+    idf = np.array([math.log((1 + count) / (1 + document_frequency[term])) + 1 for term in vocabulary],
+                   dtype=np.float32)
+    return vocabulary, idf
+
+def vectorize(token_lists, vocabulary, idf):
+    """
+    L2-normalized TF-IDF vectors of documents.
+
+    Args:
+        token_lists: Tokens of every document
+        vocabulary: Terms; a term's column is its position
+        idf: IDF weight of each term
+
+    Returns:
+        SciPy CSR matrix with one row per document; terms outside the vocabulary are ignored
+    """
+    columns = {term: column for column, term in enumerate(vocabulary)}
+    indptr = [0]
+    indices = []
+    data = []
+    for tokens in token_lists:
+        counts = Counter(columns[token] for token in tokens if token in columns)
+        for column, term_count in counts.items():
+            indices.append(column)
+            data.append((1.0 + math.log(term_count)) * idf[column])
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+        shape=(len(token_lists), len(vocabulary))
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+def nearest_neighbours(matrix, rows, top_k=TOP_K):
+    """
+    The most similar documents of some rows, a block of rows at a time.
+
+    Args:
+        matrix: Normalized document vectors (see vectorize())
+        rows: Row indexes to find neighbours for
+        top_k: Neighbours per row
+
+    Yields:
+        Tuples of (row, list of (row, score) neighbours, most similar first,
+        NumPy array of the row's similarity to every document)
+    """
+    rows = list(rows)
+    document_count = matrix.shape[0]
+    count = min(top_k, document_count - 1)
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(rows), BLOCK_SIZE):
+        block = rows[start:start + BLOCK_SIZE]
+        scores = (matrix[block] @ transposed).toarray()
+        # A document is not its own neighbour
+        scores[np.arange(len(block)), block] = -1.0
+        if count <= 0:
+            for index, row in enumerate(block):
+                yield row, [], scores[index]
+            continue
+        top = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+        for index, row in enumerate(block):
+            candidates = top[index][np.argsort(-scores[index, top[index]], kind="stable")]
+            neighbours = [(int(column), float(scores[index, column]))
+                          for column in candidates if scores[index, column] >= MIN_SCORE]
+            yield row, neighbours, scores[index]
+
+def _delete_lists(connection, keys):
+    for doc_type in DOCUMENT_TYPES:
+        ids = [doc_id for key_type, doc_id in keys if key_type == doc_type]
+        for start in range(0, len(ids), WRITE_BATCH):
+            connection.execute(delete(Related_Item).where(
+                Related_Item.source_type == doc_type, Related_Item.source_id.in_(ids[start:start + WRITE_BATCH])
+            ))
+
+def _insert_lists(connection, lists):
+    now = datetime.utcnow()
+    records = [
+        {
+            "source_type": source[0],
+            "source_id": source[1],
+            "rank": rank,
+            "related_type": related[0],
+            "related_id": related[1],
+            "score": score,
+            "updated_at": now
+        }
+        for source, neighbours in lists.items()
+        for rank, (related, score) in enumerate(neighbours, start=1)
+    ]
+    for start in range(0, len(records), WRITE_BATCH):
+        connection.execute(insert(Related_Item), records[start:start + WRITE_BATCH])
+    return len(records)
+
+def _vector_records(keys, matrix):
+    return [
+        {
+            "doc_type": key[0],
+            "doc_id": key[1],
+            "terms": matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]].tolist(),
+            "weights": matrix.data[matrix.indptr[row]:matrix.indptr[row + 1]].tolist()
+        }
+        for row, key in enumerate(keys)
+    ]
+
+def _write_vectors(connection, keys, matrix):
+    records = _vector_records(keys, matrix)
+    statement = pg_insert(Related_Vector)
+    statement = statement.on_conflict_do_update(
+        index_elements=["doc_type", "doc_id"],
+        set_={"terms": statement.excluded.terms, "weights": statement.excluded.weights}
+    )
+    for start in range(0, len(records), WRITE_BATCH):
+        connection.execute(statement, records[start:start + WRITE_BATCH])
+
+def load_vectors(connection, terms, vocabulary_size):
+    """
+    Stored vectors of the documents that contain any of some terms.
+
+    Args:
+        connection: Database connection
+        terms: Vocabulary positions
+        vocabulary_size: Number of terms in the stored vocabulary
+
+    Returns:
+        Tuple of (list of (document type, id) keys, SciPy CSR matrix of their vectors)
+    """
+    rows = connection.execute(
+        select(Related_Vector.doc_type, Related_Vector.doc_id, Related_Vector.terms, Related_Vector.weights)
+        .where(Related_Vector.terms.overlap(list(terms)))
+        .order_by(Related_Vector.doc_type, Related_Vector.doc_id)
+    ).all()
+    keys = [(row.doc_type, row.doc_id) for row in rows]
+    indptr = np.cumsum([0] + [len(row.terms) for row in rows], dtype=np.int64)
+    indices = np.array([term for row in rows for term in row.terms], dtype=np.int32)
+    data = np.array([weight for row in rows for weight in row.weights], dtype=np.float32)
+    return keys, sparse.csr_matrix((data, indices, indptr), shape=(len(rows), vocabulary_size))
+
+def _listing_sources(connection, keys):
+    """Documents whose stored list includes any of some documents."""
+    sources = set()
+    for doc_type in DOCUMENT_TYPES:
+        ids = [doc_id for key_type, doc_id in keys if key_type == doc_type]
+        for start in range(0, len(ids), WRITE_BATCH):
+            sources.update(connection.execute(
+                select(Related_Item.source_type, Related_Item.source_id).distinct()
+                .where(Related_Item.related_type == doc_type, Related_Item.related_id.in_(ids[start:start + WRITE_BATCH]))
+            ).tuples())
+    return sources
+
+def _vector_terms(connection, keys):
+    """Vocabulary positions used by the stored vectors of some documents."""
+    terms = set()
+    for doc_type in DOCUMENT_TYPES:
+        ids = [doc_id for key_type, doc_id in keys if key_type == doc_type]
+        for start in range(0, len(ids), WRITE_BATCH):
+            for vector_terms in connection.execute(
+                select(Related_Vector.terms)
+                .where(Related_Vector.doc_type == doc_type, Related_Vector.doc_id.in_(ids[start:start + WRITE_BATCH]))
+            ).scalars():
+                terms.update(vector_terms)
+    return terms
+
+def _high_water_marks(connection):
+    return {
+        "last_conversation_id": connection.execute(select(func.max(Bee_Conversation.id))).scalar(),
+        "last_subsummary_id": connection.execute(select(func.max(Limitless_Lifelog_SubSummary.id))).scalar()
+    }
+
+def _rebuild(connection, documents, marks, top_k):
+    keys = [key for key, _ in documents]
+    token_lists = [tokens for _, tokens in documents]
+    vocabulary, idf = build_vocabulary(token_lists)
+    matrix = vectorize(token_lists, vocabulary, idf)
+    logger.info(f"Vectorized {len(keys)} documents over {len(vocabulary)} terms")
+
+    connection.execute(delete(Related_Vector))
+    _write_vectors(connection, keys, matrix)
+
+    connection.execute(delete(Related_Item))
+    written = 0
+    lists = {}
+    for row, neighbours, _ in nearest_neighbours(matrix, range(len(keys)), top_k):
+        lists[keys[row]] = [(keys[column], score) for column, score in neighbours]
+        if len(lists) >= BLOCK_SIZE:
+            written += _insert_lists(connection, lists)
+            lists = {}
+    written += _insert_lists(connection, lists)
+
+    now = datetime.utcnow()
+    state = dict(marks, vocabulary=vocabulary, idf=idf.tolist(), document_count=len(keys),
+                 built_at=now, updated_at=now)
+    connection.execute(
+        pg_insert(Related_Index_State).values(id=1, **state)
+        .on_conflict_do_update(index_elements=["id"], set_=state)
+    )
+    logger.info(f"Stored {written} related items for {len(keys)} documents")
+    return {"rebuilt": True, "documents": len(keys), "indexed": len(keys), "updated_lists": len(keys)}
+
+def rebuild_index(top_k=TOP_K):
+    """
+    Rebuild the vocabulary and the related items of every document.
+
+    Args:
+        top_k: Neighbours stored per document
+
+    Returns:
+        Dict with the number of documents, indexed documents and rewritten lists
+    """
+    _require_numpy()
+    with engine.begin() as connection:
+        marks = _high_water_marks(connection)
+        return _rebuild(connection, load_documents(connection), marks, top_k)
+
+def update_index(top_k=TOP_K):
+    """
+    Index the conversations and lifelogs added since the last run.
+
+    Only the new documents are read and vectorized; they are compared with
+    the stored vectors sharing a term with them. The lists that included a
+    re-indexed document are recomputed the same way. Rebuilds instead when there
+    is no index yet or the corpus has grown by REBUILD_GROWTH since the
+    vocabulary was built.
+
+    Args:
+        top_k: Neighbours stored per document
+
+    Returns:
+        Dict with whether the index was rebuilt, the number of documents,
+        the documents indexed and the neighbour lists rewritten
+    """
+    _require_numpy()
+    with engine.begin() as connection:
+        marks = _high_water_marks(connection)
+        state = connection.execute(
+            select(Related_Index_State.vocabulary, Related_Index_State.idf, Related_Index_State.document_count,
+                   Related_Index_State.last_conversation_id, Related_Index_State.last_subsummary_id)
+            .where(Related_Index_State.id == 1)
+        ).first()
+        if state is None:
+            return _rebuild(connection, load_documents(connection), marks, top_k)
+
+        new_conversation_ids = connection.execute(
+            select(Bee_Conversation.id).where(Bee_Conversation.id > (state.last_conversation_id or 0))
+        ).scalars().all()
+        new_lifelog_ids = connection.execute(
+            select(Limitless_Lifelog.id).distinct()
+            .join(Limitless_Lifelog_SubSummary, Limitless_Lifelog_SubSummary.lifelog_id == Limitless_Lifelog.log_id)
+            .where(Limitless_Lifelog_SubSummary.id > (state.last_subsummary_id or 0))
+        ).scalars().all()
+        documents = load_documents(connection, conversation_ids=new_conversation_ids, lifelog_ids=new_lifelog_ids)
+        new_keys = [key for key, _ in documents]
+        new_matrix = vectorize([tokens for _, tokens in documents], state.vocabulary,
+                               np.array(state.idf, dtype=np.float32))
+        _write_vectors(connection, new_keys, new_matrix)
+
+        document_count = connection.execute(select(func.count()).select_from(Related_Vector)).scalar()
+        if document_count > state.document_count * (1 + REBUILD_GROWTH):
+            return _rebuild(connection, load_documents(connection), marks, top_k)
+
+        # Lists that included a re-indexed document hold its old score and are recomputed
+        new_key_set = set(new_keys)
+        stale_keys = _listing_sources(connection, new_keys) - new_key_set
+        recomputed = new_key_set | stale_keys
+
+        # Both get their lists from the stored vectors that share a term with them
+        terms = set(np.unique(new_matrix.indices).tolist()) | _vector_terms(connection, stale_keys)
+        keys, matrix = load_vectors(connection, sorted(terms), len(state.vocabulary))
+        positions = {key: row for row, key in enumerate(keys)}
+        lists = {key: [] for key in recomputed if key not in positions}
+        candidates = {}
+        rows = [positions[key] for key in new_keys + sorted(stale_keys) if key in positions]
+        for row, neighbours, scores in nearest_neighbours(matrix, rows, top_k):
+            lists[keys[row]] = [(keys[column], score) for column, score in neighbours]
+            if keys[row] not in new_key_set:
+                continue
+            # Existing documents the new one is similar to may have to list it
+            for column in np.nonzero(scores >= MIN_SCORE)[0]:
+                if keys[column] not in recomputed:
+                    candidates.setdefault(keys[column], []).append((keys[row], float(scores[column])))
+
+        # Merge the candidates into their stored lists
+        current = {}
+        for doc_type in DOCUMENT_TYPES:
+            ids = [doc_id for key_type, doc_id in candidates if key_type == doc_type]
+            for start in range(0, len(ids), WRITE_BATCH):
+                for item in connection.execute(
+                    select(Related_Item.source_type, Related_Item.source_id, Related_Item.related_type,
+                           Related_Item.related_id, Related_Item.score)
+                    .where(Related_Item.source_type == doc_type,
+                           Related_Item.source_id.in_(ids[start:start + WRITE_BATCH]))
+                    .order_by(Related_Item.source_id, Related_Item.rank)
+                ):
+                    current.setdefault((item.source_type, item.source_id), []).append(
+                        ((item.related_type, item.related_id), item.score))
+        for key, hits in candidates.items():
+            stored = current.get(key, [])
+            merged = [(related, score) for related, score in stored if related not in new_key_set] + hits
+            merged.sort(key=lambda neighbour: neighbour[1], reverse=True)
+            if merged[:top_k] != stored:
+                lists[key] = merged[:top_k]
+
+        _delete_lists(connection, list(lists))
+        _insert_lists(connection, lists)
+
+        connection.execute(
+            update(Related_Index_State).where(Related_Index_State.id == 1)
+            .values(updated_at=datetime.utcnow(), **marks)
+        )
+        logger.info(f"Indexed {len(new_keys)} new documents against {len(keys)} sharing a term, "
+                    f"recomputed {len(stale_keys)} lists that included them, rewrote {len(lists)} related lists")
+        return {"rebuilt": False, "documents": document_count, "indexed": len(new_keys),
+                "updated_lists": len(lists)}
+
+def get_related(session, doc_type, doc_id):
+    """
+    The stored related items of a conversation or lifelog.
+
+    Args:
+        session: SQLAlchemy session
+        doc_type: "conversation" or "lifelog"
+        doc_id: bee_conversations.id or limitless_lifelogs.id
+
+    Returns:
+        List of dicts with type, id, score, title, created_at and date, most
+        similar first; empty if the document is not indexed
+    """
+    rows = session.execute(
+        select(Related_Item.related_type, Related_Item.related_id, Related_Item.score)
+        .where(Related_Item.source_type == doc_type, Related_Item.source_id == doc_id)
+        .order_by(Related_Item.rank)
+    ).all()
+
+    conversation_ids = [row.related_id for row in rows if row.related_type == "conversation"]
+    lifelog_ids = [row.related_id for row in rows if row.related_type == "lifelog"]
+    details = {}
+    if conversation_ids:
+        for conversation_id, summary, created_at in session.execute(
+            select(Bee_Conversation.id, Bee_Conversation.summary, Bee_Conversation.created_at)
+            .where(Bee_Conversation.id.in_(conversation_ids))
+        ):
+            summary = summary or ""
+            title = summary if len(summary) <= SNIPPET_LENGTH else summary[:SNIPPET_LENGTH].rsplit(' ', 1)[0] + "..."
+            details[("conversation", conversation_id)] = (title, created_at)
+    if lifelog_ids:
+        for lifelog_id, title, created_at in session.execute(
+            select(Limitless_Lifelog.id, Limitless_Lifelog.title, Limitless_Lifelog.created_at)
+            .where(Limitless_Lifelog.id.in_(lifelog_ids))
+        ):
+            details[("lifelog", lifelog_id)] = (title or "Untitled", created_at)
+
+    related = []
+    for row in rows:
+        key = (row.related_type, row.related_id)
+        if key not in details:
+            # Deleted since the index was built
+            continue
+        title, created_at = details[key]
+        related.append({
+            "type": row.related_type,
+            "id": row.related_id,
+            "score": round(row.score, 4),
+            "title": title,
+            "created_at": created_at.isoformat() if created_at else None,
+            "date": created_at.strftime('%Y-%m-%d') if created_at else None
+        })
+    return related
+
+def main():
+    """Main function to build or update the related index."""
+    parser = argparse.ArgumentParser(description="Precompute related conversations and lifelogs")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Rebuild the vocabulary and every related list instead of indexing new documents")
+    parser.add_argument("--top-k", type=int, default=TOP_K,
+                        help=f"Related items stored per document (default: {TOP_K})")
+    args = parser.parse_args()
+
+    try:
+        result = rebuild_index(args.top_k) if args.rebuild else update_index(args.top_k)
+    except ImportError as e:
+        logger.error(str(e))
+        return 1
+    action = "Rebuilt" if result["rebuilt"] else "Updated"
+    logger.info(f"{action} the related index: {result['documents']} documents, {result['indexed']} indexed, "
+                f"{result['updated_lists']} lists written")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Full-Text Search
+
+This module provides PostgreSQL full-text search across Bee conversations and
+facts, Limitless lifelogs and Limitless transcript lines. Transcript lines
+stored as rows are matched one line at a time; packed transcripts (see
+transcript_store.py) are matched one subsummary at a time through the text
+kept with each pack, and returned as transcript_packs results.
+
+Each searchable table has a GIN expression index over a to_tsvector()
+expression (created by add_search_indexes.py). The queries below use the exact
+same expressions so the planner can use those indexes.
+
+A search runs one ranked subquery per source, each limited to the rows needed
+for the requested page, merges them with UNION ALL and only then computes
+highlighted snippets (ts_headline) for the rows on the page.
+"""
+
+import logging
+from datetime import timedelta
+from sqlalchemy import text
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Text search configuration used for both the indexes and the queries
+SEARCH_CONFIG = 'english'
+
+# Searchable sources:
+#   table: table name
+#   document: SQL expression of the searchable text (must match the index)
+#   date_column: timestamp used for date filtering and ordering ties
+#   from_clause: FROM/JOIN clause providing the date column
+#   id_column: key column of the table (default: id)
+#   group: optional type name that also selects this source (see parse_types)
+#   extra_columns: additional columns returned with each result
+SEARCH_SOURCES = {
+    "conversations": {
+        "table": "bee_conversations",
+        "index": "ix_bee_conversations_search",
+        "document": "coalesce(c.summary, '') || ' ' || coalesce(c.atmosphere, '')",
+        "index_document": "coalesce(summary, '') || ' ' || coalesce(atmosphere, '')",
+        "from_clause": "bee_conversations c",
+        "alias": "c",
+        "date_column": "c.created_at",
+        "extra_columns": "c.conversation_id AS ref, c.address AS context"
+    },
+    "facts": {
+        "table": "bee_facts",
+        "index": "ix_bee_facts_search",
+        "document": "coalesce(f.text, '')",
+        "index_document": "coalesce(text, '')",
+        "from_clause": "bee_facts f",
+        "alias": "f",
+        "date_column": "f.created_at",
+        "extra_columns": "f.fact_id AS ref, NULL::text AS context"
+    },
+    "lifelogs": {
+        "table": "limitless_lifelogs",
+        "index": "ix_limitless_lifelogs_search",
+        "document": "coalesce(l.title, '') || ' ' || coalesce(l.description, '')",
+        "index_document": "coalesce(title, '') || ' ' || coalesce(description, '')",
+        "from_clause": "limitless_lifelogs l",
+        "alias": "l",
+        "date_column": "l.created_at",
+        "extra_columns": "l.log_id AS ref, NULL::text AS context"
+    },
+    "transcripts": {
+        "table": "limitless_transcript_lines",
+        "index": "ix_limitless_transcript_lines_search",
+        "document": "coalesce(t.text, '')",
+        "index_document": "coalesce(text, '')",
+        # Transcript lines are dated by their lifelog
+        "from_clause": ("limitless_transcript_lines t "
+                        "JOIN limitless_lifelog_subsummaries s ON s.id = t.subsummary_id "
+                        "JOIN limitless_lifelogs l ON l.log_id = s.lifelog_id"),
+        "alias": "t",
+        "date_column": "l.created_at",
+        "extra_columns": "l.log_id AS ref, t.speaker AS context"
+    },
+    "transcript_packs": {
+        "table": "limitless_transcript_packs",
+        "index": "ix_limitless_transcript_packs_search",
+        "document": "coalesce(p.text, '')",
+        "index_document": "coalesce(text, '')",
+        "from_clause": ("limitless_transcript_packs p "
+                        "JOIN limitless_lifelog_subsummaries s ON s.id = p.subsummary_id "
+                        "JOIN limitless_lifelogs l ON l.log_id = s.lifelog_id"),
+        "alias": "p",
+        "id_column": "subsummary_id",
+        "group": "transcripts",
+        "date_column": "l.created_at",
+        "extra_columns": "l.log_id AS ref, s.content AS context"
+    }
+}
+
+# Options for highlighted snippets
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+MAX_PER_PAGE = 100
+
+def index_statements():
+    """
+    Return the CREATE INDEX statements for every searchable source.
+
+    Returns:
+        List of (index name, SQL statement) tuples
+    """
+    statements = []
+    for source in SEARCH_SOURCES.values():
+        statements.append((source["index"], (
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {source['index']} "
+            f"ON {source['table']} USING GIN "
+            f"(to_tsvector('{SEARCH_CONFIG}', {source['index_document']}))"
+        )))
+    return statements
+
+def _vector(source):
+    """to_tsvector() expression for a source, matching its index."""
+    return f"to_tsvector('{SEARCH_CONFIG}', {source['document']})"
+
+def _id(source):
+    """Key column of a source, qualified with its alias."""
+    return f"{source['alias']}.{source.get('id_column', 'id')}"
+
+def _source_query(name, source, date_filter):
+    """Ranked subquery for one source, limited to the rows the page can need."""
+    vector = _vector(source)
+    return (
+        f"(SELECT '{name}' AS type, {_id(source)} AS id, {source['date_column']} AS occurred_at, "
+        f"ts_rank({vector}, q.query, 32) AS rank, {source['extra_columns']} "
+        f"FROM {source['from_clause']}, q "
+        f"WHERE {vector} @@ q.query{date_filter.format(column=source['date_column'])} "
+        f"ORDER BY rank DESC, occurred_at DESC NULLS LAST "
+        f"LIMIT :window)"
+    )
+
+def parse_types(types):
+    """
+    Parse a comma separated list of source names.
+
+    A name also selects the sources grouped under it, so "transcripts"
+    searches packed transcripts as well as line rows.
+
+    Returns:
+        List of valid source names (all sources if none given)
+
+    Raises:
+        ValueError: If an unknown source name is given
+    """
+    if not types:
+        return list(SEARCH_SOURCES)
+    names = [name.strip() for name in types.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SEARCH_SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown search types: {', '.join(unknown)}")
+    return [
+        source_name for source_name, source in SEARCH_SOURCES.items()
+        if source_name in names or source.get("group") in names
+    ]
+
+def search(session, query, page=1, per_page=20, start_date=None, end_date=None, types=None):
+    """
+    Search conversations, facts, lifelogs and transcripts.
+
+    Args:
+        session: Database session
+        query: Search string (web search syntax: quotes, OR, -exclusion)
+        page: 1-based page number
+        per_page: Results per page (capped at MAX_PER_PAGE)
+        start_date: Optional first day to include (datetime)
+        end_date: Optional last day to include (datetime, inclusive)
+        types: Optional list of SEARCH_SOURCES keys to search
+
+    Returns:
+        Dictionary with the page of results (highest rank first) and paging info
+    """
+    page = max(1, page)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    types = types or list(SEARCH_SOURCES)
+    offset = (page - 1) * per_page
+
+    params = {
+        "config": SEARCH_CONFIG,
+        "query": query,
+        # Every source returns enough rows to fill this page plus one to detect more pages
+        "window": offset + per_page + 1,
+        "offset": offset,
+        "limit": per_page + 1
+    }
+    date_filter = ""
+    if start_date:
+        date_filter += " AND {column} >= :start_date"
+        params["start_date"] = start_date
+    if end_date:
+        date_filter += " AND {column} < :end_date"
+        params["end_date"] = end_date + timedelta(days=1)
+
+    union = " UNION ALL ".join(
+        _source_query(name, SEARCH_SOURCES[name], date_filter) for name in types
+    )
+    sql = (
+        "WITH q AS (SELECT websearch_to_tsquery(CAST(:config AS regconfig), :query) AS query) "
+        f"SELECT type, id, occurred_at, rank, ref, context FROM ({union}) results "
+        "ORDER BY rank DESC, occurred_at DESC NULLS LAST "
+        "OFFSET :offset LIMIT :limit"
+    )
+    rows = session.execute(text(sql), params).fetchall()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    snippets = _headlines(session, query, rows)
+
+    results = []
+    for row in rows:
+        results.append({
+            "type": row.type,
+            "id": row.id,
+            "ref": row.ref,
+            "context": row.context,
+            "date": row.occurred_at.strftime('%Y-%m-%d') if row.occurred_at else None,
+            "occurred_at": row.occurred_at.isoformat() if row.occurred_at else None,
+            "rank": round(float(row.rank), 6),
+            "snippet": snippets.get((row.type, row.id))
+        })
+
+    return {
+        "query": query,
+        "page": page,
+        "per_page": per_page,
+        "has_more": has_more,
+        "results": results
+    }
+
+def _headlines(session, query, rows):
+    """
+    Compute highlighted snippets for the rows on the page only.
+
+    Returns:
+        Dictionary mapping (type, id) to the snippet HTML
+    """
+    ids_by_type = {}
+    for row in rows:
+        ids_by_type.setdefault(row.type, []).append(row.id)
+
+    snippets = {}
+    for name, ids in ids_by_type.items():
+        source = SEARCH_SOURCES[name]
+        alias = source["alias"]
+        sql = (
+            f"SELECT {_id(source)}, ts_headline(CAST(:config AS regconfig), {source['document']}, "
+            f"websearch_to_tsquery(CAST(:config AS regconfig), :query), :options) AS snippet "
+            f"FROM {source['table']} {alias} WHERE {_id(source)} = ANY(:ids)"
+        )
+        for row_id, snippet in session.execute(text(sql), {
+            "config": SEARCH_CONFIG, "query": query, "options": HEADLINE_OPTIONS, "ids": ids
+        }):
+            snippets[(name, row_id)] = snippet
+    return snippets
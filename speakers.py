@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Speaker Index for Limitless Transcript Lines
+
+Transcript lines keep the speaker name as written in the transcript, but also
+reference a row of the speakers table through speaker_id. Names are resolved
+through speaker_aliases, which maps every normalized spelling ("alice",
+"dr. smith") to one speaker, so lines spoken by the same person share an id no
+matter how the name was capitalized or spaced. Another spelling can be pointed
+at an existing speaker with --alias, which also moves the lines stored under it.
+
+The (speaker_id, start_time, id) index lets get_speaker_lines() read a
+speaker's lines in time order, a page at a time, without scanning the table.
+Packed transcripts keep the speaker id of each line and are indexed by their
+speakers, so get_speaker_lines() reads them through transcript_store too.
+
+Usage:
+    python speakers.py                          # list speakers and their aliases
+    python speakers.py --backfill               # resolve the speaker of lines stored before the index
+    python speakers.py --alias "Al" --to Alice  # treat "Al" as Alice from now on
+"""
+
+import sys
+import json
+import base64
+import logging
+import argparse
+from datetime import datetime
+
+from sqlalchemy import select, insert, update, delete, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import sessionmaker
+
+import transcript_store
+from models import engine, Speaker, Speaker_Alias, Limitless_Transcript_Line
+from backfill import Backfill, run_backfill, update_rows, add_backfill_arguments, backfill_options
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Largest page get_speaker_lines() returns
+MAX_LINES_PER_PAGE = 500
+
+def alias_key(name):
+    """
+    Normalized spelling of a speaker name, as stored in speaker_aliases.
+
+    Args:
+        name: Speaker name as written in a transcript
+
+    Returns:
+        Lowercased name with collapsed whitespace and no trailing dots, or None if empty
+    """
+    if not name:
+        return None
+    key = " ".join(name.split()).rstrip(".").strip().lower()
+    return key or None
+
+def _alias_ids(connection, keys):
+    return dict(connection.execute(
+        select(Speaker_Alias.alias, Speaker_Alias.speaker_id).where(Speaker_Alias.alias.in_(list(keys)))
+    ).all())
+
+def resolve_speaker_ids(connection, names):
+    """
+    Speaker ids of transcript speaker names, creating speakers for new names.
+
+    A name whose normalized spelling has no alias yet becomes a new speaker,
+    named after the name as first seen. Concurrent writers resolving the same
+    new name end up with the same speaker.
+
+    Args:
+        connection: Connection (or session connection) with an open transaction
+        names: List of speaker names, None and empty names are ignored
+
+    Returns:
+        Dict mapping each non-empty name to its speaker id
+    """
+    display_names = {}
+    for name in names:
+        key = alias_key(name)
+        if key:
+            display_names.setdefault(key, " ".join(name.split()))
+    if not display_names:
+        return {}
+
+    ids = _alias_ids(connection, display_names)
+    missing = {key: display for key, display in display_names.items() if key not in ids}
+    if missing:
+        connection.execute(
+            pg_insert(Speaker).on_conflict_do_nothing(index_elements=["name"]),
+            [{"name": display} for display in missing.values()]
+        )
+        speaker_ids = dict(connection.execute(
+            select(Speaker.name, Speaker.id).where(Speaker.name.in_(list(missing.values())))
+        ).all())
+        connection.execute(
+            pg_insert(Speaker_Alias).on_conflict_do_nothing(index_elements=["alias"]),
+            [{"alias": key, "speaker_id": speaker_ids[display]} for key, display in missing.items()]
+        )
+        # Re-read so an alias another writer added first wins
+        ids.update(_alias_ids(connection, missing))
+
+    return {name: ids[alias_key(name)] for name in names if alias_key(name)}
+
+def assign_speaker_ids(connection, lines):
+    """
+    Set speaker_id on transcript line records about to be inserted.
+
+    Args:
+        connection: Connection (or session connection) with an open transaction
+        lines: List of line dicts with a "speaker" key; updated in place
+    """
+    ids = resolve_speaker_ids(connection, [line["speaker"] for line in lines])
+    for line in lines:
+        line["speaker_id"] = ids.get(line["speaker"])
+
+def add_alias(alias, speaker_name):
+    """
+    Resolve another spelling to a speaker, moving the lines stored under it.
+
+    The speaker is created if no alias matches speaker_name. A speaker left
+    without aliases or lines by the move is deleted.
+
+    Args:
+        alias: Spelling to resolve, e.g. "Al"
+        speaker_name: Name (or alias) of the speaker it refers to
+
+    Returns:
+        Id of the speaker the alias now points to
+    """
+    key = alias_key(alias)
+    if not key:
+        raise ValueError("Empty alias")
+
+    with engine.begin() as connection:
+        target_id = resolve_speaker_ids(connection, [speaker_name])[speaker_name]
+        old_id = connection.execute(
+            select(Speaker_Alias.speaker_id).where(Speaker_Alias.alias == key)
+        ).scalar()
+        if old_id == target_id:
+            return target_id
+        if old_id is None:
+            connection.execute(insert(Speaker_Alias).values(alias=key, speaker_id=target_id))
+            return target_id
+
+        connection.execute(
+            update(Speaker_Alias).where(Speaker_Alias.alias == key).values(speaker_id=target_id)
+        )
+        moved = transcript_store.move_speaker_lines(connection, old_id, target_id, key)
+        if moved:
+            logger.info(f"Moved {moved} transcript lines from speaker {old_id} to {target_id}")
+
+        orphaned = not (
+            connection.execute(select(exists().where(Speaker_Alias.speaker_id == old_id))).scalar()
+            or transcript_store.speaker_has_lines(connection, old_id)
+        )
+        if orphaned:
+            connection.execute(delete(Speaker).where(Speaker.id == old_id))
+            logger.info(f"Removed speaker {old_id}, which has no aliases or lines left")
+    return target_id
+
+def list_speakers(session):
+    """
+    Every speaker with its aliases, ordered by name.
+
+    Args:
+        session: SQLAlchemy session
+
+    Returns:
+        List of dicts with id, name and aliases
+    """
+    aliases = {}
+    for speaker_id, alias in session.execute(
+        select(Speaker_Alias.speaker_id, Speaker_Alias.alias).order_by(Speaker_Alias.alias)
+    ):
+        aliases.setdefault(speaker_id, []).append(alias)
+    return [
+        {"id": speaker.id, "name": speaker.name, "aliases": aliases.get(speaker.id, [])}
+        for speaker in session.execute(select(Speaker).order_by(Speaker.name)).scalars()
+    ]
+
+def encode_cursor(key):
+    """Opaque cursor for the page after the line with this key (see transcript_store.read_speaker_lines())."""
+    start_time, *rest = key
+    return base64.urlsafe_b64encode(json.dumps([start_time.isoformat(), *rest]).encode()).decode()
+
+def decode_cursor(cursor):
+    """
+    Line key encoded by encode_cursor().
+
+    Cursors holding only a start time and line id, as issued before packed
+    lines were read, are still accepted.
+
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor()
+    """
+    try:
+        start_time, *rest = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        start_time = datetime.fromisoformat(start_time)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if len(rest) == 1:
+        rest = [0, rest[0], 0]
+    if len(rest) != 3 or not all(isinstance(value, int) for value in rest):
+        raise ValueError("Invalid cursor")
+    return (transcript_store.as_utc(start_time), *rest)
+
+def get_speaker_lines(session, speaker_id, start=None, end=None, cursor=None, limit=100):
+    """
+    A speaker's transcript lines in time order, one page at a time.
+
+    Reads line rows through the (speaker_id, start_time, id) index and packs
+    through their speaker ids from the cursor onwards (see
+    transcript_store.read_speaker_lines()), so every page costs the same no
+    matter how far into the history it is. Lines without a start time are
+    not part of the timeline.
+
+    Args:
+        session: SQLAlchemy session
+        speaker_id: Id of the speaker
+        start: Optional datetime, only lines starting at or after it (naive means UTC)
+        end: Optional datetime, only lines starting before it (naive means UTC)
+        cursor: Optional next_cursor of the previous page
+        limit: Maximum lines per page (capped at MAX_LINES_PER_PAGE)
+
+    Returns:
+        Dict with the page's lines and the next_cursor (None on the last
+        page); packed lines have no id
+    """
+    limit = max(1, min(limit, MAX_LINES_PER_PAGE))
+    after = decode_cursor(cursor) if cursor else None
+    lines = transcript_store.read_speaker_lines(session, speaker_id, start=start, end=end, after=after,
+                                                limit=limit + 1)
+    next_cursor = encode_cursor(lines[limit - 1]["key"]) if len(lines) > limit else None
+    return {
+        "lines": [
+            {
+                "id": line["id"],
+                "speaker": line["speaker"],
+                "text": line["text"],
+                "start_time": transcript_store.format_transcript_time(line["start_time"]),
+                "end_time": transcript_store.format_transcript_time(line["end_time"]),
+                "subsummary": line["subsummary"],
+                "lifelog_id": line["lifelog_id"],
+                "lifelog_title": line["lifelog_title"]
+            }
+            for line in lines[:limit]
+        ],
+        "next_cursor": next_cursor
+    }
+
+def speaker_of_line(row):
+    """
+    Backfill transform: the speaker name of a line that has no speaker_id yet.
+
+    Args:
+        row: Dict with the line id and speaker
+
+    Returns:
+        Dict with the speaker name, or None if it normalizes to nothing
+    """
+    return {"speaker": row["speaker"]} if alias_key(row["speaker"]) else None
+
+def write_speaker_ids(connection, changes):
+    """
+    Backfill writer: resolve the chunk's speaker names and store their ids.
+
+    Args:
+        connection: Connection with the chunk's open transaction
+        changes: List of (row, transform result) pairs
+
+    Returns:
+        Number of lines updated
+    """
+    ids = resolve_speaker_ids(connection, [result["speaker"] for _, result in changes])
+    return update_rows(BACKFILL, connection,
+                       [(row, {"speaker_id": ids[result["speaker"]]}) for row, result in changes])
+
+BACKFILL = Backfill(
+    "assign_transcript_speakers", Limitless_Transcript_Line, ["speaker"], speaker_of_line,
+    where=Limitless_Transcript_Line.speaker_id.is_(None) & Limitless_Transcript_Line.speaker.isnot(None),
+    write=write_speaker_ids
+)
+
+def assign_transcript_speakers(processes=None, chunk_size=None, restart=False):
+    """
+    Resolve the speaker_id of every transcript line stored without one.
+
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional lines read and committed at a time
+        restart: Start from the first line instead of resuming an interrupted run
+    """
+    result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart)
+    logger.info(f"Resolved speakers of {result['updated']} transcript lines ({result['errors']} errors)")
+    return result
+
+def main():
+    """List speakers, add an alias or backfill speaker ids."""
+    parser = argparse.ArgumentParser(description="Manage the speaker index of Limitless transcript lines")
+    parser.add_argument("--backfill", action="store_true", help="Resolve the speaker of lines without a speaker_id")
+    parser.add_argument("--alias", help="Spelling to resolve to the speaker given with --to")
+    parser.add_argument("--to", metavar="NAME", help="Speaker the --alias spelling refers to")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
+
+    if args.alias or args.to:
+        if not (args.alias and args.to):
+            parser.error("--alias and --to must be given together")
+        speaker_id = add_alias(args.alias, args.to)
+        print(f"'{args.alias}' now resolves to speaker {speaker_id}")
+        return 0
+
+    if args.backfill:
+        assign_transcript_speakers(**backfill_options(args))
+        return 0
+
+    session = sessionmaker(bind=engine)()
+    try:
+        speakers = list_speakers(session)
+    finally:
+        session.close()
+    if not speakers:
+        print("No speakers yet")
+        return 0
+    for speaker in speakers:
+        print(f"{speaker['id']:>6}  {speaker['name']:<30} {', '.join(speaker['aliases'])}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Synthetic Data Builders
+
+This module builds realistic, API-shaped payloads for every data source the
+collector stores (Bee conversations and facts, Limitless lifelogs, OpenWeatherMap
+weather, Billboard charts and Netflix viewing history). It has no database
+dependency so the same builders can feed the scale dataset generator and the
+benchmarks.
+
+All builders take a random.Random instance so generated data is reproducible
+for a given seed.
+"""
+
+from datetime import datetime, timedelta
+
+# Vocabulary used to assemble plausible sentences
+SUBJECTS = [
+    "The team", "Alice", "Bob", "The speaker", "Everyone", "The client",
+    "My manager", "The group", "Sam", "The doctor", "Our neighbor", "Jordan"
+]
+VERBS = [
+    "discussed", "reviewed", "planned", "debated", "summarized", "questioned",
+    "outlined", "celebrated", "postponed", "compared", "explained", "agreed on"
+]
+OBJECTS = [
+    "the quarterly budget", "weekend plans", "the new product launch",
+    "a recent trip to the coast", "the kitchen renovation", "school pickup times",
+    "the onboarding process", "a documentary about oceans", "the hiring plan",
+    "grocery shopping", "a running schedule", "the upcoming conference"
+]
+MOODS = [
+    "relaxed and friendly", "focused and productive", "tense but respectful",
+    "lighthearted with lots of laughter", "quiet and reflective", "energetic"
+]
+SPEAKERS = ["Alice", "Bob", "Sam", "Jordan", "Taylor", "Morgan", "Unknown Speaker"]
+PLACES = [
+    ("123 Market St, San Francisco, CA", 37.7749, -122.4194),
+    ("200 Front St, Wilmington, NC", 34.2257, -77.9447),
+    ("1 Infinite Loop, Cupertino, CA", 37.3318, -122.0312),
+    ("350 5th Ave, New York, NY", 40.7484, -73.9857)
+]
+WEATHER_CONDITIONS = [
+    (800, "Clear", "clear sky"),
+    (801, "Clouds", "few clouds"),
+    (804, "Clouds", "overcast clouds"),
+    (500, "Rain", "light rain"),
+    (300, "Drizzle", "light intensity drizzle"),
+    (701, "Mist", "mist"),
+    (211, "Thunderstorm", "thunderstorm")
+]
+SERIES_NAMES = [
+    "Stranger Things", "The Crown", "Bridgerton", "Money Heist", "The Witcher",
+    "Ozark", "Dark", "Mindhunter", "Narcos", "Black Mirror", "Wednesday",
+    "The Queen's Gambit", "Squid Game", "Lupin", "Cobra Kai"
+]
+MOVIE_TITLES = [
+    "The Electric State", "Glass Onion", "Red Notice", "The Irishman",
+    "Marriage Story", "Roma", "Extraction", "The Gray Man", "Enola Holmes",
+    "Don't Look Up", "Bird Box", "The Adam Project"
+]
+EPISODE_WORDS = [
+    "The Beginning", "Homecoming", "The Reckoning", "Lost and Found",
+    "Point of No Return", "Aftermath", "The Long Night", "New Blood"
+]
+
+def sentence(rng):
+    """Build a single plausible sentence."""
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}."
+
+def paragraph(rng, sentences=3):
+    """Build a paragraph of the given number of sentences."""
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+def iso(dt):
+    """Format a datetime the way the Bee and Limitless APIs do."""
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def random_time_on_day(rng, day):
+    """Return a random datetime between 07:00 and 23:00 on the given day."""
+    return datetime(day.year, day.month, day.day) + timedelta(seconds=rng.randint(7 * 3600, 23 * 3600))
+
+def build_conversation(rng, conv_id, created_at):
+    """
+    Build a Bee conversation payload.
+
+    The summary uses the Markdown section layout the Bee API returns
+    (Summary / Atmosphere / Key Takeaways headings).
+    """
+    takeaways = [sentence(rng) for _ in range(rng.randint(2, 5))]
+    summary = (
+        "## Summary\n" + paragraph(rng, rng.randint(2, 5)) + "\n\n"
+        "## Atmosphere\n" + f"The atmosphere was {rng.choice(MOODS)}.\n\n"
+        "## Key Takeaways\n" + "\n".join(f"* {point}" for point in takeaways)
+    )
+    address, latitude, longitude = rng.choice(PLACES)
+    ended_at = created_at + timedelta(minutes=rng.randint(2, 90))
+    return {
+        "id": conv_id,
+        "summary": summary,
+        "short_summary": sentence(rng),
+        "start_time": iso(created_at),
+        "end_time": iso(ended_at),
+        "created_at": iso(created_at),
+        "primary_location": {
+            "address": address,
+            "latitude": latitude + rng.uniform(-0.005, 0.005),
+            "longitude": longitude + rng.uniform(-0.005, 0.005)
+        }
+    }
+
+def build_fact(rng, fact_id, created_at):
+    """Build a Bee fact payload."""
+    return {
+        "id": fact_id,
+        "text": f"{sentence(rng)} (#{fact_id})",
+        "tags": [],
+        "created_at": iso(created_at),
+        "confirmed": rng.random() < 0.5
+    }
+
+def build_lifelog(rng, log_id, started_at, subsummaries=4, lines_per_subsummary=12):
+    """
+    Build a Limitless lifelog payload.
+
+    The contents array follows the API layout: one heading1 title, then a
+    heading2 per sub-summary followed by blockquote transcript lines that
+    carry startTime/endTime and a speaker prefix.
+    """
+    current = started_at
+    contents = [{
+        "type": "heading1",
+        "content": sentence(rng).rstrip('.'),
+        "startTime": iso(current),
+        "endTime": iso(current),
+        "children": []
+    }]
+    for _ in range(subsummaries):
+        contents.append({
+            "type": "heading2",
+            "content": sentence(rng).rstrip('.'),
+            "startTime": iso(current),
+            "endTime": iso(current),
+            "children": []
+        })
+        for _ in range(lines_per_subsummary):
+            line_end = current + timedelta(seconds=rng.randint(2, 40))
+            contents.append({
+                "type": "blockquote",
+                "content": f"{rng.choice(SPEAKERS)}: {sentence(rng)}",
+                "startTime": iso(current),
+                "endTime": iso(line_end),
+                "children": []
+            })
+            current = line_end
+    return {
+        "id": log_id,
+        "title": contents[0]["content"],
+        "markdown": None,
+        "contents": contents
+    }
+
+def build_weather(rng, timestamp, units="imperial"):
+    """Build an OpenWeatherMap current weather payload."""
+    address, latitude, longitude = rng.choice(PLACES)
+    weather_id, main, description = rng.choice(WEATHER_CONDITIONS)
+    temperature = round(rng.uniform(30, 95), 2)
+    return {
+        "coord": {"lat": latitude, "lon": longitude},
+        "weather": [{"id": weather_id, "main": main, "description": description, "icon": "01d"}],
+        "main": {
+            "temp": temperature,
+            "feels_like": round(temperature + rng.uniform(-4, 4), 2),
+            "humidity": rng.randint(20, 100),
+            "pressure": rng.randint(990, 1030)
+        },
+        "visibility": rng.choice([10000, 8000, 5000]),
+        "wind": {"speed": round(rng.uniform(0, 25), 2), "deg": rng.randint(0, 359)},
+        "clouds": {"all": rng.randint(0, 100)},
+        "dt": int(timestamp.timestamp()),
+        "name": address.split(',')[1].strip(),
+        "units": units
+    }
+
+def build_billboard_chart(rng, chart_date, entries=100):
+    """Build a Billboard chart payload in the shape store_billboard_chart_items expects."""
+    return {
+        "chart": {
+            "name": "hot-100",
+            "date": chart_date,
+            "entries": [
+                {
+                    "rank": rank,
+                    "title": f"{rng.choice(OBJECTS).title()} #{rank}",
+                    "artist": rng.choice(SPEAKERS),
+                    "image": None,
+                    "last_week": rng.choice([None, rng.randint(1, 100)]),
+                    "peak_position": rng.randint(1, rank),
+                    "weeks_on_chart": rng.randint(1, 52)
+                }
+                for rank in range(1, entries + 1)
+            ]
+        }
+    }
+
+def build_netflix_title(rng):
+    """
+    Build a Netflix viewing history title.
+
+    Roughly two thirds are series episodes in the "Show: Season N: Episode"
+    layout of the Netflix CSV export, the rest are movies.
+    """
+    if rng.random() < 0.66:
+        return (f"{rng.choice(SERIES_NAMES)}: Season {rng.randint(1, 5)}: "
+                f"{rng.choice(EPISODE_WORDS)}")
+    return rng.choice(MOVIE_TITLES)
+
+def build_netflix_history_item(rng, watch_date):
+    """Build a Netflix history dictionary in the shape store_netflix_history expects."""
+    title = build_netflix_title(rng)
+    parts = title.split(': ')
+    return {
+        "title": title,
+        "watch_date": watch_date,
+        "show_name": parts[0] if len(parts) == 3 else None,
+        "season": parts[1] if len(parts) == 3 else None,
+        "episode_name": parts[2] if len(parts) == 3 else None
+    }
+
+def iter_days(days, end_date=None):
+    """Yield `days` consecutive dates ending at end_date (default: today)."""
+    end_date = end_date or datetime.now().date()
+    start_date = end_date - timedelta(days=days - 1)
+    for offset in range(days):
+        yield start_date + timedelta(days=offset)
+
+def poisson(rng, mean):
+    """Draw a small Poisson-distributed count (Knuth's algorithm)."""
+    if mean <= 0:
+        return 0
+    if mean > 30:
+        # Normal approximation keeps large means cheap
+        return max(0, int(round(rng.gauss(mean, mean ** 0.5))))
+    limit = 2.718281828459045 ** -mean
+    count = 0
+    product = rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
@@ -0,0 +1,55 @@
+"""
+Test script for the IMDB title matcher
+
+Checks that title_matcher uses the release year to tell apart candidates
+with the same title. Needs no database or network access; run it directly or
+with pytest.
+"""
+
+import title_matcher
+
+# Two series with the same title, separated only by their release year
+CANDIDATES = [
+    {"id": "tt0000001", "type": "tvSeries", "primaryTitle": "The Office", "originalTitle": "The Office",
+     "startYear": 2001, "numVotes": 1000},
+    {"id": "tt0000002", "type": "tvSeries", "primaryTitle": "The Office", "originalTitle": "The Office",
+     "startYear": 2005, "numVotes": 1000},
+]
+
+def test_expected_year_picks_the_closer_release():
+    """A year written in the Netflix title picks the candidate released closest to it."""
+    year = title_matcher.title_year(["The Office (2005)"])
+    assert year == 2005
+    candidate, confidence = title_matcher.best_match("The Office", CANDIDATES, want_series=True, year=year)
+    assert candidate["id"] == "tt0000002"
+    assert confidence == 1.0
+
+    candidate, _ = title_matcher.best_match("The Office", CANDIDATES, want_series=True, year=2001)
+    assert candidate["id"] == "tt0000001"
+
+def test_first_watch_excludes_later_releases():
+    """A candidate released after the title was first watched loses to one released before."""
+    candidate, confidence = title_matcher.best_match("The Office", CANDIDATES, want_series=True, latest_year=2003)
+    assert candidate["id"] == "tt0000001"
+    assert confidence == 1.0
+
+    later = title_matcher.score_candidate("The Office", CANDIDATES[1], want_series=True, latest_year=2003)
+    assert later["year_score"] == 0.0
+    assert later["confidence"] < confidence
+
+def test_unknown_years_are_left_out():
+    """Without a year the two candidates tie and the year signal is not scored."""
+    score = title_matcher.score_candidate("The Office", CANDIDATES[0], want_series=True)
+    assert score["year_score"] is None
+    assert title_matcher.year_score(None, 2005) is None
+    assert title_matcher.year_score(2001, None, latest_year=2010) is None
+
+def main():
+    """Run the tests"""
+    test_expected_year_picks_the_closer_release()
+    test_first_watch_excludes_later_releases()
+    test_unknown_years_are_left_out()
+    print("All title matcher tests passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Title Matching
+
+This module scores IMDB candidates for a Netflix title and picks the best one
+with a confidence between 0 and 1. It has no database or network dependency.
+
+Candidates are dictionaries shaped like IMDB API search results (id, type,
+primaryTitle, originalTitle, startYear, numVotes); imdb_offline shapes dataset
+rows the same way. The confidence is a weighted average of:
+
+- title similarity: character trigram overlap and token overlap of the
+  normalized titles, using the better of the primary and original title
+- type: whether the candidate is a series when episodes were watched
+- year: proximity to the expected release year when it is known (e.g. a
+  "(2019)" in the Netflix title), and zero for candidates released after the
+  title was first watched
+
+Signals that are unknown are left out of the average instead of counting as a
+match. The number of votes only breaks ties.
+"""
+
+import re
+import unicodedata
+
+# Weights of the confidence signals
+TITLE_WEIGHT = 0.7
+TYPE_WEIGHT = 0.15
+YEAR_WEIGHT = 0.15
+
+# Matches below this confidence are treated as no match
+MIN_CONFIDENCE = 0.8
+
+# A release year this many years off scores zero
+MAX_YEAR_DISTANCE = 5
+
+SERIES_TYPES = {"tvSeries", "tvMiniSeries"}
+
+# Leading articles ignored when comparing tokens
+ARTICLES = {"the", "a", "an"}
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+# A release year at the end of a title, as in "Persuasion (2022)"
+TITLE_YEAR_RE = re.compile(r'\((\d{4})\)\s*$')
+
+def tokenize(title):
+    """
+    Split a title into normalized tokens.
+
+    Case and accents are ignored, "&" counts as "and" and possessives lose their
+    apostrophe, so "The Queen's Gambit" gives ["the", "queens", "gambit"].
+
+    Args:
+        title: Title string
+
+    Returns:
+        List of tokens
+    """
+    if not title:
+        return []
+    title = unicodedata.normalize('NFKD', str(title))
+    title = ''.join(char for char in title if not unicodedata.combining(char)).lower()
+    title = title.replace('&', ' and ').replace("'", '').replace('’', '')
+    return TOKEN_RE.findall(title)
+
+def trigrams(tokens):
+    """Character trigrams of a token list, padded per token like pg_trgm."""
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _content_tokens(tokens):
+    """Tokens without a leading article."""
+    if len(tokens) > 1 and tokens[0] in ARTICLES:
+        return tokens[1:]
+    return tokens
+
+def title_similarity(query, title):
+    """
+    Similarity of two titles.
+
+    Args:
+        query: Searched title
+        title: Candidate title
+
+    Returns:
+        Score between 0 (unrelated) and 1 (same normalized title)
+    """
+    query_tokens = _content_tokens(tokenize(query))
+    title_tokens = _content_tokens(tokenize(title))
+    if not query_tokens or not title_tokens:
+        return 0.0
+    if query_tokens == title_tokens:
+        return 1.0
+
+    query_grams, title_grams = trigrams(query_tokens), trigrams(title_tokens)
+    dice = 2 * len(query_grams & title_grams) / (len(query_grams) + len(title_grams))
+
+    query_set, title_set = set(query_tokens), set(title_tokens)
+    jaccard = len(query_set & title_set) / len(query_set | title_set)
+
+    # Titles that only differ in spacing ("SpiderMan" vs "Spider Man") are the same title
+    if ''.join(query_tokens) == ''.join(title_tokens):
+        return 0.95
+    return (dice + jaccard) / 2
+
+def _year(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def title_year(titles):
+    """
+    Release year written in a title.
+
+    Args:
+        titles: Netflix titles of one search group
+
+    Returns:
+        The year of the first title ending in "(YYYY)", or None
+    """
+    for title in titles:
+        match = TITLE_YEAR_RE.search(title or '')
+        if match:
+            return int(match.group(1))
+    return None
+
+def year_score(candidate_year, expected_year, latest_year=None):
+    """
+    Score the release year of a candidate.
+
+    Args:
+        candidate_year: Release year of the candidate
+        expected_year: Expected release year, if known
+        latest_year: Latest possible release year (the year the title was
+            first watched), if known
+
+    Returns:
+        0 for a candidate released after latest_year, otherwise a score
+        between 0 and 1 for the distance to expected_year, or None if the
+        years needed are unknown
+    """
+    candidate_year = _year(candidate_year)
+    if candidate_year is None:
+        return None
+    latest_year = _year(latest_year)
+    if latest_year is not None and candidate_year > latest_year:
+        return 0.0
+    expected_year = _year(expected_year)
+    if expected_year is None:
+        return None
+    return max(0.0, 1 - abs(candidate_year - expected_year) / MAX_YEAR_DISTANCE)
+
+def type_score(candidate_type, want_series):
+    """
+    Score the title type of a candidate.
+
+    Returns:
+        1 if the candidate is a series exactly when one is wanted, 0 otherwise,
+        or None if the wanted type is unknown
+    """
+    if want_series is None or not candidate_type:
+        return None
+    return 1.0 if (candidate_type in SERIES_TYPES) == want_series else 0.0
+
+def score_candidate(query, candidate, want_series=None, year=None, latest_year=None):
+    """
+    Score one candidate.
+
+    Args:
+        query: Searched title
+        candidate: IMDB search result dictionary
+        want_series: True for series, False for movies, None if unknown
+        year: Expected release year, if known
+        latest_year: Latest possible release year, if known
+
+    Returns:
+        Dictionary with the confidence and the individual signal scores
+    """
+    title = max(title_similarity(query, candidate.get("primaryTitle")),
+                title_similarity(query, candidate.get("originalTitle")))
+    kind = type_score(candidate.get("type"), want_series)
+    release = year_score(candidate.get("startYear"), year, latest_year)
+
+    total, weights = TITLE_WEIGHT * title, TITLE_WEIGHT
+    for score, weight in ((kind, TYPE_WEIGHT), (release, YEAR_WEIGHT)):
+        if score is not None:
+            total += weight * score
+            weights += weight
+
+    return {
+        "confidence": round(total / weights, 4),
+        "title_score": round(title, 4),
+        "type_score": kind,
+        "year_score": release
+    }
+
+def rank_candidates(query, candidates, want_series=None, year=None, latest_year=None):
+    """
+    Rank candidates by confidence, most votes first among equals.
+
+    Returns:
+        List of (score dictionary, candidate) pairs, best first
+    """
+    scored = [(score_candidate(query, candidate, want_series, year, latest_year), candidate)
+              for candidate in candidates]
+    scored.sort(key=lambda pair: (pair[0]["confidence"], pair[1].get("numVotes") or 0), reverse=True)
+    return scored
+
+def best_match(query, candidates, want_series=None, year=None, latest_year=None, min_confidence=MIN_CONFIDENCE):
+    """
+    Pick the best candidate for a title.
+
+    Args:
+        query: Searched title
+        candidates: IMDB search result dictionaries
+        want_series: True for series, False for movies, None if unknown
+        year: Expected release year, if known
+        latest_year: Latest possible release year (the year the title was first watched), if known
+        min_confidence: Lowest confidence accepted as a match
+
+    Returns:
+        Tuple of (candidate, confidence); the candidate is None when no
+        candidate reaches min_confidence
+    """
+    ranked = rank_candidates(query, candidates, want_series, year, latest_year)
+    if not ranked:
+        return None, 0.0
+    score, candidate = ranked[0]
+    if score["confidence"] < min_confidence:
+        return None, score["confidence"]
+    return candidate, score["confidence"]
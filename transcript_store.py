@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+"""
+Transcript Line Storage
+
+Limitless transcript lines can be stored two ways:
+- rows: one limitless_transcript_lines row per line (the default)
+- packed: one limitless_transcript_packs row per subsummary, holding all of
+  its lines as a JSONB array of [speaker, text, start_time, end_time, speaker_id]
+
+Packing cuts the row count, index size and per-row overhead by the number of
+lines per subsummary, and the day view reads a subsummary's lines together
+anyway. A pack also keeps what the line indexes are built from: the text of
+its lines (full-text search indexes it like the text of line rows, see
+search.py), the ids of its speakers (GIN indexed) and the range of its line
+start times, so read_speaker_lines() finds a speaker's packed lines without
+unpacking unrelated packs.
+
+The storage used for new lines is set with transcripts.storage in config.yml.
+Everything that reads or writes transcript lines goes through this module
+(write_transcript_lines(), read_transcript_lines(), read_speaker_lines(),
+get_transcript_lines_between(), move_speaker_lines()), which handles both
+representations, so a database may hold a mix of both.
+
+Line rows store start_time and end_time as timestamptz, indexed on
+start_time, so get_transcript_lines_between() finds the lines overlapping a
+time window across all lifelogs. Packs keep the API's ISO strings; both are
+returned in that string format.
+
+Usage:
+    python transcript_store.py --pack    # move stored lines into packs
+    python transcript_store.py --unpack  # move packs back into rows
+    python transcript_store.py --reindex # fill the search text and speakers of packs stored without them
+"""
+
+import sys
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update, delete, exists, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import speakers
+from config_loader import get_transcript_config
+from models import Limitless_Lifelog, Limitless_Lifelog_SubSummary, Limitless_Transcript_Line, Limitless_Transcript_Pack
+from backfill import Backfill, run_backfill, update_rows, add_backfill_arguments, backfill_options
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STORAGE_ROWS = "rows"
+STORAGE_PACKED = "packed"
+
+# Line fields in the order they are packed
+PACKED_FIELDS = ("speaker", "text", "start_time", "end_time", "speaker_id")
+
+# Longest line get_transcript_lines_between() expects; lines starting earlier
+# than this before a window are not looked at, which keeps the index scan short
+MAX_LINE_DURATION = timedelta(minutes=10)
+
+# Most lines get_transcript_lines_between() returns
+MAX_WINDOW_LINES = 5000
+
+# Packs read_speaker_lines() unpacks at a time
+SPEAKER_PACK_BATCH = 50
+
+def as_utc(value):
+    """An aware datetime in UTC; naive datetimes are taken to be UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def parse_transcript_time(value):
+    """
+    Datetime of a transcript time.
+
+    Args:
+        value: ISO string as sent by the Limitless API, a datetime or None
+
+    Returns:
+        Aware UTC datetime, or None if missing or unparseable
+    """
+    if value is None or isinstance(value, datetime):
+        return as_utc(value) if value else None
+    try:
+        return as_utc(datetime.fromisoformat(value.replace('Z', '+00:00')))
+    except (ValueError, TypeError):
+        return None
+
+def format_transcript_time(value):
+    """
+    A transcript time in the Limitless API's format, e.g. 2024-05-01T14:03:12.250Z.
+
+    Args:
+        value: Datetime, an already formatted string or None
+
+    Returns:
+        ISO string in UTC, or None
+    """
+    if value is None or isinstance(value, str):
+        return value
+    value = as_utc(value)
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + f"{value.microsecond // 1000:03d}Z"
+
+def storage_mode():
+    """
+    Storage configured for new transcript lines.
+
+    Returns:
+        STORAGE_ROWS or STORAGE_PACKED
+    """
+    storage = get_transcript_config().get("storage", STORAGE_ROWS)
+    if storage not in (STORAGE_ROWS, STORAGE_PACKED):
+        logger.warning(f"Unknown transcripts.storage '{storage}', using {STORAGE_ROWS}")
+        return STORAGE_ROWS
+    return storage
+
+def pack_lines(lines):
+    """
+    Packed form of a subsummary's lines.
+
+    Args:
+        lines: List of line dicts in position order
+
+    Returns:
+        List of [speaker, text, start_time, end_time, speaker_id] lists
+    """
+    return [
+        [line.get("speaker"), line.get("text"),
+         format_transcript_time(line.get("start_time")), format_transcript_time(line.get("end_time")),
+         line.get("speaker_id")]
+        for line in lines
+    ]
+
+def unpack_lines(packed):
+    """
+    Line dicts of a pack, numbered by position.
+
+    Args:
+        packed: List of [speaker, text, start_time, end_time, speaker_id]
+            lists (packs written before speaker ids were kept lack the last one)
+
+    Returns:
+        List of dicts with speaker, text, start_time, end_time, speaker_id and position
+    """
+    return [
+        dict(zip(PACKED_FIELDS, values), speaker_id=values[4] if len(values) > 4 else None, position=position)
+        for position, values in enumerate(packed)
+    ]
+
+def pack_records(connection, lines_by_subsummary):
+    """
+    Limitless_Transcript_Pack column values for the lines of subsummaries.
+
+    Resolves the speakers of all lines at once, so every pack can be found by
+    its speakers, and keeps the text and start time range the pack indexes use.
+
+    Args:
+        connection: Connection (or session connection) with an open transaction
+        lines_by_subsummary: Dict mapping subsummary id to its line dicts
+            (speaker, text, start_time, end_time) in position order
+
+    Returns:
+        List of dicts with subsummary_id, lines, line_count, text,
+        speaker_ids, first_start_time and last_start_time
+    """
+    lines_by_subsummary = {
+        subsummary_id: [
+            {"speaker": line.get("speaker"), "text": line.get("text"),
+             "start_time": line.get("start_time"), "end_time": line.get("end_time")}
+            for line in lines
+        ]
+        for subsummary_id, lines in lines_by_subsummary.items()
+    }
+    speakers.assign_speaker_ids(connection, [line for lines in lines_by_subsummary.values() for line in lines])
+
+    records = []
+    for subsummary_id, lines in lines_by_subsummary.items():
+        start_times = [time for time in (parse_transcript_time(line["start_time"]) for line in lines) if time]
+        records.append({
+            "subsummary_id": subsummary_id,
+            "lines": pack_lines(lines),
+            "line_count": len(lines),
+            "text": "\n".join(line["text"] or "" for line in lines),
+            "speaker_ids": sorted({line["speaker_id"] for line in lines if line["speaker_id"] is not None}),
+            "first_start_time": min(start_times, default=None),
+            "last_start_time": max(start_times, default=None)
+        })
+    return records
+
+def write_transcript_lines(connection, lines_by_subsummary, storage=None):
+    """
+    Store the transcript lines of subsummaries.
+
+    Lines already stored for a subsummary are left alone: rows are skipped per
+    position and packs per subsummary, so re-running an extraction only fills
+    gaps.
+
+    Args:
+        connection: Connection (or session connection) with an open transaction
+        lines_by_subsummary: Dict mapping subsummary id to its line dicts
+            (speaker, text, start_time, end_time) in position order
+        storage: STORAGE_ROWS or STORAGE_PACKED (default: storage_mode())
+
+    Returns:
+        Number of lines written
+    """
+    storage = storage or storage_mode()
+    lines_by_subsummary = {subsummary_id: lines for subsummary_id, lines in lines_by_subsummary.items() if lines}
+    if not lines_by_subsummary:
+        return 0
+
+    if storage == STORAGE_PACKED:
+        connection.execute(
+            pg_insert(Limitless_Transcript_Pack).on_conflict_do_nothing(index_elements=["subsummary_id"]),
+            pack_records(connection, lines_by_subsummary)
+        )
+    else:
+        records = [
+            {
+                "subsummary_id": subsummary_id,
+                "speaker": line.get("speaker"),
+                "text": line["text"],
+                "start_time": parse_transcript_time(line.get("start_time")),
+                "end_time": parse_transcript_time(line.get("end_time")),
+                "position": position
+            }
+            for subsummary_id, lines in lines_by_subsummary.items()
+            for position, line in enumerate(lines)
+        ]
+        speakers.assign_speaker_ids(connection, records)
+        connection.execute(
+            pg_insert(Limitless_Transcript_Line).on_conflict_do_nothing(constraint='uq_transcript_line_position'),
+            records
+        )
+    return sum(len(lines) for lines in lines_by_subsummary.values())
+
+def read_transcript_lines(session, subsummary_ids):
+    """
+    Transcript lines of several subsummaries, whichever way they are stored.
+
+    Costs two queries however many subsummaries are read: one for their
+    packs and one for the rows of the subsummaries without a pack.
+
+    Args:
+        session: SQLAlchemy session
+        subsummary_ids: Ids of the subsummaries
+
+    Returns:
+        Dict mapping each subsummary id that has lines to its line dicts
+        (speaker, text, start_time, end_time, position) in position order
+    """
+    subsummary_ids = list(subsummary_ids)
+    if not subsummary_ids:
+        return {}
+
+    lines_by_subsummary = {
+        subsummary_id: unpack_lines(lines)
+        for subsummary_id, lines in session.execute(
+            select(Limitless_Transcript_Pack.subsummary_id, Limitless_Transcript_Pack.lines)
+            .where(Limitless_Transcript_Pack.subsummary_id.in_(subsummary_ids))
+        )
+    }
+
+    unpacked = [subsummary_id for subsummary_id in subsummary_ids if subsummary_id not in lines_by_subsummary]
+    if unpacked:
+        line = Limitless_Transcript_Line
+        rows = session.execute(
+            select(line.subsummary_id, line.speaker, line.text, line.start_time, line.end_time, line.position)
+            .where(line.subsummary_id.in_(unpacked))
+            .order_by(line.subsummary_id, line.position)
+        )
+        for row in rows:
+            lines_by_subsummary.setdefault(row.subsummary_id, []).append({
+                "speaker": row.speaker,
+                "text": row.text,
+                "start_time": format_transcript_time(row.start_time),
+                "end_time": format_transcript_time(row.end_time),
+                "position": row.position
+            })
+    return lines_by_subsummary
+
+def get_transcript_lines_between(session, start, end, limit=1000):
+    """
+    Transcript lines overlapping a time window, across all lifelogs.
+
+    Line rows are found through the start_time index: a line overlaps when it
+    starts before the window ends and ends after it starts, and only lines
+    starting at most MAX_LINE_DURATION before the window are considered.
+    Packs are found the same way through the range of their line start
+    times (first_start_time, last_start_time) and filtered after unpacking;
+    packs stored before they kept that range are only found once `--reindex`
+    has filled it in.
+
+    Args:
+        session: SQLAlchemy session
+        start: Start of the window (naive datetimes are taken as UTC)
+        end: End of the window, exclusive
+        limit: Maximum lines returned (capped at MAX_WINDOW_LINES)
+
+    Returns:
+        Dict with the lines in start time order and has_more, which is True
+        if the window holds more than limit lines
+    """
+    limit = max(1, min(limit, MAX_WINDOW_LINES))
+    start, end = as_utc(start), as_utc(end)
+    line = Limitless_Transcript_Line
+    subsummary = Limitless_Lifelog_SubSummary
+    lifelog = Limitless_Lifelog
+
+    rows = session.execute(
+        select(line.speaker, line.text, line.start_time, line.end_time, line.position,
+               subsummary.content.label("subsummary"), lifelog.log_id, lifelog.title)
+        .join(subsummary, subsummary.id == line.subsummary_id)
+        .join(lifelog, lifelog.log_id == subsummary.lifelog_id)
+        .where(line.start_time >= start - MAX_LINE_DURATION, line.start_time < end,
+               or_(line.start_time >= start, line.end_time > start))
+        .order_by(line.start_time, line.id)
+        .limit(limit + 1)
+    ).all()
+    lines = [
+        {
+            "speaker": row.speaker,
+            "text": row.text,
+            "start_time": row.start_time,
+            "end_time": row.end_time,
+            "position": row.position,
+            "subsummary": row.subsummary,
+            "lifelog_id": row.log_id,
+            "lifelog_title": row.title
+        }
+        for row in rows
+    ]
+
+    pack = Limitless_Transcript_Pack
+    packs = session.execute(
+        select(pack.lines, subsummary.content, lifelog.log_id, lifelog.title)
+        .join(subsummary, subsummary.id == pack.subsummary_id)
+        .join(lifelog, lifelog.log_id == subsummary.lifelog_id)
+        .where(pack.first_start_time < end, pack.last_start_time >= start - MAX_LINE_DURATION)
+    ).all()
+    for packed, content, log_id, title in packs:
+        for unpacked in unpack_lines(packed):
+            line_start = parse_transcript_time(unpacked["start_time"])
+            line_end = parse_transcript_time(unpacked["end_time"])
+            if line_start is None or line_start >= end:
+                continue
+            if line_start < start and (line_end is None or line_end <= start):
+                continue
+            lines.append(dict(unpacked, start_time=line_start, end_time=line_end, subsummary=content,
+                              lifelog_id=log_id, lifelog_title=title))
+
+    lines.sort(key=lambda item: item["start_time"])
+    for item in lines:
+        item["start_time"] = format_transcript_time(item["start_time"])
+        item["end_time"] = format_transcript_time(item["end_time"])
+    return {"lines": lines[:limit], "has_more": len(lines) > limit}
+
+def read_speaker_lines(session, speaker_id, start=None, end=None, after=None, limit=100):
+    """
+    A speaker's transcript lines in time order, whichever way they are stored.
+
+    Lines are ordered by a key: (start_time, 0, line id, 0) for line rows and
+    (start_time, 1, subsummary id, position) for packed lines. Line rows are
+    read through the (speaker_id, start_time, id) index from the key onwards.
+    Packs are found through the GIN index on their speaker ids in order of
+    their first start time, a batch at a time, until no later pack can hold
+    one of the first limit lines. Lines without a start time are not part of
+    the timeline, and packs stored before they had speaker ids are only found
+    once `--reindex` has filled them in.
+
+    Args:
+        session: SQLAlchemy session
+        speaker_id: Id of the speaker
+        start: Optional datetime, only lines starting at or after it (naive means UTC)
+        end: Optional datetime, only lines starting before it (naive means UTC)
+        after: Optional key of the last line already read, only later lines are returned
+        limit: Maximum lines returned
+
+    Returns:
+        List of up to limit line dicts in key order, with id (None for packed
+        lines), speaker, text, start_time and end_time (datetimes),
+        subsummary, lifelog_id, lifelog_title and key
+    """
+    start = as_utc(start) if start is not None else None
+    end = as_utc(end) if end is not None else None
+    line = Limitless_Transcript_Line
+    pack = Limitless_Transcript_Pack
+    subsummary = Limitless_Lifelog_SubSummary
+    lifelog = Limitless_Lifelog
+
+    query = (
+        select(line.id, line.speaker, line.text, line.start_time, line.end_time,
+               subsummary.content.label("subsummary"), lifelog.log_id, lifelog.title)
+        .join(subsummary, subsummary.id == line.subsummary_id)
+        .join(lifelog, lifelog.log_id == subsummary.lifelog_id)
+        .where(line.speaker_id == speaker_id, line.start_time.isnot(None))
+        .order_by(line.start_time, line.id)
+        .limit(limit)
+    )
+    if start is not None:
+        query = query.where(line.start_time >= start)
+    if end is not None:
+        query = query.where(line.start_time < end)
+    if after is not None:
+        # Packed lines sort after the line rows starting at the same time
+        if after[1] == 0:
+            query = query.where(tuple_(line.start_time, line.id) > tuple_(after[0], after[2]))
+        else:
+            query = query.where(line.start_time > after[0])
+    lines = [
+        {
+            "id": row.id,
+            "speaker": row.speaker,
+            "text": row.text,
+            "start_time": row.start_time,
+            "end_time": row.end_time,
+            "subsummary": row.subsummary,
+            "lifelog_id": row.log_id,
+            "lifelog_title": row.title,
+            "key": (row.start_time, 0, row.id, 0)
+        }
+        for row in session.execute(query)
+    ]
+
+    packs = (
+        select(pack.subsummary_id, pack.lines, pack.first_start_time, subsummary.content, lifelog.log_id, lifelog.title)
+        .join(subsummary, subsummary.id == pack.subsummary_id)
+        .join(lifelog, lifelog.log_id == subsummary.lifelog_id)
+        .where(pack.speaker_ids.contains([speaker_id]), pack.first_start_time.isnot(None))
+        .order_by(pack.first_start_time, pack.subsummary_id)
+        .limit(SPEAKER_PACK_BATCH)
+    )
+    lower = max((time for time in (start, after[0] if after else None) if time is not None), default=None)
+    if lower is not None:
+        packs = packs.where(pack.last_start_time >= lower)
+    if end is not None:
+        packs = packs.where(pack.first_start_time < end)
+
+    last_pack = None
+    while True:
+        query = packs
+        if last_pack is not None:
+            query = query.where(tuple_(pack.first_start_time, pack.subsummary_id) > tuple_(*last_pack))
+        batch = session.execute(query).all()
+        for subsummary_id, packed, _, content, log_id, title in batch:
+            for unpacked in unpack_lines(packed):
+                if unpacked["speaker_id"] != speaker_id:
+                    continue
+                line_start = parse_transcript_time(unpacked["start_time"])
+                if line_start is None or (start is not None and line_start < start) or (end is not None and line_start >= end):
+                    continue
+                key = (line_start, 1, subsummary_id, unpacked["position"])
+                if after is not None and key <= tuple(after):
+                    continue
+                lines.append({
+                    "id": None,
+                    "speaker": unpacked["speaker"],
+                    "text": unpacked["text"],
+                    "start_time": line_start,
+                    "end_time": parse_transcript_time(unpacked["end_time"]),
+                    "subsummary": content,
+                    "lifelog_id": log_id,
+                    "lifelog_title": title,
+                    "key": key
+                })
+        if len(batch) < SPEAKER_PACK_BATCH:
+            break
+        last_pack = (batch[-1].first_start_time, batch[-1].subsummary_id)
+        lines.sort(key=lambda item: item["key"])
+        # Later packs hold no line starting before the last pack's first line
+        if len(lines) >= limit and lines[limit - 1]["key"][0] < last_pack[0]:
+            break
+
+    lines.sort(key=lambda item: item["key"])
+    return lines[:limit]
+
+def move_speaker_lines(connection, from_id, to_id, alias):
+    """
+    Move the lines of one spelling of a speaker to another speaker.
+
+    Args:
+        connection: Connection with an open transaction
+        from_id: Id of the speaker the lines are stored under
+        to_id: Id of the speaker they move to
+        alias: Normalized spelling (see speakers.alias_key()) of the lines to move
+
+    Returns:
+        Number of lines moved, as rows and in packs
+    """
+    line = Limitless_Transcript_Line
+    spellings = [
+        speaker for speaker in connection.execute(
+            select(line.speaker).where(line.speaker_id == from_id).distinct()
+        ).scalars()
+        if speakers.alias_key(speaker) == alias
+    ]
+    moved = 0
+    if spellings:
+        moved = connection.execute(
+            update(line).where(line.speaker_id == from_id, line.speaker.in_(spellings)).values(speaker_id=to_id)
+        ).rowcount
+
+    pack = Limitless_Transcript_Pack
+    packs = connection.execute(
+        select(pack.subsummary_id, pack.lines).where(pack.speaker_ids.contains([from_id]))
+    ).all()
+    for subsummary_id, packed in packs:
+        lines = unpack_lines(packed)
+        changed = [item for item in lines
+                   if item["speaker_id"] == from_id and speakers.alias_key(item["speaker"]) == alias]
+        if not changed:
+            continue
+        for item in changed:
+            item["speaker_id"] = to_id
+        connection.execute(
+            update(pack).where(pack.subsummary_id == subsummary_id).values(
+                lines=pack_lines(lines),
+                speaker_ids=sorted({item["speaker_id"] for item in lines if item["speaker_id"] is not None})
+            )
+        )
+        moved += len(changed)
+    return moved
+
+def speaker_has_lines(connection, speaker_id):
+    """True if any stored line, as a row or in a pack, is spoken by the speaker."""
+    return connection.execute(select(
+        exists().where(Limitless_Transcript_Line.speaker_id == speaker_id)
+        | exists().where(Limitless_Transcript_Pack.speaker_ids.contains([speaker_id]))
+    )).scalar()
+
+def select_subsummary(row):
+    """Backfill transform: every subsummary the backfill's filter selects is moved."""
+    return {"subsummary_id": row["id"]}
+
+def pack_subsummaries(connection, changes):
+    """
+    Backfill writer: replace the line rows of the chunk's subsummaries with packs.
+
+    Args:
+        connection: Connection with the chunk's open transaction
+        changes: List of (row, transform result) pairs
+
+    Returns:
+        Number of subsummaries packed
+    """
+    subsummary_ids = [row["id"] for row, _ in changes]
+    lines_by_subsummary = {}
+    line = Limitless_Transcript_Line
+    for row in connection.execute(
+        select(line.subsummary_id, line.speaker, line.text, line.start_time, line.end_time)
+        .where(line.subsummary_id.in_(subsummary_ids))
+        .order_by(line.subsummary_id, line.position)
+    ):
+        lines_by_subsummary.setdefault(row.subsummary_id, []).append(row._asdict())
+
+    write_transcript_lines(connection, lines_by_subsummary, storage=STORAGE_PACKED)
+    connection.execute(delete(Limitless_Transcript_Line).where(Limitless_Transcript_Line.subsummary_id.in_(subsummary_ids)))
+    return len(lines_by_subsummary)
+
+def unpack_subsummaries(connection, changes):
+    """
+    Backfill writer: replace the packs of the chunk's subsummaries with line rows.
+
+    Args:
+        connection: Connection with the chunk's open transaction
+        changes: List of (row, transform result) pairs
+
+    Returns:
+        Number of subsummaries unpacked
+    """
+    subsummary_ids = [row["id"] for row, _ in changes]
+    lines_by_subsummary = {
+        subsummary_id: unpack_lines(lines)
+        for subsummary_id, lines in connection.execute(
+            select(Limitless_Transcript_Pack.subsummary_id, Limitless_Transcript_Pack.lines)
+            .where(Limitless_Transcript_Pack.subsummary_id.in_(subsummary_ids))
+        )
+    }
+
+    write_transcript_lines(connection, lines_by_subsummary, storage=STORAGE_ROWS)
+    connection.execute(delete(Limitless_Transcript_Pack).where(Limitless_Transcript_Pack.subsummary_id.in_(subsummary_ids)))
+    return len(lines_by_subsummary)
+
+def select_pack(row):
+    """Backfill transform: the lines of a pack stored without its search text and speakers."""
+    return {"lines": row["lines"]}
+
+def reindex_packs(connection, changes):
+    """
+    Backfill writer: fill in the search text, speakers and start time range of the chunk's packs.
+
+    Args:
+        connection: Connection with the chunk's open transaction
+        changes: List of (row, transform result) pairs
+
+    Returns:
+        Number of packs updated
+    """
+    records = pack_records(connection, {row["subsummary_id"]: unpack_lines(result["lines"]) for row, result in changes})
+    return update_rows(REINDEX_BACKFILL, connection, [
+        ({"subsummary_id": record.pop("subsummary_id")}, record) for record in records
+    ])
+
+PACK_BACKFILL = Backfill(
+    "pack_transcript_lines", Limitless_Lifelog_SubSummary, [], select_subsummary,
+    where=Limitless_Lifelog_SubSummary.transcript_lines.any(), write=pack_subsummaries, chunk_size=500
+)
+UNPACK_BACKFILL = Backfill(
+    "unpack_transcript_lines", Limitless_Lifelog_SubSummary, [], select_subsummary,
+    where=Limitless_Lifelog_SubSummary.transcript_pack.has(), write=unpack_subsummaries, chunk_size=500
+)
+# Packs written before they kept their search text and speaker ids
+REINDEX_BACKFILL = Backfill(
+    "reindex_transcript_packs", Limitless_Transcript_Pack, ["lines"], select_pack,
+    where=Limitless_Transcript_Pack.text.is_(None), key="subsummary_id", write=reindex_packs, chunk_size=500
+)
+
+def main():
+    """Move stored transcript lines between row and packed storage, or reindex packs."""
+    parser = argparse.ArgumentParser(description="Move Limitless transcript lines between row and packed storage")
+    direction = parser.add_mutually_exclusive_group(required=True)
+    direction.add_argument("--pack", action="store_true", help="Pack the line rows of every subsummary")
+    direction.add_argument("--unpack", action="store_true", help="Turn every pack back into line rows")
+    direction.add_argument("--reindex", action="store_true",
+                           help="Fill the search text and speakers of packs stored without them")
+    add_backfill_arguments(parser)
+    args = parser.parse_args()
+
+    if args.reindex:
+        result = run_backfill(REINDEX_BACKFILL, **backfill_options(args))
+        logger.info(f"Reindexed {result['updated']} packs")
+        return 0
+
+    backfill = PACK_BACKFILL if args.pack else UNPACK_BACKFILL
+    result = run_backfill(backfill, **backfill_options(args))
+    logger.info(f"{'Packed' if args.pack else 'Unpacked'} {result['updated']} subsummaries")
+    if storage_mode() != (STORAGE_PACKED if args.pack else STORAGE_ROWS):
+        logger.warning(f"transcripts.storage in config.yml is '{storage_mode()}', so new lines are still stored that way")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
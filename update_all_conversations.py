@@ -1,202 +1,74 @@
 #!/usr/bin/env python3
 """
-Update All Bee Conversations with Direct SQL
+Update All Bee Conversations from Raw Data
 
-This script updates all conversations in the bee_conversations table using direct SQL queries
-to extract summary, atmosphere, and key_takeaways from the raw_data JSON.
+This script re-extracts summary, atmosphere, and key_takeaways of every conversation in the
+bee_conversations table from its raw_data JSON, normalized exactly as store_conversations does
+at ingest. It runs as a resumable backfill (see backfill.py), so an interrupted run continues
+where it stopped, and only visits conversations whose raw_data changed or that were derived by
+another transform or an older conversation_sections.TRANSFORM_VERSION (--force visits all).
 """
 
 import json
-import re
 import logging
-import os
-import psycopg2
-from psycopg2.extras import Json
+import argparse
+
+import conversation_sections
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
+from models import Bee_Conversation
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def extract_section(full_text, section_patterns):
+def extract_conversation_columns(row):
     """
-    Extract a section of text based on patterns.
-    
+    Backfill transform: the normalized sections of a conversation's raw_data summary.
+
     Args:
-        full_text: The full text to search
-        section_patterns: List of regex patterns to match the section header
-        
+        row: Dict with the conversation id and raw_data
+
     Returns:
-        Extracted section text or empty string if not found
+        Dict with the new summary, atmosphere and key_takeaways values
     """
-    if not full_text:
-        return ""
-        
-    section_text = ""
-    
-    # Try to find the section header
-    section_match = None
-    for pattern in section_patterns:
-        match = re.search(pattern, full_text)
-        if match:
-            section_match = match
-            break
-            
-    # Extract text after section header
-    if section_match:
-        start_idx = section_match.end()
-        # Find where next section starts (if any)
-        next_section_start = len(full_text)
-        next_section_patterns = [r'## ', r'### ']
-        for pattern in next_section_patterns:
-            match = re.search(pattern, full_text[start_idx:])
-            if match:
-                next_section_start = min(next_section_start, start_idx + match.start())
-        
-        # Extract section text
-        section_text = full_text[start_idx:next_section_start].strip()
-    
-    return section_text
+    if not row["raw_data"]:
+        raise ValueError("No raw_data")
+    raw_data = json.loads(row["raw_data"])
+    return conversation_sections.normalize_conversation(raw_data.get("summary"))
 
-def update_all_conversations():
-    """Update all conversations in the database using direct SQL."""
-    # Get database connection
-    db_url = os.environ.get('DATABASE_URL')
-    if not db_url:
-        logger.error("DATABASE_URL not found in environment variables")
-        return {"updated": 0, "errors": 1}
-    
-    # Summary section patterns
-    summary_patterns = [
-        r'## Summary\s*\n',
-        r'### Summary\s*\n',
-        r'## Summary:',
-        r'### Summary:',
-        r'\*\*Summary\*\*:?',
-        r'Summary:'
-    ]
-    
-    # Atmosphere section patterns
-    atmosphere_patterns = [
-        r'## Atmosphere\s*\n',
-        r'### Atmosphere\s*\n', 
-        r'## Atmosphere:',
-        r'### Atmosphere:',
-        r'\*\*Atmosphere\*\*:?',
-        r'Atmosphere:'
-    ]
-    
-    # Key Takeaways section patterns
-    key_takeaways_patterns = [
-        r'## Key Take[aA]ways\s*\n',
-        r'### Key Take[aA]ways\s*\n',
-        r'## Key Take[aA]ways:',
-        r'### Key Take[aA]ways:',
-        r'\*\*Key Take[aA]ways\*\*:?',
-        r'Key Take[aA]ways:',
-        r'## Key Takeaways\s*\n',
-        r'### Key Takeaways\s*\n',
-        r'## Key Takeaways:',
-        r'### Key Takeaways:',
-        r'\*\*Key Takeaways\*\*:?',
-        r'Key Takeaways:'
-    ]
-    
+BACKFILL = Backfill("update_all_conversations", Bee_Conversation, ["raw_data"], extract_conversation_columns,
+                    version=conversation_sections.TRANSFORM_VERSION)
+
+def update_all_conversations(processes=None, chunk_size=None, restart=False, force=False):
+    """
+    Update all conversations in the database from their raw_data.
+
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first conversation instead of resuming an interrupted run
+        force: Also update conversations that are already up to date
+    """
     try:
-        conn = psycopg2.connect(db_url)
-        cursor = conn.cursor()
-        
-        # Get all conversations
-        cursor.execute("SELECT id, raw_data FROM bee_conversations;")
-        conversations = cursor.fetchall()
-        logger.info(f"Updating {len(conversations)} conversations")
-        
-        updated_count = 0
-        error_count = 0
-        
-        for conv_id, raw_data_str in conversations:
-            try:
-                if not raw_data_str:
-                    logger.warning(f"No raw_data for conversation {conv_id}")
-                    error_count += 1
-                    continue
-                    
-                raw_data = json.loads(raw_data_str)
-                
-                # Extract summary from raw_data
-                summary_text = ""
-                if raw_data.get("summary"):
-                    full_text = raw_data.get("summary")
-                    summary_text = extract_section(full_text, summary_patterns)
-                    if not summary_text and full_text:
-                        # If no summary section found, use the whole text
-                        summary_text = full_text.strip()
-                
-                # Extract atmosphere from raw_data
-                atmosphere_text = ""
-                if raw_data.get("summary"):
-                    full_text = raw_data.get("summary")
-                    atmosphere_text = extract_section(full_text, atmosphere_patterns)
-                
-                # Extract key takeaways from raw_data
-                key_takeaways_text = ""
-                if raw_data.get("summary"):
-                    full_text = raw_data.get("summary")
-                    key_takeaways_text = extract_section(full_text, key_takeaways_patterns)
-                
-                # Convert key takeaways text to list if it exists
-                key_takeaways_list = None
-                if key_takeaways_text:
-                    # Split by newlines and handle bullet points
-                    key_takeaways_items = key_takeaways_text.strip().split('\n')
-                    key_takeaways_list = []
-                    for item in key_takeaways_items:
-                        # Remove bullet points or dashes if they exist
-                        cleaned_item = re.sub(r'^[\*\-•]+\s*', '', item.strip())
-                        if cleaned_item:  # Only add non-empty items
-                            key_takeaways_list.append(cleaned_item)
-                
-                # Update the conversation record with direct SQL
-                cursor.execute(
-                    "UPDATE bee_conversations SET summary = %s, atmosphere = %s, key_takeaways = %s WHERE id = %s",
-                    (summary_text, atmosphere_text, Json(key_takeaways_list) if key_takeaways_list else None, conv_id)
-                )
-                
-                updated_count += 1
-                
-                # Log progress every 10 conversations
-                if updated_count % 10 == 0:
-                    logger.info(f"Updated {updated_count} conversations so far")
-                    # Commit every 10 records to avoid long transactions
-                    conn.commit()
-            
-            except Exception as e:
-                logger.error(f"Error updating conversation {conv_id}: {str(e)}")
-                error_count += 1
-        
-        # Final commit
-        conn.commit()
-        logger.info(f"Updated {updated_count} conversations with {error_count} errors")
-        
-        return {
-            "updated": updated_count,
-            "errors": error_count
-        }
-    
+        result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart, force=force)
     except Exception as e:
         logger.error(f"Database error: {str(e)}")
-        return {
-            "updated": 0,
-            "errors": 1
-        }
-    finally:
-        if 'conn' in locals():
-            conn.close()
+        return {"updated": 0, "errors": 1}
+
+    return {
+        "updated": result["updated"],
+        "errors": result["errors"]
+    }
 
 def main():
     """Main function to run the update process."""
-    logger.info("Starting conversation columns update with direct SQL")
-    result = update_all_conversations()
+    parser = argparse.ArgumentParser(description="Re-extract Bee conversation sections from raw_data")
+    add_backfill_arguments(parser, change_detection=True)
+    args = parser.parse_args()
+
+    logger.info("Starting conversation columns update")
+    result = update_all_conversations(**backfill_options(args))
     logger.info(f"Update complete: {result['updated']} updated, {result['errors']} errors")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,202 +3,83 @@
 Update Bee Conversation Columns
 
 This script updates the summary, atmosphere, and key_takeaways columns in the bee_conversations
-table by extracting values from the raw_data JSON.
+table by extracting values from the raw_data JSON, as a resumable backfill (see backfill.py).
+Conversations this version of the script already derived from unchanged raw_data are skipped
+(--force visits all).
 """
 
 import json
-import re
 import logging
-import sqlalchemy
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-import os
+import argparse
+
+import conversation_sections
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
 from models import Bee_Conversation
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Create database connection
-db_url = os.environ.get('DATABASE_URL')
-if not db_url:
-    logger.error("DATABASE_URL not found in environment variables")
-    exit(1)
-
-engine = create_engine(db_url)
-Session = sessionmaker(bind=engine)
+# Recorded as transform_version of the conversations this script derives; bump it when extract_columns changes
+TRANSFORM_VERSION = "update_conversation_columns:1"
 
-def extract_section(full_text, section_patterns):
+def extract_columns(row):
     """
-    Extract a section of text based on patterns.
+    Backfill transform: summary, atmosphere and key takeaways from a conversation's raw_data.
+    
+    Conversations without raw_data get empty sections.
     
     Args:
-        full_text: The full text to search
-        section_patterns: List of regex patterns to match the section header
+        row: Dict with the conversation id and raw_data
         
     Returns:
-        Extracted section text or empty string if not found
+        Dict with the new summary, atmosphere and key_takeaways values
     """
-    if not full_text:
-        return ""
-        
-    section_text = ""
-    
-    # Try to find the section header
-    section_match = None
-    for pattern in section_patterns:
-        match = re.search(pattern, full_text)
-        if match:
-            section_match = match
-            break
-            
-    # Extract text after section header
-    if section_match:
-        start_idx = section_match.end()
-        # Find where next section starts (if any)
-        next_section_start = len(full_text)
-        next_section_patterns = [r'## ', r'### ']
-        for pattern in next_section_patterns:
-            match = re.search(pattern, full_text[start_idx:])
-            if match:
-                next_section_start = min(next_section_start, start_idx + match.start())
-        
-        # Extract section text
-        section_text = full_text[start_idx:next_section_start].strip()
+    raw_data = json.loads(row["raw_data"]) if row["raw_data"] else {}
+    full_text = raw_data.get("summary") or ""
     
-    return section_text
+    sections = conversation_sections.split_sections(full_text)
+    return {
+        "summary": sections["summary"],
+        "atmosphere": sections["atmosphere"],
+        "key_takeaways": conversation_sections.parse_key_takeaways(sections["key_takeaways"]) or None
+    }
 
-def update_conversation_columns():
+BACKFILL = Backfill("update_conversation_columns", Bee_Conversation, ["raw_data"], extract_columns,
+                    version=TRANSFORM_VERSION)
+
+def update_conversation_columns(processes=None, chunk_size=None, restart=False, force=False):
     """
     Update summary, atmosphere, and key_takeaways columns for all conversations.
+    
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first conversation instead of resuming an interrupted run
+        force: Also update conversations that are already up to date
     """
-    session = Session()
     try:
-        # Get all conversations
-        conversations = session.query(Bee_Conversation).all()
-        logger.info(f"Updating {len(conversations)} conversations")
-        
-        updated_count = 0
-        error_count = 0
-        
-        # Summary section patterns
-        summary_patterns = [
-            r'## Summary\s*\n',
-            r'### Summary\s*\n',
-            r'## Summary:',
-            r'### Summary:',
-            r'\*\*Summary\*\*:?',
-            r'Summary:'
-        ]
-        
-        # Atmosphere section patterns
-        atmosphere_patterns = [
-            r'## Atmosphere\s*\n',
-            r'### Atmosphere\s*\n', 
-            r'## Atmosphere:',
-            r'### Atmosphere:',
-            r'\*\*Atmosphere\*\*:?',
-            r'Atmosphere:'
-        ]
-        
-        # Key Takeaways section patterns
-        key_takeaways_patterns = [
-            r'## Key Take[aA]ways\s*\n',
-            r'### Key Take[aA]ways\s*\n',
-            r'## Key Take[aA]ways:',
-            r'### Key Take[aA]ways:',
-            r'\*\*Key Take[aA]ways\*\*:?',
-            r'Key Take[aA]ways:',
-            r'## Key Takeaways\s*\n',
-            r'### Key Takeaways\s*\n',
-            r'## Key Takeaways:',
-            r'### Key Takeaways:',
-            r'\*\*Key Takeaways\*\*:?',
-            r'Key Takeaways:'
-        ]
-        
-        for conv in conversations:
-            try:
-                raw_data = {}
-                try:
-                    if conv.raw_data:
-                        raw_data = json.loads(conv.raw_data)
-                except json.JSONDecodeError:
-                    logger.error(f"Error parsing raw_data JSON for conversation {conv.id}")
-                    error_count += 1
-                    continue
-                
-                # Extract summary from raw_data
-                summary_text = ""
-                if raw_data.get("summary"):
-                    full_text = raw_data.get("summary")
-                    summary_text = extract_section(full_text, summary_patterns)
-                    if not summary_text and full_text:
-                        # If no summary section found, use the whole text
-                        summary_text = full_text.strip()
-                
-                # Extract atmosphere from raw_data
-                atmosphere_text = ""
-                if raw_data.get("summary"):
-                    full_text = raw_data.get("summary")
-                    atmosphere_text = extract_section(full_text, atmosphere_patterns)
-                
-                # Extract key takeaways from raw_data
-                key_takeaways_text = ""
-                if raw_data.get("summary"):
-                    full_text = raw_data.get("summary")
-                    key_takeaways_text = extract_section(full_text, key_takeaways_patterns)
-                
-                # Convert key takeaways text to list if it exists
-                key_takeaways_list = None
-                if key_takeaways_text:
-                    # Split by newlines and handle bullet points
-                    key_takeaways_items = key_takeaways_text.strip().split('\n')
-                    key_takeaways_list = []
-                    for item in key_takeaways_items:
-                        # Remove bullet points or dashes if they exist
-                        cleaned_item = re.sub(r'^[\*\-•]+\s*', '', item.strip())
-                        if cleaned_item:  # Only add non-empty items
-                            key_takeaways_list.append(cleaned_item)
-                
-                # Update the conversation record
-                conv.summary = summary_text
-                conv.atmosphere = atmosphere_text
-                conv.key_takeaways = key_takeaways_list
-                
-                updated_count += 1
-                
-                # Log progress every 10 conversations
-                if updated_count % 10 == 0:
-                    logger.info(f"Updated {updated_count} conversations so far")
-            
-            except Exception as e:
-                logger.error(f"Error updating conversation {conv.id}: {str(e)}")
-                error_count += 1
-        
-        # Commit changes
-        session.commit()
-        logger.info(f"Updated {updated_count} conversations with {error_count} errors")
-        
-        return {
-            "updated": updated_count,
-            "errors": error_count
-        }
-    
+        result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart, force=force)
     except Exception as e:
-        session.rollback()
         logger.error(f"Error in update_conversation_columns: {str(e)}")
         return {
             "updated": 0,
             "errors": 1
         }
-    finally:
-        session.close()
+    
+    return {
+        "updated": result["updated"],
+        "errors": result["errors"]
+    }
 
 def main():
     """Main function to run the update process."""
+    parser = argparse.ArgumentParser(description="Update Bee conversation columns from raw_data")
+    add_backfill_arguments(parser, change_detection=True)
+    args = parser.parse_args()
+    
     logger.info("Starting conversation columns update")
-    result = update_conversation_columns()
+    result = update_conversation_columns(**backfill_options(args))
     logger.info(f"Update complete: {result['updated']} updated, {result['errors']} errors")
 
 if __name__ == "__main__":
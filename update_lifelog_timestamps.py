@@ -2,111 +2,83 @@
 Update Lifelog Timestamps
 
 This script updates the timestamps for existing Limitless lifelogs in the database
-by extracting startTime and endTime from the contents.
+by extracting startTime and endTime from the contents. It runs as a resumable
+backfill (see backfill.py) over the lifelogs that are missing a timestamp, skipping
+the ones it already parsed from the same raw_data (--force visits them again).
 """
 
-import json
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import argparse
+import lifelog_parser
 from models import Limitless_Lifelog
-from database_handler import parse_date
-import os
+from database_handler import rebuild_daily_activity
+from backfill import Backfill, run_backfill, add_backfill_arguments, backfill_options
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Get database URL from environment variables
-DATABASE_URL = os.environ.get('DATABASE_URL')
+# Bump when extract_lifelog_timestamps changes, so processed lifelogs are parsed again
+TRANSFORM_VERSION = "update_lifelog_timestamps:1"
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+def extract_lifelog_timestamps(row):
+    """
+    Backfill transform: the earliest startTime and latest endTime in a lifelog's contents.
+
+    Uses the same parser as store_lifelogs, so timestamps fall back to the
+    payload's created_at/updated_at exactly as they do at ingest.
+
+    Args:
+        row: Dict with the lifelog id and raw_data
+
+    Returns:
+        Dict with created_at (and updated_at when one was found), or None if
+        the lifelog has no valid start time
+    """
+    parsed = lifelog_parser.parse_lifelog(row["raw_data"])
+    if not parsed.created_at:
+        return None
+    timestamps = {"created_at": parsed.created_at}
+    if parsed.updated_at:
+        timestamps["updated_at"] = parsed.updated_at
+    return timestamps
+
+def _rebuild_lifelog_activity():
+    # Lifelogs may have moved to a different day
+    rebuild_daily_activity(["lifelogs"])
 
-# Create a sessionmaker
-Session = sessionmaker(bind=engine)
+BACKFILL = Backfill(
+    "update_lifelog_timestamps", Limitless_Lifelog, ["raw_data"], extract_lifelog_timestamps,
+    where=Limitless_Lifelog.created_at.is_(None) | Limitless_Lifelog.updated_at.is_(None),
+    after=_rebuild_lifelog_activity, version=TRANSFORM_VERSION
+)
 
-def update_lifelog_timestamps():
+def update_lifelog_timestamps(processes=None, chunk_size=None, restart=False, force=False):
     """
     Update timestamps for existing Limitless lifelogs in the database.
     Extracts startTime and endTime from contents.
+
+    Args:
+        processes: Optional number of worker processes (0 means one per CPU)
+        chunk_size: Optional rows read and committed at a time
+        restart: Start from the first lifelog instead of resuming an interrupted run
+        force: Also parse lifelogs already processed from the same raw_data
     """
-    session = Session()
     try:
-        # Get all lifelogs
-        lifelogs = session.query(Limitless_Lifelog).all()
-        logger.info(f"Found {len(lifelogs)} Limitless lifelogs in the database")
-        
-        updated_count = 0
-        skipped_count = 0
-        
-        for log in lifelogs:
-            try:
-                # Skip if already has timestamps
-                if log.created_at is not None and log.updated_at is not None:
-                    logger.info(f"Lifelog {log.log_id} already has timestamps, skipping")
-                    skipped_count += 1
-                    continue
-                
-                # Parse raw_data
-                raw_data = json.loads(log.raw_data)
-                
-                # Extract timestamps from contents
-                created_at = None
-                updated_at = None
-                
-                # Look for startTime and endTime in contents
-                if 'contents' in raw_data and isinstance(raw_data['contents'], list):
-                    # Find the earliest startTime and latest endTime
-                    for item in raw_data['contents']:
-                        start_time = item.get('startTime')
-                        parsed_start = parse_date(start_time) if start_time else None
-                        
-                        if parsed_start:
-                            if created_at is None:
-                                created_at = parsed_start
-                            elif parsed_start < created_at:
-                                created_at = parsed_start
-                            
-                        end_time = item.get('endTime')
-                        parsed_end = parse_date(end_time) if end_time else None
-                        
-                        if parsed_end:
-                            if updated_at is None:
-                                updated_at = parsed_end
-                            elif parsed_end > updated_at:
-                                updated_at = parsed_end
-                
-                # Update the lifelog if we found valid timestamps
-                if created_at:
-                    log.created_at = created_at
-                    if updated_at:
-                        log.updated_at = updated_at
-                    updated_count += 1
-                    logger.info(f"Updated timestamps for lifelog {log.log_id}")
-                else:
-                    logger.warning(f"No valid timestamps found for lifelog {log.log_id}")
-                    skipped_count += 1
-            
-            except Exception as e:
-                logger.error(f"Error updating lifelog {log.log_id}: {str(e)}")
-                skipped_count += 1
-        
-        # Commit changes
-        session.commit()
-        logger.info(f"Updated {updated_count} lifelogs, skipped {skipped_count}")
-        
+        result = run_backfill(BACKFILL, processes=processes, chunk_size=chunk_size, restart=restart, force=force)
+        logger.info(f"Updated {result['updated']} lifelogs, skipped {result['processed'] - result['updated']}")
     except Exception as e:
-        session.rollback()
         logger.error(f"Error updating lifelog timestamps: {str(e)}")
-    finally:
-        session.close()
 
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description="Derive Limitless lifelog timestamps from their contents")
+    add_backfill_arguments(parser, change_detection=True)
+    args = parser.parse_args()
+
     logger.info("Starting timestamp update")
-    update_lifelog_timestamps()
+    update_lifelog_timestamps(**backfill_options(args))
     logger.info("Completed timestamp update")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
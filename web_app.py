@@ -10,7 +10,12 @@ import os
 import json
 from datetime import datetime, timedelta
 import database_handler as db
-from sqlalchemy import and_, func, extract
+import search as search_module
+import netflix_series_stats
+import speakers
+import transcript_store
+import related_index
+from sqlalchemy import and_, extract
 import models
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
@@ -83,205 +88,7 @@ def journal_data():
         start_date_str = start_date_obj.strftime('%Y-%m-%d')
         end_date_str = end_date_obj.strftime('%Y-%m-%d')
         
-        # Get Bee conversations
-        bee_conversations = session.query(models.Bee_Conversation).filter(
-            and_(
-                models.Bee_Conversation.created_at >= start_date_obj,
-                models.Bee_Conversation.created_at < end_date_obj + timedelta(days=1)
-            )
-        ).order_by(models.Bee_Conversation.created_at.desc()).all()
-        
-        # Facts removed as requested
-        bee_facts = []  # Empty list to maintain compatibility with existing code
-        
-        # Get Limitless lifelogs with their subsummaries
-        lifelogs = session.query(models.Limitless_Lifelog).filter(
-            and_(
-                models.Limitless_Lifelog.created_at >= start_date_obj,
-                models.Limitless_Lifelog.created_at < end_date_obj + timedelta(days=1)
-            )
-        ).order_by(models.Limitless_Lifelog.created_at.desc()).all()
-        
-        # Load related subsummaries for each lifelog
-        for log in lifelogs:
-            # Get subsummaries with their transcript lines
-            subsummaries = session.query(models.Limitless_Lifelog_SubSummary).filter(
-                models.Limitless_Lifelog_SubSummary.lifelog_id == log.log_id
-            ).order_by(models.Limitless_Lifelog_SubSummary.position).all()
-            
-            # For each subsummary, load related transcript lines
-            for subsummary in subsummaries:
-                subsummary.transcript_lines = session.query(models.Limitless_Transcript_Line).filter(
-                    models.Limitless_Transcript_Line.subsummary_id == subsummary.id
-                ).order_by(models.Limitless_Transcript_Line.position).all()
-            
-            log.subsummaries = subsummaries
-        
-        # Get Netflix viewing history
-        netflix_history = session.query(models.Netflix_History_Item).filter(
-            and_(
-                models.Netflix_History_Item.watch_date >= start_date_obj,
-                models.Netflix_History_Item.watch_date < end_date_obj + timedelta(days=1)
-            )
-        ).order_by(models.Netflix_History_Item.watch_date.desc()).all()
-        
-        # Process data into a format suitable for the journal
-        days_data = {}
-        
-        # Process Bee conversations
-        for conv in bee_conversations:
-            day_key = conv.created_at.strftime('%Y-%m-%d')
-            if day_key not in days_data:
-                days_data[day_key] = {
-                    'date': day_key,
-                    'conversations': [],
-                    'facts': [],
-                    'lifelogs': [],
-                    'netflix': []
-                }
-            
-            # Extract summary, atmosphere, and key takeaways
-            summary = conv.summary or ""
-            atmosphere = conv.atmosphere or ""
-            
-            # Handle key_takeaways as JSON or convert to string as needed
-            key_takeaways = None
-            if conv.key_takeaways:
-                if isinstance(conv.key_takeaways, list):
-                    # It's already a JSON list, we'll handle the formatting in the frontend
-                    key_takeaways = conv.key_takeaways
-                elif isinstance(conv.key_takeaways, str):
-                    try:
-                        # Try to parse as JSON string first
-                        import json
-                        parsed = json.loads(conv.key_takeaways)
-                        if isinstance(parsed, list):
-                            key_takeaways = parsed
-                        else:
-                            # If it's JSON but not a list, convert to string
-                            key_takeaways = str(parsed)
-                    except json.JSONDecodeError:
-                        # Not valid JSON, treat as regular string or convert lines to a list
-                        if '\n' in conv.key_takeaways:
-                            key_takeaways = [line.strip() for line in conv.key_takeaways.split('\n') if line.strip()]
-                        else:
-                            key_takeaways = conv.key_takeaways
-            
-            days_data[day_key]['conversations'].append({
-                'id': conv.id,
-                'summary': summary,
-                'atmosphere': atmosphere,
-                'key_takeaways': key_takeaways,
-                'time': conv.created_at.strftime('%H:%M'),
-                'location': conv.address if conv.address else None,
-                'latitude': conv.latitude,
-                'longitude': conv.longitude
-            })
-        
-        # Process Bee facts
-        for fact in bee_facts:
-            day_key = fact.created_at.strftime('%Y-%m-%d')
-            if day_key not in days_data:
-                days_data[day_key] = {
-                    'date': day_key,
-                    'conversations': [],
-                    'facts': [],
-                    'lifelogs': [],
-                    'netflix': []
-                }
-            
-            days_data[day_key]['facts'].append({
-                'id': fact.id,
-                'text': fact.text,
-                'time': fact.created_at.strftime('%H:%M')
-            })
-        
-        # Process Limitless lifelogs
-        for log in lifelogs:
-            day_key = log.created_at.strftime('%Y-%m-%d')
-            if day_key not in days_data:
-                days_data[day_key] = {
-                    'date': day_key,
-                    'conversations': [],
-                    'facts': [],
-                    'lifelogs': [],
-                    'netflix': []
-                }
-            
-            # Get subsummaries with transcript lines for this lifelog if available
-            subsummaries = []
-            if hasattr(log, 'subsummaries') and log.subsummaries:
-                # Process each subsummary and its transcript lines
-                for sub in log.subsummaries:
-                    # Format transcript lines for this subsummary
-                    transcript_lines = []
-                    if hasattr(sub, 'transcript_lines') and sub.transcript_lines:
-                        transcript_lines = [
-                            {
-                                'speaker': line.speaker,
-                                'text': line.text,
-                                'start_time': line.start_time,
-                                'end_time': line.end_time,
-                                'position': line.position
-                            }
-                            for line in sub.transcript_lines
-                        ]
-                    
-                    # Add subsummary with its transcript lines
-                    subsummaries.append({
-                        'position': sub.position,
-                        'content': sub.content,
-                        'transcript_lines': transcript_lines
-                    })
-                
-                # Sort by position to ensure correct order
-                subsummaries = sorted(subsummaries, key=lambda x: x['position'])
-            
-            days_data[day_key]['lifelogs'].append({
-                'id': log.id,
-                'title': log.title or "Untitled",
-                'description': log.description,
-                'time': log.created_at.strftime('%H:%M'),
-                'log_type': log.log_type,
-                'tags': json.loads(log.tags) if log.tags else [],
-                'subsummaries': subsummaries
-            })
-        
-        # Process Netflix viewing history
-        for item in netflix_history:
-            day_key = item.watch_date.strftime('%Y-%m-%d')
-            if day_key not in days_data:
-                days_data[day_key] = {
-                    'date': day_key,
-                    'conversations': [],
-                    'facts': [],
-                    'lifelogs': [],
-                    'netflix': []
-                }
-            
-            # Get enriched data if available
-            title_info = session.query(models.Netflix_Title_Info).filter_by(title=item.title).first()
-            
-            watch_entry = {
-                'id': item.id,
-                'title': item.title,
-                'time': item.watch_date.strftime('%H:%M'),
-                'show_name': item.show_name,
-                'season': item.season,
-                'episode_name': item.episode_name,
-                'content_type': item.content_type or (title_info.content_type if title_info else None),
-                'release_year': item.release_year or (title_info.release_year if title_info else None),
-                'genres': json.loads(item.genres) if item.genres else (
-                    json.loads(title_info.genres) if title_info and title_info.genres else []
-                ),
-                'poster_url': title_info.poster_url if title_info else None,
-                'imdb_score': title_info.imdb_score if title_info else None
-            }
-            
-            days_data[day_key]['netflix'].append(watch_entry)
-        
-        # Convert to list and sort by date
-        days_list = [days_data[day] for day in sorted(days_data.keys(), reverse=True)]
+        days_list = build_journal_days(session, start_date_obj, end_date_obj)
         
         return jsonify({
             "status": "success",
@@ -299,6 +106,182 @@ def journal_data():
     finally:
         session.close()
 
+def build_journal_days(session, start_date_obj, end_date_obj):
+    """
+    Collect journal entries from all sources for a date range.
+    
+    Shared by the journal API and the server-rendered day view so both
+    produce exactly the same payload.
+    
+    Args:
+        session: Active database session
+        start_date_obj: First day of the range (datetime)
+        end_date_obj: Last day of the range (datetime, inclusive)
+        
+    Returns:
+        List of day dictionaries sorted newest first
+    """
+    # Get Bee conversations
+    bee_conversations = session.query(models.Bee_Conversation).filter(
+        and_(
+            models.Bee_Conversation.created_at >= start_date_obj,
+            models.Bee_Conversation.created_at < end_date_obj + timedelta(days=1)
+        )
+    ).order_by(models.Bee_Conversation.created_at.desc()).all()
+    
+    # Facts removed as requested
+    bee_facts = []  # Empty list to maintain compatibility with existing code
+    
+    # Get Limitless lifelogs with their subsummaries
+    lifelogs = session.query(models.Limitless_Lifelog).filter(
+        and_(
+            models.Limitless_Lifelog.created_at >= start_date_obj,
+            models.Limitless_Lifelog.created_at < end_date_obj + timedelta(days=1)
+        )
+    ).order_by(models.Limitless_Lifelog.created_at.desc()).all()
+    
+    # Load related subsummaries for each lifelog
+    for log in lifelogs:
+        subsummaries = session.query(models.Limitless_Lifelog_SubSummary).filter(
+            models.Limitless_Lifelog_SubSummary.lifelog_id == log.log_id
+        ).order_by(models.Limitless_Lifelog_SubSummary.position).all()
+        
+        log.subsummaries = subsummaries
+    
+    # Transcript lines of all subsummaries at once, whether stored as rows or packs
+    transcript_lines_by_subsummary = transcript_store.read_transcript_lines(
+        session, [sub.id for log in lifelogs for sub in log.subsummaries]
+    )
+    
+    # Get Netflix viewing history
+    netflix_history = session.query(models.Netflix_History_Item).filter(
+        and_(
+            models.Netflix_History_Item.watch_date >= start_date_obj,
+            models.Netflix_History_Item.watch_date < end_date_obj + timedelta(days=1)
+        )
+    ).order_by(models.Netflix_History_Item.watch_date.desc()).all()
+    
+    # Process data into a format suitable for the journal
+    days_data = {}
+    
+    # Process Bee conversations
+    for conv in bee_conversations:
+        day_key = conv.created_at.strftime('%Y-%m-%d')
+        if day_key not in days_data:
+            days_data[day_key] = {
+                'date': day_key,
+                'conversations': [],
+                'facts': [],
+                'lifelogs': [],
+                'netflix': []
+            }
+        
+        # Sections are normalized at ingest; key_takeaways is a list of points or None
+        days_data[day_key]['conversations'].append({
+            'id': conv.id,
+            'summary': conv.summary or "",
+            'atmosphere': conv.atmosphere or "",
+            'key_takeaways': conv.key_takeaways or None,
+            'time': conv.created_at.strftime('%H:%M'),
+            'location': conv.address if conv.address else None,
+            'latitude': conv.latitude,
+            'longitude': conv.longitude
+        })
+    
+    # Process Bee facts
+    for fact in bee_facts:
+        day_key = fact.created_at.strftime('%Y-%m-%d')
+        if day_key not in days_data:
+            days_data[day_key] = {
+                'date': day_key,
+                'conversations': [],
+                'facts': [],
+                'lifelogs': [],
+                'netflix': []
+            }
+        
+        days_data[day_key]['facts'].append({
+            'id': fact.id,
+            'text': fact.text,
+            'time': fact.created_at.strftime('%H:%M')
+        })
+    
+    # Process Limitless lifelogs
+    for log in lifelogs:
+        day_key = log.created_at.strftime('%Y-%m-%d')
+        if day_key not in days_data:
+            days_data[day_key] = {
+                'date': day_key,
+                'conversations': [],
+                'facts': [],
+                'lifelogs': [],
+                'netflix': []
+            }
+        
+        # Get subsummaries with transcript lines for this lifelog if available
+        subsummaries = []
+        if hasattr(log, 'subsummaries') and log.subsummaries:
+            # Process each subsummary and its transcript lines
+            for sub in log.subsummaries:
+                # Transcript lines for this subsummary, already formatted by transcript_store
+                transcript_lines = transcript_lines_by_subsummary.get(sub.id, [])
+                
+                # Add subsummary with its transcript lines
+                subsummaries.append({
+                    'position': sub.position,
+                    'content': sub.content,
+                    'transcript_lines': transcript_lines
+                })
+            
+            # Sort by position to ensure correct order
+            subsummaries = sorted(subsummaries, key=lambda x: x['position'])
+        
+        days_data[day_key]['lifelogs'].append({
+            'id': log.id,
+            'title': log.title or "Untitled",
+            'description': log.description,
+            'time': log.created_at.strftime('%H:%M'),
+            'log_type': log.log_type,
+            'tags': json.loads(log.tags) if log.tags else [],
+            'subsummaries': subsummaries
+        })
+    
+    # Process Netflix viewing history
+    for item in netflix_history:
+        day_key = item.watch_date.strftime('%Y-%m-%d')
+        if day_key not in days_data:
+            days_data[day_key] = {
+                'date': day_key,
+                'conversations': [],
+                'facts': [],
+                'lifelogs': [],
+                'netflix': []
+            }
+        
+        # Get enriched data if available
+        title_info = session.query(models.Netflix_Title_Info).filter_by(title=item.title).first()
+        
+        watch_entry = {
+            'id': item.id,
+            'title': item.title,
+            'time': item.watch_date.strftime('%H:%M'),
+            'show_name': item.show_name,
+            'season': item.season,
+            'episode_name': item.episode_name,
+            'content_type': item.content_type or (title_info.content_type if title_info else None),
+            'release_year': item.release_year or (title_info.release_year if title_info else None),
+            'genres': json.loads(item.genres) if item.genres else (
+                json.loads(title_info.genres) if title_info and title_info.genres else []
+            ),
+            'poster_url': title_info.poster_url if title_info else None,
+            'imdb_score': title_info.imdb_score if title_info else None
+        }
+        
+        days_data[day_key]['netflix'].append(watch_entry)
+    
+    # Convert to list and sort by date
+    return [days_data[day] for day in sorted(days_data.keys(), reverse=True)]
+
 @app.route('/api/date_counts')
 def date_counts():
     """Get counts of entries by date for calendar visualization."""
@@ -317,61 +300,17 @@ def date_counts():
         # Dictionary to hold counts by date
         date_data = {}
         
-        # Query Bee conversations counts by date
-        conv_counts = session.query(
-            func.date(models.Bee_Conversation.created_at).label('date'),
-            func.count().label('count')
-        ).filter(
-            and_(
-                models.Bee_Conversation.created_at >= start_date,
-                models.Bee_Conversation.created_at <= end_date
-            )
-        ).group_by(func.date(models.Bee_Conversation.created_at)).all()
+        # One indexed range read over the daily activity rollup
+        # (facts are tracked in the rollup but not shown, as requested)
+        activity = db.get_daily_activity(session, start_date, end_date,
+                                         sources=['conversations', 'lifelogs', 'netflix'])
         
-        for date_str, count in conv_counts:
-            date_key = date_str.strftime('%Y-%m-%d')
+        for row in activity:
+            date_key = row.day.strftime('%Y-%m-%d')
             if date_key not in date_data:
                 date_data[date_key] = {'conversations': 0, 'facts': 0, 'lifelogs': 0, 'netflix': 0, 'total': 0}
-            date_data[date_key]['conversations'] = count
-            date_data[date_key]['total'] += count
-        
-        # Facts queries removed as requested
-        
-        # Query Limitless lifelogs counts by date
-        lifelog_counts = session.query(
-            func.date(models.Limitless_Lifelog.created_at).label('date'),
-            func.count().label('count')
-        ).filter(
-            and_(
-                models.Limitless_Lifelog.created_at >= start_date,
-                models.Limitless_Lifelog.created_at <= end_date
-            )
-        ).group_by(func.date(models.Limitless_Lifelog.created_at)).all()
-        
-        for date_str, count in lifelog_counts:
-            date_key = date_str.strftime('%Y-%m-%d')
-            if date_key not in date_data:
-                date_data[date_key] = {'conversations': 0, 'facts': 0, 'lifelogs': 0, 'netflix': 0, 'total': 0}
-            date_data[date_key]['lifelogs'] = count
-            date_data[date_key]['total'] += count
-        
-        # Query Netflix history counts by date
-        netflix_counts = session.query(
-            func.date(models.Netflix_History_Item.watch_date).label('date'),
-            func.count().label('count')
-        ).filter(
-            and_(
-                models.Netflix_History_Item.watch_date >= start_date,
-                models.Netflix_History_Item.watch_date <= end_date
-            )
-        ).group_by(func.date(models.Netflix_History_Item.watch_date)).all()
-        
-        for date_str, count in netflix_counts:
-            date_key = date_str.strftime('%Y-%m-%d')
-            if date_key not in date_data:
-                date_data[date_key] = {'conversations': 0, 'facts': 0, 'lifelogs': 0, 'netflix': 0, 'total': 0}
-            date_data[date_key]['netflix'] = count
-            date_data[date_key]['total'] += count
+            date_data[date_key][row.source] = row.item_count
+            date_data[date_key]['total'] += row.item_count
         
         # Convert to list format with date as key
         result = [{"date": date, **counts} for date, counts in date_data.items()]
@@ -388,15 +327,196 @@ def date_counts():
     finally:
         session.close()
 
+@app.route('/api/search')
+def search():
+    """Full-text search across conversations, facts, lifelogs and transcripts."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Missing search query (q)"}), 400
+    
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 20))
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
+        types = search_module.parse_types(request.args.get('types'))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+    
+    session = get_db_session()
+    try:
+        results = search_module.search(session, query, page=page, per_page=per_page,
+                                       start_date=start_date, end_date=end_date, types=types)
+        return jsonify({"status": "success", **results})
+    
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+    finally:
+        session.close()
+
+@app.route('/api/netflix/series')
+def netflix_series():
+    """Per-series Netflix viewing statistics from the netflix_series_stats rollup."""
+    try:
+        sort = request.args.get('sort', 'last_watch')
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
+        offset = max(0, int(request.args.get('offset', 0)))
+        if sort not in netflix_series_stats.SORT_COLUMNS:
+            raise ValueError(f"sort must be one of: {', '.join(netflix_series_stats.SORT_COLUMNS)}")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+    
+    session = get_db_session()
+    try:
+        total, rows = netflix_series_stats.get_series_stats(session, sort=sort, limit=limit, offset=offset)
+        return jsonify({
+            "status": "success",
+            "total": total,
+            "series": [netflix_series_stats.format_series_stats(row) for row in rows]
+        })
+    
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+    finally:
+        session.close()
+
+@app.route('/api/transcripts')
+def transcripts():
+    """Transcript lines overlapping a time window, across all lifelogs."""
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        if not start or not end:
+            raise ValueError("start and end are required")
+        # ISO datetimes; without an offset they are taken as UTC
+        start = datetime.fromisoformat(start.replace('Z', '+00:00'))
+        end = datetime.fromisoformat(end.replace('Z', '+00:00'))
+        limit = int(request.args.get('limit', 1000))
+        if transcript_store.as_utc(end) <= transcript_store.as_utc(start):
+            raise ValueError("end must be after start")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+    
+    session = get_db_session()
+    try:
+        window = transcript_store.get_transcript_lines_between(session, start, end, limit=limit)
+        return jsonify({"status": "success", **window})
+    
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+    finally:
+        session.close()
+
+@app.route('/api/speakers')
+def speaker_list():
+    """Speakers heard in Limitless transcripts, with the spellings that resolve to them."""
+    session = get_db_session()
+    try:
+        return jsonify({"status": "success", "speakers": speakers.list_speakers(session)})
+    
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+    finally:
+        session.close()
+
+@app.route('/api/speakers/<int:speaker_id>/lines')
+def speaker_lines(speaker_id):
+    """A speaker's transcript lines in time order, paginated with next_cursor."""
+    try:
+        limit = int(request.args.get('limit', 100))
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        # end_date is inclusive
+        end_date = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+        cursor = request.args.get('cursor')
+        if cursor:
+            speakers.decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
+    
+    session = get_db_session()
+    try:
+        speaker = session.get(models.Speaker, speaker_id)
+        if speaker is None:
+            return jsonify({"error": f"No speaker with id {speaker_id}"}), 404
+        page = speakers.get_speaker_lines(session, speaker_id, start=start_date, end=end_date,
+                                          cursor=cursor, limit=limit)
+        return jsonify({
+            "status": "success",
+            "speaker": {"id": speaker.id, "name": speaker.name},
+            **page
+        })
+    
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+    finally:
+        session.close()
+
+@app.route('/api/related/<doc_type>/<int:doc_id>')
+def related(doc_type, doc_id):
+    """Precomputed conversations and lifelogs most similar to a conversation or lifelog."""
+    if doc_type not in related_index.DOCUMENT_TYPES:
+        return jsonify({"error": f"Invalid type: use one of {', '.join(related_index.DOCUMENT_TYPES)}"}), 400
+    
+    session = get_db_session()
+    try:
+        return jsonify({
+            "status": "success",
+            "type": doc_type,
+            "id": doc_id,
+            "related": related_index.get_related(session, doc_type, doc_id)
+        })
+    
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+    finally:
+        session.close()
+
 @app.route('/day/<date>')
 def day_view(date):
-    """Show journal for a specific day."""
+    """Show journal for a specific day with its data embedded in the page."""
     try:
         # Validate date format
-        datetime.strptime(date, '%Y-%m-%d')
-        return render_template('day.html', date=date)
+        date_obj = datetime.strptime(date, '%Y-%m-%d')
     except ValueError:
         return "Invalid date format. Use YYYY-MM-DD", 400
+    
+    # Embed the day's journal data so the page renders without a second
+    # round trip; the page falls back to /api/journal_data if this fails
+    initial_data = None
+    session = get_db_session()
+    try:
+        days_list = build_journal_days(session, date_obj, date_obj)
+        initial_data = {
+            "status": "success",
+            "date_range": {
+                "start": date,
+                "end": date
+            },
+            "days": days_list
+        }
+    except Exception:
+        import traceback
+        print(traceback.format_exc())
+    finally:
+        session.close()
+    
+    return render_template('day.html', date=date, initial_data=initial_data)
 
 if __name__ == '__main__':
     # Create templates directory if needed